@@ -0,0 +1,37 @@
+"""
+Access control for the admin endpoints (everything under /api/admin/).
+
+The admin routes share one dependency, require_admin(): a request must
+carry the ADMIN_TOKEN in an X-Admin-Token header. With no ADMIN_TOKEN set
+the admin endpoints refuse every request. Request profiling has its own
+signed header (see app.profiling) and never profiles these endpoints.
+"""
+
+from typing import Optional
+import hmac
+import os
+
+from fastapi import Header, HTTPException, status
+
+# Shared secret for the X-Admin-Token header (empty disables the admin endpoints)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+ADMIN_PATH_PREFIX = "/api/admin/"
+
+
+def verify_admin_token(token: Optional[str]) -> bool:
+    """Check an X-Admin-Token value. Always False when no ADMIN_TOKEN is set."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    FastAPI dependency of every admin route.
+
+    Raises:
+        HTTPException: 403 if the X-Admin-Token header is missing or wrong
+    """
+    if not verify_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
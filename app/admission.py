@@ -0,0 +1,399 @@
+"""
+Admission control, load shedding and request deadlines.
+
+Every limited route has a concurrency limit and a bounded wait queue. A
+request that finds the queue full, or waits longer than
+ADMISSION_MAX_WAIT_MS for a slot, is answered at once with 503 and
+Retry-After instead of piling up work the client will have given up on.
+
+Concurrency limits bound requests that wait on something (synthesis in
+the threadpool, streaming). A worker saturated by CPU shows up as event
+loop lag instead: a monitor task measures how late its timer fires, and
+while the lag is above ADMISSION_SHED_LAG_MS new sessions (GET
+/api/topics, the first request of a visit) are turned away so sessions
+already in progress can finish.
+
+Each API request also gets a deadline (REQUEST_DEADLINE_MS, or less if the
+client sends X-Request-Timeout-Ms). Only request/response routes under
+/api/ get one: static files and the index are served without, and an
+event stream (/api/topics/{id}/events, or any text/event-stream response)
+lives as long as its client stays connected. remaining_seconds() exposes it to the
+layers below: MongoDB queries run with maxTimeMS, synthesis that cannot
+finish in time is not started, and the TTS call gets a timeout. Work past
+its deadline raises DeadlineExceeded, which the app answers with 504.
+
+Configuration:
+    ADMISSION_CONTROL=0             disable limits and shedding (deadlines still apply)
+    ADMISSION_LIMITS=faq=8:16,...   per-route concurrency:queue overrides
+"""
+
+from typing import Dict, Any, List, Optional, Pattern
+from collections import deque
+from contextvars import ContextVar
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_CONTROL", "1") != "0"
+# Longest a request waits in a route's queue before it is turned away
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "1000"))
+# Event loop lag above which new sessions are shed
+ADMISSION_SHED_LAG_MS = float(os.getenv("ADMISSION_SHED_LAG_MS", "100"))
+# Seconds clients are told to wait before retrying a shed request
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Default time budget of a request (0 = no deadline)
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "10000"))
+
+DEADLINE_HEADER = b"x-request-timeout-ms"
+
+# Requests given a deadline: the API, except its long-lived event streams
+DEADLINE_PATH_PREFIX = "/api/"
+EVENT_STREAM_PATH = re.compile(r"/api/topics/[^/]+/events")
+
+# How often the lag monitor wakes up, and the weight of each new sample
+LAG_INTERVAL_SECONDS = 0.025
+LAG_SMOOTHING = 0.3
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before the work could be done."""
+
+
+# Monotonic time by which the current request must be answered
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining_seconds() -> Optional[float]:
+    """Time left until the current request's deadline, or None outside a request."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def remaining_ms() -> Optional[int]:
+    """
+    Whole milliseconds left until the deadline (at least 1), e.g. for maxTimeMS.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    remaining = remaining_seconds()
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return max(1, int(remaining * 1000))
+
+
+def check_deadline(operation: str = "request"):
+    """Raise DeadlineExceeded if the current request is out of time."""
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {operation}")
+
+
+def set_deadline(seconds: Optional[float]):
+    """
+    Give the current context a deadline `seconds` from now (None clears it).
+    Used by the middleware, and by tests and batch jobs.
+
+    Returns:
+        The token for resetting it
+    """
+    return _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+class ConcurrencyLimiter:
+    """
+    A concurrency limit with a bounded FIFO wait queue, for one event loop.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_wait = 0
+        self.rejected_lag = 0
+        self.max_queued = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        """
+        Take a slot, waiting at most `timeout` seconds in the queue.
+
+        Returns:
+            bool: False if the queue was full or the wait timed out
+        """
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size or timeout <= 0:
+            self.rejected_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.max_queued = max(self.max_queued, len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted just as the wait timed out: keep the slot
+                self.admitted += 1
+                return True
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self.rejected_wait += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self):
+        """Free a slot, handing it straight to the oldest waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_wait": self.rejected_wait,
+            "rejected_overload": self.rejected_lag,
+        }
+
+
+class RouteLimit:
+    """A limited group of routes: method, path pattern, limits and shedding."""
+
+    def __init__(
+        self,
+        name: str,
+        methods: str,
+        pattern: str,
+        concurrency: int,
+        queue_size: int,
+        shed_on_lag: bool = False,
+    ):
+        self.name = name
+        self.methods = set(methods.split("|"))
+        self.pattern: Pattern = re.compile(pattern)
+        self.shed_on_lag = shed_on_lag
+        self.limiter = ConcurrencyLimiter(name, concurrency, queue_size)
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and self.pattern.fullmatch(path) is not None
+
+
+def _route_limits() -> List[RouteLimit]:
+    """The limited routes, with ADMISSION_LIMITS overrides applied. First match wins."""
+    limits = [
+        # The first request of a session: shed here first when the worker is overloaded
+        RouteLimit("list_topics", "GET", r"/api/topics", 64, 128, shed_on_lag=True),
+        # May synthesise audio (seconds per request)
+        RouteLimit("open_topic", "GET", r"/api/topics/[^/]+", 32, 64),
+        RouteLimit("faq", "GET", r"/api/faqs/[^/]+", 32, 64),
+        RouteLimit("timing", "GET", r"/api/(topics|faqs)/[^/]+/timing", 32, 64),
+        RouteLimit(
+            "media", "GET", r"/api/topics/[^/]+/hls/[^/]+|/api/(topics|faqs)/[^/]+/audio-variants",
+            32, 64,
+        ),
+        RouteLimit("write", "POST|PATCH", r"/api/(topics|faqs)(/[^/]+)?", 4, 16),
+    ]
+    by_name = {limit.name: limit for limit in limits}
+    for override in filter(None, os.getenv("ADMISSION_LIMITS", "").split(",")):
+        name, _, values = override.partition("=")
+        concurrency, _, queue_size = values.partition(":")
+        limit = by_name.get(name.strip())
+        if limit is None:
+            logger.warning("Unknown route in ADMISSION_LIMITS", extra={"route": name})
+            continue
+        limit.limiter.concurrency = int(concurrency)
+        if queue_size:
+            limit.limiter.queue_size = int(queue_size)
+    return limits
+
+
+ROUTE_LIMITS = _route_limits()
+
+# Event loop lag (ms), smoothed, as measured by the monitor task
+_loop_lag_ms = 0.0
+_max_loop_lag_ms = 0.0
+_lag_task: Optional[asyncio.Task] = None
+_deadlines_exceeded = 0
+
+
+def get_loop_lag_ms() -> float:
+    """Smoothed event loop lag of this worker in milliseconds."""
+    return _loop_lag_ms
+
+
+async def _monitor_loop_lag():
+    """Sample how late a short timer fires; lateness is time spent queued behind other work."""
+    global _loop_lag_ms, _max_loop_lag_ms
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_INTERVAL_SECONDS
+        await asyncio.sleep(LAG_INTERVAL_SECONDS)
+        lag_ms = max(0.0, loop.time() - expected) * 1000
+        _loop_lag_ms += LAG_SMOOTHING * (lag_ms - _loop_lag_ms)
+        _max_loop_lag_ms = max(_max_loop_lag_ms, lag_ms)
+
+
+def start_lag_monitor():
+    """Start measuring event loop lag (call from the running loop, e.g. in lifespan)."""
+    global _lag_task
+    if ADMISSION_ENABLED and _lag_task is None:
+        _lag_task = asyncio.get_running_loop().create_task(_monitor_loop_lag())
+
+
+async def stop_lag_monitor():
+    """Stop the lag monitor task."""
+    global _lag_task, _loop_lag_ms
+    task, _lag_task = _lag_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _loop_lag_ms = 0.0
+
+
+def record_deadline_exceeded():
+    """Count a request answered with 504 because it ran out of time."""
+    global _deadlines_exceeded
+    _deadlines_exceeded += 1
+
+
+def get_admission_stats() -> Dict[str, Any]:
+    """Per-route admission counters, loop lag and deadline misses."""
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "loop_lag_ms": round(_loop_lag_ms, 1),
+        "max_loop_lag_ms": round(_max_loop_lag_ms, 1),
+        "deadlines_exceeded": _deadlines_exceeded,
+        "routes": {limit.name: limit.limiter.stats() for limit in ROUTE_LIMITS},
+    }
+
+
+def _request_timeout(scope) -> float:
+    """
+    The request's time budget in seconds (0 = none); clients may ask for
+    less than REQUEST_DEADLINE_MS, not more. Only API request/response
+    routes have one.
+    """
+    path = scope["path"]
+    if not path.startswith(DEADLINE_PATH_PREFIX) or EVENT_STREAM_PATH.fullmatch(path):
+        return 0
+    timeout_ms = REQUEST_DEADLINE_MS
+    for name, value in scope["headers"]:
+        if name == DEADLINE_HEADER:
+            try:
+                requested = float(value)
+            except ValueError:
+                continue
+            if requested > 0:
+                timeout_ms = min(timeout_ms, requested) if timeout_ms > 0 else requested
+    return timeout_ms / 1000
+
+
+async def _send_overloaded(send, route: str):
+    body = json.dumps({"detail": "Server overloaded, retry later", "route": route}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(ADMISSION_RETRY_AFTER)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def _clear_deadline_on_stream(send):
+    """Wrap send so that a response that turns out to be an event stream drops the deadline."""
+
+    async def send_checked(message):
+        if message["type"] == "http.response.start" and any(
+            name == b"content-type" and value.startswith(b"text/event-stream")
+            for name, value in message.get("headers", ())
+        ):
+            # The stream's body is produced in this context from here on
+            _deadline.set(None)
+        await send(message)
+
+    return send_checked
+
+
+class AdmissionMiddleware:
+    """Set request deadlines, and admit, queue or shed requests to limited routes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = _request_timeout(scope)
+        token = set_deadline(timeout if timeout > 0 else None)
+        if timeout > 0:
+            send = _clear_deadline_on_stream(send)
+        try:
+            limit = None
+            if ADMISSION_ENABLED:
+                method, path = scope["method"], scope["path"]
+                limit = next((item for item in ROUTE_LIMITS if item.matches(method, path)), None)
+
+            if limit is None:
+                await self.app(scope, receive, send)
+                return
+
+            limiter = limit.limiter
+            if limit.shed_on_lag and _loop_lag_ms > ADMISSION_SHED_LAG_MS:
+                limiter.rejected_lag += 1
+                await _send_overloaded(send, limit.name)
+                return
+
+            max_wait = ADMISSION_MAX_WAIT_MS / 1000
+            if not await limiter.acquire(min(max_wait, timeout) if timeout > 0 else max_wait):
+                await _send_overloaded(send, limit.name)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                limiter.release()
+        finally:
+            _deadline.reset(token)
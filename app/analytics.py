@@ -0,0 +1,262 @@
+"""
+View and play counters for topic and FAQ popularity.
+
+Request handlers call record_view()/record_play(), which only append an
+event to an in-memory deque (atomic under the GIL, no lock, well under a
+microsecond). A background thread per worker sums the events every
+ANALYTICS_DRAIN_INTERVAL_S and, every ANALYTICS_FLUSH_INTERVAL_S, writes
+the sums to the repository as "$inc" upserts into time buckets of
+ANALYTICS_BUCKET_S seconds - one bulk write per flush, however many
+requests were counted. Workers add to the same buckets, so no
+coordination is needed.
+
+The thread also wakes at every bucket boundary, so events land in the
+bucket they happened in. stop_analytics() (called on shutdown) writes
+everything still counted; a failed write is kept and retried on the next
+flush.
+
+Views are detail fetches (GET /api/topics/{id}, GET /api/faqs/{id}),
+except requests sent with a "Purpose: prefetch" header. Plays are the
+beacons the frontend posts when audio starts.
+
+Nodes serving a read-only catalogue snapshot (CATALOGUE_SNAPSHOT) have no
+database to write counters to or rank from: nothing is counted there and
+get_popular() returns an empty list.
+"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from collections import deque
+from datetime import datetime
+import logging
+import os
+import threading
+import time
+
+from app.repository import get_repository
+from app.snapshot import snapshot_enabled
+
+logger = logging.getLogger(__name__)
+
+
+# Set ANALYTICS=0 to stop counting
+ANALYTICS_ENABLED = os.getenv("ANALYTICS", "1") != "0"
+
+# Width of a counter bucket, and how often counts are summed and written
+ANALYTICS_BUCKET_S = int(os.getenv("ANALYTICS_BUCKET_S", "3600"))
+ANALYTICS_DRAIN_INTERVAL_S = float(os.getenv("ANALYTICS_DRAIN_INTERVAL_S", "1"))
+ANALYTICS_FLUSH_INTERVAL_S = float(os.getenv("ANALYTICS_FLUSH_INTERVAL_S", "10"))
+
+TOPIC_KIND = "topic"
+FAQ_KIND = "faq"
+VIEWS = "views"
+PLAYS = "plays"
+
+# (kind, document id, bucket start)
+CounterKey = Tuple[str, str, datetime]
+
+
+def bucket_start(timestamp: float) -> datetime:
+    """The UTC start of the bucket a Unix timestamp falls in."""
+    return datetime.utcfromtimestamp(timestamp - timestamp % ANALYTICS_BUCKET_S)
+
+
+class CounterRecorder:
+    """Count events in memory and write them as bucketed "$inc" upserts."""
+
+    def __init__(
+        self,
+        drain_interval: float = None,
+        flush_interval: float = None,
+    ):
+        self.drain_interval = drain_interval or ANALYTICS_DRAIN_INTERVAL_S
+        self.flush_interval = flush_interval or ANALYTICS_FLUSH_INTERVAL_S
+
+        self._events: deque = deque()
+        # Bound method, so recording is a single C call
+        self._append = self._events.append
+        self._counts: Dict[CounterKey, Dict[str, int]] = {}
+        self._bucket = bucket_start(time.time())
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._recorded = 0
+        self._written = 0
+        self._flushes = 0
+        self._errors = 0
+        self._last_flush_ms: Optional[float] = None
+
+    def record(self, kind: str, doc_id: str, field: str):
+        """Count one event. Starts the background thread on first use."""
+        self._append((kind, doc_id, field))
+        if self._thread is None:
+            self._start()
+
+    def drain(self):
+        """Sum the recorded events into the current bucket's counters."""
+        with self._lock:
+            events = self._events
+            counts = self._counts
+            bucket = self._bucket
+            # Only the events present now; later appends wait for the next drain
+            pending = len(events)
+            for _ in range(pending):
+                kind, doc_id, field = events.popleft()
+                key = (kind, doc_id, bucket)
+                fields = counts.get(key)
+                if fields is None:
+                    counts[key] = fields = {VIEWS: 0, PLAYS: 0}
+                fields[field] += 1
+            self._recorded += pending
+            self._bucket = bucket_start(time.time())
+
+    def flush(self) -> int:
+        """
+        Drain, then write every counter to the repository.
+
+        Returns:
+            int: Number of bucket documents written (0 if nothing was counted or the write failed)
+        """
+        with self._flush_lock:
+            self.drain()
+            with self._lock:
+                counts, self._counts = self._counts, {}
+            if not counts:
+                return 0
+            if snapshot_enabled():
+                # Counted before the node switched to a snapshot; there is nowhere to write them
+                logger.warning("Snapshot mode, counters dropped", extra={"documents": len(counts)})
+                return 0
+
+            start = time.perf_counter()
+            try:
+                get_repository().add_counts(counts)
+            except Exception:
+                # Keep the counts for the next flush, adding anything drained since
+                with self._lock:
+                    for key, fields in self._counts.items():
+                        merged = counts.setdefault(key, {VIEWS: 0, PLAYS: 0})
+                        merged[VIEWS] += fields[VIEWS]
+                        merged[PLAYS] += fields[PLAYS]
+                    self._counts = counts
+                    self._errors += 1
+                logger.exception("Counter flush failed", extra={"documents": len(counts)})
+                return 0
+
+            with self._lock:
+                self._written += len(counts)
+                self._flushes += 1
+                self._last_flush_ms = (time.perf_counter() - start) * 1000
+            return len(counts)
+
+    def stop(self):
+        """Stop the background thread and write everything still counted."""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        self.flush()
+        with self._lock:
+            self._thread = None
+            self._stop.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counting and flush metrics."""
+        with self._lock:
+            return {
+                "enabled": analytics_enabled(),
+                "events_recorded": self._recorded,
+                "events_waiting": len(self._events),
+                "counters_pending": len(self._counts),
+                "counters_written": self._written,
+                "flushes": self._flushes,
+                "last_flush_ms": (
+                    round(self._last_flush_ms, 2) if self._last_flush_ms is not None else None
+                ),
+                "flush_errors": self._errors,
+            }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="analytics", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            # Wake at the bucket boundary too, so events aren't counted in the next bucket
+            now = time.time()
+            until_boundary = ANALYTICS_BUCKET_S - now % ANALYTICS_BUCKET_S
+            if self._stop.wait(min(self.drain_interval, until_boundary)):
+                return
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+            else:
+                self.drain()
+
+
+# Recorder instance - one per worker process
+_recorder = CounterRecorder()
+
+
+def get_recorder() -> CounterRecorder:
+    """Get this worker's counter recorder."""
+    return _recorder
+
+
+def set_recorder(recorder: CounterRecorder):
+    """Replace the counter recorder (used by tests and benchmarks)."""
+    global _recorder
+    _recorder.stop()
+    _recorder = recorder
+
+
+def analytics_enabled() -> bool:
+    """Whether events are counted: ANALYTICS is on and a database is behind the catalogue."""
+    return ANALYTICS_ENABLED and not snapshot_enabled()
+
+
+def record_view(kind: str, doc_id: str):
+    """Count a view of a topic or FAQ ("topic" or "faq")."""
+    if analytics_enabled():
+        _recorder.record(kind, doc_id, VIEWS)
+
+
+def record_play(kind: str, doc_id: str):
+    """Count a play of a topic's or FAQ's audio."""
+    if analytics_enabled():
+        _recorder.record(kind, doc_id, PLAYS)
+
+
+def stop_analytics():
+    """Write everything counted so far. Called on shutdown."""
+    _recorder.stop()
+
+
+def get_popular(
+    kind: str, limit: int = 10, hours: float = 24, ids: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    The most viewed topics or FAQs over the last `hours` (among `ids`, if
+    given), as written by every worker (counts reach the database within
+    ANALYTICS_FLUSH_INTERVAL_S). Whole buckets are counted, so the window
+    starts at a bucket boundary.
+
+    Returns:
+        list: {"id", "views", "plays"} dicts, most viewed first (ties: most played);
+              empty in snapshot mode
+    """
+    if snapshot_enabled():
+        return []
+    since = bucket_start(time.time() - hours * 3600)
+    return get_repository().top_counts(kind, since, limit, ids)
+
+
+def get_analytics_stats() -> Dict[str, Any]:
+    """Counter metrics for /api/admin/metrics."""
+    return _recorder.stats()
+
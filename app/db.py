@@ -1,58 +1,156 @@
 """
-MongoDB database connection and helper functions.
+Database helper functions used by the routes and tools.
+
+Each helper delegates to the catalogue repository selected by DB_BACKEND
+(MongoDB by default, or embedded SQLite - see app.repository). Reads are
+answered from a catalogue snapshot instead when CATALOGUE_SNAPSHOT is set
+(see app.snapshot).
 """
 
-from dotenv import load_dotenv
-from pymongo import MongoClient
-from pymongo.database import Database
-from pymongo.collection import Collection
 from bson import ObjectId
-from typing import Optional, Dict, Any
-from datetime import datetime
-import os
+from typing import Optional, Dict, Any, Iterable, Sequence, TYPE_CHECKING
+import logging
+
+from app.repository import (
+    get_repository,
+    set_repository,
+    MongoRepository,
+    VersionConflictError,
+    ANY_VERSION,
+    DATABASE_NAME,
+    utcnow,
+    TOPICS,
+    FAQS,
+)
+from app.snapshot import get_snapshot, snapshot_enabled
+
+if TYPE_CHECKING:
+    from app.write_behind import WriteBehindBatcher
+    from pymongo.database import Database
+    from pymongo.collection import Collection
 
-load_dotenv()  # Load environment variables from .env file
+logger = logging.getLogger(__name__)
 
-# MongoDB connection string - can be configured via environment variable
-MONGODB_URI = os.getenv("MONGODB_URI")
-DATABASE_NAME = "edtech_avatar_teacher"
+__all__ = ["VersionConflictError", "DATABASE_NAME", "set_repository"]
 
-# Global client instance
-_client: Optional[MongoClient] = None
-_db: Optional[Database] = None
+# Fields whose change makes the stored narration audio (and its timing track) stale
+TOPIC_AUDIO_SOURCE_FIELDS = ("content_text", "language")
+FAQ_AUDIO_SOURCE_FIELDS = ("answer", "language")
 
+# Bumped whenever this process changes the topic list (see catalogue_generation())
+_catalogue_generation = 0
 
-def get_db() -> Database:
+
+def get_db() -> "Database":
     """
-    Get MongoDB database instance.
-    Creates connection if it doesn't exist.
+    Get the MongoDB database instance, for MongoDB-only features such as
+    change streams. Connects on first use.
+
+    Raises:
+        RuntimeError: If the configured backend is not MongoDB
     """
-    global _client, _db
+    repository = get_repository()
+    if not isinstance(repository, MongoRepository):
+        raise RuntimeError(f"MongoDB is not in use (DB_BACKEND={repository.name})")
+    return repository.db
 
-    if _db is None:
-        _client = MongoClient(MONGODB_URI)
-        _db = _client[DATABASE_NAME]
 
-    return _db
+def get_topics_collection() -> "Collection":
+    """Get the topics collection (MongoDB backend only)."""
+    return get_db()[TOPICS]
 
 
-def get_topics_collection() -> Collection:
-    """Get the topics collection."""
-    return get_db()["topics"]
+def get_faqs_collection() -> "Collection":
+    """Get the FAQs collection (MongoDB backend only)."""
+    return get_db()[FAQS]
 
 
-def get_faqs_collection() -> Collection:
-    """Get the FAQs collection."""
-    return get_db()["faqs"]
+def close_db():
+    """Write any queued updates, then close the database connection."""
+    get_repository().close()
 
 
-def close_db():
-    """Close the MongoDB connection."""
-    global _client, _db
-    if _client:
-        _client.close()
-        _client = None
-        _db = None
+def ensure_indexes():
+    """
+    Create the indexes the read helpers rely on.
+    Safe to call repeatedly - existing indexes are skipped.
+    """
+    get_repository().ensure_indexes()
+
+
+def count_topics() -> int:
+    """Number of topics in the database."""
+    return get_repository().count_topics()
+
+
+def clear_catalogue() -> Dict[str, int]:
+    """Delete every topic and FAQ. Returns deleted counts per collection."""
+    _check_writable()
+    try:
+        return get_repository().clear()
+    finally:
+        mark_catalogue_changed()
+
+
+def catalogue_generation() -> int:
+    """
+    A counter bumped on every topic insert, topic edit and clear made
+    through this process, and on topic changes seen on the change stream.
+    Caches of the topic list compare it to know when to rebuild.
+    """
+    return _catalogue_generation
+
+
+def mark_catalogue_changed():
+    """Bump catalogue_generation()."""
+    global _catalogue_generation
+    _catalogue_generation += 1
+
+
+def iter_topics() -> Iterable[Dict[str, Any]]:
+    """Every stored topic (full documents), for batch tools such as exporters."""
+    return get_repository().iter_documents(TOPICS)
+
+
+def iter_faqs() -> Iterable[Dict[str, Any]]:
+    """Every stored FAQ (full documents), for batch tools such as exporters."""
+    return get_repository().iter_documents(FAQS)
+
+
+def _set_fields(
+    collection: str, doc_id: str, fields: Dict[str, Any], version: Any = ANY_VERSION
+) -> bool:
+    """
+    Set fields on one document (through the write-behind batcher on MongoDB).
+    With a version, only while the document is still at it (None: a document
+    written before versioning), so results generated from content that has
+    since been edited are dropped.
+    Returns True if the update was queued or modified the document.
+    """
+    if snapshot_enabled():
+        # Edge nodes serve a read-only snapshot; generated audio isn't persisted there
+        logger.debug("Snapshot mode, update not stored", extra={"collection": collection, "id": doc_id})
+        return False
+    if not validate_object_id(doc_id):
+        return False
+    return get_repository().set_fields(collection, doc_id, {**fields, "updated_at": utcnow()}, version)
+
+
+def get_write_batcher() -> Optional["WriteBehindBatcher"]:
+    """The write-behind batcher (MongoDB backend), or None - SQLite writes directly."""
+    repository = get_repository()
+    return repository.batcher if isinstance(repository, MongoRepository) else None
+
+
+def get_write_batch_stats() -> Dict[str, Any]:
+    """Batch size and flush latency metrics of the write-behind batcher."""
+    return get_repository().write_batch_stats()
+
+
+def _check_writable():
+    """Refuse writes while the catalogue is served from a read-only snapshot."""
+    if snapshot_enabled():
+        raise RuntimeError("Catalogue is served from a read-only snapshot (CATALOGUE_SNAPSHOT)")
 
 
 def object_id_to_str(doc: Optional[Dict[Any, Any]]) -> Optional[Dict[str, Any]]:
@@ -85,13 +183,13 @@ def insert_topic(
     language: str,
     audio_url: Optional[str] = None,
     avatar_video_url: str = "/static/media/avatar_loop.mp4",
-) -> str:
+) -> Dict[str, Any]:
     """
     Insert a new topic into the database.
-    Returns the inserted topic's ID as a string.
+    Returns the stored topic (with "id"), so callers don't need to read it back.
     """
-    topics = get_topics_collection()
-    now = datetime.utcnow()
+    _check_writable()
+    now = utcnow()
 
     topic_doc = {
         "title": title,
@@ -99,12 +197,14 @@ def insert_topic(
         "language": language,
         "audio_url": audio_url,
         "avatar_video_url": avatar_video_url,
+        "version": 1,
         "created_at": now,
         "updated_at": now,
     }
 
-    result = topics.insert_one(topic_doc)
-    return str(result.inserted_id)
+    topic = get_repository().insert(TOPICS, topic_doc)
+    mark_catalogue_changed()
+    return topic
 
 
 def insert_faq(
@@ -113,13 +213,13 @@ def insert_faq(
     answer: str,
     language: str,
     answer_audio_url: Optional[str] = None,
-) -> str:
+) -> Dict[str, Any]:
     """
     Insert a new FAQ into the database.
-    Returns the inserted FAQ's ID as a string.
+    Returns the stored FAQ (with "id"), so callers don't need to read it back.
     """
-    faqs = get_faqs_collection()
-    now = datetime.utcnow()
+    _check_writable()
+    now = utcnow()
 
     faq_doc = {
         "topic_id": topic_id,
@@ -127,90 +227,137 @@ def insert_faq(
         "answer": answer,
         "language": language,
         "answer_audio_url": answer_audio_url,
+        "version": 1,
         "created_at": now,
         "updated_at": now,
     }
 
-    result = faqs.insert_one(faq_doc)
-    return str(result.inserted_id)
+    return get_repository().insert(FAQS, faq_doc)
 
 
-def update_topic_audio(topic_id: str, audio_url: str) -> bool:
+def update_topic(
+    topic_id: str, fields: Dict[str, Any], expected_version: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
     """
-    Update the audio_url for a topic.
-    Returns True if successful, False otherwise.
+    Update topic fields (title, content_text, language, audio_url, avatar_video_url).
+    Audio is invalidated only when content_text or language changes.
+    Returns the updated topic, or None if it doesn't exist.
+
+    Raises:
+        VersionConflictError: If expected_version is given and doesn't match
     """
-    topics = get_topics_collection()
-    result = topics.update_one(
-        {"_id": ObjectId(topic_id)},
-        {"$set": {"audio_url": audio_url, "updated_at": datetime.utcnow()}},
-    )
-    return result.modified_count > 0
+    _check_writable()
+    if not validate_object_id(topic_id):
+        return None
+    try:
+        return get_repository().update_document(
+            TOPICS, topic_id, fields, TOPIC_AUDIO_SOURCE_FIELDS, "audio_url", expected_version
+        )
+    finally:
+        mark_catalogue_changed()
 
 
-def update_faq_audio(faq_id: str, answer_audio_url: str) -> bool:
+def update_faq(
+    faq_id: str, fields: Dict[str, Any], expected_version: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
     """
-    Update the answer_audio_url for an FAQ.
-    Returns True if successful, False otherwise.
+    Update FAQ fields (question, answer, language, answer_audio_url).
+    Audio is invalidated only when answer or language changes.
+    Returns the updated FAQ, or None if it doesn't exist.
+
+    Raises:
+        VersionConflictError: If expected_version is given and doesn't match
     """
-    faqs = get_faqs_collection()
-    result = faqs.update_one(
-        {"_id": ObjectId(faq_id)},
-        {
-            "$set": {
-                "answer_audio_url": answer_audio_url,
-                "updated_at": datetime.utcnow(),
-            }
-        },
+    _check_writable()
+    if not validate_object_id(faq_id):
+        return None
+    return get_repository().update_document(
+        FAQS, faq_id, fields, FAQ_AUDIO_SOURCE_FIELDS, "answer_audio_url", expected_version
     )
-    return result.modified_count > 0
 
 
-def get_topic_by_id(topic_id: str) -> Optional[Dict[str, Any]]:
-    """Get a topic by its ID."""
+def update_topic_audio(topic_id: str, audio_url: str, version: Any = ANY_VERSION) -> bool:
+    """
+    Update the audio_url for a topic, if it is still at `version` (the one
+    the audio was synthesised from).
+    Returns True if successful (or queued for a batched write), False otherwise.
+    """
+    updated = _set_fields(TOPICS, topic_id, {"audio_url": audio_url}, version)
+    logger.debug("Updated topic audio", extra={"topic_id": topic_id, "audio_url": audio_url})
+    return updated
+
+
+def update_faq_audio(faq_id: str, answer_audio_url: str, version: Any = ANY_VERSION) -> bool:
+    """
+    Update the answer_audio_url for an FAQ, if it is still at `version` (the
+    one the audio was synthesised from).
+    Returns True if successful (or queued for a batched write), False otherwise.
+    """
+    updated = _set_fields(FAQS, faq_id, {"answer_audio_url": answer_audio_url}, version)
+    logger.debug("Updated FAQ audio", extra={"faq_id": faq_id, "audio_url": answer_audio_url})
+    return updated
+
+
+def update_topic_timing(topic_id: str, timing_track: Dict[str, Any], version: Any = ANY_VERSION) -> bool:
+    """
+    Store the word/viseme timing track for a topic's narration, if the topic
+    is still at `version` (the one the track was built from).
+    Returns True if successful (or queued for a batched write), False otherwise.
+    """
+    return _set_fields(TOPICS, topic_id, {"timing_track": timing_track}, version)
+
+
+def update_faq_timing(faq_id: str, timing_track: Dict[str, Any], version: Any = ANY_VERSION) -> bool:
+    """
+    Store the word/viseme timing track for an FAQ answer's audio, if the FAQ
+    is still at `version` (the one the track was built from).
+    Returns True if successful (or queued for a batched write), False otherwise.
+    """
+    return _set_fields(FAQS, faq_id, {"timing_track": timing_track}, version)
+
+
+def get_topic_by_id(topic_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get a topic by its ID. With `fields`, only those stored fields (and
+    "id") are read from the database; a snapshot returns the whole topic.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.get_topic(topic_id)
+
     if not validate_object_id(topic_id):
         return None
+    return get_repository().get(TOPICS, topic_id, fields)
 
-    topics = get_topics_collection()
-    topic = topics.find_one({"_id": ObjectId(topic_id)})
-    return object_id_to_str(topic)
 
+def get_faq_by_id(faq_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """Get an FAQ by its ID; `fields` as for get_topic_by_id."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.get_faq(faq_id)
 
-def get_faq_by_id(faq_id: str) -> Optional[Dict[str, Any]]:
-    """Get an FAQ by its ID."""
     if not validate_object_id(faq_id):
         return None
+    return get_repository().get(FAQS, faq_id, fields)
 
-    faqs = get_faqs_collection()
-    faq = faqs.find_one({"_id": ObjectId(faq_id)})
-    return object_id_to_str(faq)
-
-
-def get_all_topics() -> list:
-    """Get all topics (minimal info for list view)."""
-    topics = get_topics_collection()
-    result = []
-    for topic in topics.find():
-        result.append(
-            {
-                "id": str(topic["_id"]),
-                "title": topic["title"],
-                "language": topic["language"],
-            }
-        )
-    return result
+
+def get_all_topics(fields: Optional[Sequence[str]] = None) -> list:
+    """
+    Get all topics: minimal info for the list view (id, title, language),
+    or "id" and the stored `fields`.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        topics = snapshot.list_topics()
+        if fields is None:
+            return topics
+        return [snapshot.get_topic(topic["id"]) for topic in topics]
+    return get_repository().list_topics(fields)
 
 
 def get_faqs_by_topic_id(topic_id: str) -> list:
     """Get all FAQs for a specific topic."""
-    faqs = get_faqs_collection()
-    result = []
-    for faq in faqs.find({"topic_id": topic_id}):
-        result.append(
-            {
-                "id": str(faq["_id"]),
-                "question": faq["question"],
-                "answer_audio_url": faq.get("answer_audio_url"),
-            }
-        )
-    return result
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.list_faqs(topic_id)
+    return get_repository().list_faqs(topic_id)
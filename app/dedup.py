@@ -0,0 +1,382 @@
+"""
+Duplicate narration detection.
+
+Topic narrations and FAQ answers that are the same after normalisation
+(case, Unicode form, punctuation, whitespace) share one audio file: the
+synthesised file name is a hash of the normalised text and the language,
+so every equivalent text resolves to the same stored audio.
+
+Texts that are merely similar are found with MinHash signatures over word
+shingles, bucketed with locality-sensitive hashing (LSH) so candidates are
+found without comparing every pair. They are reported as clusters for
+editors to merge, and can optionally reuse each other's audio too
+(DEDUP_REUSE_SIMILARITY below 1.0) - off by default, since "not"-sized
+edits keep a high similarity but change the meaning.
+
+Usage:
+    python -m app.dedup          # print duplicate clusters and synthesis time saved
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+
+# Texts at least this similar (estimated Jaccard of word shingles) are reported together
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.8"))
+# Texts at least this similar reuse each other's audio; 1.0 = only normalised-equal texts
+DEDUP_REUSE_SIMILARITY = float(os.getenv("DEDUP_REUSE_SIMILARITY", "1.0"))
+# Synthesis time per character, used until this process has measured its own
+DEDUP_SECONDS_PER_CHAR = float(os.getenv("DEDUP_SECONDS_PER_CHAR", "0.01"))
+
+# MinHash signature = BANDS x ROWS values; texts sharing any band become candidates.
+# 16 x 4 makes pairs above ~50% similarity candidates, checked against the thresholds.
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+SHINGLE_WORDS = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutations(count: int) -> List[Tuple[int, int]]:
+    """Fixed (a, b) pairs for the hash family h(x) = (a * x + b) mod p."""
+    result = []
+    for i in range(count):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], "big") % _MERSENNE_PRIME
+        result.append((a, b))
+    return result
+
+
+_PERMUTATIONS = _permutations(NUM_PERM)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _strip_punctuation(text: str) -> str:
+    # By Unicode category (P*, S*), not [^\w\s]: \w doesn't match combining
+    # marks, and Devanagari matras and the virama tell दिन from दान
+    return "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise text for duplicate detection: Unicode NFKC, case-folded,
+    punctuation and symbols removed and whitespace collapsed. Combining
+    marks are kept.
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _strip_punctuation(text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def text_key(text: str, language: str = "en") -> str:
+    """Hash identifying every text equivalent to this one in a language."""
+    return hashlib.md5(f"{language}:{normalize_text(text)}".encode()).hexdigest()
+
+
+def shingles(normalized: str) -> Set[int]:
+    """32-bit hashes of the overlapping SHINGLE_WORDS-word windows of a normalised text."""
+    words = normalized.split()
+    if len(words) < SHINGLE_WORDS:
+        windows = [" ".join(words)]
+    else:
+        windows = [" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(w.encode(), digest_size=4).digest(), "big") for w in windows
+    }
+
+
+def minhash(normalized: str) -> Tuple[int, ...]:
+    """MinHash signature (NUM_PERM values) of a normalised text."""
+    values = shingles(normalized)
+    return tuple(
+        min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in values)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(signature_a: Tuple[int, ...], signature_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(signature_a, signature_b)) / NUM_PERM
+
+
+class DuplicateIndex:
+    """
+    MinHash/LSH index of narration texts, partitioned by language.
+
+    Entries are keyed by an id such as "topic:<id>" or "faq:<id>" and may
+    carry the audio URL already synthesised for them.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # (language, band number, band values) -> entry ids
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry_id: str, text: str, language: str = "en", audio_url: Optional[str] = None):
+        """Add or replace an entry."""
+        normalized = normalize_text(text)
+        entry = {
+            "id": entry_id,
+            "language": language,
+            "chars": len(text or ""),
+            "raw_key": hashlib.md5((text or "").encode()).hexdigest(),
+            "key": text_key(text, language),
+            "signature": minhash(normalized),
+            "audio_url": audio_url,
+            "excerpt": normalized[:80],
+        }
+        with self._lock:
+            self._remove(entry_id)
+            self._entries[entry_id] = entry
+            for band in self._bands(entry):
+                self._buckets.setdefault(band, set()).add(entry_id)
+
+    def remove(self, entry_id: str):
+        with self._lock:
+            self._remove(entry_id)
+
+    def find_similar(
+        self, text: str, language: str = "en", threshold: float = DEDUP_SIMILARITY
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Entries in the same language at least `threshold` similar to a text.
+
+        Returns:
+            list: (similarity, entry) pairs, most similar first
+        """
+        key = text_key(text, language)
+        signature = minhash(normalize_text(text))
+        probe = {"language": language, "signature": signature}
+        with self._lock:
+            candidates = set()
+            for band in self._bands(probe):
+                candidates |= self._buckets.get(band, set())
+            matches = []
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                score = 1.0 if entry["key"] == key else similarity(signature, entry["signature"])
+                if score >= threshold:
+                    matches.append((score, entry))
+        matches.sort(key=lambda match: -match[0])
+        return matches
+
+    def clusters(self, threshold: float = DEDUP_SIMILARITY) -> List[List[Dict[str, Any]]]:
+        """
+        Groups of entries linked by similarity at or above the threshold
+        (single-linkage), largest first. Singletons are left out.
+        """
+        with self._lock:
+            parent = {entry_id: entry_id for entry_id in self._entries}
+
+            def find(entry_id: str) -> str:
+                while parent[entry_id] != entry_id:
+                    parent[entry_id] = parent[parent[entry_id]]
+                    entry_id = parent[entry_id]
+                return entry_id
+
+            for members in self._buckets.values():
+                members = sorted(members)
+                for i, first_id in enumerate(members):
+                    first = self._entries[first_id]
+                    for second_id in members[i + 1 :]:
+                        if find(first_id) == find(second_id):
+                            continue
+                        second = self._entries[second_id]
+                        if first["key"] == second["key"] or (
+                            similarity(first["signature"], second["signature"]) >= threshold
+                        ):
+                            parent[find(second_id)] = find(first_id)
+
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for entry_id, entry in self._entries.items():
+                groups.setdefault(find(entry_id), []).append(entry)
+
+        result = [sorted(group, key=lambda e: e["id"]) for group in groups.values() if len(group) > 1]
+        result.sort(key=lambda group: (-len(group), group[0]["id"]))
+        return result
+
+    def _bands(self, entry: Dict[str, Any]) -> Iterable[Tuple[str, int, Tuple[int, ...]]]:
+        signature = entry["signature"]
+        for band in range(BANDS):
+            yield entry["language"], band, signature[band * ROWS : (band + 1) * ROWS]
+
+    def _remove(self, entry_id: str):
+        # Called with self._lock held
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for band in self._bands(entry):
+            members = self._buckets.get(band)
+            if members is not None:
+                members.discard(entry_id)
+                if not members:
+                    del self._buckets[band]
+
+
+def _catalogue_texts() -> Iterable[Tuple[str, str, str, Optional[str]]]:
+    """(entry id, text, language, audio URL) for every topic narration and FAQ answer."""
+    from app.db import iter_topics, iter_faqs
+
+    for topic in iter_topics():
+        yield f"topic:{topic['id']}", topic.get("content_text", ""), topic.get(
+            "language", "en"
+        ), topic.get("audio_url")
+    for faq in iter_faqs():
+        yield f"faq:{faq['id']}", faq.get("answer", ""), faq.get("language", "en"), faq.get(
+            "answer_audio_url"
+        )
+
+
+def build_index() -> DuplicateIndex:
+    """Index every topic narration and FAQ answer in the database."""
+    index = DuplicateIndex()
+    for entry_id, text, language, audio_url in _catalogue_texts():
+        index.add(entry_id, text, language, audio_url)
+    return index
+
+
+# Index of synthesised texts for near-duplicate audio reuse - built on first use
+_reuse_index: Optional[DuplicateIndex] = None
+_reuse_lock = threading.Lock()
+
+
+def get_reuse_index() -> DuplicateIndex:
+    """Index of catalogue texts that already have audio."""
+    global _reuse_index
+    with _reuse_lock:
+        if _reuse_index is None:
+            index = DuplicateIndex()
+            for entry_id, text, language, audio_url in _catalogue_texts():
+                if audio_url:
+                    index.add(entry_id, text, language, audio_url)
+            _reuse_index = index
+        return _reuse_index
+
+
+def set_reuse_index(index: Optional[DuplicateIndex]):
+    """
+    Replace the reuse index (None rebuilds it from the database on next use).
+    Used by tests.
+    """
+    global _reuse_index
+    _reuse_index = index
+
+
+def find_reusable_audio(text: str, language: str = "en") -> Optional[str]:
+    """
+    Audio already synthesised for a near-duplicate text, if near-duplicate
+    reuse is enabled (DEDUP_REUSE_SIMILARITY < 1.0).
+    Normalised-equal texts don't need this: they hash to the same file.
+    """
+    if DEDUP_REUSE_SIMILARITY >= 1.0:
+        return None
+    for _, entry in get_reuse_index().find_similar(text, language, DEDUP_REUSE_SIMILARITY):
+        if entry["audio_url"]:
+            return entry["audio_url"]
+    return None
+
+
+def record_audio(entry_id: str, text: str, language: str, audio_url: str):
+    """Make newly synthesised audio available for near-duplicate reuse."""
+    if DEDUP_REUSE_SIMILARITY < 1.0:
+        get_reuse_index().add(entry_id, text, language, audio_url)
+
+
+def duplicate_report(
+    index: DuplicateIndex = None, threshold: float = DEDUP_SIMILARITY
+) -> Dict[str, Any]:
+    """
+    Duplicate clusters in the catalogue and the synthesis time they save.
+
+    A text needs its own synthesis only once per distinct normalised form
+    (per language), where hashing the raw text needed one per raw variant.
+    Saved seconds are estimated from this process's measured synthesis rate
+    (falling back to DEDUP_SECONDS_PER_CHAR).
+
+    Args:
+        index: Index to report on (defaults to the whole catalogue)
+        threshold: Similarity for texts to be clustered together
+
+    Returns:
+        dict: clusters (with members and similarity) and totals
+    """
+    from app.tts_stub import get_synthesis_seconds_per_char
+
+    index = index if index is not None else build_index()
+    seconds_per_char = get_synthesis_seconds_per_char() or DEDUP_SECONDS_PER_CHAR
+
+    clusters = []
+    total_saved = 0
+    total_seconds = 0.0
+    for group in index.clusters(threshold):
+        first_by_raw: Dict[str, Dict[str, Any]] = {}
+        for entry in group:
+            first_by_raw.setdefault(entry["raw_key"], entry)
+        first_by_key: Dict[str, Dict[str, Any]] = {}
+        for entry in first_by_raw.values():
+            first_by_key.setdefault(entry["key"], entry)
+
+        # Raw variants beyond the first of each normalised form no longer synthesise
+        saved = [e for e in first_by_raw.values() if first_by_key[e["key"]] is not e]
+        saved_seconds = sum(e["chars"] for e in saved) * seconds_per_char
+        total_saved += len(saved)
+        total_seconds += saved_seconds
+
+        lowest = min(
+            similarity(group[0]["signature"], entry["signature"]) for entry in group[1:]
+        )
+        clusters.append(
+            {
+                "language": group[0]["language"],
+                "members": [entry["id"] for entry in group],
+                "excerpt": group[0]["excerpt"],
+                "normalized_forms": len(first_by_key),
+                "exact": len(first_by_key) == 1,
+                "min_similarity": round(lowest, 2),
+                "audio_files": len({e["audio_url"] for e in group if e["audio_url"]}),
+                "syntheses_saved": len(saved),
+                "synthesis_seconds_saved": round(saved_seconds, 1),
+            }
+        )
+
+    return {
+        "texts": len(index),
+        "similarity_threshold": threshold,
+        "clusters": clusters,
+        "syntheses_saved": total_saved,
+        "synthesis_seconds_saved": round(total_seconds, 1),
+        "seconds_per_char": seconds_per_char,
+    }
+
+
+if __name__ == "__main__":
+    from app.log import setup_logging
+
+    setup_logging(log_format="text")
+    report = duplicate_report()
+    for cluster in report["clusters"]:
+        kind = "exact" if cluster["exact"] else f"~{cluster['min_similarity']:.2f}"
+        print(
+            f"[{cluster['language']}] {len(cluster['members'])} texts ({kind}), "
+            f"{cluster['syntheses_saved']} syntheses saved: {cluster['excerpt'][:50]}"
+        )
+    print(
+        f"{report['texts']} texts, {len(report['clusters'])} clusters, "
+        f"{report['syntheses_saved']} syntheses saved "
+        f"(~{report['synthesis_seconds_saved']:.1f} s of synthesis)"
+    )
@@ -0,0 +1,85 @@
+"""
+ETag support for JSON API responses.
+
+ASGI middleware that hashes the body of successful GET /api/* JSON
+responses, adds a strong ETag and answers 304 Not Modified when the
+client's If-None-Match matches. Route handlers and their response models
+are left untouched. The frontend service worker uses this to revalidate
+cached topic JSON cheaply.
+"""
+
+import hashlib
+
+
+def compute_etag(body: bytes) -> str:
+    """Compute a strong ETag for a response body."""
+    return '"' + hashlib.md5(body).hexdigest() + '"'
+
+
+class ETagMiddleware:
+    """Add ETags to JSON GET responses under a path prefix and honour If-None-Match."""
+
+    def __init__(self, app, path_prefix: str = "/api/"):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        start_message = None
+        body_parts = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start_message, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                # Only buffer complete JSON bodies; stream everything else through
+                if message["status"] != 200 or not content_type.startswith(b"application/json"):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+
+                body = b"".join(body_parts)
+                etag = compute_etag(body)
+                headers = [
+                    (name, value)
+                    for name, value in start_message.get("headers", [])
+                    if name not in (b"etag", b"content-length")
+                ]
+                headers.append((b"etag", etag.encode("latin-1")))
+
+                if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+                    await send({"type": "http.response.start", "status": 304, "headers": headers})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+                headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                await send({**start_message, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffered_send)
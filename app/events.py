@@ -0,0 +1,217 @@
+"""
+Server-Sent Events for audio-ready and content-changed notifications.
+
+Clients subscribe per topic (GET /api/topics/{id}/events) and are told when
+audio appears for the topic or one of its FAQs, or when its content changes.
+
+Events are fanned out by an in-process broadcaster. With several workers,
+set EVENTS_CHANGE_STREAM=1: every worker then watches the MongoDB change
+stream (requires a replica set) and the routes stop publishing locally,
+so each event is delivered exactly once per worker.
+"""
+
+from typing import Dict, Any, Set, Optional
+from collections import defaultdict
+import asyncio
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# Use MongoDB change streams for cross-worker fan-out
+CHANGE_STREAM_ENABLED = os.getenv("EVENTS_CHANGE_STREAM", "0") == "1"
+
+# Pending messages per subscriber before the oldest is dropped
+SUBSCRIBER_QUEUE_SIZE = 16
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+AUDIO_READY = "audio-ready"
+CONTENT_CHANGED = "content-changed"
+
+TOPIC_CONTENT_FIELDS = {"title", "content_text", "language"}
+FAQ_CONTENT_FIELDS = {"question", "answer", "language"}
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class EventBroadcaster:
+    """
+    Fan out events to per-topic subscriber queues.
+
+    Messages are formatted once and the same string is shared by every
+    subscriber, so an idle subscriber costs one small queue.
+    publish() is safe to call from any thread.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, topic_id: str) -> asyncio.Queue:
+        """Register a subscriber for a topic. Must be called on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[topic_id].add(queue)
+        return queue
+
+    def unsubscribe(self, topic_id: str, queue: asyncio.Queue):
+        """Remove a subscriber."""
+        subscribers = self._subscribers.get(topic_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[topic_id]
+
+    def subscriber_count(self) -> int:
+        """Total number of open subscriptions."""
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, topic_id: str, event: str, data: Dict[str, Any]):
+        """Send an event to everyone subscribed to a topic."""
+        if topic_id not in self._subscribers or self._loop is None:
+            return
+
+        message = format_sse(event, data)
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._deliver(topic_id, message)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, topic_id, message)
+
+    def _deliver(self, topic_id: str, message: str):
+        for queue in list(self._subscribers.get(topic_id, ())):
+            if queue.full():
+                # Slow consumer: drop its oldest message rather than block everyone
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+broadcaster = EventBroadcaster()
+
+
+def notify(topic_id: str, event: str, data: Dict[str, Any]):
+    """
+    Publish an event from a route handler.
+    A no-op when change streams are enabled - the watcher publishes instead.
+    """
+    if not CHANGE_STREAM_ENABLED:
+        broadcaster.publish(topic_id, event, data)
+
+
+async def stream_topic_events(topic_id: str):
+    """
+    Async generator of SSE messages for one subscriber.
+    Sends a keep-alive comment when idle so proxies don't close the stream.
+    """
+    queue = broadcaster.subscribe(topic_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        broadcaster.unsubscribe(topic_id, queue)
+
+
+# ============================================================================
+# MongoDB change stream fan-out
+# ============================================================================
+
+_watcher_thread: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+
+def _publish_change(change: Dict[str, Any]):
+    """Translate one change stream document into broadcaster events."""
+    collection = change["ns"]["coll"]
+    document = change.get("fullDocument") or {}
+    updated = set(change.get("updateDescription", {}).get("updatedFields", {}))
+    if change["operationType"] in ("insert", "replace"):
+        updated = set(document)
+
+    doc_id = str(change["documentKey"]["_id"])
+
+    if collection == "topics":
+        if updated & TOPIC_CONTENT_FIELDS:
+            # The topic list changed, possibly in another worker
+            from app.db import mark_catalogue_changed
+
+            mark_catalogue_changed()
+        if "audio_url" in updated and document.get("audio_url"):
+            broadcaster.publish(
+                doc_id,
+                AUDIO_READY,
+                {"kind": "topic", "id": doc_id, "audio_url": document["audio_url"]},
+            )
+        if updated & TOPIC_CONTENT_FIELDS:
+            broadcaster.publish(doc_id, CONTENT_CHANGED, {"kind": "topic", "id": doc_id})
+
+    elif collection == "faqs" and document.get("topic_id"):
+        topic_id = document["topic_id"]
+        if "answer_audio_url" in updated and document.get("answer_audio_url"):
+            broadcaster.publish(
+                topic_id,
+                AUDIO_READY,
+                {"kind": "faq", "id": doc_id, "audio_url": document["answer_audio_url"]},
+            )
+        if change["operationType"] == "insert" or updated & FAQ_CONTENT_FIELDS:
+            broadcaster.publish(topic_id, CONTENT_CHANGED, {"kind": "faq", "id": doc_id})
+
+
+def _watch_changes():
+    """Follow the database change stream until asked to stop."""
+    from app.db import get_db
+
+    pipeline = [
+        {"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}
+    ]
+    while not _watcher_stop.is_set():
+        try:
+            with get_db().watch(pipeline, full_document="updateLookup") as stream:
+                while not _watcher_stop.is_set():
+                    change = stream.try_next()
+                    if change is not None:
+                        _publish_change(change)
+                    else:
+                        _watcher_stop.wait(0.2)
+        except Exception as e:
+            logger.warning("Change stream error, retrying", extra={"error": str(e)})
+            _watcher_stop.wait(5)
+
+
+def start_change_stream_fanout():
+    """Start the change stream watcher thread if enabled."""
+    global _watcher_thread
+    if not CHANGE_STREAM_ENABLED or _watcher_thread is not None:
+        return
+
+    _watcher_stop.clear()
+    _watcher_thread = threading.Thread(target=_watch_changes, name="events-watcher", daemon=True)
+    _watcher_thread.start()
+    logger.info("Change stream fan-out started")
+
+
+def stop_change_stream_fanout():
+    """Stop the change stream watcher thread."""
+    global _watcher_thread
+    if _watcher_thread is None:
+        return
+
+    _watcher_stop.set()
+    _watcher_thread.join(timeout=5)
+    _watcher_thread = None
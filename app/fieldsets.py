@@ -0,0 +1,74 @@
+"""
+Sparse fieldsets for the read endpoints.
+
+GET /api/topics/{id}?fields=title,audio_url returns only the named fields
+of the response model (plus "id"). The route reads just the stored ones
+from the database (a MongoDB projection or a narrower SQLite SELECT), skips
+work for derived fields nobody asked for (the FAQ list, HLS packaging),
+and serialises with a copy of the response model narrowed to those fields.
+Without `fields` the endpoints behave as before.
+"""
+
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Type, Union
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, create_model
+
+
+def parse_fields(raw: Optional[str], model: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma-separated `fields` query parameter.
+
+    Args:
+        raw: The parameter value, or None when absent
+        model: Response model the names must belong to
+
+    Returns:
+        tuple: The requested field names plus "id", in the model's order,
+               or None when no fieldset was requested
+
+    Raises:
+        ValueError: A name is not a field of the model
+    """
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(names - set(model.model_fields))
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Available: {', '.join(model.model_fields)}"
+        )
+    names.add("id")
+    return tuple(name for name in model.model_fields if name in names)
+
+
+def stored_fields(fields: Iterable[str], derived: Iterable[str] = ()) -> Tuple[str, ...]:
+    """The fields to read from the database: all but "id" and those the route computes."""
+    skip = {"id", *derived}
+    return tuple(name for name in fields if name not in skip)
+
+
+@lru_cache(maxsize=256)
+def narrow_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A copy of `model` with only `fields` (same types and defaults), built once per fieldset."""
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (field.annotation, field) for name, field in model.model_fields.items() if name in fields},
+    )
+
+
+def sparse_response(
+    model: Type[BaseModel],
+    fields: Tuple[str, ...],
+    content: Union[Dict[str, Any], List[Dict[str, Any]]],
+    headers: Optional[Dict[str, str]] = None,
+) -> JSONResponse:
+    """Serialise a document (or a list of them) with the model narrowed to `fields`."""
+    narrowed = narrow_model(model, fields)
+    if isinstance(content, list):
+        body = [narrowed.model_validate(doc).model_dump(mode="json") for doc in content]
+    else:
+        body = narrowed.model_validate(content).model_dump(mode="json")
+    return JSONResponse(body, headers=headers)
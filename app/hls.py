@@ -0,0 +1,151 @@
+"""
+HLS packaging for long narrations.
+
+Splits an MP3 into fixed-duration segments on frame boundaries and writes a
+VOD playlist, so playback can start after the first segment and seeking only
+fetches the segment it needs. Segments are HLS "packed audio": raw MP3 frames
+prefixed with an ID3 tag carrying the segment's start timestamp. No ffmpeg
+required.
+
+Packaged output lives in static/media/hls/<audio stem>/:
+    index.m3u8, seg_00000.mp3, seg_00001.mp3, ...
+"""
+
+from typing import Optional, List
+from pathlib import Path
+import math
+import logging
+import os
+import re
+
+from app.mp3 import iter_frames
+
+logger = logging.getLogger(__name__)
+
+
+# Target segment length and the minimum narration length worth segmenting
+HLS_SEGMENT_SECONDS = float(os.getenv("HLS_SEGMENT_SECONDS", "4"))
+HLS_MIN_DURATION = float(os.getenv("HLS_MIN_DURATION", "20"))
+
+HLS_DIR = Path("static/media/hls")
+PLAYLIST_NAME = "index.m3u8"
+PLAYLIST_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_MEDIA_TYPE = "audio/mpeg"
+
+# Only these names may be requested through the HLS route
+HLS_FILENAME_PATTERN = re.compile(r"^(index\.m3u8|seg_\d{5}\.mp3)$")
+
+# Audio files known to be too short for HLS, so they aren't re-read every request
+_short_audio: set = set()
+
+
+def _syncsafe(value: int) -> bytes:
+    """Encode an integer as a 4-byte ID3v2 syncsafe integer."""
+    return bytes(
+        [(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F]
+    )
+
+
+def _timestamp_tag(start_seconds: float) -> bytes:
+    """
+    Build the ID3 tag every packed audio segment starts with.
+    It carries the segment's start time as a 33-bit, 90 kHz MPEG-2 timestamp.
+    """
+    pts = int(round(start_seconds * 90000)) & ((1 << 33) - 1)
+    payload = b"com.apple.streaming.transportStreamTimestamp\x00" + pts.to_bytes(8, "big")
+    frame = b"PRIV" + _syncsafe(len(payload)) + b"\x00\x00" + payload
+    return b"ID3\x04\x00\x00" + _syncsafe(len(frame)) + frame
+
+
+def _build_playlist(durations: List[float]) -> str:
+    """Build a VOD media playlist for segments with the given durations."""
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{math.ceil(max(durations))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+    ]
+    for index, duration in enumerate(durations):
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(f"seg_{index:05d}.mp3")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def get_hls_dir(audio_path: Path, hls_root: Path = HLS_DIR) -> Path:
+    """Get the directory holding the packaged output for an audio file."""
+    return hls_root / Path(audio_path).stem
+
+
+def package_hls(
+    audio_path: Path,
+    hls_root: Path = HLS_DIR,
+    segment_seconds: float = HLS_SEGMENT_SECONDS,
+    min_duration: float = HLS_MIN_DURATION,
+    force: bool = False,
+) -> Optional[Path]:
+    """
+    Package an MP3 file as HLS, unless it is already packaged.
+
+    Args:
+        audio_path: Path to the source MP3
+        hls_root: Directory to write packaged output under
+        segment_seconds: Target duration of each segment
+        min_duration: Files shorter than this are not packaged
+        force: Re-package even if a playlist already exists
+
+    Returns:
+        Path: Path to the playlist, or None if the file is missing or too short
+    """
+    audio_path = Path(audio_path)
+    output_dir = get_hls_dir(audio_path, hls_root)
+    playlist_path = output_dir / PLAYLIST_NAME
+
+    if not force:
+        if playlist_path.exists():
+            return playlist_path
+        if (str(audio_path), min_duration) in _short_audio:
+            return None
+    if not audio_path.exists():
+        return None
+
+    data = audio_path.read_bytes()
+    frames = list(iter_frames(data))
+    total_duration = sum(frame.samples / frame.sample_rate for frame in frames)
+    if not frames or total_duration < min_duration:
+        _short_audio.add((str(audio_path), min_duration))
+        return None
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    durations = []
+    segment_start = 0.0
+    segment_frames = []
+    segment_duration = 0.0
+
+    def flush():
+        nonlocal segment_start, segment_frames, segment_duration
+        segment_path = output_dir / f"seg_{len(durations):05d}.mp3"
+        body = b"".join(data[f.offset : f.offset + f.length] for f in segment_frames)
+        segment_path.write_bytes(_timestamp_tag(segment_start) + body)
+        durations.append(segment_duration)
+        segment_start += segment_duration
+        segment_frames = []
+        segment_duration = 0.0
+
+    for frame in frames:
+        segment_frames.append(frame)
+        segment_duration += frame.samples / frame.sample_rate
+        if segment_duration >= segment_seconds:
+            flush()
+    if segment_frames:
+        flush()
+
+    # Write the playlist last and atomically: its presence marks a complete package
+    tmp_path = playlist_path.with_name(PLAYLIST_NAME + ".tmp")
+    tmp_path.write_text(_build_playlist(durations))
+    tmp_path.replace(playlist_path)
+
+    logger.info("Packaged HLS audio", extra={"file": audio_path.name, "segments": len(durations)})
+    return playlist_path
@@ -0,0 +1,131 @@
+"""
+Server-rendered index page.
+
+GET / returns static/index.html with the topic list embedded as inline
+JSON, so the page renders its sidebar without a second round trip to
+/api/topics. A deep link (/?topic=<id>) also embeds that topic with its
+FAQs. Catalogues over INDEX_MAX_EMBEDDED_TOPICS are not inlined, and
+their list is not loaded at all (only counted).
+
+The page with the list is rendered once and served from memory. It is
+rendered again only when the catalogue may have changed: after a topic
+write in this process or one seen on the change stream (see
+app.db.catalogue_generation), when the repository or catalogue snapshot
+is swapped, or INDEX_REVALIDATE_S after the last render, which picks up
+writes made by other processes. A render that produces the same list
+keeps the same body and ETag.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+import time
+
+from app.db import catalogue_generation, count_topics, get_all_topics
+from app.etag import compute_etag
+from app.repository import get_repository
+from app.snapshot import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds before the cached list is checked against the database again
+INDEX_REVALIDATE_S = float(os.getenv("INDEX_REVALIDATE_S", "30"))
+
+# Larger catalogues are not inlined; the page then fetches /api/topics as before
+INDEX_MAX_EMBEDDED_TOPICS = int(os.getenv("INDEX_MAX_EMBEDDED_TOPICS", "2000"))
+
+INDEX_TEMPLATE = Path("static/index.html")
+# Replaced by the inline data in the template
+INITIAL_DATA_MARKER = "<!-- initial-data -->"
+
+
+def _script(data: Dict[str, Any]) -> str:
+    """Inline JSON that can't close the <script> element early."""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return (
+        '<script id="initialData" type="application/json">'
+        + payload.replace("<", "\\u003c")
+        + "</script>"
+    )
+
+
+class IndexPage:
+    """The rendered list page, and what it was rendered from."""
+
+    def __init__(self, template: str, topics: Optional[List[Dict[str, Any]]], key: tuple):
+        self.template = template
+        self.head, _, self.tail = template.partition(INITIAL_DATA_MARKER)
+        self.topics = topics  # None: too many to inline
+        self.key = key
+        self.checked_at = time.monotonic()
+        self.body = (self.head + _script({"topics": topics}) + self.tail).encode()
+        self.etag = compute_etag(self.body)
+
+    def with_topic(self, topic: Dict[str, Any]) -> Tuple[bytes, str]:
+        """The page with a deep-linked topic embedded as well (not cached)."""
+        body = (self.head + _script({"topics": self.topics, "topic": topic}) + self.tail).encode()
+        return body, compute_etag(body)
+
+
+_page: Optional[IndexPage] = None
+_render_lock = threading.Lock()
+
+
+def _cache_key() -> tuple:
+    snapshot = get_snapshot()
+    return (catalogue_generation(), id(get_repository()), id(snapshot) if snapshot else None)
+
+
+def _is_current(page: Optional[IndexPage], key: tuple) -> bool:
+    return (
+        page is not None
+        and page.key == key
+        and time.monotonic() - page.checked_at < INDEX_REVALIDATE_S
+    )
+
+
+def _embeddable_topics() -> Optional[List[Dict[str, Any]]]:
+    """The topic list to inline, or None when the catalogue is too large."""
+    # The snapshot's list is already in memory; the database is counted first
+    if get_snapshot() is None and count_topics() > INDEX_MAX_EMBEDDED_TOPICS:
+        return None
+    topics = get_all_topics()
+    return topics if len(topics) <= INDEX_MAX_EMBEDDED_TOPICS else None
+
+
+def get_index_page() -> IndexPage:
+    """The current list page, rendered again if the catalogue may have changed."""
+    global _page
+    key = _cache_key()
+    if _is_current(_page, key):
+        return _page
+
+    with _render_lock:
+        page = _page
+        if _is_current(page, key):
+            return page
+
+        template = INDEX_TEMPLATE.read_text(encoding="utf-8")
+        topics = _embeddable_topics()
+        if page is not None and page.topics == topics and page.template == template:
+            # Nothing changed: keep the body (and ETag), just note the check
+            page.key = key
+            page.checked_at = time.monotonic()
+            return page
+
+        _page = IndexPage(template, topics, key)
+        logger.info(
+            "Rendered index page",
+            extra={"topics": len(topics) if topics is not None else None, "bytes": len(_page.body)},
+        )
+        return _page
+
+
+def reset_index_page():
+    """Drop the cached page (used by tests)."""
+    global _page
+    _page = None
@@ -0,0 +1,227 @@
+"""
+Structured, non-blocking logging.
+
+Modules log through the standard library (`logging.getLogger(__name__)`).
+setup_logging() routes every record through a bounded in-memory queue to a
+background thread that formats and writes it, so a slow stdout pipe never
+blocks the event loop: when the queue is full, records are dropped and
+counted instead.
+
+Each HTTP request gets a request id (taken from X-Request-ID or generated),
+held in a context variable, so log lines from the route, app.db and
+app.tts_stub for one request share the same "request_id".
+
+Configuration:
+    LOG_FORMAT=json|text          (default json - one JSON object per line)
+    LOG_LEVEL=INFO                root level for the app's loggers
+    LOG_LEVELS=app.db=DEBUG,app.access=WARNING   per-module overrides
+    LOG_QUEUE_SIZE=10000          records buffered before dropping
+    LOG_QUEUE=0                   write synchronously (for comparison only)
+"""
+
+from typing import Dict, Any, Optional
+from contextvars import ContextVar
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_ENABLED = os.getenv("LOG_QUEUE", "1") != "0"
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+access_logger = logging.getLogger("app.access")
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id, in the thread that logged them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one line of JSON, including any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format for local development."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+        if getattr(record, "request_id", None):
+            extras = {"request_id": record.request_id, **extras}
+        if extras:
+            line += " " + " ".join(f"{key}={value}" for key, value in extras.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render arguments and traceback now: they may not be safe to read later
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    log_format: str = None, level: str = None, levels: str = None, use_queue: bool = None
+):
+    """
+    Configure the "app" loggers. Safe to call more than once; later calls
+    replace the previous configuration.
+
+    Args:
+        log_format: "json" or "text" (default LOG_FORMAT)
+        level: Level name for the app's loggers (default LOG_LEVEL)
+        levels: Comma-separated "logger=LEVEL" overrides (default LOG_LEVELS)
+        use_queue: Write from a background thread (default LOG_QUEUE)
+    """
+    global _listener, _queue_handler
+
+    shutdown_logging()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        TextFormatter() if (log_format or LOG_FORMAT) == "text" else JsonFormatter()
+    )
+
+    if use_queue if use_queue is not None else LOG_QUEUE_ENABLED:
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        _listener = logging.handlers.QueueListener(
+            _queue_handler.queue, stream_handler, respect_handler_level=False
+        )
+        _listener.start()
+        handler: logging.Handler = _queue_handler
+    else:
+        handler = stream_handler
+    handler.addFilter(RequestIdFilter())
+
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [handler]
+    app_logger.propagate = False
+    app_logger.setLevel(level or LOG_LEVEL)
+
+    for override in filter(None, (levels if levels is not None else LOG_LEVELS).split(",")):
+        name, _, module_level = override.partition("=")
+        logging.getLogger(name.strip()).setLevel(module_level.strip().upper())
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _queue_handler = None
+
+
+def get_dropped_count() -> int:
+    """Number of records dropped because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class RequestLoggingMiddleware:
+    """
+    Assign each HTTP request an id, echo it as X-Request-ID, and write one
+    access log line per request to the "app.access" logger.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:64]
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [*message.get("headers", []), (REQUEST_ID_HEADER, request_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if access_logger.isEnabledFor(logging.INFO):
+                access_logger.info(
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    },
+                )
+            request_id_var.reset(token)
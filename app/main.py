@@ -3,14 +3,39 @@ FastAPI main application for the Avatar Teacher platform.
 Serves API endpoints and static files for the talking avatar teacher app.
 """
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query, Response, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
 from contextlib import asynccontextmanager
-from typing import List
-
-from app.models import TopicCreate, Topic, TopicListItem, TopicWithFAQs, FAQCreate, FAQ
+import asyncio
+from typing import List, Optional, Tuple, Type
+import json
+import logging
+import os
+
+from app.models import (
+    TopicCreate,
+    TopicUpdate,
+    Topic,
+    TopicListItem,
+    TopicWithFAQs,
+    FAQCreate,
+    FAQUpdate,
+    FAQ,
+    AudioVariant,
+    TimingTrack,
+    PopularTopic,
+)
 from app.db import (
     get_topic_by_id,
     get_faq_by_id,
@@ -18,29 +43,125 @@ from app.db import (
     get_faqs_by_topic_id,
     insert_topic,
     insert_faq,
+    update_topic,
+    update_faq,
+    VersionConflictError,
     update_topic_audio,
     update_faq_audio,
+    update_topic_timing,
+    update_faq_timing,
+    get_write_batch_stats,
+    validate_object_id,
     close_db,
 )
-from app.tts_stub import get_or_generate_audio_for_topic, get_or_generate_audio_for_faq
-from app.seed_data import seed_database
+from app.tts_stub import (
+    get_or_generate_audio_for_topic,
+    get_or_generate_audio_for_faq,
+    audio_job,
+    pending_audio_jobs,
+    wait_for_audio_jobs,
+)
+from app.transcode import get_audio_variants, stop_transcoding, url_to_path
+from app.storage import AudioFiles, STORAGE_LOCAL_DIR
+from app.dedup import duplicate_report
+from app.hls import (
+    package_hls,
+    get_hls_dir,
+    HLS_FILENAME_PATTERN,
+    PLAYLIST_NAME,
+    PLAYLIST_MEDIA_TYPE,
+    SEGMENT_MEDIA_TYPE,
+)
+from app.timing import build_timing_track_for_audio
+from app.preload import build_topic_links, build_link_header
+from app.pregen import (
+    start_pregeneration,
+    stop_pregeneration,
+    schedule_faq_audio,
+    claim_faq_audio,
+    cancel_faq_audio,
+    get_pregen_stats,
+)
+from app.fieldsets import parse_fields, stored_fields, sparse_response
+from app.etag import ETagMiddleware
+from app.events import (
+    notify,
+    stream_topic_events,
+    start_change_stream_fanout,
+    stop_change_stream_fanout,
+    AUDIO_READY,
+    CONTENT_CHANGED,
+)
+from app.analytics import (
+    record_view,
+    record_play,
+    stop_analytics,
+    get_popular,
+    get_analytics_stats,
+    TOPIC_KIND,
+    FAQ_KIND,
+)
+from app.index_page import get_index_page
+from app.warmup import start_warmup, is_ready, get_warmup_status
+from app.log import setup_logging, shutdown_logging, RequestLoggingMiddleware
+from app.admission import (
+    AdmissionMiddleware,
+    DeadlineExceeded,
+    remaining_seconds,
+    start_lag_monitor,
+    stop_lag_monitor,
+    record_deadline_exceeded,
+    get_admission_stats,
+)
+from app.admin import ADMIN_PATH_PREFIX, require_admin
+from app.profiling import (
+    ProfilingMiddleware,
+    list_profiles,
+    get_profile_path,
+    speedscope_to_folded,
+)
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan context manager for startup and shutdown events.
-    Seeds the database on startup and closes connections on shutdown.
+    Seeds the database on startup (blocking or in the background, see
+    app.warmup.STARTUP_MODE) and closes connections on shutdown.
     """
-    # Startup: seed database if empty
-    print("Starting up Avatar Teacher API...")
-    seed_database()
+    # Startup: structured logging first, then seed database if empty and ensure indexes
+    setup_logging()
+    logger.info("Starting up Avatar Teacher API")
+    warmup_task = await start_warmup()
+    start_change_stream_fanout()
+    start_lag_monitor()
+    start_pregeneration(_generate_faq_audio)
 
     yield
 
-    # Shutdown: close database connections
-    print("Shutting down Avatar Teacher API...")
+    # Shutdown: let a background warm-up finish before closing the client
+    logger.info("Shutting down Avatar Teacher API")
+    stop_change_stream_fanout()
+    await stop_lag_monitor()
+    if warmup_task and not warmup_task.done():
+        try:
+            await warmup_task
+        except Exception:
+            pass
+    # Requests have drained; drop queued FAQ pregeneration, and let running audio
+    # jobs finish (including those whose request gave up early)
+    await asyncio.to_thread(stop_pregeneration)
+    remaining = await asyncio.to_thread(wait_for_audio_jobs)
+    if remaining:
+        logger.warning("Audio jobs still running at shutdown", extra={"audio_jobs": remaining})
+    # Variants not built yet are left to python -m app.transcode
+    await asyncio.to_thread(stop_transcoding)
+    # Write the counters still held in memory before the connection goes
+    stop_analytics()
     close_db()
+    shutdown_logging()
 
 
 # Initialize FastAPI app
@@ -60,70 +181,349 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETags on JSON API responses, so cached topics revalidate with a 304
+app.add_middleware(ETagMiddleware)
+
+# Opt-in request profiling (signed header or sampling, see app.profiling)
+app.add_middleware(ProfilingMiddleware)
+
+# Request ids for log correlation, plus one access log line per request
+app.add_middleware(RequestLoggingMiddleware)
+
+# Outermost: deadlines, per-route concurrency limits and load shedding (see app.admission),
+# so shed requests cost as little as possible
+app.add_middleware(AdmissionMiddleware)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded):
+    """Answer requests that ran out of time with 504; the client has likely given up."""
+    record_deadline_exceeded()
+    logger.warning("Request deadline exceeded", extra={"path": request.url.path, "error": str(exc)})
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Request deadline exceeded"},
+    )
+
 
 # ============================================================================
 # API Routes
 # ============================================================================
 
 
-@app.get("/", response_class=FileResponse)
-async def serve_index():
-    """Serve the main HTML page."""
-    return FileResponse("static/index.html")
+@app.get("/", response_class=HTMLResponse)
+def serve_index(topic: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+    """
+    Serve the main HTML page with the topic list embedded (see app.index_page),
+    so it renders without calling /api/topics.
+    /?topic=<id> also embeds that topic and counts a view, if its audio is ready;
+    otherwise the page fetches the topic as usual.
+    """
+    page = get_index_page()
+    body, etag = page.body, page.etag
+
+    deep_link = get_topic_by_id(topic) if topic else None
+    if deep_link is not None and deep_link.get("audio_url"):
+        record_view(TOPIC_KIND, topic)
+        _add_media_and_faqs(topic, deep_link)
+        body, etag = page.with_topic(jsonable_encoder(TopicWithFAQs(**deep_link)))
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+
+@app.get("/sw.js")
+async def serve_service_worker():
+    """
+    Serve the service worker from the site root so its scope covers the
+    whole app (pages, /api and /static), not just /static/.
+    """
+    return FileResponse(
+        "static/sw.js",
+        media_type="application/javascript",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+# Topic fields computed by get_topic rather than stored
+TOPIC_DERIVED_FIELDS = ("faqs", "audio_hls_url")
+FIELDS_DESCRIPTION = "Comma-separated fields to return (plus id), e.g. title,audio_url"
+
+
+def _requested_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """Parse a `fields` query parameter (see app.fieldsets); unknown names are a 400."""
+    try:
+        return parse_fields(fields, model)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @app.get("/api/topics", response_model=List[TopicListItem])
-async def list_topics():
+async def list_topics(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
     """
     Get a list of all available topics.
-    Returns minimal topic info: id, title, language.
+    Returns minimal topic info: id, title, language; or, with `fields`,
+    any fields of a topic (e.g. fields=title,audio_url).
+    """
+    requested = _requested_fields(fields, Topic)
+    if requested is None:
+        return get_all_topics()
+    return sparse_response(Topic, requested, get_all_topics(stored_fields(requested)))
+
+
+def _generate_topic_audio(topic_id: str, topic: dict) -> str:
+    """
+    Synthesise a topic's narration and store its URL and avatar timing track.
+    Both are only stored while the topic is still at the version read, so an
+    edit (PATCH) made during synthesis drops them.
+    """
+    version = topic.get("version")
+    with audio_job():
+        audio_url = get_or_generate_audio_for_topic(topic)
+        update_topic_audio(topic_id, audio_url, version)
+
+        # Emit the avatar timing track alongside the new audio
+        timing_track = build_timing_track_for_audio(topic["content_text"], audio_url)
+        if timing_track:
+            update_topic_timing(topic_id, timing_track, version)
+    return audio_url
+
+
+def _generate_faq_audio(faq_id: str, faq: dict) -> str:
+    """
+    Synthesise an FAQ answer and store its URL and avatar timing track, while
+    the FAQ is still at the version read (see _generate_topic_audio).
     """
-    topics = get_all_topics()
-    return topics
+    version = faq.get("version")
+    with audio_job():
+        audio_url = get_or_generate_audio_for_faq(faq)
+        update_faq_audio(faq_id, audio_url, version)
+
+        timing_track = build_timing_track_for_audio(faq["answer"], audio_url)
+        if timing_track:
+            update_faq_timing(faq_id, timing_track, version)
+    return audio_url
+
+
+def _add_media_and_faqs(topic_id: str, topic: dict, fields: Optional[Tuple[str, ...]] = None):
+    """
+    Add the HLS playlist URL (for long narrations) and the FAQ list to a
+    topic with audio; with `fields`, only those of the two that are in it.
+    """
+    if fields is None or "audio_hls_url" in fields:
+        audio_path = url_to_path(topic["audio_url"])
+        if audio_path is not None and package_hls(audio_path):
+            topic["audio_hls_url"] = f"/api/topics/{topic_id}/hls/{PLAYLIST_NAME}"
+    if fields is None or "faqs" in fields:
+        topic["faqs"] = get_faqs_by_topic_id(topic_id)
 
 
 @app.get("/api/topics/{topic_id}", response_model=TopicWithFAQs)
-async def get_topic(topic_id: str):
+async def get_topic(
+    topic_id: str,
+    response: Response,
+    purpose: Optional[str] = Header(None),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
     """
     Get a specific topic by ID along with its FAQs.
 
     - Fetches topic from database
+    - Counts a view, unless the request is a prefetch (Purpose: prefetch)
     - If audio_url is empty, generates it using TTS stub
     - Fetches all associated FAQs
+    - Schedules background synthesis of FAQ answers without audio (app.pregen)
+    - Adds Link preload hints for the topic audio and first FAQ answers
     - Returns complete topic data with FAQs
+
+    With `fields` (e.g. fields=title,audio_url) only those fields are read
+    and returned, and the FAQ list and audio are only fetched or generated
+    when asked for.
     """
+    requested = _requested_fields(fields, TopicWithFAQs)
+    wants_audio = requested is None or "audio_url" in requested or "audio_hls_url" in requested
+
     # Get topic from database
-    topic = get_topic_by_id(topic_id)
+    if requested is None:
+        topic = get_topic_by_id(topic_id)
+    else:
+        projection = stored_fields(requested, TOPIC_DERIVED_FIELDS)
+        if wants_audio:
+            projection += ("audio_url",)
+        topic = get_topic_by_id(topic_id, projection)
 
     if not topic:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Topic with id {topic_id} not found",
         )
+    if purpose != "prefetch":
+        record_view(TOPIC_KIND, topic_id)
 
-    # Generate audio if not present
-    if not topic.get("audio_url"):
-        audio_url = get_or_generate_audio_for_topic(topic)
-        update_topic_audio(topic_id, audio_url)
+    # Generate audio if not present (in the threadpool, so other requests keep being served)
+    if wants_audio and not topic.get("audio_url"):
+        source = topic if requested is None else get_topic_by_id(topic_id)
+        audio_url = await run_in_threadpool(_generate_topic_audio, topic_id, source)
         topic["audio_url"] = audio_url
+        notify(topic_id, AUDIO_READY, {"kind": "topic", "id": topic_id, "audio_url": audio_url})
 
-    # Get FAQs for this topic
-    faqs = get_faqs_by_topic_id(topic_id)
-    topic["faqs"] = faqs
+    # In the threadpool: with shared storage the audio may be downloaded first
+    await run_in_threadpool(_add_media_and_faqs, topic_id, topic, requested)
+    # The FAQ list shows when the narration ends: synthesise the answers meanwhile
+    if purpose != "prefetch" and "faqs" in topic:
+        schedule_faq_audio(topic_id, topic["faqs"])
 
+    links = build_topic_links(topic)
+    if links:
+        response.headers["Link"] = build_link_header(links)
+
+    if requested is not None:
+        return sparse_response(TopicWithFAQs, requested, topic, headers=dict(response.headers))
     return topic
 
 
+@app.get("/api/topics/{topic_id}/events")
+async def get_topic_events(topic_id: str):
+    """
+    Stream audio-ready and content-changed events for a topic (Server-Sent Events).
+
+    - audio-ready: {"kind": "topic"|"faq", "id", "audio_url"}
+    - content-changed: {"kind": "topic"|"faq", "id"}
+    """
+    if not get_topic_by_id(topic_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Topic with id {topic_id} not found",
+        )
+
+    return StreamingResponse(
+        stream_topic_events(topic_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/topics/{topic_id}/hls/{filename}")
+async def get_topic_hls(topic_id: str, filename: str):
+    """
+    Serve the HLS playlist or a segment of a topic's narration.
+
+    - index.m3u8 is packaged on demand if it doesn't exist yet
+    - Segment URIs in the playlist are relative, so they resolve to this route
+    """
+    if not HLS_FILENAME_PATTERN.match(filename):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"HLS file {filename} not found",
+        )
+
+    topic = get_topic_by_id(topic_id)
+    audio_path = await run_in_threadpool(url_to_path, topic.get("audio_url")) if topic else None
+    playlist_path = await run_in_threadpool(package_hls, audio_path) if audio_path is not None else None
+
+    if playlist_path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No HLS audio for topic {topic_id}",
+        )
+
+    if filename == PLAYLIST_NAME:
+        return Response(content=playlist_path.read_text(), media_type=PLAYLIST_MEDIA_TYPE)
+
+    segment_path = get_hls_dir(audio_path) / filename
+    if not segment_path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"HLS file {filename} not found",
+        )
+    return FileResponse(segment_path, media_type=SEGMENT_MEDIA_TYPE)
+
+
 @app.get("/api/faqs/{faq_id}", response_model=FAQ)
-async def get_faq(faq_id: str):
+async def get_faq(
+    faq_id: str,
+    purpose: Optional[str] = Header(None),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
     """
     Get a specific FAQ by ID.
 
     - Fetches FAQ from database
+    - Counts a view, unless the request is a prefetch (Purpose: prefetch)
     - If answer_audio_url is empty, generates it using TTS stub
     - Returns complete FAQ data
+
+    With `fields` only those fields are read and returned, and the audio
+    is only generated when answer_audio_url is one of them.
     """
+    requested = _requested_fields(fields, FAQ)
+    wants_audio = requested is None or "answer_audio_url" in requested
+
     # Get FAQ from database
+    faq = get_faq_by_id(faq_id, None if requested is None else stored_fields(requested))
+
+    if not faq:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"FAQ with id {faq_id} not found",
+        )
+    if purpose != "prefetch":
+        record_view(FAQ_KIND, faq_id)
+
+    # Generate audio if not present (in the threadpool, so other requests keep being served),
+    # unless background pregeneration is already synthesising it
+    if wants_audio and not faq.get("answer_audio_url"):
+        pregeneration = claim_faq_audio(faq_id)
+        audio_url = None
+        if pregeneration is not None:
+            try:
+                # Shielded: a request giving up must not cancel the job for the next one
+                audio_url = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(pregeneration)), remaining_seconds()
+                )
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("Deadline exceeded waiting for pregenerated audio")
+            except Exception:
+                pass  # Logged by app.pregen; synthesise here instead
+        if not audio_url:
+            source = faq if requested is None else get_faq_by_id(faq_id)
+            audio_url = await run_in_threadpool(_generate_faq_audio, faq_id, source)
+            notify(source["topic_id"], AUDIO_READY, {"kind": "faq", "id": faq_id, "audio_url": audio_url})
+        faq["answer_audio_url"] = audio_url
+
+    if requested is not None:
+        return sparse_response(FAQ, requested, faq)
+    return faq
+
+
+@app.get("/api/topics/{topic_id}/audio-variants", response_model=List[AudioVariant])
+async def get_topic_audio_variants(topic_id: str):
+    """
+    List the available encodings of a topic's narration, smallest first.
+    The frontend picks one based on connection quality / Save-Data.
+    """
+    topic = get_topic_by_id(topic_id)
+
+    if not topic:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Topic with id {topic_id} not found",
+        )
+
+    if not topic.get("audio_url"):
+        return []
+
+    # Sizes come from the storage backend (a bucket request with shared storage)
+    return await run_in_threadpool(get_audio_variants, topic["audio_url"])
+
+
+@app.get("/api/faqs/{faq_id}/audio-variants", response_model=List[AudioVariant])
+async def get_faq_audio_variants(faq_id: str):
+    """
+    List the available encodings of an FAQ answer's audio, smallest first.
+    """
     faq = get_faq_by_id(faq_id)
 
     if not faq:
@@ -132,13 +532,109 @@ async def get_faq(faq_id: str):
             detail=f"FAQ with id {faq_id} not found",
         )
 
-    # Generate audio if not present
     if not faq.get("answer_audio_url"):
-        audio_url = get_or_generate_audio_for_faq(faq)
-        update_faq_audio(faq_id, audio_url)
-        faq["answer_audio_url"] = audio_url
+        return []
 
-    return faq
+    return await run_in_threadpool(get_audio_variants, faq["answer_audio_url"])
+
+
+@app.get("/api/topics/{topic_id}/timing", response_model=TimingTrack)
+async def get_topic_timing(topic_id: str):
+    """
+    Get the word/viseme timing track for a topic's narration.
+    Tracks missing for older topics are built from the audio file and stored.
+    """
+    topic = get_topic_by_id(topic_id)
+
+    if not topic:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Topic with id {topic_id} not found",
+        )
+
+    timing_track = topic.get("timing_track")
+    if not timing_track and topic.get("audio_url"):
+        timing_track = await run_in_threadpool(
+            build_timing_track_for_audio, topic["content_text"], topic["audio_url"]
+        )
+        if timing_track:
+            update_topic_timing(topic_id, timing_track, topic.get("version"))
+
+    if not timing_track:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No timing track for topic {topic_id}",
+        )
+
+    return timing_track
+
+
+@app.get("/api/faqs/{faq_id}/timing", response_model=TimingTrack)
+async def get_faq_timing(faq_id: str):
+    """
+    Get the word/viseme timing track for an FAQ answer's audio.
+    Tracks missing for older FAQs are built from the audio file and stored.
+    """
+    faq = get_faq_by_id(faq_id)
+
+    if not faq:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"FAQ with id {faq_id} not found",
+        )
+
+    timing_track = faq.get("timing_track")
+    if not timing_track and faq.get("answer_audio_url"):
+        timing_track = await run_in_threadpool(
+            build_timing_track_for_audio, faq["answer"], faq["answer_audio_url"]
+        )
+        if timing_track:
+            update_faq_timing(faq_id, timing_track, faq.get("version"))
+
+    if not timing_track:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No timing track for FAQ {faq_id}",
+        )
+
+    return timing_track
+
+
+@app.post("/api/topics/{topic_id}/play", status_code=status.HTTP_204_NO_CONTENT)
+async def play_topic(topic_id: str):
+    """
+    Count a play of a topic's narration (sent by the frontend as a beacon).
+    Only the id format is checked, so counting costs no database read.
+    """
+    if not validate_object_id(topic_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid topic id")
+    record_play(TOPIC_KIND, topic_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.post("/api/faqs/{faq_id}/play", status_code=status.HTTP_204_NO_CONTENT)
+async def play_faq(faq_id: str):
+    """Count a play of an FAQ answer (sent by the frontend as a beacon)."""
+    if not validate_object_id(faq_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid FAQ id")
+    record_play(FAQ_KIND, faq_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.get("/api/analytics/popular-topics", response_model=List[PopularTopic])
+def get_popular_topics(limit: int = 10, hours: float = 24):
+    """
+    The most viewed topics over the last `hours` (whole buckets), most
+    viewed first. Counts from every worker, as of their last flush.
+    """
+    limit = max(1, min(limit, 100))
+    popular = []
+    for counts in get_popular(TOPIC_KIND, limit, hours):
+        topic = get_topic_by_id(counts["id"])
+        # Counters outlive deleted topics
+        if topic is not None:
+            popular.append({**counts, "title": topic["title"], "language": topic["language"]})
+    return popular
 
 
 @app.post("/api/topics", response_model=Topic, status_code=status.HTTP_201_CREATED)
@@ -151,29 +647,26 @@ async def create_topic(topic: TopicCreate):
     - Inserts into database
     - Returns the created topic with audio URL
     """
-    # Insert topic into database
-    topic_id = insert_topic(
+    # Insert topic into database (returns the stored document)
+    created_topic = insert_topic(
         title=topic.title,
         content_text=topic.content_text,
         language=topic.language,
         audio_url=topic.audio_url,
         avatar_video_url=topic.avatar_video_url,
     )
-
-    # Get the created topic
-    created_topic = get_topic_by_id(topic_id)
+    topic_id = created_topic["id"]
 
     # Generate audio if not provided (check for None, empty string, or missing key)
     audio_url = created_topic.get("audio_url")
     if not audio_url or audio_url.strip() == "":
-        print(f"[API] Generating audio for new topic (ID: {topic_id})...")
         try:
-            audio_url = get_or_generate_audio_for_topic(created_topic)
-            update_topic_audio(topic_id, audio_url)
+            # In the threadpool, so other requests keep being served
+            audio_url = await run_in_threadpool(_generate_topic_audio, topic_id, created_topic)
             created_topic["audio_url"] = audio_url
-            print(f"[API] ✓ Audio generated successfully: {audio_url}")
-        except Exception as e:
-            print(f"[API] ⚠️  Warning: Failed to generate audio for topic: {e}")
+            logger.info("Generated audio for new topic", extra={"topic_id": topic_id})
+        except Exception:
+            logger.exception("Failed to generate audio for new topic", extra={"topic_id": topic_id})
             # Don't fail the request if audio generation fails
             # The topic is still created successfully
 
@@ -198,46 +691,190 @@ async def create_faq(faq: FAQCreate):
             detail=f"Topic with id {faq.topic_id} not found",
         )
 
-    # Insert FAQ into database
-    faq_id = insert_faq(
+    # Insert FAQ into database (returns the stored document)
+    created_faq = insert_faq(
         topic_id=faq.topic_id,
         question=faq.question,
         answer=faq.answer,
         language=faq.language,
         answer_audio_url=faq.answer_audio_url,
     )
-
-    # Get the created FAQ
-    created_faq = get_faq_by_id(faq_id)
+    faq_id = created_faq["id"]
+    notify(faq.topic_id, CONTENT_CHANGED, {"kind": "faq", "id": faq_id})
 
     # Generate audio if not provided (check for None, empty string, or missing key)
     answer_audio_url = created_faq.get("answer_audio_url")
     if not answer_audio_url or answer_audio_url.strip() == "":
-        print(f"[API] Generating audio for new FAQ (ID: {faq_id})...")
         try:
-            audio_url = get_or_generate_audio_for_faq(created_faq)
-            update_faq_audio(faq_id, audio_url)
+            audio_url = await run_in_threadpool(_generate_faq_audio, faq_id, created_faq)
             created_faq["answer_audio_url"] = audio_url
-            print(f"[API] ✓ Audio generated successfully: {audio_url}")
-        except Exception as e:
-            print(f"[API] ⚠️  Warning: Failed to generate audio for FAQ: {e}")
+            notify(faq.topic_id, AUDIO_READY, {"kind": "faq", "id": faq_id, "audio_url": audio_url})
+            logger.info("Generated audio for new FAQ", extra={"faq_id": faq_id})
+        except Exception:
+            logger.exception("Failed to generate audio for new FAQ", extra={"faq_id": faq_id})
             # Don't fail the request if audio generation fails
             # The FAQ is still created successfully
 
     return created_faq
 
 
+@app.patch("/api/topics/{topic_id}", response_model=Topic)
+async def patch_topic(topic_id: str, changes: TopicUpdate):
+    """
+    Update some fields of a topic (admin endpoint).
+
+    - Only the fields present in the body are changed
+    - Send the "version" you last read to fail with 409 if someone else changed it since
+    - Changing content_text or language clears the audio, which is synthesised again on next view
+    """
+    fields = changes.model_dump(exclude_unset=True)
+    expected_version = fields.pop("version", None)
+    try:
+        updated_topic = update_topic(topic_id, fields, expected_version)
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Topic {topic_id} was modified (now at version {e.current_version})",
+        )
+
+    if not updated_topic:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Topic with id {topic_id} not found",
+        )
+
+    notify(topic_id, CONTENT_CHANGED, {"kind": "topic", "id": topic_id})
+    return updated_topic
+
+
+@app.patch("/api/faqs/{faq_id}", response_model=FAQ)
+async def patch_faq(faq_id: str, changes: FAQUpdate):
+    """
+    Update some fields of an FAQ (admin endpoint).
+
+    - Only the fields present in the body are changed
+    - Send the "version" you last read to fail with 409 if someone else changed it since
+    - Changing answer or language clears the audio, which is synthesised again on next view
+    """
+    fields = changes.model_dump(exclude_unset=True)
+    expected_version = fields.pop("version", None)
+    try:
+        updated_faq = update_faq(faq_id, fields, expected_version)
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"FAQ {faq_id} was modified (now at version {e.current_version})",
+        )
+
+    if not updated_faq:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"FAQ with id {faq_id} not found",
+        )
+
+    # An answer being edited may change again: synthesise it when its topic is next opened
+    cancel_faq_audio(faq_id)
+    notify(updated_faq["topic_id"], CONTENT_CHANGED, {"kind": "faq", "id": faq_id})
+    return updated_faq
+
+
+# Admin endpoints: all require the X-Admin-Token header (see app.admin)
+admin = APIRouter(prefix=ADMIN_PATH_PREFIX.rstrip("/"), dependencies=[Depends(require_admin)])
+
+
+@admin.get("/profiles")
+async def get_profiles():
+    """List stored request profiles, newest first."""
+    return list_profiles()
+
+
+@admin.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "speedscope"):
+    """
+    Download a stored request profile.
+
+    - format=speedscope (default): JSON for https://www.speedscope.app
+    - format=folded: folded stacks for flamegraph.pl
+    """
+    profile_path = get_profile_path(profile_id)
+    if profile_path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile with ID {profile_id} not found",
+        )
+
+    if format == "folded":
+        return PlainTextResponse(speedscope_to_folded(json.loads(profile_path.read_text())))
+    return FileResponse(profile_path, media_type="application/json")
+
+
+@admin.get("/duplicates")
+def get_duplicates():
+    """
+    Report clusters of duplicate and near-duplicate narrations, and the
+    synthesis time saved by sharing audio between equivalent texts.
+    Scans the whole catalogue, so it runs in the threadpool.
+    """
+    return duplicate_report()
+
+
+@admin.get("/metrics")
+async def get_metrics():
+    """
+    Internal metrics: write-behind batch sizes and flush latencies,
+    admission control (per-route queues and rejections, loop lag),
+    view/play counter flushes, FAQ audio pregeneration and running
+    audio jobs. Each worker process reports its own (see worker_pid).
+    """
+    return {
+        "worker_pid": os.getpid(),
+        "write_batches": get_write_batch_stats(),
+        "admission": get_admission_stats(),
+        "analytics": get_analytics_stats(),
+        "pregeneration": get_pregen_stats(),
+        "audio_jobs": pending_audio_jobs(),
+    }
+
+
+app.include_router(admin)
+
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """
+    Liveness check endpoint.
+    Answers as soon as the process is serving, even while warm-up is still running.
+    """
     return {"status": "healthy", "service": "avatar-teacher-api"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness check endpoint.
+    Returns 503 until database seeding and index checks have completed.
+    """
+    warmup_status = get_warmup_status()
+    if not is_ready():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warming_up", **warmup_status},
+        )
+    return {"status": "ready", **warmup_status}
+
+
 # Mount static files (must be last to avoid route conflicts)
+# Audio goes through the storage backend: local files, or redirects to shared object storage
+app.mount(
+    "/static/media/audio",
+    AudioFiles(directory=STORAGE_LOCAL_DIR, check_dir=False),
+    name="audio",
+)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
 if __name__ == "__main__":
+    # One process, for development; production runs `python -m app.server`
     import uvicorn
 
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,8 +2,8 @@
 Pydantic models for Topic and FAQ data structures.
 """
 
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, field_validator
+from typing import Optional, List, Union
 from datetime import datetime
 
 
@@ -23,6 +23,25 @@ class TopicCreate(TopicBase):
     pass
 
 
+class TopicUpdate(BaseModel):
+    """Model for partially updating a topic; omitted fields are left unchanged."""
+
+    title: Optional[str] = None
+    content_text: Optional[str] = None
+    language: Optional[str] = None
+    audio_url: Optional[str] = None
+    avatar_video_url: Optional[str] = None
+    version: Optional[int] = None  # Expected current version (optimistic concurrency)
+
+    @field_validator("title", "content_text", "language", "avatar_video_url")
+    @classmethod
+    def not_null(cls, value):
+        """Omit a field to keep it; only audio_url may be cleared with null."""
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
 class TopicListItem(BaseModel):
     """Minimal topic info for list view."""
 
@@ -32,9 +51,10 @@ class TopicListItem(BaseModel):
 
 
 class Topic(TopicBase):
-    """Full topic model with ID and timestamps."""
+    """Full topic model with ID, version and timestamps."""
 
     id: str
+    version: int = 1
     created_at: datetime
     updated_at: datetime
 
@@ -47,6 +67,7 @@ class Topic(TopicBase):
                 "language": "en",
                 "audio_url": "/static/media/audio/topic_1.mp3",
                 "avatar_video_url": "/static/media/avatar_loop.mp4",
+                "version": 1,
                 "created_at": "2025-01-01T00:00:00",
                 "updated_at": "2025-01-01T00:00:00",
             }
@@ -69,6 +90,24 @@ class FAQCreate(FAQBase):
     pass
 
 
+class FAQUpdate(BaseModel):
+    """Model for partially updating an FAQ; omitted fields are left unchanged."""
+
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    language: Optional[str] = None
+    answer_audio_url: Optional[str] = None
+    version: Optional[int] = None  # Expected current version (optimistic concurrency)
+
+    @field_validator("question", "answer", "language")
+    @classmethod
+    def not_null(cls, value):
+        """Omit a field to keep it; only answer_audio_url may be cleared with null."""
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
 class FAQListItem(BaseModel):
     """Minimal FAQ info for list view."""
 
@@ -78,9 +117,10 @@ class FAQListItem(BaseModel):
 
 
 class FAQ(FAQBase):
-    """Full FAQ model with ID and timestamps."""
+    """Full FAQ model with ID, version and timestamps."""
 
     id: str
+    version: int = 1
     created_at: datetime
     updated_at: datetime
 
@@ -93,6 +133,7 @@ class FAQ(FAQBase):
                 "answer": "Python is used for web development, data analysis...",
                 "language": "en",
                 "answer_audio_url": "/static/media/audio/faq_1.mp3",
+                "version": 1,
                 "created_at": "2025-01-01T00:00:00",
                 "updated_at": "2025-01-01T00:00:00",
             }
@@ -103,3 +144,33 @@ class TopicWithFAQs(Topic):
     """Topic model with associated FAQs."""
 
     faqs: List[FAQListItem] = []
+    audio_hls_url: Optional[str] = None  # Segmented playlist for long narrations
+
+
+class PopularTopic(BaseModel):
+    """A topic with its view and play counts over the requested window."""
+
+    id: str
+    title: str
+    language: str
+    views: int
+    plays: int
+
+
+class AudioVariant(BaseModel):
+    """One encoding of a narration file, for client-side selection."""
+
+    name: str  # "opus16", "opus24", "mp3_32" or "original"
+    url: str
+    mime_type: str
+    bitrate_kbps: Optional[int] = None
+    bytes: Optional[int] = None
+
+
+class TimingTrack(BaseModel):
+    """Estimated word/viseme timings for animating the avatar sprite."""
+
+    version: int
+    duration_ms: int
+    words: List[List[Union[int, str]]]  # [start_ms, end_ms, word]
+    visemes: List[List[Union[int, str]]]  # [start_ms, viseme_code]
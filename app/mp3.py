@@ -0,0 +1,105 @@
+"""
+Minimal MP3 (MPEG audio Layer III) frame parser.
+
+Only reads frame headers - enough to split a file on frame boundaries and
+compute its exact duration without ffmpeg or any third-party decoder.
+"""
+
+from typing import Iterator, NamedTuple, Optional
+from pathlib import Path
+
+
+# Bitrates in kbps for Layer III, indexed by the 4-bit bitrate field
+_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+
+# Sample rates in Hz, indexed by version then the 2-bit sample rate field
+_SAMPLE_RATES = {
+    "1": [44100, 48000, 32000],
+    "2": [22050, 24000, 16000],
+    "2.5": [11025, 12000, 8000],
+}
+
+_VERSIONS = {0b00: "2.5", 0b10: "2", 0b11: "1"}
+
+
+class Mp3Frame(NamedTuple):
+    """One MPEG audio frame within a file."""
+
+    offset: int
+    length: int
+    sample_rate: int
+    samples: int
+    bitrate_kbps: int
+
+
+def _skip_id3v2(data: bytes) -> int:
+    """Return the offset of the first byte after a leading ID3v2 tag."""
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def parse_frame_header(data: bytes, offset: int) -> Optional[Mp3Frame]:
+    """
+    Parse the Layer III frame header at an offset.
+
+    Returns:
+        Mp3Frame: The frame, or None if there is no valid header at the offset
+    """
+    if offset + 4 > len(data):
+        return None
+
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = _VERSIONS.get((b1 >> 3) & 0b11)
+    layer = (b1 >> 1) & 0b11
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0b11
+    padding = (b2 >> 1) & 0b1
+
+    # Layer III only ("01"), no free-format or reserved values
+    if version is None or layer != 0b01:
+        return None
+    if bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrates = _BITRATES_MPEG1 if version == "1" else _BITRATES_MPEG2
+    bitrate_kbps = bitrates[bitrate_index]
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    samples = 1152 if version == "1" else 576
+    length = (samples // 8) * bitrate_kbps * 1000 // sample_rate + padding
+
+    return Mp3Frame(offset, length, sample_rate, samples, bitrate_kbps)
+
+
+def iter_frames(data: bytes) -> Iterator[Mp3Frame]:
+    """
+    Iterate over the audio frames of an MP3 file.
+    Skips a leading ID3v2 tag and resynchronises over any junk bytes.
+    """
+    offset = _skip_id3v2(data)
+    while offset < len(data):
+        frame = parse_frame_header(data, offset)
+        if frame is None or frame.length <= 0:
+            offset += 1
+            continue
+        if frame.offset + frame.length > len(data):
+            break
+        yield frame
+        offset += frame.length
+
+
+def get_duration(path: Path) -> float:
+    """
+    Get the exact duration of an MP3 file in seconds.
+
+    Returns:
+        float: Duration in seconds (0.0 if the file has no frames)
+    """
+    data = Path(path).read_bytes()
+    return sum(frame.samples / frame.sample_rate for frame in iter_frames(data))
@@ -0,0 +1,382 @@
+"""
+Predictive FAQ audio generation.
+
+The frontend lists a topic's FAQs when its narration ends, so the next
+requests are predictable: the student clicks one of those FAQs. When a
+topic is opened, get_topic hands the FAQs whose answer audio is still
+missing to background threads, which rank them and synthesise them while
+the narration plays, so the audio is usually ready by the time of the
+click. Handing them over is constant-time work on the event loop; the
+ranking query runs on the threads.
+
+- Bounded: PREGEN_CONCURRENCY threads; at most PREGEN_FAQS_PER_TOPIC FAQs
+  per topic and PREGEN_QUEUE_SIZE waiting jobs (jobs of the topics opened
+  longest ago are dropped first).
+- Prioritised: the most recently opened topic first; within a topic, the
+  FAQs with most views over PREGEN_HISTORY_HOURS (app.analytics), then
+  list order. Without view counts (analytics off, a snapshot node, or the
+  database unreachable) a topic's FAQs keep their list order.
+- Low priority: a job only starts while no request is waiting for
+  synthesis in this process.
+- Cancellable: a request that needs an FAQ's audio takes over its queued
+  job (claim()), or waits for it if it is already running, so an answer is
+  never synthesised twice. Editing an FAQ drops its job (cancel()); a job
+  already running finishes, but its audio isn't stored (the FAQ's version
+  moved on, see app.db), announced or handed to requests. Shutdown drops
+  every queued job and waits for the running ones.
+"""
+
+from typing import Dict, Any, Callable, List, Optional, Sequence
+from concurrent.futures import Future
+import heapq
+import itertools
+import logging
+import os
+import threading
+
+from app.analytics import analytics_enabled, get_popular, FAQ_KIND
+from app.db import get_faq_by_id
+from app.events import notify, AUDIO_READY
+from app.tts_stub import AUDIO_DRAIN_TIMEOUT_S, wait_for_audio_jobs
+
+logger = logging.getLogger(__name__)
+
+
+# Set PREGEN=0 to only synthesise FAQ audio when it is requested
+PREGEN_ENABLED = os.getenv("PREGEN", "1") != "0"
+PREGEN_CONCURRENCY = int(os.getenv("PREGEN_CONCURRENCY", "1"))
+PREGEN_FAQS_PER_TOPIC = int(os.getenv("PREGEN_FAQS_PER_TOPIC", "5"))
+PREGEN_QUEUE_SIZE = int(os.getenv("PREGEN_QUEUE_SIZE", "100"))
+PREGEN_HISTORY_HOURS = float(os.getenv("PREGEN_HISTORY_HOURS", "168"))
+
+# How often a thread waiting for request synthesis to finish rechecks for shutdown
+_IDLE_POLL_S = 0.5
+
+
+class _Opening:
+    """A topic's FAQs waiting to be ranked and queued."""
+
+    __slots__ = ("topic_id", "faq_ids", "number", "withdrawn")
+
+    def __init__(self, topic_id: str, faq_ids: List[str], number: int):
+        self.topic_id = topic_id
+        self.faq_ids = faq_ids
+        self.number = number
+        # FAQs claimed or cancelled before the opening was queued
+        self.withdrawn: set = set()
+
+
+class _Job:
+    """One FAQ waiting for synthesis."""
+
+    __slots__ = ("faq_id", "topic_id", "priority")
+
+    def __init__(self, faq_id: str, topic_id: str, priority: tuple):
+        self.faq_id = faq_id
+        self.topic_id = topic_id
+        self.priority = priority
+
+
+class FaqPregenerator:
+    """
+    Priority queue of FAQ audio jobs and the threads that run them.
+
+    Args:
+        generate: Synthesises and stores an FAQ's audio, (faq id, FAQ) -> audio URL
+        concurrency: Worker threads
+        per_topic: FAQs scheduled per topic opening
+        queue_size: Jobs that may wait at once
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, Dict[str, Any]], str],
+        concurrency: int = None,
+        per_topic: int = None,
+        queue_size: int = None,
+    ):
+        self.generate = generate
+        self.concurrency = concurrency or PREGEN_CONCURRENCY
+        self.per_topic = per_topic or PREGEN_FAQS_PER_TOPIC
+        self.queue_size = queue_size or PREGEN_QUEUE_SIZE
+
+        self._unranked: List[_Opening] = []
+        self._ranking: List[_Opening] = []
+        self._heap: List[tuple] = []
+        self._queued: Dict[str, _Job] = {}
+        self._running: Dict[str, Future] = {}
+        # Running jobs whose FAQ was edited since they started
+        self._stale: set = set()
+        self._openings = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+        self._stats = {
+            "scheduled": 0,
+            "generated": 0,
+            "already_ready": 0,
+            "claimed": 0,
+            "dropped": 0,
+            "cancelled": 0,
+            "failed": 0,
+        }
+
+    def schedule(self, topic_id: str, faq_ids: Sequence[str]) -> int:
+        """
+        Hand over a topic's FAQs that lack audio. Called on the event loop,
+        so it only records them; a thread ranks them (most viewed first)
+        and queues them. Starts the threads on first use.
+
+        Returns:
+            int: FAQs handed over
+        """
+        if not faq_ids:
+            return 0
+        with self._changed:
+            if self._stopping:
+                return 0
+            self._unranked.append(_Opening(topic_id, list(faq_ids), next(self._openings)))
+            # Openings nobody has ranked yet are bounded like the queue, oldest dropped first
+            while len(self._unranked) > self.queue_size:
+                self._stats["dropped"] += len(self._unranked.pop(0).faq_ids)
+            self._changed.notify_all()
+            if not self._threads:
+                self._start()
+        return len(faq_ids)
+
+    def claim(self, faq_id: str) -> Optional[Future]:
+        """
+        For a request about to synthesise an FAQ's audio itself: drop the
+        FAQ's queued job, or return the running job's future (its result is
+        the audio URL) for the request to wait on instead.
+        """
+        with self._lock:
+            running = self._running.get(faq_id)
+            if running is not None and faq_id not in self._stale:
+                self._stats["claimed"] += 1
+                return running
+            if self._withdraw(faq_id):
+                self._stats["claimed"] += 1
+        return None
+
+    def cancel(self, faq_id: str):
+        """Drop an FAQ's queued job, or disown its running one, e.g. because its answer changed."""
+        with self._lock:
+            if faq_id in self._running:
+                self._stale.add(faq_id)
+                self._stats["cancelled"] += 1
+            elif self._withdraw(faq_id):
+                self._stats["cancelled"] += 1
+
+    def _withdraw(self, faq_id: str) -> bool:
+        """Drop an FAQ from the queue and from openings not queued yet (call with the lock held)."""
+        withdrawn = self._queued.pop(faq_id, None) is not None
+        for opening in self._unranked + self._ranking:
+            if faq_id in opening.faq_ids and faq_id not in opening.withdrawn:
+                opening.withdrawn.add(faq_id)
+                withdrawn = True
+        return withdrawn
+
+    def stop(self, timeout: float = None) -> int:
+        """
+        Drop queued jobs and wait up to timeout seconds (default
+        AUDIO_DRAIN_TIMEOUT_S) for running ones.
+
+        Returns:
+            int: Jobs still running
+        """
+        with self._changed:
+            self._stopping = True
+            self._stats["cancelled"] += len(self._queued)
+            self._stats["cancelled"] += sum(len(opening.faq_ids) for opening in self._unranked)
+            self._unranked.clear()
+            self._queued.clear()
+            self._heap.clear()
+            self._changed.notify_all()
+            threads = list(self._threads)
+        timeout = AUDIO_DRAIN_TIMEOUT_S if timeout is None else timeout
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            return len(self._running)
+
+    def stats(self) -> Dict[str, Any]:
+        """Scheduling metrics for /api/admin/metrics."""
+        with self._lock:
+            return {
+                "enabled": PREGEN_ENABLED,
+                "unranked": sum(len(opening.faq_ids) for opening in self._unranked + self._ranking),
+                "queued": len(self._queued),
+                "running": len(self._running),
+                **self._stats,
+            }
+
+    def _rank(self, faq_ids: List[str]) -> List[str]:
+        """Most viewed first (by every worker's counts), then list order."""
+        if not analytics_enabled():
+            return faq_ids
+        try:
+            popular = get_popular(FAQ_KIND, len(faq_ids), PREGEN_HISTORY_HOURS, faq_ids)
+        except Exception:
+            logger.warning("FAQ view counts unavailable, using list order", exc_info=True)
+            return faq_ids
+        ranked = [item["id"] for item in popular]
+        viewed = set(ranked)
+        return ranked + [faq_id for faq_id in faq_ids if faq_id not in viewed]
+
+    def _queue_opening(self, opening: _Opening):
+        """Rank an opening's FAQs (a database query, hence on a thread) and queue them."""
+        ranked = self._rank(opening.faq_ids)[: self.per_topic]
+        with self._changed:
+            self._ranking.remove(opening)
+            if self._stopping:
+                return
+            for position, faq_id in enumerate(ranked):
+                if faq_id in opening.withdrawn or faq_id in self._running:
+                    continue
+                # Newest topic first, then the topic's ranking; re-queueing moves a job up
+                job = _Job(faq_id, opening.topic_id, (-opening.number, position))
+                self._queued[faq_id] = job
+                heapq.heappush(self._heap, (job.priority, faq_id, job))
+                self._stats["scheduled"] += 1
+            while len(self._queued) > self.queue_size:
+                oldest = max(self._queued.values(), key=lambda job: job.priority)
+                del self._queued[oldest.faq_id]
+                self._stats["dropped"] += 1
+            self._changed.notify_all()
+
+    def _start(self):
+        for number in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"faq-pregen-{number}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the highest-priority job still wanted (call with the lock held)."""
+        while self._heap:
+            _, faq_id, job = heapq.heappop(self._heap)
+            if self._queued.get(faq_id) is job:
+                del self._queued[faq_id]
+                return job
+        return None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                # Newest opening first: its FAQs go to the front of the queue anyway
+                opening = self._unranked.pop() if self._unranked else None
+                if opening is not None:
+                    self._ranking.append(opening)
+                ours = len(self._running)
+            if opening is not None:
+                self._queue_opening(opening)
+                continue
+
+            # Requests waiting for synthesis go first; running jobs of ours don't count
+            if wait_for_audio_jobs(_IDLE_POLL_S, at_most=ours) > ours:
+                continue
+
+            with self._changed:
+                if self._unranked:
+                    continue
+                job = self._next_job()
+                if job is None:
+                    if not self._stopping:
+                        self._changed.wait()
+                    continue
+                future: Future = Future()
+                future.set_running_or_notify_cancel()
+                self._running[job.faq_id] = future
+
+            try:
+                future.set_result(self._generate(job))
+            except Exception as e:
+                with self._lock:
+                    self._stats["failed"] += 1
+                logger.exception("FAQ audio pregeneration failed", extra={"faq_id": job.faq_id})
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._running[job.faq_id]
+                    self._stale.discard(job.faq_id)
+
+    def _generate(self, job: _Job) -> Optional[str]:
+        faq = get_faq_by_id(job.faq_id)
+        if faq is None or faq.get("answer_audio_url"):
+            with self._lock:
+                self._stats["already_ready"] += 1
+            return faq and faq.get("answer_audio_url")
+
+        audio_url = self.generate(job.faq_id, faq)
+        with self._lock:
+            if job.faq_id in self._stale:
+                # Synthesised from the answer before the edit; requests synthesise the new one
+                return None
+            self._stats["generated"] += 1
+        notify(faq["topic_id"], AUDIO_READY, {"kind": "faq", "id": job.faq_id, "audio_url": audio_url})
+        logger.debug("FAQ audio pregenerated", extra={"faq_id": job.faq_id, "topic_id": job.topic_id})
+        return audio_url
+
+
+# Pregenerator instance - created on startup, one per worker process
+_pregenerator: Optional[FaqPregenerator] = None
+
+
+def get_pregenerator() -> Optional[FaqPregenerator]:
+    """Get this worker's FAQ pregenerator (None before startup or with PREGEN=0)."""
+    return _pregenerator
+
+
+def set_pregenerator(pregenerator: Optional[FaqPregenerator]):
+    """Replace the FAQ pregenerator (used by tests and benchmarks)."""
+    global _pregenerator
+    if _pregenerator is not None:
+        _pregenerator.stop(0)
+    _pregenerator = pregenerator
+
+
+def start_pregeneration(generate: Callable[[str, Dict[str, Any]], str]):
+    """Create the pregenerator on startup; threads start with the first topic opened."""
+    if PREGEN_ENABLED:
+        set_pregenerator(FaqPregenerator(generate))
+
+
+def stop_pregeneration() -> int:
+    """Drop queued jobs and wait for running ones. Called on shutdown."""
+    global _pregenerator
+    pregenerator, _pregenerator = _pregenerator, None
+    return pregenerator.stop() if pregenerator is not None else 0
+
+
+def schedule_faq_audio(topic_id: str, faqs: List[Dict[str, Any]]) -> int:
+    """Queue the listed FAQs (of a topic just opened) that have no audio yet."""
+    pregenerator = _pregenerator
+    missing = [faq["id"] for faq in faqs if not faq.get("answer_audio_url")]
+    if pregenerator is None or not missing:
+        return 0
+    return pregenerator.schedule(topic_id, missing)
+
+
+def claim_faq_audio(faq_id: str) -> Optional[Future]:
+    """See FaqPregenerator.claim(); None when pregeneration is off."""
+    pregenerator = _pregenerator
+    return pregenerator.claim(faq_id) if pregenerator is not None else None
+
+
+def cancel_faq_audio(faq_id: str):
+    """See FaqPregenerator.cancel()."""
+    pregenerator = _pregenerator
+    if pregenerator is not None:
+        pregenerator.cancel(faq_id)
+
+
+def get_pregen_stats() -> Dict[str, Any]:
+    """Pregeneration metrics for /api/admin/metrics."""
+    pregenerator = _pregenerator
+    if pregenerator is None:
+        return {"enabled": False}
+    return pregenerator.stats()
@@ -0,0 +1,55 @@
+"""
+Preload hints for topic responses.
+
+GET /api/topics/{id} carries a `Link: <...>; rel=preload` header for the
+topic audio and the first few FAQ answers' audio. uvicorn cannot send 103
+Early Hints itself, but CDNs and reverse proxies that support them
+(Cloudflare, h2o, nginx with early_hints) turn these Link headers into a
+103 response for the next request to the same URL.
+
+Only static files are hinted. A preload is an ordinary GET without
+`Purpose: prefetch`, so preloading /api/faqs/{id} would count a view and
+start synthesis; the frontend prefetches FAQ details itself, marked as a
+prefetch.
+"""
+
+from typing import Dict, Any, List
+import os
+
+
+# How many FAQ answers' audio to hint, in list order
+PRELOAD_FAQ_COUNT = int(os.getenv("PRELOAD_FAQ_COUNT", "2"))
+
+
+def _link(url: str, as_type: str) -> str:
+    """Format one Link header entry."""
+    entry = f"<{url}>; rel=preload; as={as_type}"
+    if as_type == "fetch":
+        # fetch() requests are CORS-mode, so the preload must be too to be reused
+        entry += "; crossorigin"
+    return entry
+
+
+def build_topic_links(topic: Dict[str, Any]) -> List[str]:
+    """
+    Build preload hints for a topic with its FAQ list.
+
+    Returns:
+        list: Link header entries - topic audio first, then FAQ answer audio
+    """
+    links = []
+    if topic.get("audio_hls_url"):
+        links.append(_link(topic["audio_hls_url"], "fetch"))
+    elif topic.get("audio_url"):
+        links.append(_link(topic["audio_url"], "audio"))
+
+    for faq in topic.get("faqs", [])[:PRELOAD_FAQ_COUNT]:
+        if faq.get("answer_audio_url"):
+            links.append(_link(faq["answer_audio_url"], "audio"))
+
+    return links
+
+
+def build_link_header(links: List[str]) -> str:
+    """Join Link entries into a single header value."""
+    return ", ".join(links)
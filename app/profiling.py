@@ -0,0 +1,420 @@
+"""
+Opt-in per-request sampling profiler.
+
+A request is profiled when it carries a valid X-Profile-Signature header,
+or at random with probability PROFILE_SAMPLE_RATE. While it runs, a
+background thread samples the event loop thread's stack every
+PROFILE_INTERVAL_MS and the result is written to PROFILE_DIR as a
+speedscope file (open it at https://www.speedscope.app), retrievable via
+GET /api/admin/profiles/{profile_id} (an admin endpoint, see app.admin),
+optionally as folded stacks for flamegraph.pl. Admin endpoints are never
+profiled.
+
+The signature is "<expires>.<hex HMAC-SHA256(PROFILE_SECRET, path + expires)>"
+with expires a unix time at most PROFILE_SIGNATURE_TTL_S ahead; print one
+with `python -m app.profiling sign /api/topics/<id>`.
+
+Sampling stops after PROFILE_MAX_SECONDS or PROFILE_MAX_SAMPLES, and as
+soon as a streaming (text/event-stream) response starts, so a profiled
+SSE connection doesn't keep the sampler running for its whole life.
+
+Route handlers run on the event loop thread, so samples taken while a
+handler awaits can include other requests' frames. Work a profiled request
+hands to the threadpool (Starlette's run_in_threadpool, sync endpoints) is
+followed into the worker thread: the middleware wraps anyio's
+to_thread.run_sync, which all of those go through. With no secret and a
+zero sample rate the middleware is a single check per request.
+"""
+
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from contextvars import ContextVar
+from pathlib import Path
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+import anyio.to_thread
+
+from app.admin import ADMIN_PATH_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+# Shared secret for the X-Profile-Signature header (empty disables it)
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+
+# Fraction of requests profiled without a signature (0.0 - 1.0)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Milliseconds between stack samples
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+# Where profiles are stored, and how many are kept
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# How long a signature stays valid (also the longest lifetime one may claim)
+PROFILE_SIGNATURE_TTL_S = int(os.getenv("PROFILE_SIGNATURE_TTL_S", "600"))
+
+# Upper bounds on one profile; the request itself carries on unprofiled
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_MAX_SAMPLES = int(os.getenv("PROFILE_MAX_SAMPLES", "20000"))
+
+SIGNATURE_HEADER = b"x-profile-signature"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+SPEEDSCOPE_SUFFIX = ".speedscope.json"
+
+# (function name, file, first line of the function)
+Frame = Tuple[str, str, int]
+
+
+def _digest(path: str, expires: int, secret: str) -> str:
+    payload = f"{path}\n{expires}".encode()
+    return hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+
+
+def sign(path: str, secret: str = None, expires_at: int = None) -> str:
+    """
+    Compute the X-Profile-Signature value for a request path.
+
+    Args:
+        path: Request path the signature is valid for
+        secret: Signing secret (defaults to PROFILE_SECRET)
+        expires_at: Unix time the signature expires (defaults to
+            PROFILE_SIGNATURE_TTL_S from now)
+
+    Returns:
+        "<expires>.<hex digest>"
+    """
+    if expires_at is None:
+        expires_at = int(time.time()) + PROFILE_SIGNATURE_TTL_S
+    key = secret if secret is not None else PROFILE_SECRET
+    return f"{expires_at}.{_digest(path, expires_at, key)}"
+
+
+def verify_signature(path: str, signature: Optional[str]) -> bool:
+    """
+    Check an X-Profile-Signature value. Always False when no secret is set,
+    once the signature has expired, or if it claims to stay valid for
+    longer than PROFILE_SIGNATURE_TTL_S.
+    """
+    if not PROFILE_SECRET or not signature:
+        return False
+    expires, _, digest = signature.partition(".")
+    if not expires.isdigit():
+        return False
+    remaining = int(expires) - time.time()
+    if not 0 < remaining <= PROFILE_SIGNATURE_TTL_S:
+        return False
+    return hmac.compare_digest(_digest(path, int(expires), PROFILE_SECRET), digest)
+
+
+# Profilers running right now, and the GIL switch interval to restore after the last
+_active_lock = threading.Lock()
+_active_count = 0
+_saved_switch_interval = 0.0
+
+
+def _enter_profiling(interval: float):
+    """
+    Shorten the GIL switch interval while profiling. By default a busy
+    thread holds the GIL for 5 ms at a time, which would cap the sampler
+    at one sample per 5 ms.
+    """
+    global _active_count, _saved_switch_interval
+    with _active_lock:
+        if _active_count == 0:
+            _saved_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(_saved_switch_interval, interval / 2))
+        _active_count += 1
+
+
+def _exit_profiling():
+    global _active_count
+    with _active_lock:
+        _active_count -= 1
+        if _active_count == 0:
+            sys.setswitchinterval(_saved_switch_interval)
+
+
+class SamplingProfiler:
+    """
+    Sample one thread's Python stack from a background thread.
+
+    Each sample is the stack (outermost frame first) plus the time since
+    the previous sample, so GIL contention stretches weights instead of
+    losing time. Sampling ends by itself after max_seconds or max_samples.
+    """
+
+    def __init__(
+        self,
+        thread_id: int,
+        interval_ms: float = None,
+        max_seconds: float = None,
+        max_samples: int = None,
+    ):
+        self.thread_id = thread_id
+        # Worker thread currently running on the request's behalf, sampled instead
+        self.followed_thread_id: Optional[int] = None
+        self.interval = (interval_ms or PROFILE_INTERVAL_MS) / 1000
+        self.max_seconds = max_seconds or PROFILE_MAX_SECONDS
+        self.max_samples = max_samples or PROFILE_MAX_SAMPLES
+        self.samples: List[Tuple[Tuple[Frame, ...], float]] = []
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        _enter_profiling(self.interval)
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop_sampling(self):
+        """Stop taking samples without waiting for the sampler thread."""
+        self._stop.set()
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.stopped_at = time.perf_counter()
+        return self
+
+    def _run(self):
+        try:
+            self._sample()
+        finally:
+            # Restored as soon as sampling ends, not when the request does
+            _exit_profiling()
+
+    def _sample(self):
+        last = self.started_at
+        deadline = self.started_at + self.max_seconds
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.followed_thread_id or self.thread_id)
+            now = time.perf_counter()
+            if now >= deadline or len(self.samples) >= self.max_samples:
+                logger.info("Profile truncated", extra={"samples": len(self.samples)})
+                return
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+
+            self.samples.append((tuple(stack), (now - last) * 1000))
+            last = now
+            del frame
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """Export the samples in speedscope's "sampled" file format."""
+        frame_index: Dict[Frame, int] = {}
+        samples = []
+        weights = []
+        for stack, weight in self.samples:
+            samples.append([frame_index.setdefault(frame, len(frame_index)) for frame in stack])
+            weights.append(round(weight, 3))
+
+        frames = [
+            {"name": function, "file": filename, "line": line}
+            for function, filename, line in frame_index
+        ]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "avatar-teacher",
+            "name": name,
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": round(sum(weights), 3),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+def speedscope_to_folded(profile: Dict[str, Any]) -> str:
+    """
+    Convert a speedscope file to folded stacks ("a;b;c <weight>" per line),
+    the input format of flamegraph.pl. Weights are in microseconds.
+    """
+    frames = profile["shared"]["frames"]
+    totals: Dict[str, float] = {}
+    sampled = profile["profiles"][0]
+    for stack, weight in zip(sampled["samples"], sampled["weights"]):
+        key = ";".join(
+            f"{frames[i]['name']} ({Path(frames[i]['file']).name}:{frames[i]['line']})"
+            for i in stack
+        )
+        totals[key] = totals.get(key, 0) + weight
+    return "".join(f"{stack} {round(weight * 1000)}\n" for stack, weight in totals.items())
+
+
+def new_profile_id(path: str) -> str:
+    """Make a sortable, unique profile id for a request path."""
+    slug = path.strip("/").replace("/", "_")[:60] or "root"
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{random.getrandbits(32):08x}-{slug}"
+
+
+def save_profile(profiler: SamplingProfiler, profile_id: str, method: str, path: str):
+    """Write a finished profile to PROFILE_DIR and prune old ones."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    elapsed_ms = (profiler.stopped_at - profiler.started_at) * 1000
+
+    name = f"{method} {path} ({elapsed_ms:.1f} ms)"
+    profile_path = PROFILE_DIR / f"{profile_id}{SPEEDSCOPE_SUFFIX}"
+    profile_path.write_text(json.dumps(profiler.to_speedscope(name), separators=(",", ":")))
+
+    stored = sorted(PROFILE_DIR.glob(f"*{SPEEDSCOPE_SUFFIX}"))
+    for old in stored[: max(len(stored) - PROFILE_KEEP, 0)]:
+        old.unlink(missing_ok=True)
+
+    logger.info("Saved profile", extra={"profile_id": profile_id, "profile_name": name})
+
+
+def get_profile_path(profile_id: str) -> Optional[Path]:
+    """Resolve a profile id to its file, or None if it doesn't exist."""
+    if not profile_id or "/" in profile_id or ".." in profile_id:
+        return None
+    profile_path = PROFILE_DIR / f"{profile_id}{SPEEDSCOPE_SUFFIX}"
+    return profile_path if profile_path.is_file() else None
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """List stored profiles, newest first."""
+    if not PROFILE_DIR.is_dir():
+        return []
+    profiles = []
+    for profile_path in sorted(PROFILE_DIR.glob(f"*{SPEEDSCOPE_SUFFIX}"), reverse=True):
+        profiles.append(
+            {
+                "id": profile_path.name[: -len(SPEEDSCOPE_SUFFIX)],
+                "bytes": profile_path.stat().st_size,
+            }
+        )
+    return profiles
+
+
+# Profiler of the request being handled, if it is profiled
+_current_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar(
+    "current_profiler", default=None
+)
+
+
+# anyio's to_thread.run_sync before install_threadpool_hook() wrapped it
+_run_sync: Optional[Callable] = None
+
+
+def install_threadpool_hook():
+    """
+    Wrap anyio.to_thread.run_sync, behind Starlette's run_in_threadpool and
+    sync endpoints, so that while a profiled request awaits a blocking
+    function the profiler samples the worker thread running it. Other
+    calls pay one context variable lookup. Idempotent.
+    """
+    global _run_sync
+    if _run_sync is not None:
+        return
+    _run_sync = run_sync = anyio.to_thread.run_sync
+
+    async def followed_run_sync(func: Callable, *args, **kwargs):
+        profiler = _current_profiler.get()
+        if profiler is None:
+            return await run_sync(func, *args, **kwargs)
+
+        def followed(*call_args):
+            profiler.followed_thread_id = threading.get_ident()
+            try:
+                return func(*call_args)
+            finally:
+                profiler.followed_thread_id = None
+
+        return await run_sync(followed, *args, **kwargs)
+
+    anyio.to_thread.run_sync = followed_run_sync
+
+
+def _is_streaming(headers) -> bool:
+    for name, value in headers:
+        if name.lower() == b"content-type":
+            return value.startswith(b"text/event-stream")
+    return False
+
+
+class ProfilingMiddleware:
+    """Profile requests that carry a valid signature or are picked by sampling."""
+
+    def __init__(self, app):
+        self.app = app
+        install_threadpool_hook()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (PROFILE_SECRET or PROFILE_SAMPLE_RATE):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path.startswith(ADMIN_PATH_PREFIX) or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # The id is announced up front; the file appears once the response is complete
+        profile_id = new_profile_id(path)
+        profiler = SamplingProfiler(threading.get_ident())
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+                message = {**message, "headers": headers}
+                if _is_streaming(headers):
+                    # An event stream stays open for minutes; only its setup is profiled
+                    profiler.stop_sampling()
+            await send(message)
+
+        token = _current_profiler.set(profiler)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            _current_profiler.reset(token)
+            try:
+                save_profile(profiler, profile_id, scope["method"], path)
+            except OSError as e:
+                logger.warning("Could not save profile", extra={"error": str(e)})
+
+    @staticmethod
+    def _should_profile(scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == SIGNATURE_HEADER:
+                return verify_signature(scope["path"], value.decode("latin-1"))
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "sign":
+        print("Usage: python -m app.profiling sign <path>")
+        sys.exit(1)
+    if not PROFILE_SECRET:
+        print("PROFILE_SECRET is not set")
+        sys.exit(1)
+    print(sign(sys.argv[2]))
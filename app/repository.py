@@ -0,0 +1,817 @@
+"""
+Catalogue repositories: where topics and FAQs are stored.
+
+app.db exposes the helper functions the rest of the app uses; they
+delegate to the repository selected by DB_BACKEND:
+
+- "mongo" (default): MongoDB via pymongo (MONGODB_URI). Audio and timing
+  updates go through the write-behind batcher (see app.write_behind).
+- "sqlite": an embedded SQLite file (SQLITE_PATH), for single-node
+  installs and tests. WAL mode lets readers run alongside a writer, each
+  thread keeps its own connection (with sqlite3's per-connection cache of
+  prepared statements), and FAQs are indexed by topic.
+
+Both store the same documents, with ObjectId-format ids, and return them
+with an "id" string in place of Mongo's "_id". They also hold the
+bucketed view/play counters written by app.analytics.
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from bson import ObjectId
+
+from app.write_behind import ANY_VERSION, WriteBehindBatcher, overlay_fields
+from app.admission import DeadlineExceeded, remaining_ms
+
+if TYPE_CHECKING:
+    from pymongo.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+DB_BACKEND = os.getenv("DB_BACKEND", "mongo")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "avatar_teacher.sqlite3")
+DATABASE_NAME = "edtech_avatar_teacher"
+
+# Queue audio/timing updates and write them in bulk (MongoDB only)
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND", "1") != "0"
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+WRITE_BATCH_INTERVAL_MS = float(os.getenv("WRITE_BATCH_INTERVAL_MS", "50"))
+
+# Attempts of an update whose version check lost a race with another writer
+UPDATE_ATTEMPTS = 3
+
+TOPICS = "topics"
+FAQS = "faqs"
+COUNTERS = "counters"
+
+
+def utcnow() -> datetime:
+    """Current UTC time at the millisecond precision MongoDB stores, so both backends agree."""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+class VersionConflictError(Exception):
+    """The document was changed by someone else since the expected version."""
+
+    def __init__(self, current_version: Optional[int]):
+        super().__init__(f"Document is at version {current_version}")
+        self.current_version = current_version
+
+
+def _with_id(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Replace a Mongo document's ObjectId "_id" with an "id" string."""
+    if doc is not None and "_id" in doc:
+        doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+class CatalogueRepository:
+    """
+    Storage interface for topics and FAQs.
+
+    Documents are plain dicts with an "id"; `collection` is "topics" or "faqs".
+    """
+
+    name = ""
+
+    def close(self):
+        """Write anything pending and release connections."""
+
+    def ensure_indexes(self):
+        """Create the indexes the read methods rely on (idempotent)."""
+
+    def count_topics(self) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> Dict[str, int]:
+        """Delete every topic and FAQ. Returns deleted counts per collection."""
+        raise NotImplementedError
+
+    def insert(self, collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a document and return it as stored (with "id")."""
+        raise NotImplementedError
+
+    def insert_many(self, collection: str, docs: List[Dict[str, Any]]) -> int:
+        """
+        Bulk insert for generators and imports. Documents may carry their
+        own "id" (ObjectId hex), e.g. so FAQs can reference new topics.
+        Returns the number inserted.
+        """
+        for doc in docs:
+            self.insert(collection, doc)
+        return len(docs)
+
+    def get(
+        self, collection: str, doc_id: str, fields: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """The document, or with `fields` only those stored fields (and "id")."""
+        raise NotImplementedError
+
+    def iter_documents(self, collection: str) -> Iterable[Dict[str, Any]]:
+        """Every document in a collection, in insertion order."""
+        raise NotImplementedError
+
+    def list_topics(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """id, title and language of every topic, or id and the stored `fields`."""
+        raise NotImplementedError
+
+    def list_faqs(self, topic_id: str) -> List[Dict[str, Any]]:
+        """id, question and answer_audio_url of a topic's FAQs."""
+        raise NotImplementedError
+
+    def set_fields(
+        self, collection: str, doc_id: str, fields: Dict[str, Any], version: Any = ANY_VERSION
+    ) -> bool:
+        """
+        Set fields without bumping the version. True if stored (or queued).
+
+        Args:
+            version: Only set them while the document is at this version
+                     (None: has no version field; ANY_VERSION: unconditional)
+        """
+        raise NotImplementedError
+
+    def write_batch_stats(self) -> Dict[str, Any]:
+        return {"enabled": False}
+
+    def add_counts(self, counts: Dict[Tuple[str, str, datetime], Dict[str, int]]):
+        """
+        Add view/play counts to their buckets, creating missing buckets.
+
+        Args:
+            counts: {(kind, document id, bucket start): {"views": n, "plays": n}}
+        """
+        raise NotImplementedError
+
+    def top_counts(
+        self, kind: str, since: datetime, limit: int, doc_ids: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Documents of one kind with the most views in buckets from `since` on,
+        among `doc_ids` if given (documents never counted are left out).
+
+        Returns:
+            list: {"id", "views", "plays"} dicts, most viewed first (ties: most played, then id)
+        """
+        raise NotImplementedError
+
+    def update_document(
+        self,
+        collection: str,
+        doc_id: str,
+        fields: Dict[str, Any],
+        audio_source_fields: Tuple[str, ...],
+        audio_url_field: str,
+        expected_version: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically update content fields of a topic or FAQ.
+
+        Only fields whose value actually changes are written. A change to one
+        of audio_source_fields also clears the audio URL and timing track, so
+        the narration is synthesised again on next use. Every write bumps the
+        document's version, and is only applied if the version is still the
+        one read, so concurrent edits can't interleave.
+
+        Args:
+            expected_version: Fail unless the document is at this version
+                              (None: apply on top of whatever is current)
+
+        Returns:
+            dict: The stored document after the update, or None if it doesn't exist
+
+        Raises:
+            VersionConflictError: If the document is not at expected_version
+        """
+        self._before_update(collection, doc_id)
+        for _ in range(UPDATE_ATTEMPTS):
+            current = self.get(collection, doc_id)
+            if current is None:
+                return None
+            version = current.get("version", 1)
+            if expected_version is not None and expected_version != version:
+                raise VersionConflictError(version)
+
+            changes = {name: value for name, value in fields.items() if current.get(name) != value}
+            if not changes:
+                return current
+
+            new_fields = {**changes, "version": version + 1, "updated_at": utcnow()}
+            unset: Tuple[str, ...] = ()
+            if audio_url_field not in changes and any(f in changes for f in audio_source_fields):
+                new_fields[audio_url_field] = None
+                unset = ("timing_track",)
+
+            # Documents written before versioning have no version; None matches that
+            document = self._compare_and_set(
+                collection, doc_id, current.get("version"), new_fields, unset
+            )
+            if document is not None:
+                return document
+            if expected_version is not None:
+                raise VersionConflictError(None)
+
+        raise VersionConflictError(None)
+
+    def _before_update(self, collection: str, doc_id: str):
+        """Hook run before a versioned update."""
+
+    def _compare_and_set(
+        self,
+        collection: str,
+        doc_id: str,
+        version: Optional[int],
+        fields: Dict[str, Any],
+        unset: Tuple[str, ...],
+    ) -> Optional[Dict[str, Any]]:
+        """Apply an update if the document is still at `version`; return it, or None."""
+        raise NotImplementedError
+
+
+class MongoRepository(CatalogueRepository):
+    """Topics and FAQs in MongoDB."""
+
+    name = "mongo"
+
+    def __init__(self, database: "Database" = None, uri: str = None):
+        """
+        Args:
+            database: An existing database (e.g. mongomock); otherwise one is
+                      connected on first use from `uri` or MONGODB_URI
+        """
+        self._db = database
+        self._client = None
+        self._uri = uri
+        self._batcher: Optional[WriteBehindBatcher] = None
+
+    @property
+    def db(self) -> "Database":
+        """
+        The database, connected on first use.
+        pymongo is imported here so the cost is paid on first query, not on startup.
+        """
+        if self._db is None:
+            from pymongo import MongoClient
+
+            self._client = MongoClient(self._uri or _get_mongodb_uri())
+            self._db = self._client[DATABASE_NAME]
+        return self._db
+
+    @property
+    def batcher(self) -> WriteBehindBatcher:
+        if self._batcher is None:
+            self._batcher = WriteBehindBatcher(
+                lambda name: self.db[name], WRITE_BATCH_SIZE, WRITE_BATCH_INTERVAL_MS
+            )
+        return self._batcher
+
+    @batcher.setter
+    def batcher(self, batcher: Optional[WriteBehindBatcher]):
+        self._batcher = batcher
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.stop()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._db = None
+
+    def ensure_indexes(self):
+        self.db[FAQS].create_index("topic_id")
+        # One document per bucket; also serves the top-N range query
+        self.db[COUNTERS].create_index([("kind", 1), ("bucket", 1), ("doc_id", 1)], unique=True)
+
+    def count_topics(self) -> int:
+        return self.db[TOPICS].count_documents({})
+
+    def clear(self) -> Dict[str, int]:
+        return {name: self.db[name].delete_many({}).deleted_count for name in (TOPICS, FAQS)}
+
+    def insert(self, collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        doc = dict(doc)
+        self.db[collection].insert_one(doc)
+        return _with_id(doc)
+
+    def insert_many(self, collection: str, docs: List[Dict[str, Any]]) -> int:
+        if not docs:
+            return 0
+        rows = []
+        for doc in docs:
+            row = {key: value for key, value in doc.items() if key != "id"}
+            if "id" in doc:
+                row["_id"] = ObjectId(doc["id"])
+            rows.append(row)
+        return len(self.db[collection].insert_many(rows).inserted_ids)
+
+    def get(
+        self, collection: str, doc_id: str, fields: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        # Updates queued before the read must show even if a flush lands mid-query
+        queued = self._batcher.pending_updates(collection, doc_id) if self._batcher else []
+        with _server_deadline() as options:
+            doc = self.db[collection].find_one(
+                {"_id": ObjectId(doc_id)}, _projection(fields), **options
+            )
+        if doc is not None:
+            doc.update(overlay_fields(queued, doc.get("version")) or {})
+        return _with_id(_narrow(self._apply_pending(collection, doc), fields))
+
+    def iter_documents(self, collection: str) -> Iterable[Dict[str, Any]]:
+        for doc in self.db[collection].find():
+            yield _with_id(self._apply_pending(collection, doc))
+
+    def list_topics(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        with _server_deadline() as options:
+            if fields is not None:
+                return [
+                    _with_id(_narrow(self._apply_pending(TOPICS, topic), fields))
+                    for topic in self.db[TOPICS].find({}, _projection(fields), **options)
+                ]
+            return [
+                {"id": str(topic["_id"]), "title": topic["title"], "language": topic["language"]}
+                for topic in self.db[TOPICS].find({}, TOPIC_LIST_PROJECTION, **options)
+            ]
+
+    def list_faqs(self, topic_id: str) -> List[Dict[str, Any]]:
+        result = []
+        with _server_deadline() as options:
+            for faq in self.db[FAQS].find({"topic_id": topic_id}, FAQ_LIST_PROJECTION, **options):
+                faq = self._apply_pending(FAQS, faq)
+                result.append(
+                    {
+                        "id": str(faq["_id"]),
+                        "question": faq["question"],
+                        "answer_audio_url": faq.get("answer_audio_url"),
+                    }
+                )
+        return result
+
+    def set_fields(self, collection, doc_id, fields, version=ANY_VERSION) -> bool:
+        if WRITE_BEHIND_ENABLED:
+            self.batcher.queue_set(collection, doc_id, fields, version)
+            return True
+        query: Dict[str, Any] = {"_id": ObjectId(doc_id)}
+        if version is not ANY_VERSION:
+            query["version"] = version
+        result = self.db[collection].update_one(query, {"$set": fields})
+        return result.modified_count > 0
+
+    def write_batch_stats(self) -> Dict[str, Any]:
+        return {"enabled": WRITE_BEHIND_ENABLED, **self.batcher.stats()}
+
+    def add_counts(self, counts):
+        from pymongo import UpdateOne
+
+        operations = [
+            UpdateOne(
+                {"kind": kind, "bucket": bucket, "doc_id": doc_id},
+                {"$inc": fields},
+                upsert=True,
+            )
+            for (kind, doc_id, bucket), fields in counts.items()
+        ]
+        if operations:
+            self.db[COUNTERS].bulk_write(operations, ordered=False)
+
+    def top_counts(
+        self, kind: str, since: datetime, limit: int, doc_ids: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        match: Dict[str, Any] = {"kind": kind, "bucket": {"$gte": since}}
+        if doc_ids is not None:
+            match["doc_id"] = {"$in": list(doc_ids)}
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$doc_id", "views": {"$sum": "$views"}, "plays": {"$sum": "$plays"}}},
+            {"$sort": {"views": -1, "plays": -1, "_id": 1}},
+            {"$limit": limit},
+        ]
+        with _server_deadline() as options:
+            rows = self.db[COUNTERS].aggregate(
+                pipeline, **{"maxTimeMS": options["max_time_ms"]} if options else {}
+            )
+            return [{"id": row["_id"], "views": row["views"], "plays": row["plays"]} for row in rows]
+
+    def _apply_pending(self, collection: str, doc: Optional[Dict[str, Any]]):
+        """Overlay queued, not yet written updates on a document read from MongoDB."""
+        if doc is None or self._batcher is None:
+            return doc
+        pending = self._batcher.pending_fields(collection, str(doc["_id"]), doc.get("version"))
+        if pending:
+            doc.update(pending)
+        return doc
+
+    def _before_update(self, collection: str, doc_id: str):
+        # A queued audio URL must not land after an invalidation
+        if self._batcher is not None and self._batcher.pending_fields(collection, doc_id):
+            self._batcher.flush()
+
+    def _compare_and_set(self, collection, doc_id, version, fields, unset):
+        from pymongo import ReturnDocument
+
+        update: Dict[str, Any] = {"$set": fields}
+        if unset:
+            update["$unset"] = {name: "" for name in unset}
+        with _server_deadline() as options:
+            document = self.db[collection].find_one_and_update(
+                {"_id": ObjectId(doc_id), "version": version},
+                update,
+                return_document=ReturnDocument.AFTER,
+                **{"maxTimeMS": options["max_time_ms"]} if options else {},
+            )
+        return _with_id(document)
+
+
+def _projection(fields: Optional[Sequence[str]]) -> Optional[Dict[str, int]]:
+    """
+    MongoDB projection returning only `fields` (and "_id"); None returns everything.
+
+    "version" is always read: it decides which queued updates show (see _apply_pending).
+    """
+    if fields is None:
+        return None
+    return {"_id": 1, "version": 1, **dict.fromkeys(fields, 1)}
+
+
+def _narrow(doc: Optional[Dict[str, Any]], fields: Optional[Sequence[str]]):
+    """Drop the "version" _projection() adds when it wasn't asked for."""
+    if doc is not None and fields is not None and "version" not in fields:
+        doc.pop("version", None)
+    return doc
+
+
+# List views read a few small fields, not every narration and timing track
+TOPIC_LIST_PROJECTION = _projection(("title", "language"))
+FAQ_LIST_PROJECTION = _projection(("question", "answer_audio_url"))
+
+
+@contextmanager
+def _server_deadline():
+    """
+    Query options carrying the current request's deadline to the server as
+    maxTimeMS (see app.admission), and DeadlineExceeded when it runs out.
+    Outside a request the options are empty.
+    """
+    from pymongo.errors import ExecutionTimeout
+
+    time_left_ms = remaining_ms()
+    try:
+        yield {} if time_left_ms is None else {"max_time_ms": time_left_ms}
+    except ExecutionTimeout as e:
+        raise DeadlineExceeded("Database query exceeded the request deadline") from e
+
+
+def _get_mongodb_uri() -> Optional[str]:
+    """
+    Get the MongoDB connection string.
+    Loads the .env file on first use rather than at import time,
+    so importing this module stays cheap.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()  # Load environment variables from .env file
+    return os.getenv("MONGODB_URI")
+
+
+# Columns per table, besides the id; the order is the INSERT column order
+SQLITE_COLUMNS = {
+    TOPICS: (
+        "title",
+        "content_text",
+        "language",
+        "audio_url",
+        "avatar_video_url",
+        "timing_track",
+        "version",
+        "created_at",
+        "updated_at",
+    ),
+    FAQS: (
+        "topic_id",
+        "question",
+        "answer",
+        "language",
+        "answer_audio_url",
+        "timing_track",
+        "version",
+        "created_at",
+        "updated_at",
+    ),
+}
+SQLITE_JSON_COLUMNS = {"timing_track"}
+SQLITE_DATETIME_COLUMNS = {"created_at", "updated_at"}
+# Left out of documents when NULL, as MongoDB leaves them out when never set
+SQLITE_OPTIONAL_COLUMNS = {"timing_track", "version"}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    content_text TEXT NOT NULL,
+    language TEXT NOT NULL,
+    audio_url TEXT,
+    avatar_video_url TEXT,
+    timing_track TEXT,
+    version INTEGER,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS faqs (
+    id TEXT PRIMARY KEY,
+    topic_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    language TEXT NOT NULL,
+    answer_audio_url TEXT,
+    timing_track TEXT,
+    version INTEGER,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS faqs_topic_id ON faqs (topic_id);
+CREATE TABLE IF NOT EXISTS counters (
+    kind TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    plays INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, bucket, doc_id)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteRepository(CatalogueRepository):
+    """
+    Topics and FAQs in an embedded SQLite database.
+
+    Statements are fixed strings, so each thread's connection compiles them
+    once and reuses them from sqlite3's statement cache.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = None):
+        self.path = str(path or SQLITE_PATH)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        self._select = {
+            table: f"SELECT id, {', '.join(columns)} FROM {table} WHERE id = ?"
+            for table, columns in SQLITE_COLUMNS.items()
+        }
+        self._select_all = {
+            table: f"SELECT id, {', '.join(columns)} FROM {table} ORDER BY rowid"
+            for table, columns in SQLITE_COLUMNS.items()
+        }
+        self._insert = {
+            table: f"INSERT INTO {table} (id, {', '.join(columns)}) "
+            f"VALUES (?{', ?' * len(columns)})"
+            for table, columns in SQLITE_COLUMNS.items()
+        }
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened (and the schema created) on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit; multi-statement updates open their own transaction
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SQLITE_SCHEMA)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def ensure_indexes(self):
+        # Created with the schema; touching the connection is enough
+        self.connection
+
+    def count_topics(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM topics").fetchone()[0]
+
+    def clear(self) -> Dict[str, int]:
+        return {
+            table: self.connection.execute(f"DELETE FROM {table}").rowcount
+            for table in (TOPICS, FAQS)
+        }
+
+    def insert(self, collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        columns = SQLITE_COLUMNS[collection]
+        doc_id = str(ObjectId())
+        values = [self._to_sql(name, doc.get(name)) for name in columns]
+        self.connection.execute(self._insert[collection], (doc_id, *values))
+        return {"id": doc_id, **doc}
+
+    def insert_many(self, collection: str, docs: List[Dict[str, Any]]) -> int:
+        columns = SQLITE_COLUMNS[collection]
+        rows = [
+            (doc.get("id") or str(ObjectId()), *(self._to_sql(name, doc.get(name)) for name in columns))
+            for doc in docs
+        ]
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(self._insert[collection], rows)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def get(
+        self, collection: str, doc_id: str, fields: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        if fields is None:
+            row = self.connection.execute(self._select[collection], (doc_id,)).fetchone()
+            return self._to_document(collection, row)
+        columns = self._columns(collection, fields)
+        row = self.connection.execute(
+            f"SELECT {', '.join(('id', *columns))} FROM {collection} WHERE id = ?", (doc_id,)
+        ).fetchone()
+        return self._to_document(collection, row, columns)
+
+    def iter_documents(self, collection: str) -> Iterable[Dict[str, Any]]:
+        for row in self.connection.execute(self._select_all[collection]):
+            yield self._to_document(collection, row)
+
+    def list_topics(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        if fields is not None:
+            columns = self._columns(TOPICS, fields)
+            rows = self.connection.execute(
+                f"SELECT {', '.join(('id', *columns))} FROM topics ORDER BY rowid"
+            )
+            return [self._to_document(TOPICS, row, columns) for row in rows]
+        rows = self.connection.execute("SELECT id, title, language FROM topics ORDER BY rowid")
+        return [{"id": row[0], "title": row[1], "language": row[2]} for row in rows]
+
+    def list_faqs(self, topic_id: str) -> List[Dict[str, Any]]:
+        rows = self.connection.execute(
+            "SELECT id, question, answer_audio_url FROM faqs WHERE topic_id = ? ORDER BY rowid",
+            (topic_id,),
+        )
+        return [{"id": row[0], "question": row[1], "answer_audio_url": row[2]} for row in rows]
+
+    def add_counts(self, counts):
+        rows = [
+            (kind, bucket.isoformat(), doc_id, fields.get("views", 0), fields.get("plays", 0))
+            for (kind, doc_id, bucket), fields in counts.items()
+        ]
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO counters (kind, bucket, doc_id, views, plays) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, bucket, doc_id) DO UPDATE SET "
+                "views = views + excluded.views, plays = plays + excluded.plays",
+                rows,
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def top_counts(
+        self, kind: str, since: datetime, limit: int, doc_ids: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        among = "" if doc_ids is None else f"AND doc_id IN ({', '.join('?' * len(doc_ids))}) "
+        rows = self.connection.execute(
+            "SELECT doc_id, SUM(views) AS total_views, SUM(plays) AS total_plays FROM counters "
+            f"WHERE kind = ? AND bucket >= ? {among}GROUP BY doc_id "
+            "ORDER BY total_views DESC, total_plays DESC, doc_id LIMIT ?",
+            (kind, since.isoformat(), *(doc_ids or ()), limit),
+        )
+        return [{"id": row[0], "views": row[1], "plays": row[2]} for row in rows]
+
+    def set_fields(self, collection, doc_id, fields, version=ANY_VERSION) -> bool:
+        assignments, values = self._assignments(collection, fields, ())
+        if version is ANY_VERSION:
+            condition, params = "", ()
+        else:
+            condition, params = " AND version IS ?", (version,)
+        cursor = self.connection.execute(
+            f"UPDATE {collection} SET {assignments} WHERE id = ?{condition}", (*values, doc_id, *params)
+        )
+        return cursor.rowcount > 0
+
+    def _compare_and_set(self, collection, doc_id, version, fields, unset):
+        assignments, values = self._assignments(collection, fields, unset)
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute(
+                f"UPDATE {collection} SET {assignments} WHERE id = ? AND version IS ?",
+                (*values, doc_id, version),
+            )
+            document = self.get(collection, doc_id) if cursor.rowcount else None
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return document
+
+    def _assignments(
+        self, collection: str, fields: Dict[str, Any], unset: Tuple[str, ...]
+    ) -> Tuple[str, list]:
+        columns = SQLITE_COLUMNS[collection]
+        names = list(fields) + [name for name in unset if name not in fields]
+        unknown = [name for name in names if name not in columns]
+        if unknown:
+            raise ValueError(f"Unknown {collection} fields: {', '.join(unknown)}")
+        values = [self._to_sql(name, fields.get(name)) for name in names]
+        return ", ".join(f"{name} = ?" for name in names), values
+
+    @staticmethod
+    def _columns(collection: str, fields: Sequence[str]) -> Tuple[str, ...]:
+        """
+        Validated columns for a sparse read. Every combination is a distinct
+        statement; sqlite3 caches the ones in use per connection.
+        """
+        unknown = [name for name in fields if name not in SQLITE_COLUMNS[collection]]
+        if unknown:
+            raise ValueError(f"Unknown {collection} fields: {', '.join(unknown)}")
+        return tuple(dict.fromkeys(fields))
+
+    @staticmethod
+    def _to_sql(name: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if name in SQLITE_JSON_COLUMNS:
+            return json.dumps(value, separators=(",", ":"))
+        if name in SQLITE_DATETIME_COLUMNS:
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _to_document(
+        collection: str, row: Optional[tuple], columns: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        if columns is None:
+            columns = SQLITE_COLUMNS[collection]
+        doc = {"id": row[0]}
+        for name, value in zip(columns, row[1:]):
+            if value is None:
+                if name not in SQLITE_OPTIONAL_COLUMNS:
+                    doc[name] = None
+            elif name in SQLITE_JSON_COLUMNS:
+                doc[name] = json.loads(value)
+            elif name in SQLITE_DATETIME_COLUMNS:
+                doc[name] = datetime.fromisoformat(value)
+            else:
+                doc[name] = value
+        return doc
+
+
+# Repository instance - created on first use from the environment
+_repository: Optional[CatalogueRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> CatalogueRepository:
+    """Get the configured catalogue repository."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                if DB_BACKEND == "mongo":
+                    _repository = MongoRepository()
+                elif DB_BACKEND == "sqlite":
+                    _repository = SQLiteRepository()
+                else:
+                    raise ValueError(f"Unknown DB_BACKEND: {DB_BACKEND}")
+                logger.info("Catalogue repository ready", extra={"backend": _repository.name})
+    return _repository
+
+
+def set_repository(repository: Optional[CatalogueRepository]):
+    """
+    Replace the repository (None re-reads the environment on next use).
+    Used by tests and benchmarks.
+    """
+    global _repository
+    _repository = repository
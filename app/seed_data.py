@@ -3,7 +3,11 @@ Seed data module to populate the database with sample topics and FAQs.
 This runs on application startup if the database is empty.
 """
 
-from app.db import get_topics_collection, get_faqs_collection, insert_topic, insert_faq
+import logging
+
+from app.db import count_topics, clear_catalogue, insert_topic, insert_faq
+
+logger = logging.getLogger(__name__)
 
 
 def seed_database():
@@ -11,15 +15,12 @@ def seed_database():
     Insert sample topics and FAQs into the database if collections are empty.
     Creates 2 topics with 2-3 FAQs each in English and Hindi.
     """
-    topics_collection = get_topics_collection()
-    faqs_collection = get_faqs_collection()
-
     # Check if data already exists
-    if topics_collection.count_documents({}) > 0:
-        print("Database already contains topics. Skipping seed.")
+    if count_topics() > 0:
+        logger.info("Database already contains topics. Skipping seed.")
         return
 
-    print("Seeding database with sample data...")
+    logger.info("Seeding database with sample data")
 
     # Topic 1: Introduction to Python (English)
     topic1_id = insert_topic(
@@ -34,7 +35,7 @@ def seed_database():
         ),
         language="en",
         audio_url="/static/media/audio/topic_1.mp3",
-    )
+    )["id"]
 
     # FAQs for Topic 1
     insert_faq(
@@ -87,7 +88,7 @@ def seed_database():
         ),
         language="hi",
         audio_url="/static/media/audio/topic_2.mp3",
-    )
+    )["id"]
 
     # FAQs for Topic 2
     insert_faq(
@@ -115,9 +116,9 @@ def seed_database():
         answer_audio_url="/static/media/audio/faq_1.mp3",
     )
 
-    print(f"✓ Created topic: {topic1_id} with 3 FAQs")
-    print(f"✓ Created topic: {topic2_id} with 2 FAQs")
-    print("Database seeding completed successfully!")
+    logger.info("Created topic", extra={"topic_id": topic1_id, "faqs": 3})
+    logger.info("Created topic", extra={"topic_id": topic2_id, "faqs": 2})
+    logger.info("Database seeding completed")
 
 
 def clear_database():
@@ -125,17 +126,13 @@ def clear_database():
     Clear all data from the database.
     Use with caution - this will delete all topics and FAQs!
     """
-    topics_collection = get_topics_collection()
-    faqs_collection = get_faqs_collection()
-
-    topics_result = topics_collection.delete_many({})
-    faqs_result = faqs_collection.delete_many({})
-
-    print(f"Deleted {topics_result.deleted_count} topics")
-    print(f"Deleted {faqs_result.deleted_count} FAQs")
-    print("Database cleared!")
+    deleted = clear_catalogue()
+    logger.info("Database cleared", extra=deleted)
 
 
 if __name__ == "__main__":
     # Allow running this script directly for testing
+    from app.log import setup_logging
+
+    setup_logging(log_format="text")
     seed_database()
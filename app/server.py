@@ -0,0 +1,265 @@
+"""
+Production server: gunicorn supervising uvicorn workers.
+
+    python -m app.server
+
+Runs WEB_CONCURRENCY worker processes (default: the CPUs this process may
+use, at least 2) on uvloop and httptools. The master seeds and indexes
+the database once, closes its client, and then forks the workers; each
+worker imports the app and opens its own database client and background
+threads, since pymongo clients and SQLite connections must not cross a
+fork. With PRELOAD_APP=1 the app is imported once in the master to save
+memory, and each worker drops anything inherited (post_fork).
+
+Signals, sent to the master process:
+
+- TERM: graceful stop. Workers stop accepting connections, finish
+  in-flight requests (up to REQUEST_DRAIN_S), wait for audio jobs that
+  outlived their request (app.tts_stub.AUDIO_DRAIN_TIMEOUT_S), flush view
+  counters and queued writes, and exit. Workers still running after
+  GRACEFUL_TIMEOUT_S are killed.
+- HUP: zero-downtime reload. New workers start with the current code and
+  settings; each old worker keeps serving until a new one is ready, then
+  stops gracefully as above. The listening socket stays open in the
+  master throughout, so no connection is refused.
+- USR2, then TERM to the old master: upgrade gunicorn or Python itself.
+- TTIN / TTOU: one worker more / fewer.
+"""
+
+from typing import Dict, Any, Optional
+from pathlib import Path
+import asyncio
+import math
+import os
+import signal
+import sys
+
+from uvicorn.server import Server
+
+try:
+    from gunicorn.arbiter import Arbiter
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # gunicorn missing; main() says how to install it
+    Arbiter = UvicornWorker = object
+
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+
+# Worker processes; 0 sizes from the available CPUs
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))
+
+# Seconds a stopping worker gives connections it has just accepted to send their request
+ACCEPT_GRACE_S = float(os.getenv("ACCEPT_GRACE_S", "0.25"))
+# Seconds a stopping worker waits for in-flight requests
+REQUEST_DRAIN_S = float(os.getenv("REQUEST_DRAIN_S", "15"))
+# Seconds from TERM until a worker is killed: request drain, audio jobs, flushes
+GRACEFUL_TIMEOUT_S = int(os.getenv("GRACEFUL_TIMEOUT_S", "30"))
+# A worker whose event loop doesn't check in for this long is restarted
+WORKER_TIMEOUT_S = int(os.getenv("WORKER_TIMEOUT_S", "60"))
+# Idle keep-alive connections are closed after this; keep it above the load balancer's
+KEEPALIVE_S = int(os.getenv("KEEPALIVE_S", "5"))
+# Restart each worker after about this many requests (0 = never)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+
+PRELOAD_APP = os.getenv("PRELOAD_APP", "0") == "1"
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """CPU quota from cgroup v2 (cpu.max) or v1 (cpu.cfs_quota_us), or None if unlimited."""
+    try:
+        quota, period = (root / "cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """
+    CPUs this process may use: its affinity mask, capped by a container
+    CPU quota (os.cpu_count() reports every CPU of the host).
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+
+def worker_count() -> int:
+    """
+    WEB_CONCURRENCY, or one worker per available CPU. Handlers are async and
+    synthesis runs in threads, so more workers than CPUs only adds memory;
+    at least 2, so one worker restarting never leaves the port unserved.
+    """
+    return WEB_CONCURRENCY or max(available_cpus(), 2)
+
+
+def event_loop_options() -> Dict[str, str]:
+    """uvloop and httptools (installed with uvicorn[standard]), else asyncio and h11."""
+    options = {"loop": "asyncio", "http": "h11"}
+    try:
+        import uvloop  # noqa: F401
+
+        options["loop"] = "uvloop"
+    except ImportError:
+        pass
+    try:
+        import httptools  # noqa: F401
+
+        options["http"] = "httptools"
+    except ImportError:
+        pass
+    return options
+
+
+class DrainingServer(Server):
+    """
+    uvicorn's server, except that shutdown stops accepting first and only
+    then closes idle connections. uvicorn closes a connection that has no
+    request in progress straight away, which includes one accepted a moment
+    ago whose request hasn't been read yet: its client gets no response.
+    """
+
+    async def shutdown(self, sockets=None):
+        for server in self.servers:
+            server.close()
+        await asyncio.sleep(ACCEPT_GRACE_S)
+        await super().shutdown(sockets)
+
+
+class Worker(UvicornWorker):
+    """The uvicorn worker, with our event loop and request drain settings."""
+
+    CONFIG_KWARGS = event_loop_options()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Without a limit uvicorn waits for requests until the master kills
+        # it, and the app's shutdown (audio jobs, counter flush) never runs
+        self.config.timeout_graceful_shutdown = REQUEST_DRAIN_S
+        # Created in the master; the heartbeat file first changes once the
+        # worker's event loop runs, i.e. after app startup, when it is serving
+        self.created_heartbeat = self.tmp.last_update()
+
+    def is_serving(self) -> bool:
+        return self.tmp.last_update() != self.created_heartbeat
+
+    async def _serve(self):
+        # UvicornWorker._serve, with DrainingServer
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+
+class RollingArbiter(Arbiter):
+    """
+    gunicorn's master process, except that after a reload an old worker is
+    only stopped once a new one is serving: capacity never drops to zero
+    while the new workers import the app and warm up.
+    """
+
+    def manage_workers(self):
+        if len(self.WORKERS) < self.num_workers:
+            self.spawn_workers()
+
+        workers = sorted(self.WORKERS.items(), key=lambda item: item[1].age)
+        excess = len(workers) - self.num_workers
+        if excess <= 0:
+            return
+        booting = sum(not worker.is_serving() for _, worker in workers[excess:])
+        for pid, _ in workers[: max(excess - booting, 0)]:
+            self.kill_worker(pid, signal.SIGTERM)
+
+
+def on_starting(server):
+    """
+    gunicorn hook, in the master before any worker starts: seed and index
+    the database once, instead of every worker racing to seed an empty one.
+    The master's client is closed before the first fork.
+    """
+    from app.db import close_db
+    from app.repository import set_repository
+    from app.warmup import warm_up
+
+    warm_up()
+    close_db()
+    set_repository(None)
+
+
+def post_fork(server, worker):
+    """gunicorn hook, in each new worker: don't reuse clients inherited from the master."""
+    from app.repository import set_repository
+
+    # Dropped, not closed: closing would shut sockets the master (or a sibling) still uses
+    set_repository(None)
+
+
+def when_ready(server):
+    """gunicorn hook: the master is listening."""
+    loop = event_loop_options()
+    server.log.info(
+        "Avatar Teacher serving on %s with %d workers (%s, %s)",
+        ", ".join(server.cfg.bind),
+        server.cfg.workers,
+        loop["loop"],
+        loop["http"],
+    )
+
+
+def build_options() -> Dict[str, Any]:
+    """gunicorn settings from the environment."""
+    return {
+        "bind": [f"{HOST}:{PORT}"],
+        "workers": worker_count(),
+        "worker_class": "app.server.Worker",
+        "graceful_timeout": GRACEFUL_TIMEOUT_S,
+        "timeout": WORKER_TIMEOUT_S,
+        "keepalive": KEEPALIVE_S,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS // 10,
+        "preload_app": PRELOAD_APP,
+        "on_starting": on_starting,
+        "post_fork": post_fork,
+        "when_ready": when_ready,
+        "proc_name": "avatar-teacher",
+    }
+
+
+def main():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise ImportError("gunicorn not installed. Install with: pip install gunicorn")
+
+    options = build_options()
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    RollingArbiter(Application()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""
+Read-only catalogue snapshots for Mongo-free edge serving.
+
+The exporter writes every topic and FAQ into one compact file that is
+memory-mapped by the readers:
+
+    header
+    topic id table   open-addressing hash table: 12-byte ObjectId -> record number
+    faq id table     same, for FAQs
+    topic records    fixed-size structs: id, string refs, timestamps, FAQ range
+    faq records      fixed-size structs, grouped by topic in catalogue order
+    string table     UTF-8 bytes referenced as (offset, length)
+
+Lookups by id hash into the table (O(1)), and record fields are read with
+struct.unpack_from straight from the mapping, so a request allocates only
+the values it returns. Nothing is parsed when a snapshot is opened.
+
+With CATALOGUE_SNAPSHOT set, the app.db read helpers answer from the
+snapshot instead of the database. The exporter writes a temporary file and
+renames it over the old one; readers notice the new file (checked at most
+every SNAPSHOT_CHECK_SECONDS) and swap to it atomically. Requests already
+reading the previous mapping keep it alive until they finish.
+
+Usage:
+    python -m app.snapshot export [path]     # write a snapshot from the database
+    python -m app.snapshot info [path]       # print snapshot counts
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Path of the snapshot to serve from; empty = read from the database
+CATALOGUE_SNAPSHOT = os.getenv("CATALOGUE_SNAPSHOT", "")
+SNAPSHOT_CHECK_SECONDS = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "1"))
+DEFAULT_SNAPSHOT_PATH = "catalogue.snap"
+
+MAGIC = b"AVSNAP\x00\x01"
+VERSION = 2
+
+# magic, version, topic count, faq count, topic slots, faq slots, created_at,
+# then offsets of the topic table, faq table, topic records, faq records, strings
+HEADER = struct.Struct("<8sIIIIId5Q")
+SLOT = struct.Struct("<12sI")
+EMPTY_SLOT = 0xFFFFFFFF
+NULL_REF = (0xFFFFFFFF, 0)
+
+TOPIC_STRINGS = ("title", "content_text", "language", "audio_url", "avatar_video_url", "timing_track")
+FAQ_STRINGS = ("topic_id", "question", "answer", "language", "answer_audio_url", "timing_track")
+# Fields stored as JSON text
+JSON_FIELDS = {"timing_track"}
+
+# id, string refs, created_at/updated_at (microseconds), document version (0 = none),
+# then for topics the first FAQ record and FAQ count
+TOPIC_RECORD = struct.Struct("<12s" + "II" * len(TOPIC_STRINGS) + "qqIII")
+FAQ_RECORD = struct.Struct("<12s" + "II" * len(FAQ_STRINGS) + "qqI")
+
+_EPOCH = datetime(1970, 1, 1)
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+def _slot_count(count: int) -> int:
+    """Power of two at least twice the entry count (load factor <= 0.5)."""
+    slots = 2
+    while slots < count * 2:
+        slots *= 2
+    return slots
+
+
+def _slot_for(oid: bytes, slots: int) -> int:
+    # Fibonacci hashing of the random + counter bytes (the first 4 are a timestamp);
+    # the top bits of the product depend on every bit below them
+    return ((int.from_bytes(oid[4:], "big") * _GOLDEN) & _MASK64) >> (65 - slots.bit_length())
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+class _StringTable:
+    """Deduplicated UTF-8 string table being built by the exporter."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self._offsets: Dict[bytes, int] = {}
+
+    def ref(self, value: Any) -> Tuple[int, int]:
+        if value is None:
+            return NULL_REF
+        if not isinstance(value, str):
+            value = json.dumps(value, separators=(",", ":"))
+        encoded = value.encode("utf-8")
+        offset = self._offsets.get(encoded)
+        if offset is None:
+            offset = len(self.data)
+            self.data += encoded
+            self._offsets[encoded] = offset
+        return offset, len(encoded)
+
+
+def _id_table(ids: List[bytes]) -> bytes:
+    slots = _slot_count(len(ids))
+    table = bytearray(SLOT.pack(b"\x00" * 12, EMPTY_SLOT) * slots)
+    for number, oid in enumerate(ids):
+        slot = _slot_for(oid, slots)
+        while SLOT.unpack_from(table, slot * SLOT.size)[1] != EMPTY_SLOT:
+            slot = (slot + 1) & (slots - 1)
+        SLOT.pack_into(table, slot * SLOT.size, oid, number)
+    return bytes(table)
+
+
+def write_snapshot(
+    path: str, topics: Iterable[Dict[str, Any]], faqs: Iterable[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Write a snapshot of the given topic and FAQ documents (as returned by
+    app.db, with an "id" string). The file appears atomically under `path`.
+
+    Returns:
+        dict: topic and FAQ counts and the file size in bytes
+    """
+    topics = list(topics)
+    faqs_by_topic: Dict[str, List[Dict[str, Any]]] = {}
+    for faq in faqs:
+        faqs_by_topic.setdefault(str(faq.get("topic_id")), []).append(faq)
+
+    strings = _StringTable()
+    topic_records = bytearray()
+    faq_records = bytearray()
+    faq_ids: List[bytes] = []
+    ordered_faqs = [
+        faq for topic in topics for faq in faqs_by_topic.get(topic["id"], [])
+    ]
+    # FAQs of topics not in the catalogue are still reachable by id
+    known = {topic["id"] for topic in topics}
+    ordered_faqs += [
+        faq for topic_id, group in faqs_by_topic.items() if topic_id not in known for faq in group
+    ]
+
+    first_faq = 0
+    for topic in topics:
+        count = len(faqs_by_topic.get(topic["id"], []))
+        refs = [part for field in TOPIC_STRINGS for part in strings.ref(topic.get(field))]
+        topic_records += TOPIC_RECORD.pack(
+            bytes.fromhex(topic["id"]),
+            *refs,
+            _to_micros(topic.get("created_at")),
+            _to_micros(topic.get("updated_at")),
+            topic.get("version", 0),
+            first_faq,
+            count,
+        )
+        first_faq += count
+
+    for faq in ordered_faqs:
+        refs = [part for field in FAQ_STRINGS for part in strings.ref(faq.get(field))]
+        faq_records += FAQ_RECORD.pack(
+            bytes.fromhex(faq["id"]),
+            *refs,
+            _to_micros(faq.get("created_at")),
+            _to_micros(faq.get("updated_at")),
+            faq.get("version", 0),
+        )
+        faq_ids.append(bytes.fromhex(faq["id"]))
+
+    topic_table = _id_table([bytes.fromhex(topic["id"]) for topic in topics])
+    faq_table = _id_table(faq_ids)
+
+    offsets = [HEADER.size]
+    for section in (topic_table, faq_table, topic_records, faq_records):
+        offsets.append(offsets[-1] + len(section))
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(topics),
+        len(ordered_faqs),
+        len(topic_table) // SLOT.size,
+        len(faq_table) // SLOT.size,
+        time.time(),
+        *offsets,
+    )
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        for section in (header, topic_table, faq_table, topic_records, faq_records, strings.data):
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(target)
+
+    size = target.stat().st_size
+    logger.info(
+        "Catalogue snapshot written",
+        extra={"path": str(target), "topics": len(topics), "faqs": len(ordered_faqs), "bytes": size},
+    )
+    return {"topics": len(topics), "faqs": len(ordered_faqs), "bytes": size}
+
+
+def export_snapshot(path: str = None) -> Dict[str, Any]:
+    """Write a snapshot of the stored catalogue (defaults to CATALOGUE_SNAPSHOT)."""
+    from app.db import iter_topics, iter_faqs
+
+    return write_snapshot(path or CATALOGUE_SNAPSHOT or DEFAULT_SNAPSHOT_PATH, iter_topics(), iter_faqs())
+
+
+class CatalogueSnapshot:
+    """A memory-mapped snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        (
+            magic,
+            version,
+            self.topic_count,
+            self.faq_count,
+            self._topic_slots,
+            self._faq_slots,
+            self.created_at,
+            self._topic_table,
+            self._faq_table,
+            self._topic_records,
+            self._faq_records,
+            self._strings,
+        ) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} catalogue snapshot")
+        self._view = memoryview(self._mm)
+
+    @property
+    def size(self) -> int:
+        return len(self._mm)
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if offset == NULL_REF[0]:
+            return None
+        start = self._strings + offset
+        return str(self._view[start : start + length], "utf-8")
+
+    def _field(self, name: str, offset: int, length: int) -> Any:
+        value = self._string(offset, length)
+        if value is not None and name in JSON_FIELDS:
+            return json.loads(value)
+        return value
+
+    def _find(self, doc_id: str, table: int, slots: int) -> Optional[int]:
+        try:
+            oid = bytes.fromhex(doc_id)
+        except (TypeError, ValueError):
+            return None
+        if len(oid) != 12:
+            return None
+        slot = _slot_for(oid, slots)
+        while True:
+            stored, number = SLOT.unpack_from(self._mm, table + slot * SLOT.size)
+            if number == EMPTY_SLOT:
+                return None
+            if stored == oid:
+                return number
+            slot = (slot + 1) & (slots - 1)
+
+    def _topic(self, number: int) -> tuple:
+        return TOPIC_RECORD.unpack_from(self._mm, self._topic_records + number * TOPIC_RECORD.size)
+
+    def _faq(self, number: int) -> tuple:
+        return FAQ_RECORD.unpack_from(self._mm, self._faq_records + number * FAQ_RECORD.size)
+
+    def get_topic(self, topic_id: str) -> Optional[Dict[str, Any]]:
+        """Full topic document (like app.db.get_topic_by_id), or None."""
+        number = self._find(topic_id, self._topic_table, self._topic_slots)
+        if number is None:
+            return None
+        record = self._topic(number)
+        doc = {"id": record[0].hex()}
+        for i, name in enumerate(TOPIC_STRINGS):
+            value = self._field(name, record[1 + 2 * i], record[2 + 2 * i])
+            if value is not None:
+                doc[name] = value
+        base = 1 + 2 * len(TOPIC_STRINGS)
+        for i, name in enumerate(("created_at", "updated_at")):
+            if record[base + i]:
+                doc[name] = _from_micros(record[base + i])
+        if record[base + 2]:
+            doc["version"] = record[base + 2]
+        return doc
+
+    def get_faq(self, faq_id: str) -> Optional[Dict[str, Any]]:
+        """Full FAQ document (like app.db.get_faq_by_id), or None."""
+        number = self._find(faq_id, self._faq_table, self._faq_slots)
+        if number is None:
+            return None
+        record = self._faq(number)
+        doc = {"id": record[0].hex()}
+        for i, name in enumerate(FAQ_STRINGS):
+            value = self._field(name, record[1 + 2 * i], record[2 + 2 * i])
+            if value is not None:
+                doc[name] = value
+        base = 1 + 2 * len(FAQ_STRINGS)
+        for i, name in enumerate(("created_at", "updated_at")):
+            if record[base + i]:
+                doc[name] = _from_micros(record[base + i])
+        if record[base + 2]:
+            doc["version"] = record[base + 2]
+        return doc
+
+    def list_topics(self) -> List[Dict[str, Any]]:
+        """Minimal topic info (like app.db.get_all_topics)."""
+        title = 1 + 2 * TOPIC_STRINGS.index("title")
+        language = 1 + 2 * TOPIC_STRINGS.index("language")
+        result = []
+        for number in range(self.topic_count):
+            record = self._topic(number)
+            result.append(
+                {
+                    "id": record[0].hex(),
+                    "title": self._string(record[title], record[title + 1]),
+                    "language": self._string(record[language], record[language + 1]),
+                }
+            )
+        return result
+
+    def list_faqs(self, topic_id: str) -> List[Dict[str, Any]]:
+        """Minimal FAQ info for a topic (like app.db.get_faqs_by_topic_id)."""
+        number = self._find(topic_id, self._topic_table, self._topic_slots)
+        if number is None:
+            return []
+        first, count = self._topic(number)[-2:]
+        question = 1 + 2 * FAQ_STRINGS.index("question")
+        audio = 1 + 2 * FAQ_STRINGS.index("answer_audio_url")
+        result = []
+        for faq_number in range(first, first + count):
+            record = self._faq(faq_number)
+            result.append(
+                {
+                    "id": record[0].hex(),
+                    "question": self._string(record[question], record[question + 1]),
+                    "answer_audio_url": self._string(record[audio], record[audio + 1]),
+                }
+            )
+        return result
+
+
+# Snapshot being served, and when the file was last checked for a replacement
+_snapshot: Optional[CatalogueSnapshot] = None
+_snapshot_path: str = CATALOGUE_SNAPSHOT
+_last_check = 0.0
+_swap_lock = threading.Lock()
+
+
+def snapshot_enabled() -> bool:
+    """Whether reads are served from a snapshot."""
+    return bool(_snapshot_path)
+
+
+def get_snapshot() -> Optional[CatalogueSnapshot]:
+    """
+    The snapshot to serve from, or None when reading from MongoDB.
+    Reopens the file when a new snapshot has been renamed over it.
+
+    Raises:
+        FileNotFoundError: If snapshot mode is on and no snapshot was ever loaded
+    """
+    global _snapshot, _last_check
+    if not _snapshot_path:
+        return None
+
+    now = time.monotonic()
+    if _snapshot is not None and now - _last_check < SNAPSHOT_CHECK_SECONDS:
+        return _snapshot
+
+    with _swap_lock:
+        if _snapshot is not None and now - _last_check < SNAPSHOT_CHECK_SECONDS:
+            return _snapshot
+        _last_check = now
+        try:
+            stat = os.stat(_snapshot_path)
+        except FileNotFoundError:
+            if _snapshot is None:
+                raise
+            return _snapshot
+        if _snapshot is None or _snapshot.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            try:
+                replacement = CatalogueSnapshot(_snapshot_path)
+            except (OSError, ValueError):
+                if _snapshot is None:
+                    raise
+                logger.exception("Could not load new catalogue snapshot, keeping the current one")
+                return _snapshot
+            # Readers holding the old mapping keep it alive until they return
+            _snapshot = replacement
+            logger.info(
+                "Catalogue snapshot loaded",
+                extra={
+                    "path": _snapshot_path,
+                    "topics": replacement.topic_count,
+                    "faqs": replacement.faq_count,
+                },
+            )
+        return _snapshot
+
+
+def set_snapshot_path(path: Optional[str]):
+    """
+    Serve reads from a snapshot file (None or "" reads from MongoDB again).
+    Used by tests and benchmarks.
+    """
+    global _snapshot, _snapshot_path, _last_check
+    with _swap_lock:
+        _snapshot = None
+        _snapshot_path = str(path) if path else ""
+        _last_check = 0.0
+
+
+if __name__ == "__main__":
+    import sys
+
+    if not sys.argv[1:] or sys.argv[1] not in ("export", "info"):
+        print("Usage: python -m app.snapshot export|info [path]")
+        raise SystemExit(1)
+
+    from app.log import setup_logging
+
+    setup_logging(log_format="text")
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else CATALOGUE_SNAPSHOT or DEFAULT_SNAPSHOT_PATH
+    if sys.argv[1] == "export":
+        result = export_snapshot(snapshot_path)
+        print(f"Wrote {snapshot_path}: {result['topics']} topics, {result['faqs']} FAQs, {result['bytes']} bytes")
+    else:
+        snapshot = CatalogueSnapshot(snapshot_path)
+        created = datetime.fromtimestamp(snapshot.created_at).isoformat(timespec="seconds")
+        print(
+            f"{snapshot_path}: {snapshot.topic_count} topics, {snapshot.faq_count} FAQs, "
+            f"{snapshot.size} bytes, exported {created}"
+        )
@@ -0,0 +1,314 @@
+"""
+Audio storage backends.
+
+Audio URLs stored in the database stay stable ("/static/media/audio/<key>");
+the backend decides where the bytes live:
+
+- "filesystem" (default): files under STORAGE_LOCAL_DIR, served by the app.
+- "s3": an S3-compatible bucket (AWS S3, MinIO, ...) shared by every node,
+  so audio synthesised on one node is reused by all. STORAGE_LOCAL_DIR
+  becomes a read-through cache for the files the app itself needs
+  (HLS packaging, timing tracks), and audio requests are answered with a
+  redirect to a signed (or public) bucket URL, so the app never proxies
+  audio bytes. Requires boto3 (pip install boto3).
+
+Configuration (environment):
+    STORAGE_BACKEND=filesystem|s3
+    STORAGE_LOCAL_DIR=static/media/audio
+    S3_BUCKET, S3_PREFIX=audio/, S3_ENDPOINT_URL (e.g. http://localhost:9000 for MinIO),
+    S3_REGION, S3_URL_EXPIRES=3600, S3_PUBLIC_BASE_URL (CDN/public bucket, skips signing),
+    S3_MULTIPART_THRESHOLD_MB=8
+"""
+
+from typing import Dict, Optional
+from pathlib import Path
+import logging
+import mimetypes
+import os
+import shutil
+import threading
+
+from fastapi.responses import RedirectResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "filesystem")
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", "static/media/audio")
+
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "audio/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+S3_URL_EXPIRES = int(os.getenv("S3_URL_EXPIRES", "3600"))
+S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL", "")
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+
+AUDIO_URL_PREFIX = "/static/media/audio/"
+
+# Generated audio file names are content hashes, so stored objects never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def audio_url_for(key: str) -> str:
+    """Get the stable URL stored in the database for an audio key."""
+    return AUDIO_URL_PREFIX + key
+
+
+def key_from_url(audio_url: Optional[str]) -> Optional[str]:
+    """Get the storage key of an audio URL, or None if it is not stored audio."""
+    if not audio_url or not audio_url.startswith(AUDIO_URL_PREFIX):
+        return None
+    key = audio_url[len(AUDIO_URL_PREFIX) :]
+    if not key or "/" in key or key.startswith("."):
+        return None
+    return key
+
+
+def _content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class FilesystemStorage:
+    """Audio files in a local directory, served by the app itself."""
+
+    name = "filesystem"
+    redirects = False
+
+    def __init__(self, local_dir: str = None):
+        self.local_dir = Path(local_dir or STORAGE_LOCAL_DIR)
+
+    def cache_path(self, key: str) -> Path:
+        """Local path where a key is (or would be) stored."""
+        return self.local_dir / key
+
+    def exists(self, key: str) -> bool:
+        return self.cache_path(key).exists()
+
+    def size(self, key: str) -> Optional[int]:
+        """Size in bytes, or None if the key doesn't exist."""
+        path = self.cache_path(key)
+        return path.stat().st_size if path.exists() else None
+
+    def put_file(self, key: str, path: Path):
+        """Store a local file under a key."""
+        target = self.cache_path(key)
+        if Path(path) == target or Path(path).resolve() == target.resolve():
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(path, tmp_path)
+        tmp_path.replace(target)
+
+    def local_path(self, key: str) -> Path:
+        """Local file for a key (it may not exist)."""
+        return self.cache_path(key)
+
+    def get_url(self, key: str) -> str:
+        return audio_url_for(key)
+
+    def delete(self, key: str):
+        self.cache_path(key).unlink(missing_ok=True)
+
+
+class S3Storage(FilesystemStorage):
+    """
+    Audio in an S3-compatible bucket with a local read-through cache.
+
+    Uploads go through boto3's managed transfer, which switches to
+    multipart above the threshold. Keys are content hashes, so a cached
+    copy never goes stale.
+    """
+
+    name = "s3"
+    redirects = True
+
+    def __init__(
+        self,
+        bucket: str = None,
+        prefix: str = None,
+        local_dir: str = None,
+        endpoint_url: str = None,
+        region: str = None,
+        url_expires: int = None,
+        public_base_url: str = None,
+        multipart_threshold_mb: int = None,
+        client=None,
+    ):
+        super().__init__(local_dir)
+        self.bucket = bucket or S3_BUCKET
+        if not self.bucket:
+            raise ValueError("S3_BUCKET must be set for the s3 storage backend")
+        self.prefix = S3_PREFIX if prefix is None else prefix
+        self.url_expires = url_expires or S3_URL_EXPIRES
+        self.public_base_url = (public_base_url or S3_PUBLIC_BASE_URL).rstrip("/")
+        threshold = (multipart_threshold_mb or S3_MULTIPART_THRESHOLD_MB) * 1024 * 1024
+
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError:
+            raise ImportError("boto3 not installed. Install with: pip install boto3")
+
+        self.client = client or boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or S3_ENDPOINT_URL,
+            region_name=region or S3_REGION,
+            config=Config(signature_version="s3v4"),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=threshold, multipart_chunksize=threshold
+        )
+        # Object sizes seen so far (objects are immutable, so this never goes stale)
+        self._sizes: Dict[str, int] = {}
+
+    def object_key(self, key: str) -> str:
+        return self.prefix + key
+
+    def size(self, key: str) -> Optional[int]:
+        # A local file alone doesn't prove the upload finished, so ask the bucket once
+        if key in self._sizes:
+            return self._sizes[key]
+
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        self._sizes[key] = head["ContentLength"]
+        return self._sizes[key]
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    def put_file(self, key: str, path: Path):
+        """Upload a file (multipart above the threshold) and keep it in the local cache."""
+        super().put_file(key, path)
+        self.client.upload_file(
+            str(path),
+            self.bucket,
+            self.object_key(key),
+            ExtraArgs={"ContentType": _content_type(key), "CacheControl": IMMUTABLE_CACHE_CONTROL},
+            Config=self.transfer_config,
+        )
+        self._sizes[key] = Path(path).stat().st_size
+        logger.info("Uploaded audio", extra={"key": key, "bucket": self.bucket})
+
+    def local_path(self, key: str) -> Path:
+        """Local copy of a key, downloaded on first use if it exists in the bucket."""
+        path = self.cache_path(key)
+        if path.exists() or not self.exists(key):
+            return path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Per-thread name: concurrent requests may download the same key
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.client.download_file(
+            self.bucket, self.object_key(key), str(tmp_path), Config=self.transfer_config
+        )
+        tmp_path.replace(path)
+        logger.debug("Cached audio from bucket", extra={"key": key})
+        return path
+
+    def get_url(self, key: str) -> str:
+        """A public URL if configured, otherwise a time-limited signed URL."""
+        if self.public_base_url:
+            return f"{self.public_base_url}/{self.object_key(key)}"
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.object_key(key)},
+            ExpiresIn=self.url_expires,
+        )
+
+    def delete(self, key: str):
+        super().delete(key)
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+        self._sizes.pop(key, None)
+
+
+# Storage instance - created on first use from the environment
+_storage: Optional[FilesystemStorage] = None
+# First use may come from several threadpool threads at once
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> FilesystemStorage:
+    """Get the configured audio storage backend."""
+    global _storage
+    if _storage is not None:
+        return _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == "s3":
+                storage = S3Storage()
+            elif STORAGE_BACKEND == "filesystem":
+                storage = FilesystemStorage()
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+            logger.info("Audio storage ready", extra={"backend": storage.name})
+            _storage = storage
+    return _storage
+
+
+def set_storage(storage: Optional[FilesystemStorage]):
+    """
+    Replace the storage backend (None re-reads the environment on next use).
+    Used by tests and benchmarks.
+    """
+    global _storage
+    _storage = storage
+
+
+class AudioFiles(StaticFiles):
+    """
+    Serve /static/media/audio: from local disk for the filesystem backend,
+    or as a redirect to the bucket so the app doesn't proxy audio bytes.
+    """
+
+    async def get_response(self, path: str, scope):
+        storage = get_storage()
+        # Files only on local disk (e.g. bundled fallbacks not uploaded yet) are served directly.
+        # The bucket is asked in the threadpool: boto3 blocks.
+        if (
+            storage.redirects
+            and key_from_url(AUDIO_URL_PREFIX + path)
+            and await run_in_threadpool(storage.exists, path)
+        ):
+            return RedirectResponse(storage.get_url(path), status_code=307)
+        return await super().get_response(path, scope)
+
+
+def upload_local_audio() -> int:
+    """
+    Upload every local audio file missing from the storage backend, e.g.
+    when moving an existing node to shared storage.
+
+    Returns:
+        int: Number of files uploaded
+    """
+    storage = get_storage()
+    count = 0
+    for path in sorted(storage.local_dir.glob("*")):
+        if path.is_file() and not path.name.endswith(".tmp") and not storage.exists(path.name):
+            storage.put_file(path.name, path)
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["upload"]:
+        print("Usage: python -m app.storage upload")
+        raise SystemExit(1)
+
+    from app.log import setup_logging
+
+    setup_logging(log_format="text")
+    print(f"Uploaded {upload_local_audio()} files to {get_storage().name} storage")
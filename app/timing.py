@@ -0,0 +1,155 @@
+"""
+Word and viseme timing tracks for the avatar sprite.
+
+The track is estimated from the narration text and the exact audio duration:
+each word gets a share of the duration proportional to its letter count,
+punctuation adds pauses, and each letter is mapped to a mouth shape
+(viseme). The frontend animates a static avatar sprite from it instead of
+streaming a looping video.
+
+Track format (compact JSON):
+    {
+        "version": 1,
+        "duration_ms": 31392,
+        "words": [[start_ms, end_ms, "word"], ...],
+        "visemes": [[start_ms, "A"], ...]   # shape holds until the next cue
+    }
+
+Viseme codes:
+    X rest, A open, E spread, O rounded, M closed lips, F lip-teeth,
+    L tongue, S teeth
+
+Usage:
+    python -m app.timing          # compare track size with the avatar video
+"""
+
+from typing import Dict, Any, List, Tuple, Optional
+from pathlib import Path
+import json
+import re
+
+from app.mp3 import get_duration
+from app.transcode import url_to_path
+
+
+TIMING_TRACK_VERSION = 1
+
+# Letter -> viseme code. Latin letters plus Devanagari vowels, matras and consonants.
+VISEME_MAP: Dict[str, str] = {}
+for _chars, _code in [
+    ("aāअआा", "A"),
+    ("eiyइईएऐिीेैय", "E"),
+    ("ouwउऊओऔुूोौ", "O"),
+    ("mbpमबपभफ", "M"),
+    ("fvव", "F"),
+    ("ltdnrhkgqxटठडढतथदधनलरहकखगघङणञ", "L"),
+    ("szcjशषसजझचछ", "S"),
+]:
+    VISEME_MAP.update(dict.fromkeys(_chars, _code))
+
+# Pause weight (in letters) added after a word ending with this punctuation
+PAUSE_WEIGHTS = {",": 3, ";": 4, ":": 4, ".": 6, "!": 6, "?": 6, "।": 6}
+
+# Share of the duration treated as lead-in silence before the first word
+LEAD_IN_RATIO = 0.02
+
+_WORD_PATTERN = re.compile(r"\S+")
+
+
+def _letters(word: str) -> str:
+    """Keep only the characters that are spoken (letters, digits, Devanagari marks)."""
+    return "".join(
+        ch for ch in word if ch.isalnum() or ("ऀ" <= ch <= "ॿ" and ch not in "।॥")
+    )
+
+
+def _pause_after(word: str) -> int:
+    """Get the pause weight implied by a word's trailing punctuation."""
+    stripped = word.rstrip("\"')]")
+    return PAUSE_WEIGHTS.get(stripped[-1:], 1) if stripped else 1
+
+
+def build_timing_track(text: str, duration: float) -> Dict[str, Any]:
+    """
+    Estimate a word/viseme timing track for a narration.
+
+    Args:
+        text: The narrated text
+        duration: Exact audio duration in seconds
+
+    Returns:
+        dict: Timing track in the compact format described in the module docstring
+    """
+    words = [w for w in _WORD_PATTERN.findall(text) if _letters(w)]
+    duration_ms = int(round(duration * 1000))
+    track: Dict[str, Any] = {
+        "version": TIMING_TRACK_VERSION,
+        "duration_ms": duration_ms,
+        "words": [],
+        "visemes": [[0, "X"]],
+    }
+    if not words or duration_ms <= 0:
+        return track
+
+    # Distribute the duration by weight: letters are spoken, pauses are silent
+    weights: List[Tuple[str, int, int]] = [
+        (w, len(_letters(w)), _pause_after(w)) for w in words
+    ]
+    total_weight = sum(spoken + pause for _, spoken, pause in weights)
+    lead_in = duration_ms * LEAD_IN_RATIO
+    ms_per_unit = (duration_ms - lead_in) / total_weight
+
+    visemes = track["visemes"]
+    cursor = lead_in
+    for word, spoken, pause in weights:
+        start = cursor
+        end = start + spoken * ms_per_unit
+        track["words"].append([int(start), int(end), word])
+
+        letter_ms = (end - start) / spoken
+        for index, letter in enumerate(_letters(word).lower()):
+            code = VISEME_MAP.get(letter, "L")
+            if visemes[-1][1] != code:
+                visemes.append([int(start + index * letter_ms), code])
+
+        visemes.append([int(end), "X"])
+        cursor = end + pause * ms_per_unit
+
+    return track
+
+
+def build_timing_track_for_audio(text: str, audio_url: str) -> Optional[Dict[str, Any]]:
+    """
+    Build a timing track for a narration whose audio is a local static file.
+
+    Returns:
+        dict: Timing track, or None if the audio file is not available locally
+    """
+    audio_path = url_to_path(audio_url)
+    if audio_path is None or not audio_path.exists():
+        return None
+    return build_timing_track(text, get_duration(audio_path))
+
+
+def track_size(track: Dict[str, Any]) -> int:
+    """Get the serialised size of a timing track in bytes."""
+    return len(json.dumps(track, separators=(",", ":"), ensure_ascii=False).encode())
+
+
+if __name__ == "__main__":
+    from app.db import iter_topics
+
+    video_path = Path("static/media/avatar_loop.mp4")
+    video_bytes = video_path.stat().st_size if video_path.exists() else None
+
+    print(f"{'Topic':40}  {'track':>9}  {'video':>10}")
+    for topic in iter_topics():
+        track = topic.get("timing_track") or build_timing_track_for_audio(
+            topic["content_text"], topic.get("audio_url") or ""
+        )
+        if track is None:
+            print(f"{topic['title'][:40]:40}  (no local audio)")
+            continue
+        size = track_size(track)
+        video = f"{video_bytes / 1024:8.1f} KB" if video_bytes else "   missing"
+        print(f"{topic['title'][:40]:40}  {size / 1024:6.1f} KB  {video}")
@@ -0,0 +1,346 @@
+"""
+Post-synthesis audio transcoding.
+
+Produces low-bitrate mono variants of each narration file using a local
+ffmpeg binary. Every variant is loudness-normalised and has leading/trailing
+silence trimmed, and is stored next to the original as
+"<stem>.<variant>.<ext>" (e.g. topic_abc123.opus16.ogg).
+
+Synthesis doesn't wait for it: schedule_transcode() builds the variants of
+a new file on background threads (TRANSCODE_CONCURRENCY), and the original
+is served until they are stored. Transcodes still queued at shutdown are
+dropped; `python -m app.transcode` builds whatever is missing.
+
+If ffmpeg is not installed the stage is skipped and only the original file
+is served.
+
+Usage:
+    python -m app.transcode          # transcode all topic/FAQ audio and report savings
+"""
+
+from typing import Dict, Any, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+from app.storage import get_storage, key_from_url, audio_url_for
+
+logger = logging.getLogger(__name__)
+
+
+# Transcoding can be disabled via environment variable
+TRANSCODE_ENABLED = os.getenv("AUDIO_TRANSCODE", "1") != "0"
+# Files transcoded at once in the background (each runs one ffmpeg at a time)
+TRANSCODE_CONCURRENCY = int(os.getenv("TRANSCODE_CONCURRENCY", "1"))
+
+# Variants ordered from smallest to largest
+AUDIO_VARIANTS = [
+    {
+        "name": "opus16",
+        "ext": "ogg",
+        "codec": "libopus",
+        "bitrate_kbps": 16,
+        "mime_type": "audio/ogg; codecs=opus",
+    },
+    {
+        "name": "opus24",
+        "ext": "ogg",
+        "codec": "libopus",
+        "bitrate_kbps": 24,
+        "mime_type": "audio/ogg; codecs=opus",
+    },
+    {
+        "name": "mp3_32",
+        "ext": "mp3",
+        "codec": "libmp3lame",
+        "bitrate_kbps": 32,
+        "mime_type": "audio/mpeg",
+    },
+]
+
+# Trim silence at both ends (the end by trimming the start of the reversed
+# audio), keeping pauses inside the narration so variants stay in step with
+# its timing track, then normalise to a speech-friendly loudness
+TRIM_START = "silenceremove=start_periods=1:start_threshold=-50dB"
+AUDIO_FILTERS = f"{TRIM_START},areverse,{TRIM_START},areverse,loudnorm=I=-16:TP=-1.5:LRA=11"
+
+STATIC_URL_PREFIX = "/static/"
+
+# Background transcoding threads - created on first use
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Return the path to the ffmpeg binary, or None if it is not installed."""
+    return shutil.which("ffmpeg")
+
+
+def url_to_path(audio_url: str) -> Optional[Path]:
+    """
+    Map a static audio URL to its file on disk. Stored audio is fetched
+    into the local cache first when the storage backend is remote.
+
+    Args:
+        audio_url: URL like "/static/media/audio/topic_1.mp3"
+
+    Returns:
+        Path: Local file path, or None if the URL is not a static file URL
+    """
+    if not audio_url or not audio_url.startswith(STATIC_URL_PREFIX):
+        return None
+    key = key_from_url(audio_url)
+    if key is not None:
+        return get_storage().local_path(key)
+    return Path("static") / audio_url[len(STATIC_URL_PREFIX) :]
+
+
+def path_to_url(path: Path) -> str:
+    """Map a file under static/ back to its URL."""
+    return STATIC_URL_PREFIX + path.relative_to("static").as_posix()
+
+
+def variant_path(original: Path, variant: Dict[str, Any]) -> Path:
+    """Get the on-disk path of a variant of the original file."""
+    return original.with_name(f"{original.stem}.{variant['name']}.{variant['ext']}")
+
+
+def transcode_variant(original: Path, variant: Dict[str, Any], ffmpeg: str) -> Path:
+    """
+    Transcode one variant of an audio file with ffmpeg.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails
+    """
+    output_path = variant_path(original, variant)
+    # Per-thread name: requests synthesising the same text may transcode it at once
+    tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    subprocess.run(
+        [
+            ffmpeg,
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            str(original),
+            "-af",
+            AUDIO_FILTERS,
+            "-ac",
+            "1",
+            "-c:a",
+            variant["codec"],
+            "-b:a",
+            f"{variant['bitrate_kbps']}k",
+            "-f",
+            variant["ext"],
+            str(tmp_path),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    # Rename only once complete so a half-written variant is never served
+    tmp_path.replace(output_path)
+    return output_path
+
+
+def transcode_audio(original: Path, force: bool = False) -> List[Path]:
+    """
+    Produce all missing variants for an audio file.
+
+    Args:
+        original: Path to the synthesised MP3
+        force: Re-encode variants even if they already exist
+
+    Returns:
+        list: Paths of the variants that exist after the call
+    """
+    ffmpeg = find_ffmpeg()
+    if not TRANSCODE_ENABLED or ffmpeg is None or not original.exists():
+        return []
+
+    produced = []
+    for variant in AUDIO_VARIANTS:
+        output_path = variant_path(original, variant)
+        if output_path.exists() and not force:
+            produced.append(output_path)
+            continue
+        try:
+            produced.append(transcode_variant(original, variant, ffmpeg))
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.warning(
+                "Transcode failed",
+                extra={"variant": variant["name"], "file": original.name, "error": str(e)},
+            )
+
+    return produced
+
+
+def transcode_and_store(original: Path) -> List[Path]:
+    """
+    Produce the missing variants of an audio file and put them in the
+    storage backend under their file names.
+
+    Returns:
+        list: Paths of the variants stored
+    """
+    variants = transcode_audio(original)
+    storage = get_storage()
+    for path in variants:
+        storage.put_file(path.name, path)
+    return variants
+
+
+def _transcode_in_background(original: Path) -> List[Path]:
+    try:
+        variants = transcode_and_store(original)
+    except Exception:
+        logger.exception("Background transcode failed", extra={"file": original.name})
+        raise
+    logger.debug("Variants stored", extra={"file": original.name, "variants": len(variants)})
+    return variants
+
+
+def schedule_transcode(original: Path) -> Optional[Future]:
+    """
+    Build a newly synthesised file's variants on a background thread, so
+    the request that synthesised it doesn't wait for ffmpeg.
+
+    Returns:
+        Future: Resolves to the stored variant paths, or None if transcoding is off
+    """
+    global _executor
+    if not TRANSCODE_ENABLED or find_ffmpeg() is None:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(TRANSCODE_CONCURRENCY, thread_name_prefix="transcode")
+        return _executor.submit(_transcode_in_background, original)
+
+
+def stop_transcoding():
+    """Drop queued background transcodes and wait for the running ones. Called on shutdown."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def get_audio_variants(audio_url: str) -> List[Dict[str, Any]]:
+    """
+    List the available variants of an audio URL, smallest first.
+    The original file is always included last as variant "original".
+
+    Args:
+        audio_url: URL of the original audio file
+
+    Returns:
+        list: Dicts with name, url, mime_type, bitrate_kbps and bytes
+    """
+    key = key_from_url(audio_url)
+    if key is None:
+        return [
+            {
+                "name": "original",
+                "url": audio_url,
+                "mime_type": "audio/mpeg",
+                "bitrate_kbps": None,
+                "bytes": None,
+            }
+        ]
+
+    # Ask the storage backend, so variants made on other nodes are listed too
+    storage = get_storage()
+    variants = []
+    for variant in AUDIO_VARIANTS:
+        variant_key = variant_path(Path(key), variant).name
+        size = storage.size(variant_key)
+        if size is not None:
+            variants.append(
+                {
+                    "name": variant["name"],
+                    "url": audio_url_for(variant_key),
+                    "mime_type": variant["mime_type"],
+                    "bitrate_kbps": variant["bitrate_kbps"],
+                    "bytes": size,
+                }
+            )
+
+    variants.append(
+        {
+            "name": "original",
+            "url": audio_url,
+            "mime_type": "audio/mpeg",
+            "bitrate_kbps": None,
+            "bytes": storage.size(key),
+        }
+    )
+    return variants
+
+
+def bytes_saved(audio_url: str) -> Dict[str, Any]:
+    """
+    Compare the original file size with its smallest variant.
+
+    Returns:
+        dict: original bytes, smallest variant bytes and bytes saved
+    """
+    variants = get_audio_variants(audio_url)
+    original = variants[-1]["bytes"] or 0
+    smallest = variants[0]["bytes"] or 0
+    return {
+        "original_bytes": original,
+        "smallest_bytes": smallest,
+        "bytes_saved": original - smallest,
+    }
+
+
+def transcode_catalogue() -> List[Dict[str, Any]]:
+    """
+    Transcode the audio of every topic and FAQ in the database.
+
+    Returns:
+        list: Per-topic report with original and smallest-variant bytes
+             summed over the topic narration and its FAQ answers
+    """
+    from app.db import iter_topics, get_faqs_by_topic_id
+
+    report = []
+    for topic in iter_topics():
+        topic_id = topic["id"]
+        urls = [topic.get("audio_url")]
+        for faq in get_faqs_by_topic_id(topic_id):
+            urls.append(faq.get("answer_audio_url"))
+
+        totals = {"original_bytes": 0, "smallest_bytes": 0, "bytes_saved": 0}
+        for url in filter(None, urls):
+            path = url_to_path(url)
+            if path is not None and path.exists():
+                if key_from_url(url) is not None:
+                    transcode_and_store(path)
+                else:
+                    transcode_audio(path)
+            for name, value in bytes_saved(url).items():
+                totals[name] += value
+
+        report.append({"topic_id": topic_id, "title": topic["title"], **totals})
+    return report
+
+
+if __name__ == "__main__":
+    if find_ffmpeg() is None:
+        print("[Transcode] ERROR: ffmpeg not found. Install ffmpeg to build variants.")
+        raise SystemExit(1)
+
+    total_saved = 0
+    for row in transcode_catalogue():
+        total_saved += row["bytes_saved"]
+        print(
+            f"{row['title'][:40]:40}  {row['original_bytes'] / 1024:8.1f} KB -> "
+            f"{row['smallest_bytes'] / 1024:8.1f} KB  (saved {row['bytes_saved'] / 1024:.1f} KB)"
+        )
+    print(f"Total saved: {total_saved / 1024:.1f} KB")
@@ -4,10 +4,22 @@ Generates audio files dynamically from text content.
 Falls back to hardcoded paths if gTTS is not available or fails.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from contextlib import contextmanager
 import hashlib
+import logging
+import os
+import threading
+import time
 from pathlib import Path
 
+from app.transcode import schedule_transcode
+from app.storage import get_storage, audio_url_for
+from app.dedup import text_key, find_reusable_audio, record_audio
+from app.admission import DeadlineExceeded, remaining_seconds
+
+logger = logging.getLogger(__name__)
+
 
 # Mapping of topic/FAQ identifiers to hardcoded audio files
 TOPIC_AUDIO_MAP = {
@@ -23,6 +35,62 @@ FAQ_AUDIO_MAP = {
 }
 
 
+# Characters synthesised and seconds spent, for estimating synthesis cost
+_synthesis_totals = {"chars": 0, "seconds": 0.0}
+
+# Seconds shutdown waits for audio jobs still running (see wait_for_audio_jobs)
+AUDIO_DRAIN_TIMEOUT_S = float(os.getenv("AUDIO_DRAIN_TIMEOUT_S", "10"))
+
+# Audio jobs (synthesis plus storing the URL) running in this process
+_audio_jobs = 0
+_audio_jobs_changed = threading.Condition()
+
+
+# Cached gTTS class - resolved on the first synthesis, not at import time
+_gtts_class: Optional[type] = None
+_gtts_checked = False
+
+
+def _load_gtts() -> type:
+    """
+    Import gTTS once and remember the result.
+
+    Returns:
+        type: The gTTS class
+
+    Raises:
+        ImportError: If gTTS is not installed (cached, so later calls fail fast)
+    """
+    global _gtts_class, _gtts_checked
+
+    if not _gtts_checked:
+        try:
+            from gtts import gTTS
+
+            _gtts_class = gTTS
+        except ImportError:
+            _gtts_class = None
+        _gtts_checked = True
+
+    if _gtts_class is None:
+        raise ImportError("gTTS is not installed")
+    return _gtts_class
+
+
+def set_tts_engine(engine: Optional[type]):
+    """
+    Replace the synthesis engine, e.g. with a fake for tests and benchmarks.
+
+    Args:
+        engine: Class with the gTTS interface - engine(text=..., lang=..., slow=...,
+                timeout=...) returning an object with save(path). None restores gTTS.
+    """
+    global _gtts_class, _gtts_checked
+
+    _gtts_class = engine
+    _gtts_checked = engine is not None
+
+
 def _get_audio_index(text: str, max_index: int) -> str:
     """
     Generate a consistent index based on text hash.
@@ -32,30 +100,58 @@ def _get_audio_index(text: str, max_index: int) -> str:
     return str((hash_val % max_index) + 1)
 
 
-def _generate_audio_filename(text: str, prefix: str = "audio") -> str:
+def _generate_audio_filename(text: str, prefix: str = "audio", language: str = "en") -> str:
     """
     Generate a unique filename based on text content hash.
+    Texts differing only in case, punctuation or whitespace get the same
+    name, so they share one synthesis (see app.dedup).
 
     Args:
         text: Text content to hash
         prefix: Filename prefix (e.g., "topic", "faq")
+        language: Language code - the same text in two languages is two files
 
     Returns:
         str: Filename like "topic_abc123def.mp3"
     """
-    # Create a hash of the text for unique filename
-    text_hash = hashlib.md5(text.encode()).hexdigest()[:12]
+    # Create a hash of the normalised text for unique filename
+    text_hash = text_key(text, language)[:12]
     return f"{prefix}_{text_hash}.mp3"
 
 
+def get_synthesis_seconds_per_char() -> Optional[float]:
+    """Average synthesis time per character in this process, or None before any synthesis."""
+    if not _synthesis_totals["chars"]:
+        return None
+    return _synthesis_totals["seconds"] / _synthesis_totals["chars"]
+
+
+def _synthesis_options(text: str) -> Dict[str, Any]:
+    """
+    Engine options for the current request's deadline (see app.admission):
+    a timeout for the engine's HTTP calls, or DeadlineExceeded if the
+    synthesis is not expected to finish in the time left.
+    """
+    remaining = remaining_seconds()
+    if remaining is None:
+        return {}
+    seconds_per_char = get_synthesis_seconds_per_char()
+    expected = seconds_per_char * len(text) if seconds_per_char else 0.0
+    if remaining <= expected:
+        raise DeadlineExceeded(
+            f"Synthesis needs ~{expected:.1f}s, {max(remaining, 0):.1f}s left before the deadline"
+        )
+    return {"timeout": remaining}
+
+
 def _ensure_audio_directory() -> Path:
     """
-    Ensure the audio directory exists.
+    Ensure the local audio directory (the storage backend's local copy) exists.
 
     Returns:
         Path: Path to the audio directory
     """
-    audio_dir = Path("static/media/audio")
+    audio_dir = get_storage().local_dir
     audio_dir.mkdir(parents=True, exist_ok=True)
     return audio_dir
 
@@ -65,6 +161,9 @@ def generate_tts_audio(
 ) -> str:
     """
     Generate audio file from text using gTTS.
+    The file is written to the configured storage backend, so other nodes
+    sharing that storage reuse it; its low-bitrate variants follow from a
+    background transcode (app.transcode.schedule_transcode).
 
     Args:
         text: Text to convert to speech
@@ -76,41 +175,72 @@ def generate_tts_audio(
 
     Raises:
         ImportError: If gTTS is not installed
+        DeadlineExceeded: If the request's deadline leaves no time to synthesise
         Exception: If audio generation fails
     """
     try:
-        from gtts import gTTS
-
         # Ensure audio directory exists
+        storage = get_storage()
         audio_dir = _ensure_audio_directory()
 
         # Generate filename if not provided
         if not output_filename:
-            output_filename = _generate_audio_filename(text, "tts")
+            output_filename = _generate_audio_filename(text, "tts", language)
 
         # Full path to save the audio file
         output_path = audio_dir / output_filename
 
-        # Check if file already exists to avoid regenerating
-        if output_path.exists():
-            print(f"[TTS] Using existing audio: {output_filename}")
-            return f"/static/media/audio/{output_filename}"
+        # Check if file already exists (on any node sharing the storage) to avoid regenerating
+        if storage.exists(output_filename):
+            logger.debug("Using existing audio", extra={"file": output_filename})
+            return audio_url_for(output_filename)
 
         # Generate speech
-        print(
-            f"[TTS] Generating audio for text (length: {len(text)} chars, language: {language})..."
+        gTTS = _load_gtts()
+        options = _synthesis_options(text)
+        start = time.perf_counter()
+        tts = gTTS(text=text, lang=language, slow=False, **options)
+        # Write under a temporary name so a half-written file is never served;
+        # the name is per thread, as two requests may synthesise the same text at once
+        tmp_path = output_path.with_name(
+            f"{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
         )
-        tts = gTTS(text=text, lang=language, slow=False)
-        tts.save(str(output_path))
-
-        print(f"[TTS] ✓ Audio generated: {output_filename}")
-        return f"/static/media/audio/{output_filename}"
+        tts.save(str(tmp_path))
+        tmp_path.replace(output_path)
+        synthesis_seconds = time.perf_counter() - start
+        synthesis_ms = round(synthesis_seconds * 1000, 1)
+        _synthesis_totals["chars"] += len(text)
+        _synthesis_totals["seconds"] += synthesis_seconds
+
+        storage.put_file(output_filename, output_path)
+
+        # Post-synthesis stage: low-bitrate variants for slow connections, built
+        # in the background; the original is served until they are stored
+        schedule_transcode(output_path)
+
+        logger.info(
+            "Audio generated",
+            extra={
+                "file": output_filename,
+                "chars": len(text),
+                "language": language,
+                "synthesis_ms": synthesis_ms,
+                "storage": storage.name,
+            },
+        )
+        return audio_url_for(output_filename)
 
     except ImportError:
-        print("[TTS] ERROR: gTTS not installed. Install with: pip install gtts")
+        logger.error("gTTS not installed. Install with: pip install gtts")
+        raise
+    except DeadlineExceeded:
         raise
     except Exception as e:
-        print(f"[TTS] ERROR: Failed to generate audio: {e}")
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            # The engine call was cut short by the request's deadline
+            raise DeadlineExceeded("Deadline exceeded during synthesis") from e
+        logger.exception("Failed to generate audio")
         raise
 
 
@@ -140,24 +270,37 @@ def get_or_generate_audio_for_topic(topic: Dict[str, Any]) -> str:
     content_text = topic.get("content_text", "")
     language = topic.get("language", "en")
 
+    # Reuse the audio of a near-duplicate narration, if enabled
+    audio_url = find_reusable_audio(content_text, language)
+    if audio_url:
+        logger.info("Reusing near-duplicate audio", extra={"title": title, "audio_url": audio_url})
+        return audio_url
+
     # Try to generate audio using gTTS
     try:
         # Generate unique filename based on content
-        filename = _generate_audio_filename(content_text, "topic")
+        filename = _generate_audio_filename(content_text, "topic", language)
         audio_url = generate_tts_audio(content_text, language, filename)
-        print(f"[TTS] Generated audio for topic '{title}': {audio_url}")
+        record_audio(f"topic:{topic.get('id')}", content_text, language, audio_url)
+        logger.info("Generated topic audio", extra={"title": title, "audio_url": audio_url})
         return audio_url
 
+    except DeadlineExceeded:
+        # Out of time: leave the audio unset so a later request synthesises it
+        raise
+
     except ImportError:
         # Fallback to hardcoded paths if gTTS not installed
-        print(f"[TTS] Falling back to hardcoded audio for topic '{title}'")
+        logger.warning("Falling back to hardcoded topic audio", extra={"title": title})
         index = _get_audio_index(title, len(TOPIC_AUDIO_MAP))
         audio_url = TOPIC_AUDIO_MAP.get(index, "/static/media/audio/topic_1.mp3")
         return audio_url
 
     except Exception as e:
         # Fallback on any error
-        print(f"[TTS] Error generating audio, using fallback: {e}")
+        logger.warning(
+            "Error generating topic audio, using fallback", extra={"title": title, "error": str(e)}
+        )
         index = _get_audio_index(title, len(TOPIC_AUDIO_MAP))
         audio_url = TOPIC_AUDIO_MAP.get(index, "/static/media/audio/topic_1.mp3")
         return audio_url
@@ -189,38 +332,92 @@ def get_or_generate_audio_for_faq(faq: Dict[str, Any]) -> str:
     answer = faq.get("answer", "")
     language = faq.get("language", "en")
 
+    # Reuse the audio of a near-duplicate answer, if enabled
+    audio_url = find_reusable_audio(answer, language)
+    if audio_url:
+        logger.info(
+            "Reusing near-duplicate audio", extra={"question": question, "audio_url": audio_url}
+        )
+        return audio_url
+
     # Try to generate audio using gTTS
     try:
         # Generate unique filename based on answer content
-        filename = _generate_audio_filename(answer, "faq")
+        filename = _generate_audio_filename(answer, "faq", language)
         audio_url = generate_tts_audio(answer, language, filename)
-        print(f"[TTS] Generated audio for FAQ '{question}': {audio_url}")
+        record_audio(f"faq:{faq.get('id')}", answer, language, audio_url)
+        logger.info("Generated FAQ audio", extra={"question": question, "audio_url": audio_url})
         return audio_url
 
+    except DeadlineExceeded:
+        # Out of time: leave the audio unset so a later request synthesises it
+        raise
+
     except ImportError:
         # Fallback to hardcoded paths if gTTS not installed
-        print(f"[TTS] Falling back to hardcoded audio for FAQ '{question}'")
+        logger.warning("Falling back to hardcoded FAQ audio", extra={"question": question})
         index = _get_audio_index(question, len(FAQ_AUDIO_MAP))
         audio_url = FAQ_AUDIO_MAP.get(index, "/static/media/audio/faq_1.mp3")
         return audio_url
 
     except Exception as e:
         # Fallback on any error
-        print(f"[TTS] Error generating audio, using fallback: {e}")
+        logger.warning(
+            "Error generating FAQ audio, using fallback",
+            extra={"question": question, "error": str(e)},
+        )
         index = _get_audio_index(question, len(FAQ_AUDIO_MAP))
         audio_url = FAQ_AUDIO_MAP.get(index, "/static/media/audio/faq_1.mp3")
         return audio_url
 
 
+@contextmanager
+def audio_job():
+    """
+    Mark an audio job as running until the block exits. A job outlives its
+    request when the request gives up first (deadline, client gone), so
+    shutdown waits for jobs separately from requests.
+    """
+    global _audio_jobs
+    with _audio_jobs_changed:
+        _audio_jobs += 1
+    try:
+        yield
+    finally:
+        with _audio_jobs_changed:
+            _audio_jobs -= 1
+            _audio_jobs_changed.notify_all()
+
+
+def pending_audio_jobs() -> int:
+    """Number of audio jobs running in this process."""
+    return _audio_jobs
+
+
+def wait_for_audio_jobs(timeout: float = None, at_most: int = 0) -> int:
+    """
+    Wait until at most `at_most` audio jobs are running (by default none),
+    or timeout seconds (default AUDIO_DRAIN_TIMEOUT_S).
+
+    Returns:
+        int: Jobs still running
+    """
+    timeout = AUDIO_DRAIN_TIMEOUT_S if timeout is None else timeout
+    with _audio_jobs_changed:
+        _audio_jobs_changed.wait_for(lambda: _audio_jobs <= at_most, timeout)
+        return _audio_jobs
+
+
 def clear_generated_audio() -> int:
     """
     Clear all generated TTS audio files (keep fallback files).
     Useful for regenerating audio with different settings.
+    Only the local copies are removed; shared storage is left alone.
 
     Returns:
         int: Number of files deleted
     """
-    audio_dir = Path("static/media/audio")
+    audio_dir = get_storage().local_dir
     if not audio_dir.exists():
         return 0
 
@@ -232,6 +429,6 @@ def clear_generated_audio() -> int:
             if not file.stem.split("_")[-1].isdigit():
                 file.unlink()
                 count += 1
-                print(f"[TTS] Deleted: {file.name}")
+                logger.info("Deleted generated audio", extra={"file": file.name})
 
     return count
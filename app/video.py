@@ -0,0 +1,376 @@
+"""
+Offline avatar video optimisation.
+
+Topics point at one avatar loop (avatar_video_url, by default
+/static/media/avatar_loop.mp4), which StaticFiles serves as-is. This
+pipeline uses a local ffmpeg to build, next to each source video:
+
+- a resolution ladder "<stem>.<height>p.<ext>" in H.264 MP4 and VP9 WebM,
+  never upscaled, without an audio track (the narration plays separately);
+  MP4s have their index (moov) first and WebMs their cues first, so
+  playback can start before the download ends
+- a poster "<stem>.poster.jpg" (the first frame)
+- a manifest "<stem>.manifest.json" listing the variants, smallest first,
+  which the frontend fetches to pick one for the player size and connection
+
+The source itself is remuxed (stream copy) with its index first if it
+isn't already, for clients that play avatar_video_url directly.
+
+If ffmpeg is not installed nothing is built and the source is served.
+
+Usage:
+    python -m app.video                               # every avatar in the catalogue
+    python -m app.video static/media/avatar_loop.mp4  # specific files
+    python -m app.video --force                       # re-encode existing outputs
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+
+from app.transcode import url_to_path, path_to_url
+
+logger = logging.getLogger(__name__)
+
+
+# Output heights, smallest first; CRFs tuned for a mostly static talking head
+VIDEO_LADDER = [
+    {"height": 240, "crf_h264": 30, "crf_vp9": 44},
+    {"height": 360, "crf_h264": 28, "crf_vp9": 42},
+    {"height": 540, "crf_h264": 26, "crf_vp9": 40},
+    {"height": 720, "crf_h264": 24, "crf_vp9": 38},
+]
+
+VIDEO_FORMATS = [
+    {
+        "ext": "webm",
+        "mime_type": 'video/webm; codecs="vp9"',
+        "codec": "libvpx-vp9",
+        "crf": "crf_vp9",
+        # Constant quality; cues (the seek index) first needs ffmpeg 6+
+        "args": ["-b:v", "0", "-deadline", "good", "-cpu-used", "4", "-row-mt", "1", "-cues_to_front", "1"],
+    },
+    {
+        "ext": "mp4",
+        # H.264 Main profile, level 3.1 (up to 720p30)
+        "mime_type": 'video/mp4; codecs="avc1.4D401F"',
+        "codec": "libx264",
+        "crf": "crf_h264",
+        "args": ["-preset", "slow", "-profile:v", "main", "-level", "3.1", "-movflags", "+faststart"],
+    },
+]
+
+# Keyframe every 2 seconds, so a looping or seeking player never waits long
+KEYFRAME_INTERVAL_S = 2
+
+POSTER_QUALITY = 5  # ffmpeg JPEG scale: 2 (best) to 31
+
+# (name, round-trip time in ms, downlink in Mbit/s) for time-to-first-frame estimates
+NETWORK_PROFILES: List[Tuple[str, float, float]] = [
+    ("3g", 300, 1.6),
+    ("4g", 100, 9.0),
+    ("broadband", 30, 50.0),
+]
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Return the path to the ffmpeg binary, or None if it is not installed."""
+    return shutil.which("ffmpeg")
+
+
+def find_ffprobe() -> Optional[str]:
+    """Return the path to the ffprobe binary, or None if it is not installed."""
+    return shutil.which("ffprobe")
+
+
+def output_path(source: Path, suffix: str) -> Path:
+    """Get the path of an output built from a source video, e.g. "360p.webm"."""
+    return source.with_name(f"{source.stem}.{suffix}")
+
+
+def manifest_path(source: Path) -> Path:
+    """Get the manifest path of a source video."""
+    return output_path(source, "manifest.json")
+
+
+def ladder_for(source_height: int) -> List[Dict[str, Any]]:
+    """
+    The ladder rungs for a source video: those not above its height, or
+    the smallest rung if the source is smaller than all of them.
+    """
+    rungs = [rung for rung in VIDEO_LADDER if rung["height"] <= source_height]
+    return rungs or VIDEO_LADDER[:1]
+
+
+def mp4_boxes(path: Path) -> List[Tuple[str, int, int]]:
+    """
+    List an MP4 file's top-level boxes.
+
+    Returns:
+        list: (type, offset, size) per box, in file order
+    """
+    boxes = []
+    file_size = path.stat().st_size
+    with open(path, "rb") as video_file:
+        offset = 0
+        while offset + 8 <= file_size:
+            video_file.seek(offset)
+            size, box_type = struct.unpack(">I4s", video_file.read(8))
+            if size == 1:
+                (size,) = struct.unpack(">Q", video_file.read(8))
+            elif size == 0:
+                size = file_size - offset
+            if size < 8:
+                break
+            boxes.append((box_type.decode("latin-1"), offset, size))
+            offset += size
+    return boxes
+
+
+def is_faststart(path: Path) -> bool:
+    """Check whether an MP4 file's index (moov) comes before its media data (mdat)."""
+    types = [box_type for box_type, _, _ in mp4_boxes(path)]
+    return "moov" in types and ("mdat" not in types or types.index("moov") < types.index("mdat"))
+
+
+def _probe(path: Path, ffprobe: str, *args: str) -> Dict[str, Any]:
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-of", "json", *args, str(path)],
+        check=True,
+        capture_output=True,
+    )
+    return json.loads(result.stdout)
+
+
+def probe_video(path: Path, ffprobe: str) -> Dict[str, Any]:
+    """
+    Read a video's size and duration with ffprobe.
+
+    Returns:
+        dict: width, height and duration_s
+    """
+    info = _probe(
+        path, ffprobe, "-select_streams", "v:0", "-show_entries", "stream=width,height:format=duration"
+    )
+    stream = info["streams"][0]
+    return {
+        "width": int(stream["width"]),
+        "height": int(stream["height"]),
+        "duration_s": round(float(info["format"].get("duration", 0)), 3),
+    }
+
+
+def first_frame_bytes(path: Path, ffprobe: str) -> int:
+    """
+    How many bytes a progressive download needs before the first frame can
+    be shown: up to the end of the first video packet, and for an MP4 also
+    up to the end of its index (the whole file when the index is last).
+    """
+    info = _probe(
+        path, ffprobe, "-select_streams", "v:0", "-show_entries", "packet=pos,size", "-read_intervals", "%+#1"
+    )
+    packet = info["packets"][0]
+    needed = int(packet["pos"]) + int(packet["size"])
+    if path.suffix == ".mp4":
+        for box_type, offset, size in mp4_boxes(path):
+            if box_type == "moov":
+                needed = max(needed, offset + size)
+    return needed
+
+
+def estimate_ttff_ms(first_bytes: int, rtt_ms: float, downlink_mbps: float) -> float:
+    """Time to first frame on a warm connection: one round trip, then the bytes up to the first frame."""
+    return rtt_ms + first_bytes * 8 / (downlink_mbps * 1000)
+
+
+def _run_ffmpeg(ffmpeg: str, args: List[str], destination: Path):
+    """Run ffmpeg into a temporary file and rename it once complete."""
+    # Per-thread name, and the real extension so ffmpeg picks the muxer
+    tmp_path = destination.with_name(f".{os.getpid()}.{threading.get_ident()}.{destination.name}")
+    try:
+        subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", *args, str(tmp_path)],
+            check=True,
+            capture_output=True,
+        )
+        tmp_path.replace(destination)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def encode_variant(source: Path, rung: Dict[str, Any], video_format: Dict[str, Any], ffmpeg: str) -> Path:
+    """
+    Encode one ladder rung in one format.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails
+    """
+    destination = output_path(source, f"{rung['height']}p.{video_format['ext']}")
+    _run_ffmpeg(
+        ffmpeg,
+        [
+            "-i", str(source),
+            "-an",
+            "-vf", f"scale=-2:{rung['height']}",
+            "-pix_fmt", "yuv420p",
+            "-force_key_frames", f"expr:gte(t,n_forced*{KEYFRAME_INTERVAL_S})",
+            "-c:v", video_format["codec"],
+            "-crf", str(rung[video_format["crf"]]),
+            *video_format["args"],
+        ],
+        destination,
+    )
+    return destination
+
+
+def build_poster(source: Path, height: int, ffmpeg: str) -> Path:
+    """Save the first frame as a JPEG of the given height."""
+    destination = output_path(source, "poster.jpg")
+    _run_ffmpeg(
+        ffmpeg,
+        ["-i", str(source), "-frames:v", "1", "-vf", f"scale=-2:{height}", "-q:v", str(POSTER_QUALITY)],
+        destination,
+    )
+    return destination
+
+
+def remux_faststart(source: Path, ffmpeg: str) -> bool:
+    """
+    Move an MP4 source's index in front of its media data (stream copy).
+
+    Returns:
+        bool: Whether the file was rewritten
+    """
+    if source.suffix != ".mp4" or is_faststart(source):
+        return False
+    _run_ffmpeg(ffmpeg, ["-i", str(source), "-map", "0", "-c", "copy", "-movflags", "+faststart"], source)
+    return True
+
+
+def describe(path: Path, ffprobe: str, **fields: Any) -> Dict[str, Any]:
+    """A manifest entry for a built file: its URL, size and first-frame bytes."""
+    info = probe_video(path, ffprobe)
+    return {
+        **fields,
+        "url": path_to_url(path),
+        "width": info["width"],
+        "height": info["height"],
+        "bytes": path.stat().st_size,
+        "first_frame_bytes": first_frame_bytes(path, ffprobe),
+    }
+
+
+def optimise_video(source: Path, force: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Build the ladder, poster and manifest for one source video.
+
+    Args:
+        source: Video file under static/
+        force: Re-encode outputs even if they already exist
+
+    Returns:
+        dict: The manifest (also written to <stem>.manifest.json), plus the
+              source before and after remuxing under "original" and
+              "remuxed" for the report, or None if ffmpeg/ffprobe are not
+              installed or the file does not exist
+    """
+    ffmpeg, ffprobe = find_ffmpeg(), find_ffprobe()
+    if ffmpeg is None or ffprobe is None or not source.exists():
+        return None
+
+    info = probe_video(source, ffprobe)
+    original = describe(source, ffprobe, name="original")
+    remuxed = None
+    try:
+        if remux_faststart(source, ffmpeg):
+            logger.info("Remuxed avatar video with its index first", extra={"file": source.name})
+            remuxed = describe(source, ffprobe, name="original, index first")
+    except (subprocess.CalledProcessError, OSError) as e:
+        # The source is left as it was; the variants are still built from it
+        logger.warning("Remux failed", extra={"file": source.name, "error": str(e)})
+
+    rungs = ladder_for(info["height"])
+    variants = []
+    for rung in rungs:
+        for video_format in VIDEO_FORMATS:
+            name = f"{rung['height']}p.{video_format['ext']}"
+            destination = output_path(source, name)
+            try:
+                if force or not destination.exists():
+                    encode_variant(source, rung, video_format, ffmpeg)
+                variants.append(describe(destination, ffprobe, name=name, mime_type=video_format["mime_type"]))
+            except (subprocess.CalledProcessError, OSError) as e:
+                logger.warning(
+                    "Video encode failed",
+                    extra={"variant": destination.name, "file": source.name, "error": str(e)},
+                )
+
+    poster = output_path(source, "poster.jpg")
+    try:
+        if force or not poster.exists():
+            build_poster(source, rungs[-1]["height"], ffmpeg)
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.warning("Poster failed", extra={"file": source.name, "error": str(e)})
+
+    manifest = {
+        "source": path_to_url(source),
+        "width": info["width"],
+        "height": info["height"],
+        "duration_s": info["duration_s"],
+        "poster": path_to_url(poster) if poster.exists() else None,
+        "variants": sorted(variants, key=lambda variant: variant["bytes"]),
+    }
+    tmp_path = manifest_path(source).with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    tmp_path.replace(manifest_path(source))
+    return {**manifest, "original": original, "remuxed": remuxed}
+
+
+def catalogue_videos() -> List[Path]:
+    """The distinct local avatar videos referenced by topics in the database."""
+    from app.db import iter_topics
+
+    paths = []
+    for topic in iter_topics():
+        path = url_to_path(topic.get("avatar_video_url") or "")
+        if path is not None and path not in paths:
+            paths.append(path)
+    return paths
+
+
+def print_report(manifest: Dict[str, Any]):
+    """Print bytes and estimated time to first frame per variant."""
+    print(f"\n{manifest['source']}  {manifest['width']}x{manifest['height']}  {manifest['duration_s']:.1f}s")
+    header = "".join(f"{f'ttff {name}':>16}" for name, _, _ in NETWORK_PROFILES)
+    print(f"{'variant':24} {'bytes':>11} {'first frame':>12}{header}")
+    rows = [manifest["original"], manifest["remuxed"], *manifest["variants"]]
+    for entry in filter(None, rows):
+        ttff = "".join(
+            f"{estimate_ttff_ms(entry['first_frame_bytes'], rtt, downlink):13.0f} ms"
+            for _, rtt, downlink in NETWORK_PROFILES
+        )
+        print(f"{entry['name']:24} {entry['bytes']:11,} {entry['first_frame_bytes']:12,}{ttff}")
+
+
+if __name__ == "__main__":
+    if find_ffmpeg() is None or find_ffprobe() is None:
+        print("[Video] ERROR: ffmpeg not found. Install ffmpeg to build avatar video variants.")
+        raise SystemExit(1)
+
+    force = "--force" in sys.argv[1:]
+    sources = [Path(arg) for arg in sys.argv[1:] if arg != "--force"] or catalogue_videos()
+    for source in sources:
+        manifest = optimise_video(source, force)
+        if manifest is None:
+            print(f"\n{source}: not found")
+            continue
+        print_report(manifest)
+    profiles = ", ".join(f"{name} {rtt:.0f} ms RTT / {downlink:g} Mbit/s" for name, rtt, downlink in NETWORK_PROFILES)
+    print(f"\nttff: one round trip plus the bytes before the first frame ({profiles})")
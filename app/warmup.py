@@ -0,0 +1,101 @@
+"""
+Startup warm-up: database seeding and index checks.
+
+In "blocking" mode (the default) warm-up runs before the server accepts
+traffic, as it always has. In "background" mode the server starts serving
+immediately and warm-up runs in a worker thread; /health answers straight
+away while /ready reports 503 until warm-up has finished.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+# "blocking" or "background" - can be configured via environment variable
+STARTUP_MODE = os.getenv("STARTUP_MODE", "blocking")
+
+_state: Dict[str, Any] = {
+    "ready": False,
+    "error": None,
+    "started_at": None,
+    "finished_at": None,
+}
+
+
+def warm_up():
+    """
+    Seed the database and make sure indexes exist (or, when serving a
+    catalogue snapshot, check that the snapshot loads).
+    Runs synchronously - call it from a thread when the event loop must stay free.
+    """
+    from app.db import ensure_indexes
+    from app.seed_data import seed_database
+    from app.snapshot import get_snapshot, snapshot_enabled
+
+    _state["started_at"] = time.time()
+    _state["error"] = None
+    try:
+        if snapshot_enabled():
+            # Read-only edge node: only the snapshot has to be there
+            get_snapshot()
+        else:
+            seed_database()
+            ensure_indexes()
+        _state["ready"] = True
+    except Exception as e:
+        _state["error"] = str(e)
+        logger.exception("Warm-up failed")
+        raise
+    finally:
+        _state["finished_at"] = time.time()
+
+
+async def start_warmup(mode: str = None) -> Optional[asyncio.Task]:
+    """
+    Run warm-up according to the startup mode.
+
+    Args:
+        mode: "blocking" or "background" (defaults to STARTUP_MODE)
+
+    Returns:
+        asyncio.Task: The running warm-up task in background mode, otherwise None
+    """
+    mode = mode or STARTUP_MODE
+
+    if mode == "background":
+        logger.info("Warm-up running in background; /ready reports 503 until done")
+        task = asyncio.create_task(asyncio.to_thread(warm_up))
+        # Failures are recorded in the state; don't let the task log them again
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    warm_up()
+    return None
+
+
+def is_ready() -> bool:
+    """Check whether warm-up has completed successfully."""
+    return _state["ready"]
+
+
+def get_warmup_status() -> Dict[str, Any]:
+    """
+    Get a snapshot of the warm-up state for the /ready endpoint.
+
+    Returns:
+        dict: ready flag, last error, and warm-up duration in seconds (if finished)
+    """
+    duration = None
+    if _state["started_at"] and _state["finished_at"]:
+        duration = round(_state["finished_at"] - _state["started_at"], 3)
+
+    return {
+        "ready": _state["ready"],
+        "error": _state["error"],
+        "warmup_seconds": duration,
+    }
@@ -0,0 +1,271 @@
+"""
+Write-behind batching for small field updates.
+
+Request handlers queue "$set" updates instead of writing them one by one.
+Updates to the same document are coalesced (later values win), and a
+background thread writes everything pending with one unordered bulk_write
+per collection, whenever WRITE_BATCH_SIZE documents are pending or every
+WRITE_BATCH_INTERVAL_MS, whichever comes first.
+
+An update can be conditional on the document's version: it is then only
+written, and only shown to reads, while the document is still at that
+version, so audio synthesised from text that has since been edited never
+lands. An update for another version replaces the queued one instead of
+merging with it.
+
+Queued values are visible to reads through pending_fields() until they are
+written, and stop() writes everything still pending, so close_db() on
+shutdown loses nothing. A failed bulk write is put back in the queue
+(behind any newer values) and retried on the next flush. stop() retries
+a failing final flush a few times, then logs the ids it could not write.
+"""
+
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from collections import deque
+import logging
+import threading
+import time
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# (collection name, document id)
+DocKey = Tuple[str, str]
+
+
+class _AnyVersion:
+    def __repr__(self):
+        return "ANY_VERSION"
+
+
+# Version condition of an unconditional update
+ANY_VERSION: Any = _AnyVersion()
+
+# Flush latencies kept for the percentile metrics
+LATENCY_WINDOW = 1000
+
+# Attempts at the final flush in stop(), and the pause between them
+STOP_FLUSH_ATTEMPTS = 3
+STOP_RETRY_DELAY_S = 0.2
+
+
+class WriteBehindBatcher:
+    """Coalesce "$set" updates per document and write them in bulk."""
+
+    def __init__(
+        self,
+        get_collection: Callable[[str], Any],
+        batch_size: int = 100,
+        interval_ms: float = 50,
+    ):
+        self.get_collection = get_collection
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+
+        self._pending: Dict[DocKey, Dict[str, Any]] = {}
+        self._inflight: Dict[DocKey, Dict[str, Any]] = {}
+        # Version each pending/in-flight update is conditional on (ANY_VERSION: none)
+        self._pending_versions: Dict[DocKey, Any] = {}
+        self._inflight_versions: Dict[DocKey, Any] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._queued = 0
+        self._coalesced = 0
+        self._written = 0
+        self._batches = 0
+        self._errors = 0
+        self._max_batch = 0
+        self._latencies_ms: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def queue_set(
+        self, collection: str, doc_id: str, fields: Dict[str, Any], version: Any = ANY_VERSION
+    ):
+        """
+        Queue a "$set" of fields on one document. Starts the writer on first use.
+
+        Args:
+            version: Only write while the document is at this version
+                     (None: has no version field; ANY_VERSION: unconditional)
+        """
+        key = (collection, doc_id)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None or self._pending_versions[key] != version:
+                if pending is not None:
+                    self._coalesced += 1
+                self._pending[key] = dict(fields)
+                self._pending_versions[key] = version
+            else:
+                pending.update(fields)
+                self._coalesced += 1
+            self._queued += 1
+            pending_count = len(self._pending)
+            if self._thread is None:
+                self._start()
+
+        if pending_count >= self.batch_size:
+            self._wakeup.set()
+
+    def pending_updates(self, collection: str, doc_id: str) -> List[Tuple[Any, Dict[str, Any]]]:
+        """(version condition, fields) being written and queued for a document, oldest first."""
+        key = (collection, doc_id)
+        with self._lock:
+            updates = []
+            if key in self._inflight:
+                updates.append((self._inflight_versions[key], dict(self._inflight[key])))
+            if key in self._pending:
+                updates.append((self._pending_versions[key], dict(self._pending[key])))
+            return updates
+
+    def pending_fields(
+        self, collection: str, doc_id: str, version: Any = ANY_VERSION
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fields queued or being written for a document, or None.
+
+        Args:
+            version: The document's current version; updates conditional on
+                     another version are left out (ANY_VERSION: include all)
+        """
+        return overlay_fields(self.pending_updates(collection, doc_id), version)
+
+    def flush(self) -> int:
+        """
+        Write everything pending now.
+
+        Returns:
+            int: Number of documents written (0 if nothing was pending or the write failed)
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                versions, self._pending_versions = self._pending_versions, {}
+                self._inflight, self._inflight_versions = batch, versions
+            if not batch:
+                return 0
+
+            from pymongo import UpdateOne
+
+            by_collection: Dict[str, List[Any]] = {}
+            for (collection, doc_id), fields in batch.items():
+                query: Dict[str, Any] = {"_id": ObjectId(doc_id)}
+                version = versions[(collection, doc_id)]
+                if version is not ANY_VERSION:
+                    # None matches documents written before versioning
+                    query["version"] = version
+                by_collection.setdefault(collection, []).append(UpdateOne(query, {"$set": fields}))
+
+            start = time.perf_counter()
+            try:
+                for collection, operations in by_collection.items():
+                    self.get_collection(collection).bulk_write(operations, ordered=False)
+            except Exception:
+                # Put the batch back behind anything queued since, and retry next time
+                with self._lock:
+                    for key, fields in batch.items():
+                        if key not in self._pending:
+                            self._pending[key] = fields
+                            self._pending_versions[key] = versions[key]
+                        elif self._pending_versions[key] == versions[key]:
+                            self._pending[key] = {**fields, **self._pending[key]}
+                    self._inflight, self._inflight_versions = {}, {}
+                    self._errors += 1
+                logger.exception("Write-behind flush failed", extra={"documents": len(batch)})
+                return 0
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._inflight, self._inflight_versions = {}, {}
+                self._written += len(batch)
+                self._batches += 1
+                self._max_batch = max(self._max_batch, len(batch))
+                self._latencies_ms.append(elapsed_ms)
+            logger.debug(
+                "Flushed write batch",
+                extra={"documents": len(batch), "flush_ms": round(elapsed_ms, 2)},
+            )
+            return len(batch)
+
+    def stop(self) -> int:
+        """
+        Stop the writer thread and write everything still pending.
+
+        Returns:
+            int: Number of documents whose updates could not be written
+        """
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            thread.join()
+
+        for attempt in range(STOP_FLUSH_ATTEMPTS):
+            if attempt:
+                time.sleep(STOP_RETRY_DELAY_S)
+            self.flush()
+            with self._lock:
+                if not self._pending:
+                    break
+
+        with self._lock:
+            lost = sorted(self._pending)
+            self._thread = None
+            self._stop.clear()
+        if lost:
+            logger.error(
+                "Write-behind updates not written at shutdown",
+                extra={
+                    "documents": len(lost),
+                    "ids": [f"{collection}/{doc_id}" for collection, doc_id in lost],
+                },
+            )
+        return len(lost)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch size and flush latency metrics."""
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            pending = len(self._pending)
+
+        def latency(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(fraction * len(latencies)), len(latencies) - 1)], 2)
+
+        return {
+            "queued_updates": self._queued,
+            "coalesced_updates": self._coalesced,
+            "documents_written": self._written,
+            "pending_documents": pending,
+            "batches": self._batches,
+            "avg_batch_size": round(self._written / self._batches, 1) if self._batches else None,
+            "max_batch_size": self._max_batch,
+            "flush_ms_p50": latency(0.50),
+            "flush_ms_p99": latency(0.99),
+            "flush_errors": self._errors,
+        }
+
+    def _start(self):
+        # Called with self._lock held
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def overlay_fields(updates: List[Tuple[Any, Dict[str, Any]]], version: Any) -> Optional[Dict[str, Any]]:
+    """Merge the pending_updates() that apply to a document at `version`, or None."""
+    fields = None
+    for condition, values in updates:
+        if condition is ANY_VERSION or version is ANY_VERSION or condition == version:
+            fields = {**(fields or {}), **values}
+    return fields
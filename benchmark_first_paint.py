@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+First meaningful paint benchmark for the home page.
+
+Measures the time from navigation until the topic list is on screen,
+against a running server, with an artificial round-trip time added to
+every request to model a mobile connection.
+
+- browser (default): headless Chromium via Playwright. Reports when the
+  first topic button exists (performance.now() since navigation) and
+  how many /api/topics requests the page made. Service workers are
+  blocked so every run is a first visit. Point it at servers running the
+  old and new code to compare.
+- --replay: no browser. Replays the requests the page waits for before
+  it can show the list: before = page, then app.js/styles.css, then
+  /api/topics; after = page (with the list inlined), then app.js/styles.css.
+
+Usage:
+    python benchmark_first_paint.py [--base-url http://localhost:8000] [--rtt 150] [--runs 5]
+    python benchmark_first_paint.py --replay
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import re
+import statistics
+import time
+import urllib.request
+
+STATIC_ASSETS = ("/static/app.js", "/static/styles.css")
+_INITIAL_DATA = re.compile(r'<script id="initialData" type="application/json">(.*?)</script>', re.S)
+
+
+def fetch(base_url: str, path: str, rtt: float) -> bytes:
+    time.sleep(rtt)
+    with urllib.request.urlopen(base_url + path) as response:
+        return response.read()
+
+
+def replay(base_url: str, rtt: float, before: bool) -> float:
+    """Seconds until the page has everything it needs to show the topic list."""
+    start = time.perf_counter()
+    html = fetch(base_url, "/", rtt).decode()
+    # The browser loads the stylesheet and script in parallel
+    with ThreadPoolExecutor(len(STATIC_ASSETS)) as pool:
+        list(pool.map(lambda path: fetch(base_url, path, rtt), STATIC_ASSETS))
+
+    match = _INITIAL_DATA.search(html)
+    embedded = match and json.loads(match.group(1)).get("topics") is not None
+    if before or not embedded:
+        json.loads(fetch(base_url, "/api/topics", rtt))
+    return time.perf_counter() - start
+
+
+def browser_runs(base_url: str, rtt_ms: float, runs: int):
+    """Yield (milliseconds to topic list, /api/topics requests) per fresh page load."""
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        raise ImportError(
+            "playwright not installed. Install with: pip install playwright "
+            "&& python -m playwright install chromium"
+        )
+
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch()
+        try:
+            for _ in range(runs):
+                context = browser.new_context(service_workers="block")
+                page = context.new_page()
+                cdp = context.new_cdp_session(page)
+                cdp.send("Network.enable")
+                cdp.send(
+                    "Network.emulateNetworkConditions",
+                    {
+                        "offline": False,
+                        "latency": rtt_ms,
+                        "downloadThroughput": -1,
+                        "uploadThroughput": -1,
+                    },
+                )
+                list_requests = []
+                page.on(
+                    "request",
+                    lambda request: request.url.endswith("/api/topics") and list_requests.append(request),
+                )
+                page.goto(base_url + "/", wait_until="commit")
+                page.wait_for_selector(".topic-button, #topicList .empty")
+                painted_ms = page.evaluate("performance.now()")
+                yield painted_ms, len(list_requests)
+                context.close()
+        finally:
+            browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rtt", type=float, default=150, help="simulated RTT in ms")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--replay", action="store_true", help="replay requests without a browser")
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip("/")
+
+    print("🎨 Avatar Teacher - First Meaningful Paint")
+    print("=" * 60)
+    print(f"Server: {base_url}   simulated RTT: {args.rtt:.0f} ms\n")
+
+    if args.replay:
+        for label, before in (("before", True), ("after", False)):
+            timings = [replay(base_url, args.rtt / 1000, before) for _ in range(args.runs)]
+            print(f"topic list {label:6}  median {statistics.median(timings) * 1000:7.1f} ms")
+        return
+
+    results = list(browser_runs(base_url, args.rtt, args.runs))
+    timings = [painted_ms for painted_ms, _ in results]
+    list_requests = max(requests for _, requests in results)
+    print(f"topic list  median {statistics.median(timings):7.1f} ms   /api/topics requests: {list_requests}")
+
+
+if __name__ == "__main__":
+    main()
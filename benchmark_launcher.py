@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Launcher benchmark: run.sh's single uvicorn process versus app.server.
+
+Starts each launcher against the same SQLite catalogue (the sample topics
+plus --topics synthetic ones, warm audio) and drives it with a closed
+loop of --connections keep-alive connections requesting a mix of topic,
+FAQ, topic list and health URLs for --duration seconds. Reports requests
+per second, p50/p99 latency and errors per launcher (the median of
+--rounds alternating runs). The production launcher is then run again
+with a reload (SIGHUP) in the middle of the load, which should cost no
+failed requests, and stopped with SIGTERM.
+
+The client shares the machine with the server: on a small machine its
+CPU use (reported) limits the numbers for every launcher alike.
+
+Usage:
+    python benchmark_launcher.py [--duration 10] [--connections 32] [--workers 0] [--rounds 3]
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPO_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_catalogue(sandbox: Path, topics: int) -> List[str]:
+    """Seed a SQLite catalogue in the sandbox; returns the URLs to request."""
+    from app import db
+    from app.repository import SQLiteRepository, set_repository
+    from app.seed_data import seed_database
+    from benchmarks.fakes import seed_synthetic_catalogue
+
+    repository = SQLiteRepository(str(sandbox / "catalogue.sqlite3"))
+    set_repository(repository)
+    seed_database()
+    seed_synthetic_catalogue(topics)
+
+    # Weighted like a session: topic and FAQ opens dominate
+    topic_ids = [topic["id"] for topic in db.get_all_topics()]
+    faq_ids = [faq["id"] for topic_id in topic_ids[:50] for faq in db.get_faqs_by_topic_id(topic_id)]
+    paths = [f"/api/topics/{topic_id}" for topic_id in topic_ids[:50]] * 2
+    paths += [f"/api/faqs/{faq_id}" for faq_id in faq_ids]
+    paths += ["/api/topics"] * 10 + ["/health"] * 10
+    repository.close()
+    set_repository(None)
+    return paths
+
+
+def start(command: List[str], sandbox: Path, env: Dict[str, str], port: int) -> subprocess.Popen:
+    """Start a launcher and wait until it answers /health."""
+    process = subprocess.Popen(
+        command, cwd=sandbox, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{command} did not start")
+
+
+def stop(process: subprocess.Popen) -> Tuple[float, int]:
+    """SIGTERM the launcher; returns (seconds to exit, exit code)."""
+    started = time.monotonic()
+    process.send_signal(signal.SIGTERM)
+    try:
+        code = process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        code = process.wait()
+    return time.monotonic() - started, code
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+    """Read one HTTP/1.1 response. Returns (status, server closes the connection)."""
+    status_line = await reader.readuntil(b"\r\n")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", "0")))
+    return status, headers.get("connection") == "close"
+
+
+async def _connection(
+    port: int, paths: List[str], until: float, rng: random.Random, results: Dict[str, Any]
+):
+    """
+    One keep-alive client connection, requesting until `until`. Like a
+    browser, a request is retried once on a new connection when a reused
+    one turns out to be closed (a stopping worker closes idle connections).
+    """
+    reader = writer = None
+    while time.perf_counter() < until:
+        path = rng.choice(paths)
+        started = time.perf_counter()
+        for retry in (True, False):
+            reused = writer is not None
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: benchmark\r\n\r\n".encode())
+                status, closing = await asyncio.wait_for(_read_response(reader), 10)
+                break
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                if writer is not None:
+                    writer.close()
+                writer = None
+                closed_before_reply = isinstance(e, (ConnectionError, asyncio.IncompleteReadError))
+                if not (retry and reused and closed_before_reply):
+                    status = None
+                    break
+        if status is None:
+            results["errors"] += 1
+            await asyncio.sleep(0.01)
+            continue
+        results["latencies"].append((time.perf_counter() - started) * 1000)
+        if status >= 400:
+            results["errors"] += 1
+        if closing:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def drive(
+    port: int, paths: List[str], duration: float, connections: int, during: Optional[Tuple[float, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run the closed loop for `duration` seconds. `during` = (delay, callable)
+    calls the callable that many seconds into the run (e.g. to send SIGHUP).
+    """
+    results: Dict[str, Any] = {"latencies": [], "errors": 0}
+
+    async def run():
+        until = time.perf_counter() + duration
+        tasks = [
+            asyncio.create_task(_connection(port, paths, until, random.Random(number), results))
+            for number in range(connections)
+        ]
+        if during:
+            await asyncio.sleep(during[0])
+            during[1]()
+        await asyncio.gather(*tasks)
+
+    cpu_start = time.process_time()
+    started = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(results["latencies"])
+    return {
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))], 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+        "errors": results["errors"],
+        "client_cpu": round((time.process_time() - cpu_start) / elapsed, 2),
+    }
+
+
+def print_row(label: str, result: Dict[str, Any]):
+    print(
+        f"{label:34} {result['requests_per_sec']:9.1f} {result['p50_ms']:8.2f} "
+        f"{result['p99_ms']:8.2f} {result['max_ms']:9.2f} {result['errors']:7} {result['client_cpu']:6.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=0, help="app.server workers (0 = sized from CPUs)")
+    parser.add_argument("--topics", type=int, default=200, help="synthetic topics to add")
+    parser.add_argument("--rounds", type=int, default=3, help="runs per launcher (median reported)")
+    args = parser.parse_args()
+
+    os.environ["LOG_LEVEL"] = "WARNING"
+    from benchmarks.fakes import make_sandbox
+
+    cwd = os.getcwd()
+    sandbox = make_sandbox()
+    os.chdir(cwd)
+    paths = prepare_catalogue(sandbox, args.topics)
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(REPO_ROOT),
+        DB_BACKEND="sqlite",
+        SQLITE_PATH=str(sandbox / "catalogue.sqlite3"),
+        PORT=str(port),
+        LOG_LEVEL="WARNING",
+        ADMISSION_CONTROL="0",
+    )
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+
+    from app.server import worker_count
+
+    launchers = [
+        (
+            "run.sh (uvicorn --reload)",
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--reload", "--host", "127.0.0.1", "--port", str(port)],
+        ),
+        (f"app.server ({args.workers or worker_count()} workers)", [sys.executable, "-m", "app.server"]),
+    ]
+
+    print("🚀 Avatar Teacher - Launcher Benchmark")
+    print("=" * 86)
+    print(
+        f"CPUs: {os.cpu_count()}   connections: {args.connections}   "
+        f"duration: {args.duration:.0f}s   rounds: {args.rounds}"
+    )
+
+    runs: Dict[str, List[Dict[str, Any]]] = {label: [] for label, _ in launchers}
+    try:
+        # Alternate the launchers so drift on the machine affects both alike
+        for _ in range(args.rounds):
+            for label, command in launchers:
+                process = start(command, sandbox, env, port)
+                drive(port, paths, 1, args.connections)  # warm caches and connections
+                runs[label].append(drive(port, paths, args.duration, args.connections))
+                stop(process)
+
+        print(f"\n{'launcher (median round)':34} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>9} {'errors':>7} {'client':>6}")
+        for label, results in runs.items():
+            results.sort(key=lambda result: result["requests_per_sec"])
+            print_row(label, results[len(results) // 2])
+
+        # Reload and stop the production launcher under load
+        label, command = launchers[-1]
+        process = start(command, sandbox, env, port)
+        drive(port, paths, 1, args.connections)
+        reload = (args.duration / 3, lambda: process.send_signal(signal.SIGHUP))
+        print_row("app.server, SIGHUP mid-run", drive(port, paths, args.duration, args.connections, reload))
+        seconds, code = stop(process)
+        print(f"app.server SIGTERM → exit {seconds:.1f}s (exit code {code})")
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-audio benchmark for topic open and FAQ click.
+
+Replays the requests static/app.js makes, headlessly, against a running
+server. An artificial round-trip time is added to every request to model a
+mobile connection.
+
+- before: the old flow. Fetch JSON, wait the fixed 100 ms delay, fetch audio.
+  Every FAQ click fetches its JSON and audio on demand.
+- after: the current flow. No fixed delay. FAQ JSON (marked as a prefetch)
+  and the answer audio named in the topic's Link preload header are
+  prefetched during topic playback, so a click plays from memory.
+
+Usage:
+    python benchmark_preload.py [--base-url http://localhost:8000] [--rtt 150] [--runs 5]
+"""
+
+import argparse
+import json
+import re
+import statistics
+import time
+import urllib.request
+
+OLD_PLAY_DELAY = 0.1  # the setTimeout(..., 100) app.js used before play()
+FIRST_AUDIO_BYTES = 16 * 1024  # enough for the browser to start decoding
+
+_LINK_PATTERN = re.compile(r"<([^>]+)>")
+
+
+class Client:
+    """Minimal HTTP client that adds a simulated round-trip to every request."""
+
+    def __init__(self, base_url: str, rtt: float):
+        self.base_url = base_url.rstrip("/")
+        self.rtt = rtt
+
+    def get(self, path: str, first_bytes: int = None, prefetch: bool = False):
+        request = urllib.request.Request(self.base_url + path)
+        if prefetch:
+            request.add_header("Purpose", "prefetch")
+        if first_bytes:
+            request.add_header("Range", f"bytes=0-{first_bytes - 1}")
+        time.sleep(self.rtt)
+        with urllib.request.urlopen(request) as response:
+            return response.headers, response.read()
+
+    def get_json(self, path: str):
+        headers, body = self.get(path)
+        return headers, json.loads(body)
+
+
+def topic_open(client: Client, topic_id: str, before: bool) -> float:
+    """Seconds from clicking a topic until the first audio bytes arrive."""
+    start = time.perf_counter()
+    _, topic = client.get_json(f"/api/topics/{topic_id}")
+    if before:
+        time.sleep(OLD_PLAY_DELAY)
+    client.get(topic["audio_url"], FIRST_AUDIO_BYTES)
+    return time.perf_counter() - start
+
+
+def faq_click(client: Client, topic_id: str, before: bool) -> float:
+    """Seconds from clicking the first FAQ until its audio is available."""
+    headers, topic = client.get_json(f"/api/topics/{topic_id}")
+    faq_id = topic["faqs"][0]["id"]
+
+    prefetched = {}
+    if not before:
+        # Done during topic playback, so it is not part of the click latency
+        prefetched[f"/api/faqs/{faq_id}"] = client.get(f"/api/faqs/{faq_id}", prefetch=True)[1]
+        for url in _LINK_PATTERN.findall(headers.get("Link", "")):
+            if url.startswith("/static/media/audio/faq"):
+                prefetched[url] = client.get(url)[1]
+
+    start = time.perf_counter()
+    faq_body = prefetched.get(f"/api/faqs/{faq_id}")
+    if faq_body is None:
+        _, faq = client.get_json(f"/api/faqs/{faq_id}")
+    else:
+        faq = json.loads(faq_body)
+
+    if faq["answer_audio_url"] not in prefetched:
+        if before:
+            time.sleep(OLD_PLAY_DELAY)
+        client.get(faq["answer_audio_url"], FIRST_AUDIO_BYTES)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rtt", type=float, default=150, help="simulated RTT in ms")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    client = Client(args.base_url, args.rtt / 1000)
+    _, topics = client.get_json("/api/topics")
+    topic_id = topics[0]["id"]
+
+    print("⏱  Avatar Teacher - Time to First Audio")
+    print("=" * 60)
+    print(f"Server: {args.base_url}   simulated RTT: {args.rtt:.0f} ms\n")
+
+    for name, measure in (("topic open", topic_open), ("FAQ click", faq_click)):
+        for label, before in (("before", True), ("after", False)):
+            timings = [measure(client, topic_id, before) for _ in range(args.runs)]
+            print(f"{name:10} {label:6}  median {statistics.median(timings) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Idle subscriber load test for the topic events (SSE) endpoint.
+
+Starts the API in a subprocess, opens N idle Server-Sent Events connections
+to /api/topics/{id}/events, and reports the server's resident memory
+growth per connection. Requires the same MongoDB as the app itself.
+
+Usage:
+    python benchmark_sse.py [--subscribers 5000] [--port 8012]
+"""
+
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+import json
+
+
+def read_rss_kb(pid: int) -> int:
+    """Get a process's resident set size in KB (Linux)."""
+    with open(f"/proc/{pid}/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise RuntimeError("VmRSS not found")
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Run uvicorn and wait until it is ready."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise TimeoutError("Server did not become ready")
+
+
+async def open_subscriber(port: int, topic_id: str):
+    """Open one SSE connection and wait for the first message."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /api/topics/{topic_id}/events HTTP/1.1\r\n"
+        f"Host: 127.0.0.1:{port}\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    while True:
+        line = await reader.readline()
+        if not line or line.startswith(b"retry:"):
+            break
+    return reader, writer
+
+
+async def run(port: int, topic_id: str, subscribers: int, pid: int):
+    baseline_kb = read_rss_kb(pid)
+
+    connections = []
+    start = time.perf_counter()
+    batch = 200  # don't overflow the listen backlog
+    for offset in range(0, subscribers, batch):
+        count = min(batch, subscribers - offset)
+        connections += await asyncio.gather(
+            *(open_subscriber(port, topic_id) for _ in range(count))
+        )
+    elapsed = time.perf_counter() - start
+
+    await asyncio.sleep(1)
+    loaded_kb = read_rss_kb(pid)
+
+    print(f"Subscribers opened : {len(connections)} in {elapsed:.1f} s")
+    print(f"Server RSS         : {baseline_kb / 1024:.1f} MB -> {loaded_kb / 1024:.1f} MB")
+    print(f"Per connection     : {(loaded_kb - baseline_kb) / len(connections):.1f} KB")
+
+    for _, writer in connections:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8012)
+    args = parser.parse_args()
+
+    # Each subscriber needs a file descriptor on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if args.subscribers + 100 > hard:
+        print(f"⚠️  File descriptor limit {hard} is too low for {args.subscribers} subscribers")
+        return
+
+    print("📡 Avatar Teacher - SSE Idle Subscriber Load Test")
+    print("=" * 60)
+
+    process = start_server(args.port)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{args.port}/api/topics") as response:
+            topic_id = json.loads(response.read())[0]["id"]
+        asyncio.run(run(args.port, topic_id, args.subscribers, process.pid))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
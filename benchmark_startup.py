@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark for the Avatar Teacher API.
+
+Measures:
+1. Import time of app.main in a fresh interpreter
+2. Time from process launch to the first successful /health response
+3. Time from process launch to /ready returning 200
+
+Each startup mode (blocking / background) is measured separately, which is
+what matters for container autoscaling: the orchestrator can route traffic
+once /health answers, and sends real load once /ready does.
+
+Usage:
+    python benchmark_startup.py [--runs 5] [--port 8011]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import_time(runs: int) -> list:
+    """Import app.main in a fresh interpreter and return the timings in seconds."""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, "-c", IMPORT_SNIPPET], stderr=subprocess.DEVNULL
+        )
+        timings.append(float(output.decode().strip().splitlines()[-1]))
+    return timings
+
+
+def _wait_for(url: str, deadline: float) -> float:
+    """Poll a URL until it returns 200. Returns the time it first succeeded."""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not become available")
+
+
+def measure_first_response(mode: str, port: int, timeout: float = 60.0) -> dict:
+    """
+    Launch uvicorn in the given startup mode and time /health and /ready.
+
+    Returns:
+        dict: Seconds from launch to first /health and first /ready response
+    """
+    env = dict(os.environ, STARTUP_MODE=mode)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        health_at = _wait_for(f"http://127.0.0.1:{port}/health", deadline)
+        ready_at = _wait_for(f"http://127.0.0.1:{port}/ready", deadline)
+        return {"health": health_at - start, "ready": ready_at - start}
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def _summary(values: list) -> str:
+    return (
+        f"median {statistics.median(values) * 1000:7.1f} ms  "
+        f"min {min(values) * 1000:7.1f} ms  max {max(values) * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8011)
+    args = parser.parse_args()
+
+    print("🚀 Avatar Teacher - Cold Start Benchmark")
+    print("=" * 60)
+
+    print("\nImport time (import app.main):")
+    print(f"  {_summary(measure_import_time(args.runs))}")
+
+    for mode in ("blocking", "background"):
+        health, ready = [], []
+        for _ in range(args.runs):
+            result = measure_first_response(mode, args.port)
+            health.append(result["health"])
+            ready.append(result["ready"])
+        print(f"\nSTARTUP_MODE={mode}")
+        print(f"  first /health: {_summary(health)}")
+        print(f"  first /ready : {_summary(ready)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Benchmarks and load tools for the Avatar Teacher API.
+"""
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Parametric synthetic catalogue generator for scale testing.
+
+Generates topics and FAQs with a configurable language mix (en/hi/mixed),
+narration and answer lengths drawn from log-normal distributions, and a
+per-topic FAQ fan-out (fixed, uniform or heavy-tailed), and writes them
+with the repository's bulk insert_many in batches. The same seed always
+produces the same catalogue.
+
+Usage:
+    python -m benchmarks.datagen --topics 100000
+    python -m benchmarks.datagen --topics 1000000 --languages en=0.5,hi=0.3,mixed=0.2 \\
+        --faqs 5 --fanout zipf --faqs-max 200 --cold-audio
+    DB_BACKEND=sqlite SQLITE_PATH=/tmp/big.sqlite3 python -m benchmarks.datagen --topics 1000000
+"""
+
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import timedelta
+from pathlib import Path
+import argparse
+import math
+import random
+import sys
+import time
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+FANOUTS = ("fixed", "uniform", "zipf")
+
+# Sample files shipped in static/media/audio, used when audio is generated "warm"
+TOPIC_AUDIO = ["/static/media/audio/topic_1.mp3", "/static/media/audio/topic_2.mp3"]
+FAQ_AUDIO = [f"/static/media/audio/faq_{number}.mp3" for number in range(1, 5)]
+
+SUBJECTS = [
+    "Photosynthesis", "Gravity", "Fractions", "Volcanoes", "Electricity", "Magnetism",
+    "Democracy", "Ecosystems", "Algebra", "Weather", "Digestion", "Geometry",
+    "Tides", "Cells", "Energy", "Sound", "Light", "Climate", "Rivers", "Atoms",
+]
+ENGLISH_WORDS = (
+    "the of and a to in is that it for as with was on are by this be from or have an "
+    "energy water plant light force earth moon sun cell heat matter motion number shape "
+    "angle river rain cloud soil rock air sound wave speed mass weight atom charge "
+    "current field system process change because when which every many small large "
+    "explain observe measure compare example experiment result pattern reason"
+).split()
+HINDI_WORDS = (
+    "और का की के है में से को यह एक पर भी था हैं कि जो तो ही नहीं "
+    "ऊर्जा पानी पौधा प्रकाश बल पृथ्वी चंद्रमा सूर्य कोशिका गर्मी गति संख्या आकार "
+    "नदी बारिश बादल मिट्टी चट्टान हवा ध्वनि तरंग वजन परमाणु उदाहरण प्रयोग परिणाम कारण"
+).split()
+LANGUAGE_WORDS = {
+    "en": ENGLISH_WORDS,
+    "hi": HINDI_WORDS,
+    # Code-mixed narration draws from both vocabularies
+    "mixed": ENGLISH_WORDS + HINDI_WORDS,
+}
+QUESTION_STARTS = {
+    "en": ["Why does", "How does", "What is", "When does", "Where does"],
+    "hi": ["क्यों", "कैसे", "क्या है", "कब", "कहाँ"],
+    "mixed": ["Why does", "क्यों", "How does", "कैसे", "What is"],
+}
+
+
+class CatalogueSpec:
+    """
+    What to generate.
+
+    Args:
+        topics: Number of topics
+        languages: {language: weight}, e.g. {"en": 0.5, "hi": 0.3, "mixed": 0.2}
+        content_words: (median, sigma) of the log-normal narration length in words
+        answer_words: (median, sigma) of the log-normal FAQ answer length in words
+        faqs: Mean FAQs per topic
+        fanout: "fixed" (exactly `faqs`), "uniform" (0 to 2x `faqs`) or
+                "zipf" (heavy-tailed: most topics have a few, some have many)
+        faqs_max: Upper bound on FAQs per topic
+        audio: Set audio URLs to the sample files (False: cold, no audio yet)
+        seed: Random seed
+    """
+
+    def __init__(
+        self,
+        topics: int,
+        languages: Optional[Dict[str, float]] = None,
+        content_words: Tuple[float, float] = (150, 0.5),
+        answer_words: Tuple[float, float] = (40, 0.5),
+        faqs: float = 5,
+        fanout: str = "fixed",
+        faqs_max: int = 50,
+        audio: bool = True,
+        seed: int = 0,
+    ):
+        if fanout not in FANOUTS:
+            raise ValueError(f"Unknown fan-out {fanout!r}, expected one of {', '.join(FANOUTS)}")
+        unknown = set(languages or ()) - set(LANGUAGE_WORDS)
+        if unknown:
+            raise ValueError(f"Unknown languages: {', '.join(sorted(unknown))}")
+
+        self.topics = topics
+        self.languages = languages or {"en": 1.0}
+        self.content_words = content_words
+        self.answer_words = answer_words
+        self.faqs = faqs
+        self.fanout = fanout
+        self.faqs_max = faqs_max
+        self.audio = audio
+        self.seed = seed
+
+
+def parse_languages(value: str) -> Dict[str, float]:
+    """Parse "en=0.5,hi=0.3,mixed=0.2" into a weight mapping."""
+    weights = {}
+    for item in filter(None, value.split(",")):
+        language, _, weight = item.partition("=")
+        weights[language.strip()] = float(weight or 1)
+    return weights
+
+
+class _Generator:
+    """Draws documents for a spec from one seeded random stream."""
+
+    def __init__(self, spec: CatalogueSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.languages = list(spec.languages)
+        self.language_weights = [spec.languages[language] for language in self.languages]
+
+        from app.repository import utcnow
+
+        self.now = utcnow()
+        # Zipf-like fan-out: Pareto draws scaled so the mean is about spec.faqs
+        self.pareto_alpha = 1.5
+        self.pareto_scale = spec.faqs * (self.pareto_alpha - 1) / self.pareto_alpha
+
+    def words(self, language: str, median: float, sigma: float) -> str:
+        count = max(3, int(self.rng.lognormvariate(math.log(median), sigma)))
+        return " ".join(self.rng.choices(LANGUAGE_WORDS[language], k=count)).capitalize() + "."
+
+    def faq_count(self) -> int:
+        spec = self.spec
+        if spec.fanout == "fixed":
+            count = round(spec.faqs)
+        elif spec.fanout == "uniform":
+            count = self.rng.randint(0, round(2 * spec.faqs))
+        else:
+            count = int(self.pareto_scale * self.rng.paretovariate(self.pareto_alpha))
+        return min(count, spec.faqs_max)
+
+    def timestamp(self):
+        # Spread over the last year, at the millisecond precision the repositories store
+        return self.now - timedelta(milliseconds=self.rng.randrange(365 * 24 * 3600 * 1000))
+
+    def topic(self, number: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        from bson import ObjectId
+
+        spec = self.spec
+        rng = self.rng
+        language = rng.choices(self.languages, self.language_weights)[0]
+        topic_id = str(ObjectId())
+        created_at = self.timestamp()
+        topic = {
+            "id": topic_id,
+            "title": f"{rng.choice(SUBJECTS)} {number}",
+            "content_text": self.words(language, *spec.content_words),
+            "language": language,
+            "audio_url": TOPIC_AUDIO[number % len(TOPIC_AUDIO)] if spec.audio else None,
+            "avatar_video_url": "/static/media/avatar_loop.mp4",
+            "version": 1,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+        faqs = []
+        for faq_number in range(self.faq_count()):
+            question = f"{rng.choice(QUESTION_STARTS[language])} {rng.choice(LANGUAGE_WORDS[language])} {faq_number}?"
+            faqs.append(
+                {
+                    "topic_id": topic_id,
+                    "question": question,
+                    "answer": self.words(language, *spec.answer_words),
+                    "language": language,
+                    "answer_audio_url": FAQ_AUDIO[faq_number % len(FAQ_AUDIO)] if spec.audio else None,
+                    "version": 1,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+        return topic, faqs
+
+
+def iter_batches(
+    spec: CatalogueSpec, batch: int = 5000
+) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Yield (topics, their FAQs) in batches of `batch` topics."""
+    generator = _Generator(spec)
+    for start in range(0, spec.topics, batch):
+        topic_docs, faq_docs = [], []
+        for number in range(start, min(start + batch, spec.topics)):
+            topic, faqs = generator.topic(number)
+            topic_docs.append(topic)
+            faq_docs.extend(faqs)
+        yield topic_docs, faq_docs
+
+
+def generate_catalogue(spec: CatalogueSpec, batch: int = 5000, progress: bool = False) -> Dict[str, Any]:
+    """
+    Generate a catalogue into the configured repository with bulk inserts.
+
+    Returns:
+        dict: Topics and FAQs inserted, and the time taken
+    """
+    from app.db import mark_catalogue_changed
+    from app.repository import get_repository, TOPICS, FAQS
+
+    repository = get_repository()
+    repository.ensure_indexes()
+    start = time.perf_counter()
+    topics = faqs = 0
+    for topic_docs, faq_docs in iter_batches(spec, batch):
+        topics += repository.insert_many(TOPICS, topic_docs)
+        faqs += repository.insert_many(FAQS, faq_docs)
+        if progress:
+            print(f"\r  {topics:,}/{spec.topics:,} topics, {faqs:,} FAQs", end="", flush=True)
+    if progress:
+        print()
+    mark_catalogue_changed()
+    return {"topics": topics, "faqs": faqs, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """The catalogue shape options, shared with the scaling report."""
+    parser.add_argument("--languages", default="en=0.5,hi=0.3,mixed=0.2", help="language=weight,...")
+    parser.add_argument("--content-words", type=float, default=150, help="median narration words")
+    parser.add_argument("--answer-words", type=float, default=40, help="median FAQ answer words")
+    parser.add_argument("--length-sigma", type=float, default=0.5, help="log-normal sigma of lengths")
+    parser.add_argument("--faqs", type=float, default=5, help="mean FAQs per topic")
+    parser.add_argument("--fanout", choices=FANOUTS, default="fixed")
+    parser.add_argument("--faqs-max", type=int, default=50)
+    parser.add_argument("--cold-audio", action="store_true", help="leave audio URLs unset")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def spec_from_args(args: argparse.Namespace, topics: int) -> CatalogueSpec:
+    return CatalogueSpec(
+        topics,
+        languages=parse_languages(args.languages),
+        content_words=(args.content_words, args.length_sigma),
+        answer_words=(args.answer_words, args.length_sigma),
+        faqs=args.faqs,
+        fanout=args.fanout,
+        faqs_max=args.faqs_max,
+        audio=not args.cold_audio,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--topics", type=int, required=True)
+    parser.add_argument("--batch", type=int, default=5000, help="topics per bulk insert")
+    parser.add_argument("--clear", action="store_true", help="delete the existing catalogue first")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    from app.db import clear_catalogue, count_topics
+    from app.repository import get_repository
+
+    print("🏭 Avatar Teacher - Synthetic Catalogue")
+    print("=" * 60)
+    print(f"Backend: {get_repository().name}   existing topics: {count_topics():,}")
+    if args.clear:
+        clear_catalogue()
+
+    result = generate_catalogue(spec_from_args(args, args.topics), args.batch, progress=True)
+    rate = (result["topics"] + result["faqs"]) / max(result["seconds"], 1e-9)
+    print(
+        f"✓ Inserted {result['topics']:,} topics and {result['faqs']:,} FAQs "
+        f"in {result['seconds']:.1f}s ({rate:,.0f} documents/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
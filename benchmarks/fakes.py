@@ -0,0 +1,169 @@
+"""
+Stand-ins for external services, so benchmarks and load tests run without
+MongoDB or network access to Google TTS.
+
+Requires the development dependencies:
+    pip install -r requirements-dev.txt
+"""
+
+from typing import Optional
+from pathlib import Path
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# One silent MPEG-2 Layer III frame: 64 kbps, 24 kHz, 576 samples (24 ms), 192 bytes
+SILENT_FRAME = b"\xff\xf3\x84\xc4" + b"\x00" * 188
+FRAME_SECONDS = 576 / 24000
+
+# Rough speaking rate used to size fake audio
+CHARS_PER_SECOND = 15
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class FakeTTS:
+    """
+    Drop-in replacement for gTTS that writes valid silent MP3 files.
+
+    The file length matches a typical speaking rate, so MP3 duration, HLS
+    packaging and timing tracks behave as with real audio. Set `latency`
+    (seconds) to model the time a real synthesis call takes, and `capacity`
+    to model a service that handles only so many calls at once (the rest
+    wait their turn). A call that can't finish within `timeout` fails after
+    `timeout` seconds, like gTTS's HTTP requests.
+    """
+
+    latency = 0.0
+    capacity: Optional[threading.Semaphore] = None
+
+    def __init__(self, text: str, lang: str = "en", slow: bool = False, timeout: float = None):
+        self.text = text
+        self.lang = lang
+        self.timeout = timeout
+
+    def save(self, path: str):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        if self.capacity is not None and not self.capacity.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Fake synthesis timed out after {self.timeout:.2f}s")
+        try:
+            if deadline is not None and time.monotonic() + self.latency > deadline:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                raise TimeoutError(f"Fake synthesis timed out after {self.timeout:.2f}s")
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            if self.capacity is not None:
+                self.capacity.release()
+        seconds = max(len(self.text) / CHARS_PER_SECOND, FRAME_SECONDS)
+        Path(path).write_bytes(SILENT_FRAME * int(seconds / FRAME_SECONDS))
+
+
+def install_fake_tts(latency: float = 0.0, capacity: int = 0) -> type:
+    """
+    Route all synthesis through FakeTTS with the given per-call latency
+    and, if `capacity` is set, at most that many calls in progress.
+    """
+    from app.tts_stub import set_tts_engine
+
+    FakeTTS.latency = latency
+    FakeTTS.capacity = threading.Semaphore(capacity) if capacity else None
+    set_tts_engine(FakeTTS)
+    return FakeTTS
+
+
+def install_mongomock(database_name: str = "edtech_benchmark"):
+    """
+    Point app.db at an in-memory mongomock database.
+
+    Returns:
+        The mongomock database instance
+    """
+    try:
+        import mongomock
+    except ImportError:
+        raise ImportError("mongomock not installed. Install with: pip install mongomock")
+
+    from app.repository import MongoRepository, set_repository
+
+    database = mongomock.MongoClient()[database_name]
+    set_repository(MongoRepository(database=database))
+    return database
+
+
+def install_sqlite(path: str = "catalogue.sqlite3"):
+    """
+    Point app.db at a fresh SQLite file (relative paths land in the
+    current directory, i.e. the sandbox).
+
+    Returns:
+        The SQLiteRepository instance
+    """
+    from app.repository import SQLiteRepository, set_repository
+
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    repository = SQLiteRepository(path)
+    set_repository(repository)
+    return repository
+
+
+def make_sandbox(copy_audio: bool = True) -> Path:
+    """
+    Create a temporary working directory with the static/ layout the app
+    expects, and chdir into it so generated audio doesn't land in the repo.
+
+    Returns:
+        Path: The sandbox directory
+    """
+    sandbox = Path(tempfile.mkdtemp(prefix="avatar-bench-"))
+    audio_dir = sandbox / "static" / "media" / "audio"
+    audio_dir.mkdir(parents=True)
+    # The page and its assets, so browser benchmarks can load the frontend
+    for name in ("index.html", "app.js", "styles.css", "sw.js"):
+        shutil.copy(REPO_ROOT / "static" / name, sandbox / "static" / name)
+    if copy_audio:
+        for mp3 in (REPO_ROOT / "static" / "media" / "audio").glob("*.mp3"):
+            shutil.copy(mp3, audio_dir / mp3.name)
+    os.chdir(sandbox)
+    return sandbox
+
+
+def setup_environment(
+    tts_latency: float = 0.0, database: Optional[str] = None, tts_capacity: int = 0
+) -> Path:
+    """
+    Sandbox directory + mongomock + fake TTS, in the order the app needs.
+    Must be called before importing app.main (StaticFiles checks the
+    static/ directory when the app is created).
+    With DB_BACKEND=sqlite the catalogue lives in a SQLite file in the
+    sandbox instead of mongomock.
+
+    Returns:
+        Path: The sandbox directory
+    """
+    sandbox = make_sandbox()
+    if os.getenv("DB_BACKEND") == "sqlite":
+        install_sqlite()
+    else:
+        install_mongomock(database or "edtech_benchmark")
+    install_fake_tts(tts_latency, tts_capacity)
+    return sandbox
+
+
+def seed_synthetic_catalogue(topics: int, faqs_per_topic: int = 5, batch: int = 1000) -> int:
+    """
+    Insert a generated catalogue straight into the current database:
+    `topics` English topics with `faqs_per_topic` FAQs each, with audio
+    URLs set. See benchmarks/datagen.py for other shapes.
+
+    Returns:
+        int: Number of documents inserted
+    """
+    from benchmarks.datagen import CatalogueSpec, generate_catalogue
+
+    spec = CatalogueSpec(topics, languages={"en": 1.0}, faqs=faqs_per_topic, faqs_max=faqs_per_topic)
+    result = generate_catalogue(spec, batch)
+    return result["topics"] + result["faqs"]
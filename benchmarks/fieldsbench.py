@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Sparse fieldset benchmark: payload bytes and latency with and without
+`fields=` on large topics.
+
+Generates --topics topics with long narrations (--content-words) and
+--faqs FAQs each, then times GET /api/topics/{id}, GET /api/faqs/{id} and
+GET /api/topics in-process over ASGI, in full and with the fieldsets a
+client typically needs. The db.* cases time the database read alone (full
+document vs projection), which is where MongoDB saves transfer.
+
+Usage:
+    python -m benchmarks.fieldsbench
+    python -m benchmarks.fieldsbench --backend mongomock --content-words 5000 --faqs 50
+    python -m benchmarks.fieldsbench --mongodb-uri mongodb://localhost:27017
+"""
+
+from typing import List, Tuple
+from pathlib import Path
+import argparse
+import asyncio
+import itertools
+import os
+import shutil
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.datagen import CatalogueSpec, generate_catalogue  # noqa: E402
+from benchmarks.scalebench import SCRATCH_DATABASE, time_case, use_backend  # noqa: E402
+
+# (URL template, fields) per measured request; {topic} and {faq} are filled in
+REQUESTS: List[Tuple[str, str]] = [
+    ("/api/topics/{topic}", ""),
+    ("/api/topics/{topic}", "title,audio_url"),
+    ("/api/topics/{topic}", "title,audio_url,faqs"),
+    ("/api/topics/{topic}", "content_text"),
+    ("/api/faqs/{faq}", ""),
+    ("/api/faqs/{faq}", "question,answer_audio_url"),
+    ("/api/topics", ""),
+    ("/api/topics", "title,audio_url"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--content-words", type=float, default=3000, help="median narration length")
+    parser.add_argument("--faqs", type=int, default=30, help="FAQs per topic")
+    parser.add_argument("--backend", choices=["sqlite", "mongomock"], default="sqlite")
+    parser.add_argument("--mongodb-uri", default="", help="measure a real server instead")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per case")
+    args = parser.parse_args()
+
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ.setdefault("ANALYTICS", "0")
+    from benchmarks.fakes import make_sandbox
+
+    scratch = make_sandbox(copy_audio=True)
+
+    import httpx
+    from app import db
+    from app.main import app
+
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(app=app, base_url="http://benchmark")
+
+    def get(path: str):
+        response = loop.run_until_complete(client.get(path))
+        response.raise_for_status()
+        return response
+
+    backend = "mongodb" if args.mongodb_uri else args.backend
+    print("🧩 Avatar Teacher - Sparse Fieldset Benchmark")
+    print("=" * 86)
+    print(
+        f"Backend: {backend}   topics: {args.topics}   "
+        f"narration: ~{args.content_words:.0f} words   FAQs/topic: {args.faqs}"
+    )
+
+    try:
+        use_backend(args, scratch, args.topics)
+        spec = CatalogueSpec(
+            args.topics, content_words=(args.content_words, 0.3), answer_words=(200, 0.3), faqs=args.faqs
+        )
+        generate_catalogue(spec)
+        topic_ids = [topic["id"] for topic in db.get_all_topics()]
+        faq_ids = [faq["id"] for faq in db.get_faqs_by_topic_id(topic_ids[0])]
+        topics, faqs = itertools.cycle(topic_ids), itertools.cycle(faq_ids)
+
+        print(f"\n{'request':52} {'bytes':>10} {'median ms':>10} {'p90 ms':>8}")
+        for template, fields in REQUESTS:
+            query = f"?fields={fields}" if fields else ""
+            size = len(get(template.format(topic=topic_ids[0], faq=faq_ids[0]) + query).content)
+
+            def request(template=template, query=query):
+                get(template.format(topic=next(topics), faq=next(faqs)) + query)
+                return 1
+
+            case = time_case(request, args.min_time)
+            label = f"{template}{query}"
+            print(f"{label:52} {size:10,} {case['median_ms']:10.3f} {case['p90_ms']:8.3f}")
+
+        print(f"\n{'database read':52} {'':>10} {'median ms':>10} {'p90 ms':>8}")
+        reads = [("db.get_topic_by_id", None), ("db.get_topic_by_id[title,audio_url]", ("title", "audio_url"))]
+        for label, fields in reads:
+            case = time_case(lambda fields=fields: len([db.get_topic_by_id(next(topics), fields)]), args.min_time)
+            print(f"{label:52} {'':>10} {case['median_ms']:10.3f} {case['p90_ms']:8.3f}")
+    finally:
+        db.get_repository().close()
+        if args.mongodb_uri:
+            from pymongo import MongoClient
+
+            MongoClient(args.mongodb_uri).drop_database(SCRATCH_DATABASE)
+        loop.run_until_complete(client.aclose())
+        loop.close()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
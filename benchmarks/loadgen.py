@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Session-replay load generator modelled on the frontend flow.
+
+Each virtual user follows static/app.js: list topics -> open a topic ->
+load its timing track and play its audio -> click a few FAQs (answer,
+timing track, audio), with think time between clicks. Sessions arrive as
+a Poisson process at a fixed rate (open loop): a slow server does not slow
+the arrivals down, so queueing shows up as latency and errors instead of
+silently lowering the offered load.
+
+Each rate in --rates runs for --duration seconds against one server
+worker (benchmarks/serve.py: mongomock + fake TTS, unless --url is given).
+The report has throughput, latency percentiles and error rate per step,
+goodput (sessions completed without an error per second), and the
+saturation point: the first rate that drops sessions, errors, or breaks
+the p95 objective. Requests carry the client timeout as a deadline
+(X-Request-Timeout-Ms); 503s from admission control count as errors and
+are also reported as "shed".
+
+Usage:
+    python -m benchmarks.loadgen --rates 5,10,20,40 --duration 20
+    python -m benchmarks.loadgen --cold-audio --tts-latency 0.5
+    python -m benchmarks.loadgen --cold-audio --topics 500 --tts-capacity 4 --rates 2,4,8,16 --keep-going
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --rates 10
+"""
+
+from typing import Dict, Any, List, Optional
+from collections import defaultdict
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.microbench import percentile  # noqa: E402
+
+STEPS = [
+    "list_topics",
+    "open_topic",
+    "topic_timing",
+    "topic_audio",
+    "faq",
+    "faq_timing",
+    "faq_audio",
+    "session",
+]
+
+# A rate is saturated when fewer than this fraction of its sessions finish...
+MIN_COMPLETION = 0.95
+# ...or more than this fraction of requests fail
+MAX_ERROR_RATE = 0.01
+
+# Client CPU use (fraction of one core) above which results are suspect
+CLIENT_CPU_WARNING = 0.8
+
+
+class StepStats:
+    """Latencies (ms) and error count for each step of one run."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, int] = defaultdict(int)
+        self.audio_bytes = 0
+
+    def record(self, step: str, started: float, ok: bool):
+        if ok:
+            self.latencies[step].append((time.perf_counter() - started) * 1000)
+        else:
+            self.errors[step] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        rows = {}
+        for step in STEPS:
+            latencies = sorted(self.latencies.get(step, []))
+            errors = self.errors.get(step, 0)
+            total = len(latencies) + errors
+            if not total:
+                continue
+            rows[step] = {
+                "ok": len(latencies),
+                "errors": errors,
+                "error_rate": round(errors / total, 4),
+                "shed": self.shed.get(step, 0),
+                "per_sec": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(percentile(latencies, 0.50), 1) if latencies else None,
+                "p95_ms": round(percentile(latencies, 0.95), 1) if latencies else None,
+                "p99_ms": round(percentile(latencies, 0.99), 1) if latencies else None,
+            }
+        return rows
+
+
+async def fetch(
+    client, stats: StepStats, step: str, url: str, timeout: float, started: float = None
+):
+    """
+    GET one URL and record its latency under `step`. A request that takes
+    longer than `timeout` seconds in total counts as an error.
+    Audio bodies are read to the end, as the browser does when it plays them.
+
+    Returns:
+        The response, or None on failure
+    """
+    started = started or time.perf_counter()
+    headers = {"X-Request-Timeout-Ms": str(int(timeout * 1000))}
+    try:
+        response = await asyncio.wait_for(client.get(url, headers=headers), timeout)
+        if response.status_code == 503:
+            stats.shed[step] += 1
+        response.raise_for_status()
+        if step.endswith("_audio"):
+            stats.audio_bytes += len(response.content)
+    except Exception:
+        stats.record(step, started, ok=False)
+        return None
+    stats.record(step, started, ok=True)
+    return response
+
+
+async def run_session(
+    client, stats: StepStats, arrival: float, think_time: float, max_faqs: int, timeout: float
+) -> bool:
+    """
+    Replay one user session.
+
+    Args:
+        arrival: perf_counter() time the session was scheduled to start;
+                 the first request and the session total are timed from it
+        think_time: Mean pause (seconds) before each FAQ click
+        max_faqs: Upper bound on FAQ clicks per session
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        bool: True if every request succeeded
+    """
+    response = await fetch(client, stats, "list_topics", "/api/topics", timeout, started=arrival)
+    if response is None or not response.json():
+        return False
+    topic_id = random.choice(response.json())["id"]
+
+    response = await fetch(client, stats, "open_topic", f"/api/topics/{topic_id}", timeout)
+    if response is None:
+        return False
+    topic = response.json()
+
+    ok = True
+    if topic.get("audio_url"):
+        # app.js loads the timing track while the audio starts playing
+        timing, audio = await asyncio.gather(
+            fetch(client, stats, "topic_timing", f"/api/topics/{topic_id}/timing", timeout),
+            fetch(client, stats, "topic_audio", topic["audio_url"], timeout),
+        )
+        ok = timing is not None and audio is not None
+
+    faqs = topic.get("faqs", [])
+    for faq_item in random.sample(faqs, random.randint(0, min(max_faqs, len(faqs)))):
+        if think_time:
+            await asyncio.sleep(random.expovariate(1 / think_time))
+
+        response = await fetch(client, stats, "faq", f"/api/faqs/{faq_item['id']}", timeout)
+        if response is None:
+            ok = False
+            continue
+        faq = response.json()
+        if faq.get("answer_audio_url"):
+            timing, audio = await asyncio.gather(
+                fetch(client, stats, "faq_timing", f"/api/faqs/{faq['id']}/timing", timeout),
+                fetch(client, stats, "faq_audio", faq["answer_audio_url"], timeout),
+            )
+            ok = ok and timing is not None and audio is not None
+
+    stats.record("session", arrival, ok=ok)
+    return ok
+
+
+async def run_rate(
+    base_url: str,
+    rate: float,
+    duration: float,
+    think_time: float,
+    max_faqs: int,
+    timeout: float,
+    drain: float,
+) -> Dict[str, Any]:
+    """
+    Offer sessions at `rate` per second for `duration` seconds.
+
+    Returns:
+        dict: Offered/completed session counts, scheduling lag and per-step stats
+    """
+    import httpx
+
+    stats = StepStats()
+    cpu_start = time.process_time()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        sessions = []
+        start = time.perf_counter()
+        next_arrival = start
+        max_lag = 0.0
+        while next_arrival < start + duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+            sessions.append(
+                asyncio.create_task(
+                    run_session(client, stats, next_arrival, think_time, max_faqs, timeout)
+                )
+            )
+            next_arrival += random.expovariate(rate)
+
+        done, pending = await asyncio.wait(sessions, timeout=drain)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+    completed = sum(1 for task in done if not task.cancelled() and task.result())
+    return {
+        "rate": rate,
+        "offered": len(sessions),
+        "completed": completed,
+        "unfinished": len(pending),
+        "elapsed_s": round(elapsed, 1),
+        "max_lag_ms": round(max_lag * 1000, 1),
+        "client_cpu": round((time.process_time() - cpu_start) / elapsed, 2),
+        "goodput": round(completed / elapsed, 1),
+        "audio_mb": round(stats.audio_bytes / 1e6, 1),
+        "steps": stats.summary(elapsed),
+    }
+
+
+def is_saturated(result: Dict[str, Any], slo_ms: float) -> Optional[str]:
+    """
+    Check a run against the saturation criteria.
+
+    Returns:
+        str: The reason the rate is saturated, or None if it held up
+    """
+    if result["completed"] < MIN_COMPLETION * result["offered"]:
+        return f"only {result['completed']}/{result['offered']} sessions completed"
+    for step, row in result["steps"].items():
+        if row["error_rate"] > MAX_ERROR_RATE:
+            return f"{step} error rate {row['error_rate']:.1%}"
+        if step != "session" and row["p95_ms"] is not None and row["p95_ms"] > slo_ms:
+            return f"{step} p95 {row['p95_ms']:.0f} ms > {slo_ms:.0f} ms"
+    return None
+
+
+def print_result(result: Dict[str, Any]):
+    print(
+        f"\n▶ {result['rate']:g} sessions/s: {result['completed']}/{result['offered']} completed "
+        f"(goodput {result['goodput']:g}/s), {result['unfinished']} unfinished, "
+        f"{result['audio_mb']} MB audio, "
+        f"scheduler lag {result['max_lag_ms']} ms, client CPU {result['client_cpu']:.0%}"
+    )
+    if result["client_cpu"] > CLIENT_CPU_WARNING:
+        print("  ⚠️  The load generator is near its own CPU limit; its latencies include client queueing")
+    print(
+        f"  {'step':14} {'ok':>7} {'err%':>6} {'shed':>6} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for step, row in result["steps"].items():
+        p50, p95, p99 = (
+            float("nan") if row[key] is None else row[key] for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        print(
+            f"  {step:14} {row['ok']:7d} {row['error_rate']:6.1%} {row['shed']:6d} {row['per_sec']:8.1f} "
+            f"{p50:8.1f} {p95:8.1f} {p99:8.1f}"
+        )
+
+
+def start_server(
+    port: int, tts_latency: float, cold_audio: bool, tts_capacity: int = 0, topics: int = 0
+) -> subprocess.Popen:
+    """Run benchmarks/serve.py and wait until it is ready."""
+    command = [sys.executable, "-m", "benchmarks.serve", "--port", str(port)]
+    command += ["--tts-latency", str(tts_latency), "--tts-capacity", str(tts_capacity)]
+    command += ["--topics", str(topics)]
+    if cold_audio:
+        command.append("--cold-audio")
+
+    process = subprocess.Popen(
+        command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise TimeoutError("Benchmark server did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rates", default="5,10,20,40", help="sessions per second, comma-separated")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per rate")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean seconds before each FAQ click")
+    parser.add_argument("--max-faqs", type=int, default=3, help="most FAQ clicks per session")
+    parser.add_argument("--slo-ms", type=float, default=500, help="p95 objective per request")
+    parser.add_argument("--timeout", type=float, default=10, help="per-request timeout in seconds")
+    parser.add_argument("--drain", type=float, default=30, help="seconds to wait for open sessions")
+    parser.add_argument("--url", help="target an already running server instead")
+    parser.add_argument("--port", type=int, default=8020)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--tts-capacity", type=int, default=0, help="fake TTS calls served at once")
+    parser.add_argument("--topics", type=int, default=0, help="synthetic topics to add to the catalogue")
+    parser.add_argument("--cold-audio", action="store_true", help="start with no generated audio")
+    parser.add_argument("--keep-going", action="store_true", help="run every rate past saturation")
+    parser.add_argument("--output", type=Path, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    print("🚦 Avatar Teacher - Session Replay Load Test")
+    print("=" * 60)
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process = start_server(
+            args.port, args.tts_latency, args.cold_audio, args.tts_capacity, args.topics
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        capacity = f", {args.tts_capacity} at a time" if args.tts_capacity else ""
+        print(f"Server: benchmarks.serve (1 worker, fake TTS {args.tts_latency}s{capacity})")
+    else:
+        print(f"Server: {base_url}")
+
+    results = []
+    saturation = None
+    try:
+        for rate in (float(value) for value in args.rates.split(",")):
+            result = asyncio.run(
+                run_rate(
+                    base_url,
+                    rate,
+                    args.duration,
+                    args.think_time,
+                    args.max_faqs,
+                    args.timeout,
+                    args.drain,
+                )
+            )
+            result["saturated"] = is_saturated(result, args.slo_ms)
+            results.append(result)
+            print_result(result)
+
+            if result["saturated"]:
+                print(f"  ✗ Saturated: {result['saturated']}")
+                if saturation is None:
+                    saturation = rate
+                if not args.keep_going:
+                    break
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print("\n" + "=" * 60)
+    held = [
+        result["rate"]
+        for result in results
+        if not result["saturated"] and (saturation is None or result["rate"] < saturation)
+    ]
+    if saturation is None:
+        print(f"No saturation up to {results[-1]['rate']:g} sessions/s")
+    elif held:
+        print(f"Saturation point: between {max(held):g} and {saturation:g} sessions/s per worker")
+    else:
+        print(f"Saturated at the lowest rate tried ({saturation:g} sessions/s)")
+    print(
+        "Goodput (sessions/s): "
+        + ", ".join(f"{result['goodput']:g} at {result['rate']:g}" for result in results)
+    )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Request throughput with a slow log consumer.
+
+Runs benchmarks/serve.py with its stdout connected to a pipe that is
+either drained immediately or read at --throttle bytes/sec (a slow log
+shipper or terminal), once with the queue-based log handler and once with
+synchronous writes (LOG_QUEUE=0), and drives the API with a fixed number
+of concurrent clients. With synchronous writes a full pipe blocks the
+event loop; with the queue, requests keep their throughput and excess
+records are dropped.
+
+Usage:
+    python -m benchmarks.logbench [--duration 10] [--concurrency 16] [--throttle 16384]
+"""
+
+from typing import Dict, Any, List
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.microbench import percentile  # noqa: E402
+
+
+def drain_pipe(pipe, bytes_per_sec: float, stop: threading.Event):
+    """Read a pipe, optionally no faster than bytes_per_sec."""
+    chunk = 4096
+    while not stop.is_set():
+        data = pipe.read1(chunk) if hasattr(pipe, "read1") else pipe.read(chunk)
+        if not data:
+            return
+        if bytes_per_sec:
+            time.sleep(len(data) / bytes_per_sec)
+
+
+def start_server(port: int, use_queue: bool, throttle: float):
+    """Start benchmarks.serve with its stdout drained at the given rate."""
+    env = {**os.environ, "LOG_QUEUE": "1" if use_queue else "0", "LOG_FORMAT": "json"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve", "--port", str(port), "--tts-latency", "0"],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=drain_pipe, args=(process.stdout, throttle, stop), daemon=True
+    )
+    reader.start()
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1):
+                return process, stop
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise TimeoutError("Benchmark server did not become ready")
+
+
+async def drive(base_url: str, duration: float, concurrency: int) -> Dict[str, Any]:
+    """Closed-loop clients cycling through the topic list and topic pages."""
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        topic_ids = [topic["id"] for topic in (await client.get("/api/topics")).json()]
+        paths = ["/api/topics"] + [f"/api/topics/{topic_id}" for topic_id in topic_ids]
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            index = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[index % len(paths)])
+                    response.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except Exception:
+                    errors += 1
+                index += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    latencies.sort()
+    return {
+        "req_per_sec": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 1) if latencies else None,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--throttle", type=float, default=16384, help="log bytes/sec when throttled")
+    parser.add_argument("--port", type=int, default=8021)
+    args = parser.parse_args()
+
+    print("📝 Avatar Teacher - Logging Throughput Benchmark")
+    print("=" * 60)
+    print(f"{'handler':10} {'stdout':16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7}")
+
+    for use_queue in (True, False):
+        for throttle in (0, args.throttle):
+            process, stop = start_server(args.port, use_queue, throttle)
+            try:
+                result = asyncio.run(
+                    drive(f"http://127.0.0.1:{args.port}", args.duration, args.concurrency)
+                )
+            finally:
+                stop.set()
+                process.kill()
+                process.wait(timeout=10)
+
+            stdout = f"{throttle / 1024:.0f} KB/s" if throttle else "drained"
+            p99 = result["p99_ms"] if result["p99_ms"] is not None else float("nan")
+            p50 = result["p50_ms"] if result["p50_ms"] is not None else float("nan")
+            print(
+                f"{'queue' if use_queue else 'sync':10} {stdout:16} {result['req_per_sec']:8.1f} "
+                f"{p50:8.1f} {p99:9.1f} {result['errors']:7d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark suite for the db, tts and route layers, with regression gates.
+
+Every case runs in-process against mongomock and the fake TTS engine
+(see benchmarks/fakes.py). Each case reports ops/sec and p50/p95/p99
+latency. Results are compared with a JSON baseline, and the run fails
+(exit code 1) when a case's throughput drops, or its median latency
+rises, by more than the threshold. p95/p99 are recorded for reference but
+are too noisy on shared machines to gate on.
+
+Baselines are machine-specific: regenerate one on the machine that runs
+the gate.
+
+Usage:
+    python -m benchmarks.microbench                     # compare with baseline
+    python -m benchmarks.microbench --save-baseline     # record a new baseline
+    python -m benchmarks.microbench --only db. --threshold 0.3
+"""
+
+from typing import Callable, Dict, Any, List, Tuple
+from pathlib import Path
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fakes import setup_environment  # noqa: E402
+
+DEFAULT_BASELINE = REPO_ROOT / "benchmarks" / "baseline.json"
+DEFAULT_THRESHOLD = 0.3
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(
+    func: Callable[[], Any], min_time: float, rounds: int = 3, warmup: int = 20
+) -> Dict[str, float]:
+    """
+    Run func for `rounds` rounds of at least min_time seconds each and keep
+    the fastest round, which filters out most scheduler and GC noise.
+
+    Returns:
+        dict: ops_per_sec and p50/p95/p99 latency in microseconds
+    """
+    for _ in range(warmup):
+        func()
+
+    results = [_measure_round(func, min_time / rounds) for _ in range(rounds)]
+    return max(results, key=lambda result: result["ops_per_sec"])
+
+
+def _measure_round(func: Callable[[], Any], min_time: float) -> Dict[str, float]:
+    latencies = []
+    clock = time.perf_counter_ns
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline or len(latencies) < 50:
+        start = clock()
+        func()
+        latencies.append((clock() - start) / 1000)
+
+    latencies.sort()
+    return {
+        "ops_per_sec": round(1e6 * len(latencies) / sum(latencies), 1),
+        "p50_us": round(percentile(latencies, 0.50), 1),
+        "p95_us": round(percentile(latencies, 0.95), 1),
+        "p99_us": round(percentile(latencies, 0.99), 1),
+    }
+
+
+def build_cases(get: Callable[[str], Any]) -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    Build the benchmark cases. The app must already be seeded.
+
+    Args:
+        get: Performs an in-process GET request against the app
+    """
+    from app import analytics, db, tts_stub
+    from app.timing import build_timing_track
+    from app.mp3 import get_duration
+
+    topics = db.get_all_topics()
+    topic_id = topics[0]["id"]
+    faq_id = db.get_faqs_by_topic_id(topic_id)[0]["id"]
+    topic = db.get_topic_by_id(topic_id)
+    counter = itertools.count()
+
+    def insert_and_update_faq():
+        # A separate topic id, so the inserts don't grow the FAQ list the other cases read
+        new_faq = db.insert_faq("benchmark-topic", "Benchmark question?", "Benchmark answer.", "en")
+        db.update_faq_audio(new_faq["id"], "/static/media/audio/faq_1.mp3")
+
+    def synthesize_new_text():
+        text = f"Benchmark narration number {next(counter)} for the fake engine."
+        tts_stub.generate_tts_audio(text, "en")
+
+    def cached_faq_audio():
+        tts_stub.get_or_generate_audio_for_faq(
+            {"question": "q", "answer": "Cached benchmark answer.", "language": "en"}
+        )
+
+    return [
+        ("db.get_all_topics", db.get_all_topics),
+        ("db.get_topic_by_id", lambda: db.get_topic_by_id(topic_id)),
+        ("db.get_faq_by_id", lambda: db.get_faq_by_id(faq_id)),
+        ("db.get_faqs_by_topic_id", lambda: db.get_faqs_by_topic_id(topic_id)),
+        ("db.insert_and_update_faq", insert_and_update_faq),
+        ("db.update_faq_audio", lambda: db.update_faq_audio(faq_id, topic["audio_url"])),
+        ("analytics.record_view", lambda: analytics.record_view("topic", topic_id)),
+        ("tts.synthesize_new_text", synthesize_new_text),
+        ("tts.cached_faq_audio", cached_faq_audio),
+        ("tts.timing_track", lambda: build_timing_track(topic["content_text"], 30.0)),
+        ("tts.mp3_duration", lambda: get_duration(Path("static/media/audio/topic_1.mp3"))),
+        ("route.list_topics", lambda: get("/api/topics")),
+        ("route.get_topic", lambda: get(f"/api/topics/{topic_id}")),
+        ("route.get_faq", lambda: get(f"/api/faqs/{faq_id}")),
+        ("route.health", lambda: get("/health")),
+    ]
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    Returns:
+        list: Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result['ops_per_sec']} ops/s vs baseline {base['ops_per_sec']}"
+            )
+        if result["p50_us"] > base["p50_us"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {result['p50_us']} us vs baseline {base['p50_us']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per case")
+    parser.add_argument("--only", default="", help="run only cases starting with this prefix")
+    parser.add_argument("--output", type=Path, help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    setup_environment()
+
+    import httpx
+    from app.main import app, lifespan
+
+    # Drive the app directly over ASGI on one event loop - no sockets, no threads
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    app_lifespan = lifespan(app)
+    loop.run_until_complete(app_lifespan.__aenter__())
+    client = httpx.AsyncClient(app=app, base_url="http://benchmark")
+
+    def get(path: str):
+        response = loop.run_until_complete(client.get(path))
+        response.raise_for_status()
+        return response
+
+    results: Dict[str, Any] = {}
+    try:
+        print(f"{'case':28} {'ops/s':>10} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}")
+        for name, func in build_cases(get):
+            if not name.startswith(args.only):
+                continue
+            result = measure(func, args.min_time)
+            results[name] = result
+            print(
+                f"{name:28} {result['ops_per_sec']:10.1f} {result['p50_us']:9.1f} "
+                f"{result['p95_us']:9.1f} {result['p99_us']:9.1f}"
+            )
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.run_until_complete(app_lifespan.__aexit__(None, None, None))
+        loop.close()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\n⚠️  No baseline at {args.baseline}; run with --save-baseline first")
+        return
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print(f"\n✓ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
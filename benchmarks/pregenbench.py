@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+FAQ audio pregeneration benchmark: click-to-audio latency for students
+opening topics whose FAQ answers have no audio yet.
+
+Each simulated student opens a topic (its narration already synthesised),
+listens for --listen seconds, then clicks --clicks FAQs, most viewed first,
+pausing --think seconds between clicks. A click is GET /api/faqs/{id}; it
+returns once the answer audio exists. Every FAQ starts without audio and
+synthesis takes --tts-latency seconds (fake TTS), in-process over ASGI.
+
+Modes:
+    off         PREGEN=0: each click synthesises its answer
+    list order  pregeneration without view history (FAQs in list order)
+    popularity  pregeneration with view counts favouring the last FAQs
+
+Usage:
+    python -m benchmarks.pregenbench
+    python -m benchmarks.pregenbench --topics 8 --faqs 10 --tts-latency 1.5 --listen 3
+"""
+
+from typing import Dict, Any, List
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import time
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# A click answered within this many milliseconds found its audio ready
+READY_MS = 50
+
+
+def run_mode(mode: str, args, get) -> Dict[str, Any]:
+    """Create fresh topics, simulate one student per topic and time the clicks."""
+    from app import db
+    from app.analytics import FAQ_KIND, VIEWS, bucket_start
+    from app.main import _generate_faq_audio
+    from app.pregen import FaqPregenerator, get_pregen_stats, set_pregenerator
+    from app.repository import get_repository
+
+    set_pregenerator(None if mode == "off" else FaqPregenerator(_generate_faq_audio))
+
+    sessions = []
+    for number in range(args.topics):
+        topic = db.insert_topic(f"{mode} topic {number}", "Narration. " * 20, "en")
+        db.update_topic_audio(topic["id"], "/static/media/audio/topic_1.mp3")
+        faqs = [
+            db.insert_faq(topic["id"], f"Question {i}?", f"{mode} answer {number}.{i}. " * 5, "en")
+            for i in range(args.faqs)
+        ]
+        # Students ask about the last FAQs of each list most
+        clicks = [faq["id"] for faq in reversed(faqs)][: args.clicks]
+        if mode == "popularity":
+            bucket = bucket_start(time.time())
+            get_repository().add_counts(
+                {(FAQ_KIND, faq_id, bucket): {VIEWS: 100 - rank} for rank, faq_id in enumerate(clicks)}
+            )
+        sessions.append((topic["id"], clicks))
+
+    latencies: List[float] = []
+    for topic_id, clicks in sessions:
+        get(f"/api/topics/{topic_id}")
+        time.sleep(args.listen)
+        for faq_id in clicks:
+            start = time.perf_counter()
+            body = get(f"/api/faqs/{faq_id}").json()
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert body["answer_audio_url"]
+            time.sleep(args.think)
+
+    stats = get_pregen_stats()
+    set_pregenerator(None)
+    latencies.sort()
+    return {
+        "clicks": len(latencies),
+        "ready": sum(latency <= READY_MS for latency in latencies) / len(latencies),
+        "p50_ms": statistics.median(latencies),
+        "max_ms": latencies[-1],
+        "pregenerated": stats.get("generated", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--topics", type=int, default=4)
+    parser.add_argument("--faqs", type=int, default=8, help="FAQs per topic")
+    parser.add_argument("--clicks", type=int, default=3, help="FAQs clicked per topic")
+    parser.add_argument("--tts-latency", type=float, default=0.8, help="seconds per synthesis")
+    parser.add_argument("--listen", type=float, default=1.5, help="seconds before the first click")
+    parser.add_argument("--think", type=float, default=1.0, help="seconds between clicks")
+    args = parser.parse_args()
+
+    os.environ["LOG_LEVEL"] = "WARNING"
+    from benchmarks.fakes import setup_environment
+
+    scratch = setup_environment(tts_latency=args.tts_latency, database="edtech_pregen_bench")
+
+    import httpx
+    from app.main import app, lifespan
+    from app.repository import set_repository
+
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(app=app, base_url="http://benchmark")
+
+    def get(path: str):
+        response = loop.run_until_complete(client.get(path))
+        response.raise_for_status()
+        return response
+
+    print("🎧 Avatar Teacher - FAQ Audio Pregeneration Benchmark")
+    print("=" * 78)
+    print(
+        f"topics: {args.topics}   FAQs/topic: {args.faqs}   clicks/topic: {args.clicks}   "
+        f"TTS: {args.tts_latency:.1f}s   listen: {args.listen:.1f}s   think: {args.think:.1f}s"
+    )
+
+    context = lifespan(app)
+    loop.run_until_complete(context.__aenter__())
+    try:
+        print(f"\n{'mode':12} {'clicks':>7} {'ready':>7} {'p50 ms':>9} {'max ms':>9} {'pregenerated':>13}")
+        for mode in ("off", "list order", "popularity"):
+            result = run_mode(mode, args, get)
+            print(
+                f"{mode:12} {result['clicks']:7} {result['ready']:7.0%} {result['p50_ms']:9.1f} "
+                f"{result['max_ms']:9.1f} {result['pregenerated']:13}"
+            )
+        print(f"\nready: clicks answered within {READY_MS} ms (audio synthesised before the click)")
+    finally:
+        loop.run_until_complete(context.__aexit__(None, None, None))
+        loop.run_until_complete(client.aclose())
+        loop.close()
+        set_repository(None)
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Scaling report: key catalogue queries at growing catalogue sizes.
+
+For each size (total documents, topics plus FAQs) a fresh catalogue is
+generated with benchmarks.datagen, then the read paths the app serves
+are timed: the app.db helpers and the GET routes on top of them, driven
+in-process over ASGI. For each case the report prints the median time,
+the time per returned item, and the growth exponent k between sizes
+(time ~ size^k). List queries should grow linearly with what they return
+(k <= 1) and lookups should stay flat (k near 0); cases that grow faster
+than expected are flagged.
+
+The catalogue is written to a SQLite file in a scratch directory by
+default. With --mongodb-uri it goes to a scratch database on that server
+(dropped afterwards). mongomock scans collections linearly and is only
+useful as a smoke test (--backend mongomock).
+
+Usage:
+    python -m benchmarks.scalebench                       # 1k, 100k and 1M documents on SQLite
+    python -m benchmarks.scalebench --sizes 1000,10000 --fanout zipf --output scaling.json
+    python -m benchmarks.scalebench --mongodb-uri mongodb://localhost:27017
+"""
+
+from typing import Dict, Any, Callable, List
+from pathlib import Path
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import time
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.datagen import add_spec_arguments, generate_catalogue, spec_from_args  # noqa: E402
+
+SCRATCH_DATABASE = "edtech_scale_bench"
+DEFAULT_SIZES = "1000,100000,1000000"
+
+# Highest growth exponent each kind of case may show before it is flagged.
+# "list" cases return work proportional to the catalogue, "lookup" cases don't.
+EXPECTED_EXPONENT = {"list": 1.15, "lookup": 0.25}
+
+
+def time_case(func: Callable[[], Any], min_time: float, min_runs: int = 5) -> Dict[str, float]:
+    """
+    Call func (which returns how many items it produced) until both
+    min_time seconds and min_runs calls have passed.
+
+    Returns:
+        dict: runs, median and p90 in milliseconds, and the items returned
+    """
+    items = func()  # warm caches and learn the result size
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline or len(timings) < min_runs:
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "median_ms": round(statistics.median(timings), 3),
+        "p90_ms": round(timings[int(0.9 * (len(timings) - 1))], 3),
+        "items": items,
+    }
+
+
+def use_backend(args, scratch: Path, size: int):
+    """Point app.db at an empty catalogue on the chosen backend."""
+    from app.repository import MongoRepository, SQLiteRepository, set_repository
+
+    if args.mongodb_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.mongodb_uri)
+        client.drop_database(SCRATCH_DATABASE)
+        set_repository(MongoRepository(database=client[SCRATCH_DATABASE]))
+    elif args.backend == "mongomock":
+        from benchmarks.fakes import install_mongomock
+
+        install_mongomock(f"{SCRATCH_DATABASE}_{size}")
+    else:
+        set_repository(SQLiteRepository(str(scratch / f"catalogue-{size}.sqlite3")))
+
+
+def build_cases(get: Callable[[str], Any], topic_ids: List[str], widest_id: str):
+    """(name, kind, func) per measured query. Each func returns the number of items it produced."""
+    from app import db
+
+    topics = itertools.cycle(topic_ids)
+
+    def get_topic():
+        return len(get(f"/api/topics/{next(topics)}").json()["faqs"]) + 1
+
+    return [
+        ("db.get_all_topics", "list", lambda: len(db.get_all_topics())),
+        ("db.count_topics", "lookup", lambda: db.count_topics() and 1),
+        ("db.get_topic_by_id", "lookup", lambda: len([db.get_topic_by_id(next(topics))])),
+        ("db.get_faqs_by_topic_id", "lookup", lambda: len(db.get_faqs_by_topic_id(next(topics)))),
+        # The widest topic of a 2000-topic sample: with --fanout zipf it grows with the catalogue
+        ("db.get_faqs_by_topic_id[widest]", "list", lambda: len(db.get_faqs_by_topic_id(widest_id))),
+        ("route.list_topics", "list", lambda: len(get("/api/topics").json())),
+        ("route.get_topic", "lookup", get_topic),
+    ]
+
+
+def run_size(args, scratch: Path, size: int, get: Callable[[str], Any]) -> Dict[str, Any]:
+    """Generate a catalogue of about `size` documents and time every case on it."""
+    from app import db
+
+    use_backend(args, scratch, size)
+    topics = max(1, round(size / (1 + args.faqs)))
+    generated = generate_catalogue(spec_from_args(args, topics), args.batch)
+    print(
+        f"\n{generated['topics'] + generated['faqs']:,} documents "
+        f"({generated['topics']:,} topics, {generated['faqs']:,} FAQs) "
+        f"generated in {generated['seconds']:.1f}s"
+    )
+
+    repository = db.get_repository()
+    topic_ids = [topic["id"] for topic in db.get_all_topics()]
+    widest = max(
+        random.Random(args.seed).sample(topic_ids, min(len(topic_ids), 2000)),
+        key=lambda topic_id: len(db.get_faqs_by_topic_id(topic_id)),
+    )
+    random.Random(args.seed).shuffle(topic_ids)
+
+    result: Dict[str, Any] = {"generated": generated, "cases": {}}
+    print(f"{'case':34} {'median ms':>11} {'p90 ms':>10} {'items':>9} {'us/item':>9}")
+    for name, kind, func in build_cases(get, topic_ids, widest):
+        if not name.startswith(args.only):
+            continue
+        case = time_case(func, args.min_time)
+        case["kind"] = kind
+        case["us_per_item"] = round(1000 * case["median_ms"] / max(case["items"], 1), 3)
+        result["cases"][name] = case
+        print(
+            f"{name:34} {case['median_ms']:11.3f} {case['p90_ms']:10.3f} "
+            f"{case['items']:9,} {case['us_per_item']:9.3f}"
+        )
+
+    repository.close()
+    if args.mongodb_uri:
+        from pymongo import MongoClient
+
+        MongoClient(args.mongodb_uri).drop_database(SCRATCH_DATABASE)
+    for path in scratch.glob(f"catalogue-{size}.sqlite3*"):
+        path.unlink()
+    return result
+
+
+def growth(results: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Growth exponent per case between consecutive sizes:
+    k = log(t2 / t1) / log(n2 / n1), with n the documents generated.
+    """
+    rows = []
+    sizes = sorted(results)
+    for small, large in zip(sizes, sizes[1:]):
+        n1 = sum(results[small]["generated"][key] for key in ("topics", "faqs"))
+        n2 = sum(results[large]["generated"][key] for key in ("topics", "faqs"))
+        for name, case in results[large]["cases"].items():
+            before = results[small]["cases"].get(name)
+            if not before:
+                continue
+            exponent = math.log(case["median_ms"] / before["median_ms"]) / math.log(n2 / n1)
+            rows.append(
+                {
+                    "case": name,
+                    "from": small,
+                    "to": large,
+                    "exponent": round(exponent, 2),
+                    "unexpected": exponent > EXPECTED_EXPONENT[case["kind"]],
+                }
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="total documents per run, comma separated")
+    parser.add_argument("--backend", choices=["sqlite", "mongomock"], default="sqlite")
+    parser.add_argument("--mongodb-uri", default="", help="measure a real server instead")
+    parser.add_argument("--batch", type=int, default=5000, help="topics per bulk insert")
+    parser.add_argument("--min-time", type=float, default=2.0, help="seconds per case")
+    parser.add_argument("--only", default="", help="run only cases starting with this prefix")
+    parser.add_argument("--output", type=Path, help="also write results to this JSON file")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ.setdefault("ANALYTICS", "0")
+    from benchmarks.fakes import make_sandbox
+
+    scratch = make_sandbox(copy_audio=False)
+
+    import httpx
+    from app.main import app
+
+    # Drive the routes over ASGI on one event loop, without the lifespan:
+    # startup warm-up would try to synthesise audio for the generated topics
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(app=app, base_url="http://benchmark")
+
+    def get(path: str):
+        response = loop.run_until_complete(client.get(path))
+        response.raise_for_status()
+        return response
+
+    backend = "mongodb" if args.mongodb_uri else args.backend
+    print("📈 Avatar Teacher - Catalogue Scaling Report")
+    print("=" * 78)
+    print(f"Backend: {backend}   languages: {args.languages}   FAQs/topic: {args.faqs} ({args.fanout})")
+
+    results: Dict[int, Dict[str, Any]] = {}
+    try:
+        for size in sizes:
+            results[size] = run_size(args, scratch, size, get)
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.close()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    rows = growth(results)
+    if rows:
+        print(f"\n{'case':34} {'sizes':>18} {'exponent':>9}")
+        for row in rows:
+            flag = "  ⚠ grows faster than expected" if row["unexpected"] else ""
+            print(f"{row['case']:34} {row['from']:>8,}→{row['to']:<9,} {row['exponent']:9.2f}{flag}")
+
+    if args.output:
+        report = {"backend": backend, "sizes": {str(size): result for size, result in results.items()}}
+        report["growth"] = rows
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Run the API on mongomock and the fake TTS engine, for load tests.
+
+The server runs as a single uvicorn worker: mongomock lives in-process, so
+each worker would otherwise get its own database with different ids.
+
+Usage:
+    python -m benchmarks.serve [--port 8020] [--tts-latency 0.3] [--tts-capacity 4]
+                               [--topics 500] [--cold-audio]
+"""
+
+from pathlib import Path
+import argparse
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fakes import setup_environment, seed_synthetic_catalogue  # noqa: E402
+
+
+def clear_audio_urls() -> int:
+    """
+    Blank every stored audio URL so the first request for each item
+    goes through synthesis, as it does on a fresh catalogue.
+
+    Returns:
+        int: Number of documents changed
+    """
+    from app.db import get_topics_collection, get_faqs_collection
+
+    topics = get_topics_collection().update_many({}, {"$set": {"audio_url": ""}})
+    faqs = get_faqs_collection().update_many({}, {"$set": {"answer_audio_url": ""}})
+    return topics.modified_count + faqs.modified_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8020)
+    parser.add_argument(
+        "--tts-latency", type=float, default=0.3, help="seconds per fake synthesis call"
+    )
+    parser.add_argument(
+        "--tts-capacity", type=int, default=0, help="fake synthesis calls served at once (0 = no limit)"
+    )
+    parser.add_argument(
+        "--topics", type=int, default=0, help="add this many synthetic topics to the sample catalogue"
+    )
+    parser.add_argument(
+        "--cold-audio", action="store_true", help="start with no generated audio"
+    )
+    args = parser.parse_args()
+
+    setup_environment(tts_latency=args.tts_latency, tts_capacity=args.tts_capacity)
+
+    import uvicorn
+    from app.main import app
+    from app.seed_data import seed_database
+
+    # Seed before startup so the catalogue can be adjusted; warm-up skips a seeded DB
+    seed_database()
+    if args.topics:
+        seed_synthetic_catalogue(args.topics)
+    if args.cold_audio:
+        print(f"[Serve] Cleared audio for {clear_audio_urls()} documents")
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Read latency and memory: catalogue snapshot versus MongoDB reads.
+
+Generates a synthetic catalogue, exports it as a snapshot (app.snapshot),
+then measures the app.db read helpers in two fresh processes: one reading
+from the database and one serving from the memory-mapped snapshot. Each
+process reports its resident memory (RSS) before and after the reads.
+
+Without --mongodb-uri the database is mongomock, which keeps the whole
+catalogue inside the benchmark process, so its RSS includes the data a
+real deployment keeps in mongod. With --mongodb-uri the catalogue is
+written to a scratch database on that server (dropped afterwards) and the
+numbers include the network round trip.
+
+Usage:
+    python -m benchmarks.snapshotbench [--topics 10000] [--faqs-per-topic 5] [--mongodb-uri URI]
+"""
+
+from typing import Dict, Any
+from pathlib import Path
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.microbench import measure  # noqa: E402
+
+SCRATCH_DATABASE = "edtech_snapshot_bench"
+# get_all_topics is O(catalogue); above this many topics it dominates the run
+LIST_ALL_LIMIT = 20000
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def use_database(mongodb_uri: str):
+    """Point app.db at the scratch database on a server, or at mongomock."""
+    if mongodb_uri:
+        from pymongo import MongoClient
+        from app.repository import MongoRepository, set_repository
+
+        set_repository(MongoRepository(database=MongoClient(mongodb_uri)[SCRATCH_DATABASE]))
+    else:
+        from benchmarks.fakes import install_mongomock
+
+        install_mongomock(SCRATCH_DATABASE)
+
+
+def run_child(mode: str, args) -> Dict[str, Any]:
+    """Measure one mode in this (fresh) process."""
+    from app import db, snapshot
+    from benchmarks.fakes import seed_synthetic_catalogue
+
+    result: Dict[str, Any] = {"rss_start_mb": round(rss_mb(), 1)}
+    if mode == "snapshot":
+        snapshot.set_snapshot_path(args.snapshot)
+        db.get_snapshot()
+    else:
+        use_database(args.mongodb_uri)
+        if not args.mongodb_uri:
+            seed_synthetic_catalogue(args.topics, args.faqs_per_topic)
+    result["rss_loaded_mb"] = round(rss_mb(), 1)
+
+    topic_ids = [topic["id"] for topic in db.get_all_topics()]
+    faq_ids = [faq["id"] for faq in db.get_faqs_by_topic_id(topic_ids[0])]
+    random.Random(1).shuffle(topic_ids)
+    topics = itertools.cycle(topic_ids)
+    faqs = itertools.cycle(faq_ids)
+
+    cases = [
+        ("get_topic_by_id", lambda: db.get_topic_by_id(next(topics))),
+        ("get_faq_by_id", lambda: db.get_faq_by_id(next(faqs))),
+        ("get_faqs_by_topic_id", lambda: db.get_faqs_by_topic_id(next(topics))),
+    ]
+    if args.topics <= LIST_ALL_LIMIT:
+        cases.append(("get_all_topics", db.get_all_topics))
+
+    for name, func in cases:
+        result[name] = measure(func, args.min_time)
+    result["rss_end_mb"] = round(rss_mb(), 1)
+    return result
+
+
+def export(args) -> Dict[str, Any]:
+    """Seed the database (real or mongomock) and write the snapshot."""
+    from app import snapshot
+    from benchmarks.fakes import seed_synthetic_catalogue
+
+    use_database(args.mongodb_uri)
+    import app.db
+
+    app.db.clear_catalogue()
+    seed_synthetic_catalogue(args.topics, args.faqs_per_topic)
+    if args.mongodb_uri:
+        app.db.ensure_indexes()
+    return snapshot.export_snapshot(args.snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--topics", type=int, default=10000)
+    parser.add_argument("--faqs-per-topic", type=int, default=5)
+    parser.add_argument("--mongodb-uri", default="", help="measure a real server instead of mongomock")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per case")
+    parser.add_argument("--child", choices=["database", "snapshot"], help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ["LOG_LEVEL"] = "WARNING"
+    if args.child:
+        print(json.dumps(run_child(args.child, args)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="avatar-snapshot-") as tmp_dir:
+        args.snapshot = str(Path(tmp_dir) / "catalogue.snap")
+        exported = export(args)
+        print("🗂  Avatar Teacher - Catalogue Snapshot Benchmark")
+        print("=" * 72)
+        print(
+            f"{exported['topics']} topics, {exported['faqs']} FAQs, "
+            f"snapshot {exported['bytes'] / 1024 / 1024:.1f} MB"
+        )
+
+        results = {}
+        for mode in ("database", "snapshot"):
+            command = [sys.executable, "-m", "benchmarks.snapshotbench", "--child", mode]
+            command += ["--snapshot", args.snapshot, "--topics", str(args.topics)]
+            command += ["--faqs-per-topic", str(args.faqs_per_topic), "--min-time", str(args.min_time)]
+            if args.mongodb_uri:
+                command += ["--mongodb-uri", args.mongodb_uri]
+            output = subprocess.run(
+                command, cwd=REPO_ROOT, check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+        if args.mongodb_uri:
+            from pymongo import MongoClient
+
+            MongoClient(args.mongodb_uri).drop_database(SCRATCH_DATABASE)
+
+    database_label = "mongodb" if args.mongodb_uri else "mongomock"
+    print(f"\n{'case':22} {'source':10} {'ops/s':>10} {'p50 us':>9} {'p99 us':>9}")
+    for name in ("get_topic_by_id", "get_faq_by_id", "get_faqs_by_topic_id", "get_all_topics"):
+        for mode, label in (("database", database_label), ("snapshot", "snapshot")):
+            if name in results[mode]:
+                case = results[mode][name]
+                print(
+                    f"{name:22} {label:10} {case['ops_per_sec']:10.1f} "
+                    f"{case['p50_us']:9.1f} {case['p99_us']:9.1f}"
+                )
+
+    print(f"\n{'source':10} {'RSS start':>10} {'loaded':>10} {'after reads':>12}  (MB)")
+    for mode, label in (("database", database_label), ("snapshot", "snapshot")):
+        result = results[mode]
+        print(
+            f"{label:10} {result['rss_start_mb']:10.1f} {result['rss_loaded_mb']:10.1f} "
+            f"{result['rss_end_mb']:12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
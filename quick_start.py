@@ -53,6 +53,9 @@ def check_dependencies():
 
 def check_mongodb():
     """Check MongoDB connection"""
+    if os.getenv("DB_BACKEND") == "sqlite":
+        print("✓ SQLite backend selected (DB_BACKEND=sqlite), MongoDB not needed")
+        return True
     try:
         from pymongo import MongoClient
 
@@ -36,5 +36,8 @@ echo "Press Ctrl+C to stop the server"
 echo "========================================"
 echo ""
 
-# Run the application
+# Run the application: ./run.sh --production for the multi-worker server (app/server.py)
+if [[ "$1" == "--production" ]]; then
+    exec python -m app.server
+fi
 python -m uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
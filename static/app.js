@@ -24,11 +24,45 @@ let closeFaqBtn = null;
 let statusIndicator = null;
 let statusText = null;
 let audioError = null;
+let avatarSprite = null;
+let avatarMouth = null;
+let downloadTopicBtn = null;
+
+// hls.js is only loaded when the browser can't play HLS natively
+const HLS_JS_URL = 'https://cdn.jsdelivr.net/npm/hls.js@1/dist/hls.min.js';
+let hlsPlayer = null;
+
+// Mouth ellipse radii [rx, ry] for each viseme code in a timing track
+const VISEME_SHAPES = {
+    X: [18, 2],
+    A: [16, 14],
+    E: [22, 6],
+    O: [10, 12],
+    M: [18, 1],
+    F: [18, 4],
+    L: [16, 8],
+    S: [20, 5]
+};
+let timingTrack = null;
+let spriteAnimationFrame = null;
+
+// FAQ prefetching during topic playback
+const PREFETCH_BUDGET_BYTES = 1.5 * 1024 * 1024;
+const faqCache = new Map();        // faq id -> FAQ JSON
+const prefetchedAudio = new Map(); // audio URL -> object URL of the downloaded file
+
+// Avatar video manifests (built offline by app.video), by video URL
+const videoManifests = new Map();
+let avatarVideoRequest = 0; // bumped whenever the avatar changes, so stale picks are dropped
+
+// Server-Sent Events for the open topic
+let topicEvents = null;
 
 // Current state
 let currentTopic = null;
 let currentFaqs = [];
 let currentTopicId = null;
+let unreportedPlay = null; // { kind, id } of the loaded audio until its play is counted
 
 /**
  * Initialize the application
@@ -52,6 +86,9 @@ function init() {
     statusIndicator = document.getElementById('statusIndicator');
     statusText = document.getElementById('statusText');
     audioError = document.getElementById('audioError');
+    avatarSprite = document.getElementById('avatarSprite');
+    avatarMouth = document.getElementById('avatarMouth');
+    downloadTopicBtn = document.getElementById('downloadTopicBtn');
 
     // Set up event listeners
     voiceAudio.addEventListener('play', onAudioPlay);
@@ -60,9 +97,41 @@ function init() {
     voiceAudio.addEventListener('error', onAudioError);
     voiceAudio.addEventListener('loadeddata', onAudioLoaded);
     closeFaqBtn.addEventListener('click', closeFaqAnswer);
+    downloadTopicBtn.addEventListener('click', downloadTopicForOffline);
 
-    // Load topics on page load
-    loadTopics();
+    registerServiceWorker();
+
+    // The server embeds the topic list (and a deep-linked topic) in the page;
+    // fetch them only if it didn't
+    const initialData = readInitialData();
+    if (initialData && initialData.topics) {
+        displayTopics(initialData.topics);
+    } else {
+        loadTopics();
+    }
+
+    const linkedTopicId = new URLSearchParams(window.location.search).get('topic');
+    if (initialData && initialData.topic) {
+        showTopic(initialData.topic);
+    } else if (linkedTopicId) {
+        selectTopic(linkedTopicId);
+    }
+}
+
+/**
+ * Parse the JSON the server inlined in the page, if any
+ */
+function readInitialData() {
+    const element = document.getElementById('initialData');
+    if (!element) {
+        return null;
+    }
+    try {
+        return JSON.parse(element.textContent);
+    } catch (error) {
+        console.warn('Ignoring invalid initial data:', error);
+        return null;
+    }
 }
 
 /**
@@ -124,22 +193,8 @@ async function selectTopic(topicId) {
         }
 
         const topic = await response.json();
-        currentTopic = topic;
-        currentFaqs = topic.faqs || [];
-        currentTopicId = topicId;
-
-        // Display topic
-        displayTopic(topic);
-        
-        // Hide welcome screen, show player
-        welcomeScreen.style.display = 'none';
-        playerContainer.style.display = 'flex';
-        
-        // Hide loading
         showLoading(false);
-
-        // Start playing video and audio
-        playTopicMedia(topic);
+        showTopic(topic);
     } catch (error) {
         console.error('Error selecting topic:', error);
         showLoading(false);
@@ -147,6 +202,34 @@ async function selectTopic(topicId) {
     }
 }
 
+/**
+ * Open a loaded topic (with its FAQs) in the player
+ */
+function showTopic(topic) {
+    highlightActiveTopic(topic.id);
+    clearPrefetchedFaqs();
+    currentTopic = topic;
+    currentFaqs = topic.faqs || [];
+    currentTopicId = topic.id;
+
+    // Make the open topic linkable (/?topic=<id>)
+    const topicUrl = `/?topic=${encodeURIComponent(topic.id)}`;
+    if (window.location.pathname + window.location.search !== topicUrl) {
+        history.replaceState(null, '', topicUrl);
+    }
+
+    // Display topic and listen for audio/content updates
+    displayTopic(topic);
+    subscribeToTopicEvents(topic.id);
+
+    // Hide welcome screen, show player
+    welcomeScreen.style.display = 'none';
+    playerContainer.style.display = 'flex';
+
+    // Start playing video and audio
+    playTopicMedia(topic);
+}
+
 /**
  * Display topic content
  */
@@ -161,6 +244,11 @@ function displayTopic(topic) {
     // Display FAQs
     displayFAQs(topic.faqs);
 
+    // Offline download needs a service worker
+    downloadTopicBtn.textContent = '⬇ Save offline';
+    downloadTopicBtn.disabled = false;
+    downloadTopicBtn.style.display = 'serviceWorker' in navigator ? 'inline-block' : 'none';
+
     // Hide current FAQ answer if showing
     currentFaqEl.style.display = 'none';
 }
@@ -168,41 +256,44 @@ function displayTopic(topic) {
 /**
  * Play topic video and audio
  */
-function playTopicMedia(topic) {
+async function playTopicMedia(topic) {
     // Reset audio error message
     if (audioError) {
         audioError.style.display = 'none';
     }
     
-    // Set video source
-    avatarVideo.src = topic.avatar_video_url || '/static/media/avatar_loop.mp4';
-    avatarVideo.loop = true;
-    avatarVideo.muted = false;
-    
-    // Play video
-    avatarVideo.play().catch(error => {
-        console.error('Error playing video:', error);
-        // If autoplay fails, try muted
-        avatarVideo.muted = true;
-        avatarVideo.play().catch(e => {
-            console.error('Video playback failed:', e);
-        });
+    // Animate the sprite from the timing track; fall back to the looping video.
+    // Not awaited, so the track fetch runs alongside the audio request.
+    loadTimingTrack(`/topics/${topic.id}/timing`).then(track => {
+        if (track) {
+            showAvatarSprite(track);
+        } else {
+            showAvatarVideo(topic.avatar_video_url);
+        }
     });
 
     // Set and play audio
     if (topic.audio_url) {
-        voiceAudio.src = topic.audio_url;
-        voiceAudio.load();
-        
-        // Small delay to ensure audio is loaded
-        setTimeout(() => {
-            voiceAudio.play().catch(error => {
+        const audioUrl = await pickAudioUrl(`/topics/${topic.id}/audio-variants`, topic.audio_url);
+        // Long narrations stream as HLS unless a low-bitrate variant was picked.
+        // Offline, only the progressive file saved by the service worker is available.
+        const useHls = audioUrl === topic.audio_url && navigator.onLine;
+        await setAudioSource(audioUrl, useHls ? topic.audio_hls_url : null);
+        unreportedPlay = { kind: 'topics', id: topic.id };
+
+        // play() waits for enough data itself - no need for an extra delay
+        voiceAudio.play()
+            .then(() => prefetchFaqs(topic.id, topic.faqs || []))
+            .catch(error => {
+                // A deep-linked page can't autoplay; the student presses play
+                if (error.name === 'NotAllowedError') {
+                    return;
+                }
                 console.error('Error playing audio:', error);
                 if (audioError) {
                     audioError.style.display = 'block';
                 }
             });
-        }, 100);
     } else {
         console.warn('No audio URL provided for this topic');
         if (audioError) {
@@ -211,6 +302,444 @@ function playTopicMedia(topic) {
     }
 }
 
+/**
+ * Play the looping avatar video, in the variant that suits the player
+ * size and connection when the video has a manifest
+ */
+async function showAvatarVideo(videoUrl) {
+    const request = ++avatarVideoRequest;
+    stopSpriteRenderer();
+    avatarSprite.style.display = 'none';
+    avatarVideo.style.display = 'block';
+
+    videoUrl = videoUrl || '/static/media/avatar_loop.mp4';
+    const manifest = await loadVideoManifest(videoUrl);
+    if (request !== avatarVideoRequest) {
+        return; // Another topic or the sprite took over meanwhile
+    }
+    const variant = manifest ? pickVideoVariant(manifest) : null;
+    if (manifest && manifest.poster) {
+        avatarVideo.poster = manifest.poster;
+    }
+
+    avatarVideo.src = variant ? variant.url : videoUrl;
+    avatarVideo.loop = true;
+    avatarVideo.muted = false;
+
+    avatarVideo.play().catch(error => {
+        console.error('Error playing video:', error);
+        // If autoplay fails, try muted
+        avatarVideo.muted = true;
+        avatarVideo.play().catch(e => {
+            console.error('Video playback failed:', e);
+        });
+    });
+}
+
+/**
+ * Fetch the manifest next to a video ("<name>.manifest.json"), or null if
+ * it has none. Each manifest is requested once per page.
+ */
+function loadVideoManifest(videoUrl) {
+    const manifestUrl = videoUrl.replace(/\.[^./]+$/, '.manifest.json');
+    if (!videoManifests.has(manifestUrl)) {
+        videoManifests.set(manifestUrl, fetch(manifestUrl)
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null));
+    }
+    return videoManifests.get(manifestUrl);
+}
+
+/**
+ * Pick the smallest playable variant at least as wide as the player on
+ * this screen. Save-Data and 2G get the lowest resolution, 3G at most 360p.
+ */
+function pickVideoVariant(manifest) {
+    let variants = manifest.variants.filter(variant =>
+        avatarVideo.canPlayType(variant.mime_type) !== ''
+    );
+    if (variants.length === 0) {
+        return null;
+    }
+
+    if (isConstrainedConnection()) {
+        const connection = navigator.connection;
+        const lowest = Math.min(...variants.map(variant => variant.height));
+        const limit = connection.saveData || connection.effectiveType !== '3g' ? lowest : Math.max(lowest, 360);
+        variants = variants.filter(variant => variant.height <= limit);
+    }
+
+    const playerWidth = avatarVideo.clientWidth || avatarVideo.parentElement.clientWidth || window.innerWidth;
+    const wantedWidth = playerWidth * (window.devicePixelRatio || 1);
+    let candidates = variants.filter(variant => variant.width >= wantedWidth);
+    if (candidates.length === 0) {
+        // Nothing is sharp enough: take the widest there is
+        const widest = Math.max(...variants.map(variant => variant.width));
+        candidates = variants.filter(variant => variant.width === widest);
+    }
+    // Variants come smallest first
+    return candidates[0];
+}
+
+/**
+ * Fetch a word/viseme timing track, or null if there isn't one
+ */
+async function loadTimingTrack(timingPath) {
+    try {
+        const response = await fetch(`${API_BASE}${timingPath}`);
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        console.warn('Could not load timing track:', error);
+        return null;
+    }
+}
+
+/**
+ * Show the static avatar sprite and animate it from a timing track
+ */
+function showAvatarSprite(track) {
+    // Stop any video download - the sprite replaces it
+    avatarVideoRequest++;
+    avatarVideo.pause();
+    avatarVideo.removeAttribute('src');
+    avatarVideo.load();
+    avatarVideo.style.display = 'none';
+    avatarSprite.style.display = 'block';
+
+    timingTrack = track;
+    if (!spriteAnimationFrame) {
+        spriteAnimationFrame = requestAnimationFrame(renderSpriteFrame);
+    }
+}
+
+function stopSpriteRenderer() {
+    if (spriteAnimationFrame) {
+        cancelAnimationFrame(spriteAnimationFrame);
+        spriteAnimationFrame = null;
+    }
+}
+
+/**
+ * Find the viseme active at a time (ms) by binary search over the cues
+ */
+function visemeAt(track, timeMs) {
+    const cues = track.visemes;
+    let low = 0;
+    let high = cues.length - 1;
+    while (low < high) {
+        const mid = (low + high + 1) >> 1;
+        if (cues[mid][0] <= timeMs) {
+            low = mid;
+        } else {
+            high = mid - 1;
+        }
+    }
+    return cues[low][1];
+}
+
+/**
+ * Set the mouth shape for the current audio position
+ */
+function renderSpriteFrame() {
+    let viseme = 'X';
+    if (!voiceAudio.paused) {
+        if (timingTrack) {
+            viseme = visemeAt(timingTrack, voiceAudio.currentTime * 1000);
+        } else {
+            // No track for this audio: a simple open/close loop while speaking
+            viseme = Math.floor(voiceAudio.currentTime * 8) % 2 ? 'A' : 'M';
+        }
+    }
+
+    const [rx, ry] = VISEME_SHAPES[viseme] || VISEME_SHAPES.X;
+    avatarMouth.setAttribute('rx', rx);
+    avatarMouth.setAttribute('ry', ry);
+    spriteAnimationFrame = requestAnimationFrame(renderSpriteFrame);
+}
+
+/**
+ * Check whether the browser reports a slow or data-saving connection
+ */
+function isConstrainedConnection() {
+    const connection = navigator.connection;
+    if (!connection) {
+        return false;
+    }
+    return connection.saveData || ['slow-2g', '2g', '3g'].includes(connection.effectiveType);
+}
+
+/**
+ * Pick the audio URL to play for the current connection.
+ * Variants are only requested on constrained connections, so fast
+ * clients don't pay for an extra round trip.
+ */
+async function pickAudioUrl(variantsPath, originalUrl) {
+    if (!isConstrainedConnection()) {
+        return originalUrl;
+    }
+
+    try {
+        const response = await fetch(`${API_BASE}${variantsPath}`);
+        if (!response.ok) {
+            return originalUrl;
+        }
+
+        // Variants come smallest first; skip the original and anything we can't decode
+        const variants = (await response.json()).filter(variant =>
+            variant.name !== 'original' && voiceAudio.canPlayType(variant.mime_type) !== ''
+        );
+        if (variants.length === 0) {
+            return originalUrl;
+        }
+
+        // Save-Data and 2G get the smallest variant, 3G the largest low-bitrate one
+        const connection = navigator.connection;
+        const wantSmallest = connection.saveData || connection.effectiveType !== '3g';
+        return wantSmallest ? variants[0].url : variants[variants.length - 1].url;
+    } catch (error) {
+        console.warn('Could not load audio variants, using original:', error);
+        return originalUrl;
+    }
+}
+
+/**
+ * Load hls.js on demand
+ */
+function loadHlsJs() {
+    return new Promise((resolve, reject) => {
+        if (window.Hls) {
+            resolve(window.Hls);
+            return;
+        }
+        const script = document.createElement('script');
+        script.src = HLS_JS_URL;
+        script.onload = () => resolve(window.Hls);
+        script.onerror = reject;
+        document.head.appendChild(script);
+    });
+}
+
+/**
+ * Point the audio element at a progressive URL or an HLS playlist.
+ * Uses native HLS where available, then hls.js, then the progressive file.
+ */
+async function setAudioSource(url, hlsUrl = null) {
+    if (hlsPlayer) {
+        hlsPlayer.destroy();
+        hlsPlayer = null;
+    }
+
+    if (hlsUrl) {
+        if (voiceAudio.canPlayType('application/vnd.apple.mpegurl')) {
+            voiceAudio.src = hlsUrl;
+            voiceAudio.load();
+            return;
+        }
+
+        try {
+            const Hls = await loadHlsJs();
+            if (Hls && Hls.isSupported()) {
+                hlsPlayer = new Hls();
+                hlsPlayer.loadSource(hlsUrl);
+                hlsPlayer.attachMedia(voiceAudio);
+                return;
+            }
+        } catch (error) {
+            console.warn('hls.js unavailable, using progressive audio:', error);
+        }
+    }
+
+    voiceAudio.src = url;
+    voiceAudio.load();
+}
+
+/**
+ * How many bytes of FAQ audio may be prefetched on this connection
+ */
+function getPrefetchBudget() {
+    const connection = navigator.connection;
+    if (!connection) {
+        return PREFETCH_BUDGET_BYTES;
+    }
+    if (connection.saveData || ['slow-2g', '2g'].includes(connection.effectiveType)) {
+        return 0;
+    }
+    if (connection.effectiveType === '3g') {
+        return PREFETCH_BUDGET_BYTES / 4;
+    }
+    return PREFETCH_BUDGET_BYTES;
+}
+
+/**
+ * Prefetch FAQ details and answer audio while the topic narration plays,
+ * in list order, until the bandwidth budget is used up
+ */
+async function prefetchFaqs(topicId, faqs) {
+    let budget = getPrefetchBudget();
+
+    for (const item of faqs) {
+        // Stop if the budget is spent or the student moved to another topic
+        if (budget <= 0 || currentTopicId !== topicId) {
+            break;
+        }
+
+        try {
+            let faq = faqCache.get(item.id);
+            if (!faq) {
+                // Marked as a prefetch so it isn't counted as a view
+                const response = await fetch(`${API_BASE}/faqs/${item.id}`, {
+                    headers: { 'Purpose': 'prefetch' }
+                });
+                if (!response.ok) {
+                    continue;
+                }
+                faq = await response.json();
+                faqCache.set(item.id, faq);
+            }
+
+            if (!faq.answer_audio_url || prefetchedAudio.has(faq.answer_audio_url)) {
+                continue;
+            }
+
+            const audioResponse = await fetch(faq.answer_audio_url);
+            const size = Number(audioResponse.headers.get('Content-Length') || 0);
+            if (!audioResponse.ok || size > budget) {
+                audioResponse.body && audioResponse.body.cancel();
+                break;
+            }
+
+            const blob = await audioResponse.blob();
+            prefetchedAudio.set(faq.answer_audio_url, URL.createObjectURL(blob));
+            budget -= blob.size;
+        } catch (error) {
+            console.warn('FAQ prefetch failed:', error);
+        }
+    }
+}
+
+/**
+ * Drop prefetched FAQs when switching topics
+ */
+function clearPrefetchedFaqs() {
+    prefetchedAudio.forEach(objectUrl => URL.revokeObjectURL(objectUrl));
+    prefetchedAudio.clear();
+    faqCache.clear();
+}
+
+/**
+ * Register the service worker that caches topics and audio
+ */
+function registerServiceWorker() {
+    if (!('serviceWorker' in navigator)) {
+        return;
+    }
+    navigator.serviceWorker.register('/sw.js').catch(error => {
+        console.warn('Service worker registration failed:', error);
+    });
+}
+
+/**
+ * Ask the service worker to save the current topic, its FAQs and all audio
+ */
+async function downloadTopicForOffline() {
+    if (!currentTopicId || !('serviceWorker' in navigator)) {
+        return;
+    }
+
+    const topicId = currentTopicId;
+    downloadTopicBtn.disabled = true;
+    downloadTopicBtn.textContent = '⏳ Saving...';
+
+    try {
+        const registration = await navigator.serviceWorker.ready;
+        const result = await new Promise(resolve => {
+            const channel = new MessageChannel();
+            channel.port1.onmessage = event => resolve(event.data);
+            registration.active.postMessage({ type: 'download-topic', topicId }, [channel.port2]);
+        });
+
+        if (!result.ok) {
+            throw new Error(result.error);
+        }
+        if (currentTopicId === topicId) {
+            const megabytes = (result.bytes / (1024 * 1024)).toFixed(1);
+            downloadTopicBtn.textContent = `✓ Saved offline (${megabytes} MB)`;
+        }
+    } catch (error) {
+        console.error('Error saving topic for offline:', error);
+        showError('Failed to save topic for offline use.');
+        downloadTopicBtn.disabled = false;
+        downloadTopicBtn.textContent = '⬇ Save offline';
+    }
+}
+
+/**
+ * Listen for audio-ready and content-changed events for a topic
+ */
+function subscribeToTopicEvents(topicId) {
+    if (topicEvents) {
+        topicEvents.close();
+        topicEvents = null;
+    }
+    if (!('EventSource' in window)) {
+        return;
+    }
+
+    topicEvents = new EventSource(`${API_BASE}/topics/${topicId}/events`);
+    topicEvents.addEventListener('audio-ready', event => onAudioReady(JSON.parse(event.data)));
+    topicEvents.addEventListener('content-changed', () => refreshTopic(topicId));
+}
+
+/**
+ * Swap in audio as soon as the server reports it is ready
+ */
+function onAudioReady(data) {
+    if (data.kind === 'topic') {
+        if (currentTopic && currentTopic.id === data.id && !currentTopic.audio_url) {
+            currentTopic.audio_url = data.audio_url;
+            playTopicMedia(currentTopic);
+        }
+        return;
+    }
+
+    const cachedFaq = faqCache.get(data.id);
+    if (cachedFaq) {
+        cachedFaq.answer_audio_url = data.audio_url;
+    }
+    const listedFaq = currentFaqs.find(faq => faq.id === data.id);
+    if (listedFaq) {
+        listedFaq.answer_audio_url = data.audio_url;
+    }
+}
+
+/**
+ * Re-fetch the open topic after its content or FAQ list changed
+ */
+async function refreshTopic(topicId) {
+    try {
+        const response = await fetch(`${API_BASE}/topics/${topicId}`, { cache: 'no-store' });
+        if (!response.ok || currentTopicId !== topicId) {
+            return;
+        }
+
+        const topic = await response.json();
+        currentTopic = { ...currentTopic, ...topic };
+        currentFaqs = topic.faqs || [];
+        faqCache.clear();
+
+        topicTitleEl.textContent = topic.title;
+        topicTextEl.innerHTML = `<p>${escapeHtml(topic.content_text)}</p>`;
+
+        const faqsVisible = faqSectionEl.style.display !== 'none';
+        displayFAQs(currentFaqs);
+        if (faqsVisible && currentFaqs.length > 0) {
+            faqSectionEl.style.display = 'block';
+        }
+    } catch (error) {
+        console.warn('Could not refresh topic:', error);
+    }
+}
+
 /**
  * Display FAQs as buttons
  */
@@ -243,28 +772,41 @@ async function selectFAQ(faqId) {
             audioError.style.display = 'none';
         }
         
-        // Fetch FAQ details
-        const response = await fetch(`${API_BASE}/faqs/${faqId}`);
-        if (!response.ok) {
-            throw new Error('Failed to fetch FAQ details');
+        // Use the prefetched FAQ if we have it, otherwise fetch details
+        let faq = faqCache.get(faqId);
+        if (!faq) {
+            const response = await fetch(`${API_BASE}/faqs/${faqId}`);
+            if (!response.ok) {
+                throw new Error('Failed to fetch FAQ details');
+            }
+            faq = await response.json();
+            faqCache.set(faqId, faq);
         }
 
-        const faq = await response.json();
         displayFAQAnswer(faq);
 
+        // Keep the sprite in sync with the answer audio
+        if (avatarSprite.style.display !== 'none') {
+            timingTrack = null;
+            loadTimingTrack(`/faqs/${faq.id}/timing`).then(track => {
+                timingTrack = track;
+            });
+        }
+
         // Play FAQ audio while keeping video looping
         if (faq.answer_audio_url) {
-            voiceAudio.src = faq.answer_audio_url;
-            voiceAudio.load();
-            
-            setTimeout(() => {
-                voiceAudio.play().catch(error => {
-                    console.error('Error playing FAQ audio:', error);
-                    if (audioError) {
-                        audioError.style.display = 'block';
-                    }
-                });
-            }, 100);
+            const prefetchedUrl = prefetchedAudio.get(faq.answer_audio_url);
+            await setAudioSource(
+                prefetchedUrl || await pickAudioUrl(`/faqs/${faq.id}/audio-variants`, faq.answer_audio_url)
+            );
+            unreportedPlay = { kind: 'faqs', id: faq.id };
+
+            voiceAudio.play().catch(error => {
+                console.error('Error playing FAQ audio:', error);
+                if (audioError) {
+                    audioError.style.display = 'block';
+                }
+            });
         } else {
             console.warn('No audio URL for this FAQ');
         }
@@ -299,6 +841,22 @@ function closeFaqAnswer() {
 function onAudioPlay() {
     statusIndicator.style.display = 'flex';
     statusText.textContent = 'Speaking...';
+    reportPlay();
+}
+
+/**
+ * Count a play of the loaded topic/FAQ audio, once per load
+ * (resuming after a pause is not a new play)
+ */
+function reportPlay() {
+    if (!unreportedPlay) {
+        return;
+    }
+    const url = `${API_BASE}/${unreportedPlay.kind}/${unreportedPlay.id}/play`;
+    unreportedPlay = null;
+    if (!(navigator.sendBeacon && navigator.sendBeacon(url))) {
+        fetch(url, { method: 'POST', keepalive: true }).catch(() => {});
+    }
 }
 
 function onAudioEnded() {
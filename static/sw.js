@@ -0,0 +1,267 @@
+/**
+ * Avatar Teacher Service Worker
+ * Caches the app shell, topic/FAQ JSON and audio for fast and offline revisits
+ *
+ * - App shell: stale-while-revalidate
+ * - API JSON: stale-while-revalidate, revalidated with the server's ETag
+ * - Audio: cache-first, capped at AUDIO_CACHE_MAX_BYTES with LRU eviction.
+ *   Audio saved with "download for offline" is pinned and never evicted.
+ */
+
+const SHELL_CACHE = 'avatar-shell-v1';
+const API_CACHE = 'avatar-api-v1';
+const AUDIO_CACHE = 'avatar-audio-v1';
+
+const SHELL_URLS = ['/', '/static/app.js', '/static/styles.css'];
+
+const AUDIO_CACHE_MAX_BYTES = 50 * 1024 * 1024;
+// url -> { size, lastUsed, pinned }, stored as a JSON entry in the audio cache
+const AUDIO_INDEX_KEY = '/__audio-index__';
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(SHELL_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    const currentCaches = [SHELL_CACHE, API_CACHE, AUDIO_CACHE];
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => !currentCaches.includes(key)).map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (url.pathname.startsWith('/static/media/audio/')) {
+        event.respondWith(audioCacheFirst(request));
+    } else if (url.pathname.startsWith('/api/') && !/\/(hls|events)(\/|$)/.test(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, API_CACHE));
+    } else if (SHELL_URLS.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, SHELL_CACHE));
+    }
+});
+
+self.addEventListener('message', event => {
+    const port = event.ports[0];
+    if (!event.data || event.data.type !== 'download-topic' || !port) {
+        return;
+    }
+
+    event.waitUntil(
+        downloadTopic(event.data.topicId)
+            .then(result => port.postMessage({ ok: true, ...result }))
+            .catch(error => port.postMessage({ ok: false, error: error.message }))
+    );
+});
+
+/**
+ * Stale-while-revalidate
+ */
+async function staleWhileRevalidate(event, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+    const revalidated = revalidate(cache, event.request.url, cached);
+
+    // Callers that explicitly bypass caches get the fresh response
+    const wantsFresh = ['no-store', 'reload', 'no-cache'].includes(event.request.cache);
+    if (cached && !wantsFresh) {
+        event.waitUntil(revalidated.catch(() => {}));
+        return cached;
+    }
+    return revalidated;
+}
+
+/**
+ * Refresh a cached entry, sending its ETag so an unchanged resource costs a 304
+ */
+async function revalidate(cache, url, cached) {
+    const headers = new Headers();
+    const etag = cached && cached.headers.get('ETag');
+    if (etag) {
+        headers.set('If-None-Match', etag);
+    }
+
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    if (response.status === 304 && cached) {
+        return cached;
+    }
+    if (response.ok) {
+        await cache.put(url, response.clone());
+    }
+    return response;
+}
+
+/**
+ * Cache-first for audio. Audio filenames are content hashes, so cached
+ * files never go stale.
+ */
+async function audioCacheFirst(request) {
+    const cache = await caches.open(AUDIO_CACHE);
+    let response = await cache.match(request.url);
+
+    if (response) {
+        updateAudioIndex(index => {
+            if (index[request.url]) {
+                index[request.url].lastUsed = Date.now();
+            }
+        });
+    } else {
+        try {
+            response = await cacheAudio(cache, request.url, false);
+        } catch (error) {
+            return fetch(request);
+        }
+    }
+
+    return rangeResponse(request, response);
+}
+
+/**
+ * Download a whole audio file into the cache and record it in the LRU index
+ */
+async function cacheAudio(cache, url, pinned) {
+    // Index keys must match request.url, so always use absolute URLs
+    url = new URL(url, self.location.origin).href;
+
+    // Always fetch the full file (no Range) so the cached copy is complete
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`Failed to fetch ${url}: ${response.status}`);
+    }
+
+    const blob = await response.clone().blob();
+    await cache.put(url, response.clone());
+    await updateAudioIndex(index => {
+        const previous = index[url];
+        index[url] = {
+            size: blob.size,
+            lastUsed: Date.now(),
+            pinned: pinned || Boolean(previous && previous.pinned)
+        };
+    });
+    return response;
+}
+
+/**
+ * Answer a Range request from a full cached response, as media elements expect
+ */
+async function rangeResponse(request, response) {
+    const range = request.headers.get('Range');
+    const match = range && /^bytes=(\d*)-(\d*)$/.exec(range);
+    if (!match) {
+        return response;
+    }
+
+    const blob = await response.blob();
+    let start = match[1] === '' ? null : Number(match[1]);
+    let end = match[2] === '' ? blob.size - 1 : Math.min(Number(match[2]), blob.size - 1);
+    if (start === null) {
+        // Suffix range: the last N bytes
+        start = Math.max(blob.size - Number(match[2]), 0);
+        end = blob.size - 1;
+    }
+
+    return new Response(blob.slice(start, end + 1), {
+        status: 206,
+        headers: {
+            'Content-Type': response.headers.get('Content-Type') || 'audio/mpeg',
+            'Content-Range': `bytes ${start}-${end}/${blob.size}`,
+            'Content-Length': String(end - start + 1),
+            'Accept-Ranges': 'bytes'
+        }
+    });
+}
+
+// Index updates are serialised so concurrent fetches can't lose entries
+let audioIndexQueue = Promise.resolve();
+
+function updateAudioIndex(mutate) {
+    audioIndexQueue = audioIndexQueue.then(async () => {
+        const cache = await caches.open(AUDIO_CACHE);
+        const stored = await cache.match(AUDIO_INDEX_KEY);
+        const index = stored ? await stored.json() : {};
+
+        mutate(index);
+        await evictAudio(cache, index);
+
+        await cache.put(AUDIO_INDEX_KEY, new Response(JSON.stringify(index), {
+            headers: { 'Content-Type': 'application/json' }
+        }));
+    }).catch(error => console.warn('Audio cache index update failed:', error));
+
+    return audioIndexQueue;
+}
+
+/**
+ * Evict least recently used, unpinned audio until the cache fits the cap
+ */
+async function evictAudio(cache, index) {
+    let total = Object.values(index).reduce((sum, entry) => sum + entry.size, 0);
+    const candidates = Object.entries(index)
+        .filter(([, entry]) => !entry.pinned)
+        .sort((a, b) => a[1].lastUsed - b[1].lastUsed);
+
+    for (const [url, entry] of candidates) {
+        if (total <= AUDIO_CACHE_MAX_BYTES) {
+            break;
+        }
+        await cache.delete(url);
+        delete index[url];
+        total -= entry.size;
+    }
+}
+
+/**
+ * Save a topic, its FAQs, timing tracks and all their audio for offline use
+ */
+async function downloadTopic(topicId) {
+    const apiCache = await caches.open(API_CACHE);
+    const audioCache = await caches.open(AUDIO_CACHE);
+
+    async function cacheJson(url, required) {
+        const response = await fetch(url, { cache: 'no-store' });
+        if (!response.ok) {
+            if (required) {
+                throw new Error(`Failed to fetch ${url}: ${response.status}`);
+            }
+            return null;
+        }
+        await apiCache.put(url, response.clone());
+        return response.json();
+    }
+
+    const topic = await cacheJson(`/api/topics/${topicId}`, true);
+    await cacheJson(`/api/topics/${topicId}/timing`, false);
+    const audioUrls = [topic.audio_url];
+
+    for (const item of topic.faqs || []) {
+        const faq = await cacheJson(`/api/faqs/${item.id}`, true);
+        await cacheJson(`/api/faqs/${item.id}/timing`, false);
+        audioUrls.push(faq.answer_audio_url);
+    }
+
+    let bytes = 0;
+    const files = audioUrls.filter(Boolean);
+    for (const url of files) {
+        const response = await cacheAudio(audioCache, url, true);
+        bytes += Number(response.headers.get('Content-Length') || 0);
+    }
+
+    return { files: files.length, bytes };
+}
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Test script for admission control, load shedding and request deadlines,
+which event streams and static files don't get. Runs in-process on
+mongomock and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_limiter_queues_then_rejects():
+    from app.admission import ConcurrencyLimiter
+
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", concurrency=1, queue_size=1)
+        assert await limiter.acquire(1.0)
+
+        waiting = asyncio.ensure_future(limiter.acquire(1.0))
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 1
+        # Queue full: turned away at once
+        assert not await limiter.acquire(1.0)
+
+        limiter.release()
+        assert await waiting
+        # Nobody releases this time: the wait times out
+        assert not await limiter.acquire(0.05)
+        limiter.release()
+        assert limiter.stats()["active"] == 0
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2
+    assert stats["rejected_queue_full"] == 1
+    assert stats["rejected_wait"] == 1
+
+
+def test_shedding_and_deadlines():
+    from benchmarks.fakes import setup_environment, FakeTTS
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_admission_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import admin, admission, db
+        from app.main import app
+
+        admin.ADMIN_TOKEN = "test-admin-token"
+        with TestClient(app) as client:
+            topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+            topic_url = f"/api/topics/{topic['id']}"
+            open_topic = next(item for item in admission.ROUTE_LIMITS if item.name == "open_topic")
+
+            # A full route is shed with 503 and Retry-After
+            concurrency = open_topic.limiter.concurrency
+            open_topic.limiter.concurrency = 0
+            try:
+                shed = client.get(topic_url)
+            finally:
+                open_topic.limiter.concurrency = concurrency
+            assert shed.status_code == 503
+            assert shed.headers["retry-after"] == "1"
+
+            # New sessions are turned away while the worker is overloaded
+            shed_lag_ms = admission.ADMISSION_SHED_LAG_MS
+            admission.ADMISSION_SHED_LAG_MS = -1
+            try:
+                assert client.get("/api/topics").status_code == 503
+                assert client.get(f"/api/faqs/{'0' * 24}").status_code == 404
+            finally:
+                admission.ADMISSION_SHED_LAG_MS = shed_lag_ms
+
+            # Synthesis that can't finish before the client's deadline is abandoned
+            FakeTTS.latency = 0.5
+            try:
+                late = client.get(topic_url, headers={"X-Request-Timeout-Ms": "100"})
+            finally:
+                FakeTTS.latency = 0.0
+            assert late.status_code == 504
+            db.close_db()
+            assert db.get_topic_by_id(topic["id"])["audio_url"] is None
+
+            # With time to spare the audio is generated as usual
+            assert client.get(topic_url).json()["audio_url"]
+
+            metrics = client.get("/api/admin/metrics", headers={"X-Admin-Token": "test-admin-token"})
+            stats = metrics.json()["admission"]
+            assert stats["deadlines_exceeded"] == 1
+            assert stats["routes"]["list_topics"]["rejected_overload"] == 1
+    finally:
+        from app import admin
+
+        admin.ADMIN_TOKEN = ""
+        os.chdir(cwd)
+
+
+def test_creating_content_does_not_block_other_requests():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(tts_latency=0.5, database="edtech_admission_test")
+    try:
+        import httpx
+        from app import db
+        from app.main import app, lifespan
+        from app.tts_stub import pending_audio_jobs
+
+        async def run():
+            async with lifespan(app):
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    body = {"title": "Waves", "content_text": "Wind stirs the surface.", "language": "en"}
+                    create = asyncio.create_task(client.post("/api/topics", json=body))
+                    deadline = time.monotonic() + 10
+                    while not pending_audio_jobs():
+                        assert time.monotonic() < deadline, "synthesis did not start"
+                        await asyncio.sleep(0.01)
+                    # Synthesis runs in the threadpool: other requests are answered meanwhile
+                    assert (await client.get("/health")).status_code == 200
+                    assert not create.done()
+                    created = (await create).json()
+                    assert created["audio_url"]
+                    # ...and stores the avatar timing track like the read path does
+                    assert db.get_topic_by_id(created["id"])["timing_track"]
+
+        asyncio.run(run())
+    finally:
+        os.chdir(cwd)
+
+
+def test_database_reads_respect_deadline():
+    from benchmarks.fakes import install_mongomock
+    from app import db
+    from app.admission import DeadlineExceeded, set_deadline, _deadline
+
+    install_mongomock("edtech_admission_test")
+    topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+
+    token = set_deadline(-1)
+    try:
+        db.get_topic_by_id(topic["id"])
+        raise AssertionError("expired deadline should stop the query")
+    except DeadlineExceeded:
+        pass
+    finally:
+        _deadline.reset(token)
+    assert db.get_topic_by_id(topic["id"])["title"] == "Tides"
+
+
+def test_event_stream_outlives_the_deadline():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_admission_test")
+    try:
+        from app import admission, db, main
+        from app.admission import _request_timeout, remaining_seconds
+        from app.events import AUDIO_READY, broadcaster, stream_topic_events
+        from app.main import app, lifespan
+
+        deadlines = []
+
+        async def observed_stream(topic_id):
+            async for message in stream_topic_events(topic_id):
+                deadlines.append(remaining_seconds())
+                yield message
+
+        async def run():
+            async with lifespan(app):
+                topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+                path = f"/api/topics/{topic['id']}/events"
+                messages, disconnected = [], asyncio.Event()
+
+                async def receive():
+                    await disconnected.wait()
+                    return {"type": "http.disconnect"}
+
+                async def send(message):
+                    messages.append(message)
+
+                scope = {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": "GET",
+                    "scheme": "http",
+                    "path": path,
+                    "raw_path": path.encode(),
+                    "root_path": "",
+                    "query_string": b"",
+                    "headers": [(b"host", b"test")],
+                    "client": ("127.0.0.1", 1),
+                    "server": ("test", 80),
+                }
+                # Through the whole middleware stack; httpx would buffer the endless body
+                connection = asyncio.ensure_future(app(scope, receive, send))
+                deadline = time.monotonic() + 10
+                while broadcaster.subscriber_count() == 0:
+                    assert time.monotonic() < deadline, "stream did not open"
+                    await asyncio.sleep(0.01)
+
+                # Well past the request deadline, events still arrive
+                await asyncio.sleep(0.3)
+                broadcaster.publish(topic["id"], AUDIO_READY, {"kind": "topic", "id": topic["id"]})
+                while len(deadlines) < 2:
+                    assert time.monotonic() < deadline, "event not delivered"
+                    await asyncio.sleep(0.01)
+                disconnected.set()
+                await asyncio.wait_for(connection, 10)
+                return messages
+
+        request_deadline_ms = admission.REQUEST_DEADLINE_MS
+        admission.REQUEST_DEADLINE_MS = 100
+        main.stream_topic_events = observed_stream
+        try:
+            messages = asyncio.run(run())
+        finally:
+            admission.REQUEST_DEADLINE_MS = request_deadline_ms
+            main.stream_topic_events = stream_topic_events
+
+        assert messages[0]["status"] == 200
+        assert deadlines == [None, None]
+        assert b"event: audio-ready" in b"".join(message.get("body", b"") for message in messages)
+
+        # Only API request/response routes have a deadline
+        def timeout(path):
+            return _request_timeout({"path": path, "headers": []})
+
+        assert timeout("/api/topics") == admission.REQUEST_DEADLINE_MS / 1000
+        assert timeout("/api/topics/abc/events") == 0
+        assert timeout("/static/media/audio/topic_1.mp3") == 0
+        assert timeout("/") == 0
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing admission control...")
+    print("-" * 50)
+    test_limiter_queues_then_rejects()
+    test_shedding_and_deadlines()
+    test_creating_content_does_not_block_other_requests()
+    test_database_reads_respect_deadline()
+    test_event_stream_outlives_the_deadline()
+    print("\n✓ All admission tests passed")
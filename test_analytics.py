@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for the view/play counters and the popular topics endpoint.
+Runs in-process on mongomock (and a temporary SQLite file) with the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+@pytest.mark.parametrize("backend", ["mongo", "sqlite"])
+def test_counters_are_summed_per_bucket(backend):
+    from benchmarks.fakes import install_mongomock
+    from app import analytics
+    from app.repository import SQLiteRepository, get_repository, set_repository
+
+    # Counts left by other tests go to their own database first
+    analytics.set_recorder(analytics.CounterRecorder())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if backend == "sqlite":
+            set_repository(SQLiteRepository(str(Path(tmp_dir) / "catalogue.sqlite3")))
+        else:
+            install_mongomock("edtech_analytics_test")
+        repository = get_repository()
+        repository.ensure_indexes()
+        try:
+            # Two workers count independently and add to the same bucket
+            for _ in range(2):
+                recorder = analytics.CounterRecorder()
+                for _ in range(3):
+                    recorder.record("topic", "a" * 24, analytics.VIEWS)
+                recorder.record("topic", "b" * 24, analytics.VIEWS)
+                recorder.record("topic", "b" * 24, analytics.PLAYS)
+                recorder.record("faq", "c" * 24, analytics.VIEWS)
+                recorder.stop()
+                assert recorder.stats()["events_recorded"] == 6
+                assert recorder.stats()["counters_written"] == 3
+
+            # An older bucket only counts when the window reaches back to it
+            old_bucket = analytics.bucket_start(time.time() - 3 * analytics.ANALYTICS_BUCKET_S)
+            repository.add_counts({("topic", "b" * 24, old_bucket): {"views": 10, "plays": 0}})
+
+            hours = analytics.ANALYTICS_BUCKET_S / 3600
+            assert analytics.get_popular("topic", limit=5, hours=hours) == [
+                {"id": "a" * 24, "views": 6, "plays": 0},
+                {"id": "b" * 24, "views": 2, "plays": 2},
+            ]
+            hours = 4 * analytics.ANALYTICS_BUCKET_S / 3600
+            assert analytics.get_popular("topic", limit=1, hours=hours) == [
+                {"id": "b" * 24, "views": 12, "plays": 2}
+            ]
+            assert analytics.get_popular("faq") == [{"id": "c" * 24, "views": 2, "plays": 0}]
+        finally:
+            repository.close()
+            set_repository(None)
+
+
+def test_views_plays_and_popular_topics():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_analytics_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import admin, db
+        from app.main import app
+        from app.repository import get_repository
+
+        admin.ADMIN_TOKEN = "test-admin-token"
+        with TestClient(app) as client:
+            tides = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+            rain = db.insert_topic("Rain", "Clouds release water.", "en")
+            deleted = db.insert_topic("Snow", "Frozen rain.", "en")
+
+            for topic in (tides, tides, rain, deleted):
+                assert client.get(f"/api/topics/{topic['id']}").status_code == 200
+            # Prefetches are not views; plays are counted separately
+            client.get(f"/api/topics/{rain['id']}", headers={"Purpose": "prefetch"})
+            assert client.post(f"/api/topics/{rain['id']}/play").status_code == 204
+            assert client.post("/api/topics/not-an-id/play").status_code == 404
+            get_repository().db["topics"].delete_one({"title": "Snow"})
+
+        # Shutdown wrote the counters still held in memory
+        with TestClient(app) as client:
+            popular = client.get("/api/analytics/popular-topics").json()
+            assert [(item["title"], item["views"], item["plays"]) for item in popular] == [
+                ("Tides", 2, 0),
+                ("Rain", 1, 1),
+            ]
+            metrics = client.get("/api/admin/metrics", headers={"X-Admin-Token": "test-admin-token"})
+            assert metrics.json()["analytics"]["flush_errors"] == 0
+    finally:
+        from app import admin
+
+        admin.ADMIN_TOKEN = ""
+        os.chdir(cwd)
+
+
+def test_snapshot_nodes_do_not_count():
+    """With a read-only snapshot there is no database: nothing is counted or queried."""
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_analytics_snapshot_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import admin, analytics, db, snapshot
+        from app.main import app
+        from app.repository import get_repository
+
+        def unreachable(*args):
+            raise AssertionError("no database behind a snapshot node")
+
+        topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+        path = Path("catalogue.snap")
+        snapshot.export_snapshot(str(path))
+        repository = get_repository()
+        repository.add_counts = repository.top_counts = unreachable
+        recorder = analytics.CounterRecorder()
+        analytics.set_recorder(recorder)
+        snapshot.set_snapshot_path(str(path))
+        admin.ADMIN_TOKEN = "test-admin-token"
+        try:
+            with TestClient(app) as client:
+                assert client.get(f"/api/topics/{topic['id']}").status_code == 200
+                assert client.post(f"/api/topics/{topic['id']}/play").status_code == 204
+                assert client.get("/api/analytics/popular-topics").json() == []
+                metrics = client.get("/api/admin/metrics", headers={"X-Admin-Token": "test-admin-token"})
+                assert metrics.json()["analytics"]["enabled"] is False
+
+            assert analytics.get_popular("faq") == []
+            assert recorder.stats()["events_recorded"] == 0
+            assert recorder.stats()["flush_errors"] == 0
+
+            # Counted before the switch: dropped at shutdown, not retried forever
+            recorder.record("topic", topic["id"], analytics.VIEWS)
+            started = time.monotonic()
+            analytics.stop_analytics()
+            assert time.monotonic() - started < 1
+            assert recorder.stats()["counters_pending"] == 0
+        finally:
+            admin.ADMIN_TOKEN = ""
+            snapshot.set_snapshot_path(None)
+            del repository.add_counts, repository.top_counts
+            analytics.set_recorder(analytics.CounterRecorder())
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing view/play counters...")
+    print("-" * 50)
+    for backend in ("mongo", "sqlite"):
+        test_counters_are_summed_per_bucket(backend)
+        print(f"✓ {backend}")
+    test_views_plays_and_popular_topics()
+    test_snapshot_nodes_do_not_count()
+    print("\n✓ All analytics tests passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for duplicate narration detection.
+Runs against mongomock and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+ANSWER = (
+    "Photosynthesis turns light energy into chemical energy, "
+    "storing it as glucose inside the plant's cells."
+)
+
+
+def test_normalisation_ignores_case_punctuation_and_whitespace():
+    from app.dedup import normalize_text, text_key
+
+    assert normalize_text("  Hello,   WORLD!\n") == "hello world"
+    assert text_key("Hello, world!") == text_key("hello world")
+    assert text_key("Hello, world!", "en") != text_key("Hello, world!", "hi")
+
+
+def test_normalisation_keeps_devanagari_vowel_signs():
+    """Matras and the virama are part of the word, not punctuation."""
+    from app.dedup import normalize_text, text_key
+
+    for a, b in [("दिन", "दान"), ("कि", "की"), ("पत्र", "पतर"), ("हैं", "है")]:
+        assert text_key(a, "hi") != text_key(b, "hi"), (a, b)
+    # The danda is punctuation
+    assert normalize_text("नमस्ते, दुनिया।") == "नमस्ते दुनिया"
+    assert text_key("नमस्ते दुनिया।", "hi") == text_key("नमस्ते  दुनिया", "hi")
+
+
+def test_equivalent_answers_share_one_synthesis():
+    """Answers that differ only in punctuation and spacing are synthesised once."""
+    from benchmarks.fakes import make_sandbox, FakeTTS
+    from app import tts_stub
+
+    calls = []
+
+    class CountingTTS(FakeTTS):
+        def save(self, path):
+            calls.append(self.text)
+            super().save(path)
+
+    cwd = os.getcwd()
+    make_sandbox(copy_audio=False)
+    tts_stub.set_tts_engine(CountingTTS)
+    try:
+        variants = [ANSWER, ANSWER.upper(), ANSWER.replace(",", "").replace(" ", "  ")]
+        urls = {
+            tts_stub.get_or_generate_audio_for_faq({"question": "q", "answer": text, "language": "en"})
+            for text in variants
+        }
+        assert len(urls) == 1
+        assert len(calls) == 1
+
+        # The same text in another language is its own recording
+        hindi = tts_stub.get_or_generate_audio_for_faq(
+            {"question": "q", "answer": ANSWER, "language": "hi"}
+        )
+        assert hindi not in urls
+    finally:
+        tts_stub.set_tts_engine(None)
+        os.chdir(cwd)
+
+
+def test_report_clusters_near_duplicates():
+    from app.dedup import DuplicateIndex, duplicate_report
+
+    index = DuplicateIndex()
+    index.add("faq:1", ANSWER)
+    index.add("faq:2", ANSWER.lower() + "  ")
+    index.add("faq:3", ANSWER.replace("inside the plant's cells", "inside plant cells"))
+    index.add("faq:4", "Gravity pulls objects toward the centre of the Earth.")
+    index.add("faq:5", ANSWER, language="hi")
+
+    near = index.find_similar(ANSWER, threshold=0.5)
+    assert {entry["id"] for _, entry in near} == {"faq:1", "faq:2", "faq:3"}
+
+    report = duplicate_report(index, threshold=0.5)
+    assert len(report["clusters"]) == 1
+    cluster = report["clusters"][0]
+    assert cluster["members"] == ["faq:1", "faq:2", "faq:3"]
+    assert cluster["normalized_forms"] == 2
+    assert cluster["syntheses_saved"] == 1
+    assert report["synthesis_seconds_saved"] == round(
+        (len(ANSWER) + 2) * report["seconds_per_char"], 1
+    )
+
+
+if __name__ == "__main__":
+    print("Testing duplicate narration detection...")
+    print("-" * 50)
+    test_normalisation_ignores_case_punctuation_and_whitespace()
+    test_normalisation_keeps_devanagari_vowel_signs()
+    test_equivalent_answers_share_one_synthesis()
+    test_report_clusters_near_duplicates()
+    print("\n✓ All dedup tests passed")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-topic Server-Sent Events stream (app.events):
+audio-ready and content-changed events reach the topic's subscribers,
+and only them. Runs in-process on mongomock and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+async def _next_event(stream, timeout: float = 10):
+    """Read the next SSE message, skipping keep-alives: (event, data)."""
+    while True:
+        message = await asyncio.wait_for(stream.__anext__(), timeout)
+        if message.startswith("event:"):
+            event, data = message.strip().split("\n")
+            return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def test_audio_ready_and_content_changed_are_pushed():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(tts_latency=0.05, database="edtech_events_test")
+    try:
+        import httpx
+        from app import db
+        from app.events import broadcaster
+        from app.main import app, get_topic_events, lifespan
+
+        async def run():
+            async with lifespan(app):
+                topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+                other = db.insert_topic("Rain", "Clouds release water.", "en")
+
+                # httpx's in-process transport buffers whole bodies, so read the stream directly
+                response = await get_topic_events(topic["id"])
+                assert response.media_type == "text/event-stream"
+                assert response.headers["cache-control"] == "no-cache"
+                stream = response.body_iterator
+                assert await stream.__anext__() == "retry: 3000\n\n"
+                assert broadcaster.subscriber_count() == 1
+
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    # Opening the topic synthesises its narration
+                    opened = (await client.get(f"/api/topics/{topic['id']}")).json()
+                    assert await _next_event(stream) == (
+                        "audio-ready",
+                        {"kind": "topic", "id": topic["id"], "audio_url": opened["audio_url"]},
+                    )
+
+                    faq = (
+                        await client.post(
+                            "/api/faqs",
+                            json={"topic_id": topic["id"], "question": "Why?", "answer": "Gravity.", "language": "en"},
+                        )
+                    ).json()
+                    assert await _next_event(stream) == ("content-changed", {"kind": "faq", "id": faq["id"]})
+                    assert await _next_event(stream) == (
+                        "audio-ready",
+                        {"kind": "faq", "id": faq["id"], "audio_url": faq["answer_audio_url"]},
+                    )
+
+                    # Other topics' events are not delivered here
+                    await client.patch(f"/api/topics/{other['id']}", json={"title": "Heavy rain"})
+                    await client.patch(f"/api/topics/{topic['id']}", json={"title": "Ocean tides"})
+                    assert await _next_event(stream) == ("content-changed", {"kind": "topic", "id": topic["id"]})
+
+                    assert (await client.get("/api/topics/" + "0" * 24 + "/events")).status_code == 404
+
+                await stream.aclose()
+                assert broadcaster.subscriber_count() == 0
+
+        asyncio.run(run())
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing topic event stream...")
+    print("-" * 50)
+    test_audio_ready_and_content_changed_are_pushed()
+    print("\n✓ All event stream tests passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for sparse fieldsets (?fields=) on the topic and FAQ endpoints.
+Runs in-process on mongomock and on a SQLite file with the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+@pytest.mark.parametrize("backend", ["mongo", "sqlite"])
+def test_sparse_fieldsets(backend):
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    previous = os.environ.get("DB_BACKEND")
+    os.environ["DB_BACKEND"] = backend
+    setup_environment(database="edtech_fieldsets_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import db
+        from app.main import app
+        from app.repository import TOPICS, get_repository, set_repository
+
+        from app.pregen import set_pregenerator
+
+        with TestClient(app) as client:
+            # Only requests synthesise audio here
+            set_pregenerator(None)
+            tides = db.insert_topic("Tides", "The moon pulls the oceans. " * 50, "en")
+            faq = db.insert_faq(tides["id"], "How often?", "Twice a day.", "en")
+
+            # Only the requested fields are read from the database
+            assert get_repository().get(TOPICS, tides["id"], ("title",)) == {
+                "id": tides["id"],
+                "title": "Tides",
+            }
+
+            # Asking for neither audio nor FAQs neither synthesises nor lists them
+            url = f"/api/topics/{tides['id']}"
+            response = client.get(url, params={"fields": "title,language"})
+            assert response.status_code == 200
+            assert response.json() == {"id": tides["id"], "title": "Tides", "language": "en"}
+            assert db.get_topic_by_id(tides["id"])["audio_url"] is None
+
+            response = client.get(url, params={"fields": "title,audio_url,faqs"})
+            body = response.json()
+            assert set(body) == {"id", "title", "audio_url", "faqs"}
+            assert body["audio_url"].endswith(".mp3")
+            assert body["faqs"] == [{"id": faq["id"], "question": "How often?", "answer_audio_url": None}]
+            assert "rel=preload" in response.headers["Link"]
+            assert len(response.content) < len(client.get(url).content) / 4
+
+            response = client.get(f"/api/faqs/{faq['id']}", params={"fields": "question"})
+            assert response.json() == {"id": faq["id"], "question": "How often?"}
+            assert db.get_faq_by_id(faq["id"])["answer_audio_url"] is None
+            response = client.get(f"/api/faqs/{faq['id']}", params={"fields": "answer_audio_url,version"})
+            assert set(response.json()) == {"id", "answer_audio_url", "version"}
+            assert response.json()["answer_audio_url"].endswith(".mp3")
+
+            # The list returns any topic fields on request, and the usual three otherwise
+            listed = client.get("/api/topics", params={"fields": "audio_url"}).json()
+            assert {"id": tides["id"], "audio_url": body["audio_url"]} in listed
+            assert set(client.get("/api/topics").json()[0]) == {"id", "title", "language"}
+
+            response = client.get(url, params={"fields": "title,colour"})
+            assert response.status_code == 400
+            assert "colour" in response.json()["detail"]
+    finally:
+        set_repository(None)
+        if previous is None:
+            os.environ.pop("DB_BACKEND", None)
+        else:
+            os.environ["DB_BACKEND"] = previous
+        os.chdir(cwd)
+
+
+def test_narrowed_models_are_cached():
+    from app.fieldsets import narrow_model, parse_fields
+    from app.models import FAQ
+
+    fields = parse_fields(" answer_audio_url, question ,", FAQ)
+    assert fields == ("question", "answer_audio_url", "id")
+    assert parse_fields(None, FAQ) is None
+    assert narrow_model(FAQ, fields) is narrow_model(FAQ, parse_fields("question,answer_audio_url", FAQ))
+    assert list(narrow_model(FAQ, fields).model_fields) == ["question", "answer_audio_url", "id"]
+    with pytest.raises(ValueError):
+        parse_fields("question,_id", FAQ)
+
+
+if __name__ == "__main__":
+    print("Testing sparse fieldsets...")
+    print("-" * 50)
+    for backend in ("mongo", "sqlite"):
+        test_sparse_fieldsets(backend)
+        print(f"✓ {backend}")
+    test_narrowed_models_are_cached()
+    print("\n✓ All fieldset tests passed")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for HLS packaging of topic narrations.
+Measures how many bytes a player must fetch before playback can start,
+with and without segmentation.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+SAMPLE_AUDIO = Path(__file__).parent / "static" / "media" / "audio" / "topic_1.mp3"
+
+
+def _package(tmp_dir: str) -> Path:
+    from app.hls import package_hls
+
+    return package_hls(SAMPLE_AUDIO, hls_root=Path(tmp_dir), force=True)
+
+
+def test_segments_preserve_audio():
+    """Concatenated segment frames must equal the original frames."""
+    from app.mp3 import iter_frames
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        playlist = _package(tmp_dir)
+        assert playlist is not None
+
+        original = SAMPLE_AUDIO.read_bytes()
+        original_frames = b"".join(
+            original[f.offset : f.offset + f.length] for f in iter_frames(original)
+        )
+
+        segments = sorted(playlist.parent.glob("seg_*.mp3"))
+        rebuilt = b""
+        for segment in segments:
+            data = segment.read_bytes()
+            assert data[:3] == b"ID3"  # packed audio timestamp tag
+            rebuilt += b"".join(data[f.offset : f.offset + f.length] for f in iter_frames(data))
+
+        assert rebuilt == original_frames
+        assert playlist.read_text().count("#EXTINF") == len(segments)
+
+
+def test_bytes_before_playback():
+    """Playback needs only the playlist and first segment, not the whole file."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        playlist = _package(tmp_dir)
+        first_segment = playlist.parent / "seg_00000.mp3"
+
+        progressive_bytes = SAMPLE_AUDIO.stat().st_size
+        hls_bytes = playlist.stat().st_size + first_segment.stat().st_size
+
+        print(f"  progressive MP3 : {progressive_bytes / 1024:6.1f} KB before smooth seeking")
+        print(f"  HLS first play  : {hls_bytes / 1024:6.1f} KB (playlist + first segment)")
+        print(f"  reduction       : {100 * (1 - hls_bytes / progressive_bytes):.0f}%")
+
+        assert hls_bytes < progressive_bytes / 4
+
+
+def test_short_audio_not_packaged():
+    """Narrations shorter than the minimum duration stay progressive."""
+    from app.hls import package_hls
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert package_hls(SAMPLE_AUDIO, hls_root=Path(tmp_dir), min_duration=3600) is None
+
+
+if __name__ == "__main__":
+    print("Testing HLS packaging...")
+    print("-" * 50)
+    test_segments_preserve_audio()
+    print("✓ Segments preserve the original audio frames")
+    test_bytes_before_playback()
+    print("✓ First playback fetches a fraction of the file")
+    test_short_audio_not_packaged()
+    print("✓ Short narrations are not packaged")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the server-rendered index page.
+Runs in-process on mongomock and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _initial_data(html: str):
+    match = re.search(r'<script id="initialData" type="application/json">(.*?)</script>', html)
+    assert match, "page has no inline data"
+    return json.loads(match.group(1))
+
+
+def test_index_embeds_topics_and_rerenders_on_change():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_index_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import db, index_page
+        from app.main import app
+
+        with TestClient(app) as client:
+            db.clear_catalogue()
+            tides = db.insert_topic("Tides </script><b>", "The moon pulls the oceans.", "en")
+
+            first = client.get("/")
+            assert first.status_code == 200
+            assert "<b>" not in first.text.split('id="initialData"')[1].split("</script>")[0]
+            assert _initial_data(first.text)["topics"] == [
+                {"id": tides["id"], "title": "Tides </script><b>", "language": "en"}
+            ]
+
+            # Served from memory until the catalogue changes
+            page = index_page.get_index_page()
+            assert client.get("/", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+            assert index_page.get_index_page() is page
+
+            # Audio updates don't touch the list; a new topic does
+            db.update_topic_audio(tides["id"], "/static/media/audio/topic_1.mp3")
+            assert index_page.get_index_page() is page
+            rain = client.post(
+                "/api/topics",
+                json={"title": "Rain", "content_text": "Clouds release water.", "language": "en"},
+            ).json()
+            second = client.get("/")
+            assert second.headers["etag"] != first.headers["etag"]
+            assert [item["title"] for item in _initial_data(second.text)["topics"]] == [
+                "Tides </script><b>",
+                "Rain",
+            ]
+
+            # A deep link embeds the topic with its FAQs once its audio is ready
+            db.insert_faq(rain["id"], "Why?", "Gravity.", "en")
+            linked = _initial_data(client.get("/", params={"topic": rain["id"]}).text)
+            assert linked["topic"]["id"] == rain["id"]
+            assert [faq["question"] for faq in linked["topic"]["faqs"]] == ["Why?"]
+            missing = _initial_data(client.get("/", params={"topic": "0" * 24}).text)
+            assert "topic" not in missing
+    finally:
+        os.chdir(cwd)
+
+
+def test_large_catalogue_is_counted_not_loaded():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_index_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import db, index_page
+        from app.main import app
+
+        listed = []
+        get_all_topics = index_page.get_all_topics
+        max_embedded = index_page.INDEX_MAX_EMBEDDED_TOPICS
+
+        def counting_get_all_topics(*args):
+            listed.append(args)
+            return get_all_topics(*args)
+
+        index_page.get_all_topics = counting_get_all_topics
+        index_page.INDEX_MAX_EMBEDDED_TOPICS = 2
+        try:
+            with TestClient(app) as client:
+                db.clear_catalogue()
+                for title in ("Tides", "Rain"):
+                    db.insert_topic(title, "Text.", "en")
+                index_page.reset_index_page()
+                assert len(_initial_data(client.get("/").text)["topics"]) == 2
+                assert len(listed) == 1
+
+                # Over the limit the page falls back to /api/topics without loading the list
+                db.insert_topic("Wind", "Text.", "en")
+                assert _initial_data(client.get("/").text)["topics"] is None
+                assert len(listed) == 1
+        finally:
+            index_page.get_all_topics = get_all_topics
+            index_page.INDEX_MAX_EMBEDDED_TOPICS = max_embedded
+            index_page.reset_index_page()
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing index page rendering...")
+    print("-" * 50)
+    test_index_embeds_topics_and_rerenders_on_change()
+    test_large_catalogue_is_counted_not_loaded()
+    print("\n✓ All index page tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the session-replay load generator (benchmarks/loadgen.py):
+sessions replayed in-process against mongomock and the fake TTS engine
+record every step of the frontend flow, and the saturation criteria.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_sessions_follow_the_frontend_flow():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_loadgen_test")
+    try:
+        import httpx
+        from app.main import app, lifespan
+        from benchmarks.loadgen import StepStats, run_session
+
+        random.seed(7)
+
+        async def run():
+            async with lifespan(app):
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    stats = StepStats()
+                    sessions = [
+                        run_session(client, stats, time.perf_counter(), think_time=0, max_faqs=3, timeout=10)
+                        for _ in range(10)
+                    ]
+                    assert all(await asyncio.gather(*sessions))
+                    return stats.summary(elapsed=1.0)
+
+        summary = asyncio.run(run())
+        assert summary["session"]["ok"] == 10
+        assert summary["list_topics"]["ok"] == summary["open_topic"]["ok"] == 10
+        # The seeded topics have audio: every open plays it with its timing track
+        assert summary["topic_audio"]["ok"] == summary["topic_timing"]["ok"] == 10
+        assert summary["faq"]["ok"] == summary["faq_audio"]["ok"] > 0
+        for row in summary.values():
+            assert row["errors"] == 0
+            assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+    finally:
+        os.chdir(cwd)
+
+
+def test_saturation_criteria():
+    from benchmarks.loadgen import is_saturated
+
+    def result(completed=100, errors=0, p95_ms=50.0):
+        return {
+            "offered": 100,
+            "completed": completed,
+            "steps": {
+                "open_topic": {"error_rate": errors / 100, "p95_ms": p95_ms},
+                # Sessions include think time, so they are not held to the objective
+                "session": {"error_rate": 0.0, "p95_ms": 5000.0},
+            },
+        }
+
+    assert is_saturated(result(), slo_ms=500) is None
+    assert "sessions completed" in is_saturated(result(completed=90), slo_ms=500)
+    assert "error rate" in is_saturated(result(errors=5), slo_ms=500)
+    assert "p95" in is_saturated(result(p95_ms=800), slo_ms=500)
+
+
+if __name__ == "__main__":
+    print("Testing load generator...")
+    print("-" * 50)
+    test_sessions_follow_the_frontend_flow()
+    test_saturation_criteria()
+    print("\n✓ All load generator tests passed")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the microbenchmark suite (benchmarks/microbench.py): the
+regression gate, and a smoke run of every case against mongomock and the
+fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_gate_flags_regressions_beyond_the_threshold():
+    from benchmarks.microbench import compare, percentile
+
+    assert percentile([1, 2, 3, 4, 5], 0.5) == 3
+    assert percentile([1, 2, 3, 4, 5], 0.99) == 5
+
+    baseline = {
+        "db.get_topic_by_id": {"ops_per_sec": 1000, "p50_us": 100},
+        "route.health": {"ops_per_sec": 500, "p50_us": 200},
+    }
+    results = {
+        # Within 30%: not a regression
+        "db.get_topic_by_id": {"ops_per_sec": 750, "p50_us": 125},
+        # Slower on both counts
+        "route.health": {"ops_per_sec": 300, "p50_us": 300},
+        # Not in the baseline yet: ignored
+        "route.new_case": {"ops_per_sec": 1, "p50_us": 1e6},
+    }
+    regressions = compare(results, baseline, threshold=0.3)
+    assert len(regressions) == 2
+    assert all(regression.startswith("route.health:") for regression in regressions)
+
+
+def test_every_case_runs():
+    from benchmarks.fakes import setup_environment
+    from benchmarks.microbench import DEFAULT_BASELINE, build_cases, measure
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_microbench_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        with TestClient(app) as client:
+
+            def get(path: str):
+                response = client.get(path)
+                response.raise_for_status()
+                return response
+
+            cases = build_cases(get)
+            for name, func in cases:
+                result = measure(func, min_time=0.01, rounds=1, warmup=1)
+                assert result["ops_per_sec"] > 0, name
+                assert result["p50_us"] <= result["p95_us"] <= result["p99_us"], name
+
+        # Every case in the committed baseline is still measured
+        names = {name for name, _ in cases}
+        assert set(json.loads(DEFAULT_BASELINE.read_text())) <= names
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing microbenchmark suite...")
+    print("-" * 50)
+    test_gate_flags_regressions_beyond_the_threshold()
+    test_every_case_runs()
+    print("\n✓ All microbenchmark suite tests passed")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Test script for predictive FAQ audio generation (app.pregen): opening a
+topic queues its FAQs most viewed first, a click takes over or waits for
+the job instead of synthesising twice, edits and shutdown drop jobs, and
+without view counts the list order is kept.
+Runs in-process on mongomock with the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+async def _until(condition, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_topic_opening_pregenerates_popular_faqs():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(tts_latency=0.05, database="edtech_pregen_test")
+    try:
+        import httpx
+        from app import db
+        from app.analytics import FAQ_KIND, VIEWS, bucket_start
+        from app.main import app, lifespan, _generate_faq_audio
+        from app.pregen import FaqPregenerator, get_pregen_stats, set_pregenerator
+        from app.repository import get_repository
+
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def generate(faq_id, faq):
+            calls.append(faq_id)
+            started.set()
+            release.wait(10)
+            return _generate_faq_audio(faq_id, faq)
+
+        async def run():
+            async with lifespan(app):
+                pregenerator = FaqPregenerator(generate, concurrency=1, per_topic=3)
+                set_pregenerator(pregenerator)
+                topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+                db.update_topic_audio(topic["id"], "/static/media/audio/topic_1.mp3")
+                a, b, c, d = (
+                    db.insert_faq(topic["id"], f"Question {name}?", f"Answer {name}.", "en")["id"]
+                    for name in "abcd"
+                )
+                bucket = bucket_start(time.time())
+                get_repository().add_counts(
+                    {(FAQ_KIND, c, bucket): {VIEWS: 5}, (FAQ_KIND, a, bucket): {VIEWS: 3}}
+                )
+
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    url = f"/api/topics/{topic['id']}"
+                    await client.get(url, headers={"Purpose": "prefetch"})
+                    assert get_pregen_stats()["scheduled"] == 0
+
+                    # Most viewed first, then list order, at most per_topic of them
+                    await client.get(url)
+                    assert started.wait(10)
+                    assert calls == [c]
+                    assert get_pregen_stats()["queued"] == 2
+
+                    # Editing b drops its job
+                    response = await client.patch(f"/api/faqs/{b}", json={"answer": "Answer b, revised."})
+                    assert response.status_code == 200
+                    assert get_pregen_stats()["cancelled"] == 1
+
+                    # A click on the FAQ being synthesised waits for it
+                    click = asyncio.create_task(client.get(f"/api/faqs/{c}"))
+                    await _until(lambda: get_pregen_stats()["claimed"] == 1)
+                    assert not click.done()
+                    release.set()
+                    assert (await click).json()["answer_audio_url"]
+
+                    await _until(lambda: get_pregen_stats()["generated"] == 2)
+                    assert calls == [c, a]
+                    assert db.get_faq_by_id(a)["answer_audio_url"]
+                    assert db.get_faq_by_id(b)["answer_audio_url"] is None
+                    assert db.get_faq_by_id(d)["answer_audio_url"] is None
+                    assert (await client.get(f"/api/faqs/{a}")).json()["answer_audio_url"]
+                    assert calls == [c, a]
+
+                    # A click on a queued FAQ synthesises it and drops the job
+                    release.clear()
+                    started.clear()
+                    other = db.insert_topic("Waves", "Wind stirs the surface.", "en")
+                    db.update_topic_audio(other["id"], "/static/media/audio/topic_1.mp3")
+                    e, f, g = (
+                        db.insert_faq(other["id"], f"Question {name}?", f"Answer {name}.", "en")["id"]
+                        for name in "efg"
+                    )
+                    await client.get(f"/api/topics/{other['id']}")
+                    assert started.wait(10)
+                    assert (await client.get(f"/api/faqs/{f}")).json()["answer_audio_url"]
+                    assert get_pregen_stats()["claimed"] == 2
+
+                    # Shutdown drops the queued job and waits for the running one
+                    stopping = asyncio.ensure_future(asyncio.to_thread(pregenerator.stop, 10))
+                    await _until(lambda: get_pregen_stats()["queued"] == 0)
+                    release.set()
+                    assert await stopping == 0
+                    assert calls == [c, a, e]
+                    assert db.get_faq_by_id(g)["answer_audio_url"] is None
+                    assert get_pregen_stats()["generated"] == 3
+
+        asyncio.run(run())
+    finally:
+        from app.pregen import set_pregenerator
+        from app.repository import set_repository
+
+        set_pregenerator(None)
+        set_repository(None)
+        os.chdir(cwd)
+
+
+def test_ranking_off_the_event_loop_and_deadlines():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(tts_latency=0.05, database="edtech_pregen_test")
+    try:
+        import httpx
+        from app import db, pregen
+        from app.main import app, lifespan, _generate_faq_audio
+        from app.pregen import FaqPregenerator, get_pregen_stats, set_pregenerator
+
+        ranked_on, rank_release = [], threading.Event()
+        get_popular = pregen.get_popular
+
+        def slow_get_popular(*args):
+            ranked_on.append(threading.current_thread().name)
+            rank_release.wait(10)
+            return get_popular(*args)
+
+        calls, release = [], threading.Event()
+
+        def generate(faq_id, faq):
+            calls.append(faq_id)
+            release.wait(10)
+            return _generate_faq_audio(faq_id, faq)
+
+        async def run():
+            async with lifespan(app):
+                set_pregenerator(FaqPregenerator(generate, concurrency=1, per_topic=5))
+                topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+                db.update_topic_audio(topic["id"], "/static/media/audio/topic_1.mp3")
+                a, b = (
+                    db.insert_faq(topic["id"], f"Question {name}?", f"Answer {name}.", "en")["id"]
+                    for name in "ab"
+                )
+
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    # Opening the topic doesn't wait for the ranking query, which runs on a worker thread
+                    await client.get(f"/api/topics/{topic['id']}")
+                    await _until(lambda: ranked_on)
+                    assert ranked_on == ["faq-pregen-0"]
+                    assert get_pregen_stats()["unranked"] == 2
+
+                    # A click while the FAQs are still being ranked keeps them from being queued
+                    assert (await client.get(f"/api/faqs/{b}")).json()["answer_audio_url"]
+                    rank_release.set()
+                    await _until(lambda: calls)
+                    assert calls == [a]
+                    assert get_pregen_stats()["queued"] == 0
+
+                    # Waiting for a running job is bounded by the request deadline
+                    late = await client.get(f"/api/faqs/{a}", headers={"X-Request-Timeout-Ms": "100"})
+                    assert late.status_code == 504
+                    release.set()
+                    await _until(lambda: get_pregen_stats()["generated"] == 1)
+                    assert (await client.get(f"/api/faqs/{a}")).json()["answer_audio_url"]
+                    assert calls == [a]
+
+        pregen.get_popular = slow_get_popular
+        try:
+            asyncio.run(run())
+        finally:
+            pregen.get_popular = get_popular
+    finally:
+        from app.pregen import set_pregenerator
+        from app.repository import set_repository
+
+        set_pregenerator(None)
+        set_repository(None)
+        os.chdir(cwd)
+
+
+def test_list_order_without_analytics_and_edits_during_synthesis():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(tts_latency=0.05, database="edtech_pregen_test")
+    try:
+        import httpx
+        from app import analytics, db, pregen
+        from app.analytics import FAQ_KIND, VIEWS, bucket_start
+        from app.main import app, lifespan, _generate_faq_audio
+        from app.pregen import FaqPregenerator, get_pregen_stats, set_pregenerator
+        from app.repository import get_repository
+
+        queried = []
+
+        def unavailable(*args):
+            queried.append(args)
+            raise RuntimeError("no analytics here")
+
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def generate(faq_id, faq):
+            calls.append(faq_id)
+            started.set()
+            release.wait(10)
+            return _generate_faq_audio(faq_id, faq)
+
+        async def run():
+            async with lifespan(app):
+                set_pregenerator(FaqPregenerator(generate, concurrency=1, per_topic=2))
+                topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+                db.update_topic_audio(topic["id"], "/static/media/audio/topic_1.mp3")
+                a, b = (
+                    db.insert_faq(topic["id"], f"Question {name}?", f"Answer {name}.", "en")["id"]
+                    for name in "ab"
+                )
+                get_repository().add_counts({(FAQ_KIND, b, bucket_start(time.time())): {VIEWS: 5}})
+
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    # No view counts to rank by: list order
+                    await client.get(f"/api/topics/{topic['id']}")
+                    assert started.wait(10)
+                    assert calls == [a]
+                    assert queried == []
+
+                    # Editing the FAQ being synthesised disowns the job
+                    response = await client.patch(f"/api/faqs/{a}", json={"answer": "Answer a, revised."})
+                    assert response.status_code == 200
+                    assert get_pregen_stats()["cancelled"] == 1
+                    # A click synthesises the new answer instead of waiting for the old one
+                    revised = (await client.get(f"/api/faqs/{a}")).json()["answer_audio_url"]
+                    assert get_pregen_stats()["claimed"] == 0
+
+                    release.set()
+                    await _until(lambda: get_pregen_stats()["generated"] == 1)
+                    assert calls == [a, b]
+                    db.close_db()
+                    assert db.get_faq_by_id(a)["answer_audio_url"] == revised
+                    assert db.get_faq_by_id(b)["answer_audio_url"]
+
+        previous = analytics.ANALYTICS_ENABLED
+        analytics.ANALYTICS_ENABLED = False
+        pregen.get_popular = unavailable
+        try:
+            asyncio.run(run())
+        finally:
+            analytics.ANALYTICS_ENABLED = previous
+            pregen.get_popular = analytics.get_popular
+    finally:
+        from app.pregen import set_pregenerator
+        from app.repository import set_repository
+
+        set_pregenerator(None)
+        set_repository(None)
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing FAQ audio pregeneration...")
+    print("-" * 50)
+    test_topic_opening_pregenerates_popular_faqs()
+    test_ranking_off_the_event_loop_and_deadlines()
+    test_list_order_without_analytics_and_edits_during_synthesis()
+    print("\n✓ All pregeneration tests passed")
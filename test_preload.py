@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test script for the Link preload hints on topic responses (app.preload).
+Runs in-process on mongomock and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_topic_preloads_only_static_audio():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_preload_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import db
+        from app.main import app
+
+        with TestClient(app) as client:
+            topic = client.post(
+                "/api/topics",
+                json={"title": "Tides", "content_text": "The moon pulls the oceans.", "language": "en"},
+            ).json()
+            voiced = client.post(
+                "/api/faqs",
+                json={"topic_id": topic["id"], "question": "Why?", "answer": "Gravity.", "language": "en"},
+            ).json()
+            # No audio yet, so nothing to hint for it
+            db.insert_faq(topic["id"], "When?", "Twice a day.", "en")
+
+            response = client.get(f"/api/topics/{topic['id']}")
+            assert response.status_code == 200
+            body = response.json()
+            urls = re.findall(r"<([^>]+)>", response.headers["link"])
+
+            # Topic audio first, then the answer audio that already exists
+            assert urls[0] == (body["audio_hls_url"] or body["audio_url"])
+            assert urls[1:] == [voiced["answer_audio_url"]]
+            # Preloads carry no Purpose: prefetch, so API URLs would count views and synthesise
+            assert not any(url.startswith("/api/") for url in urls)
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing preload hints...")
+    print("-" * 50)
+    test_topic_preloads_only_static_audio()
+    print("\n✓ All preload tests passed")
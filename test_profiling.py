@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test script for opt-in request profiling.
+Runs the API on mongomock and the fake TTS engine, profiles a topic
+request that generates audio, and checks the stored profile. Also checks
+that the admin endpoints require the admin token and are never profiled.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+SECRET = "test-secret"
+ADMIN_TOKEN = "test-admin-token"
+ADMIN_HEADERS = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@contextmanager
+def _profiled_app():
+    """TestClient for the app in a sandbox, with profiling secret and admin token set."""
+    from benchmarks.fakes import setup_environment
+    from app import admin, profiling
+
+    cwd = os.getcwd()
+    sandbox = setup_environment(tts_latency=0.05)
+    try:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        profiling.PROFILE_SECRET = SECRET
+        profiling.PROFILE_DIR = sandbox / "profiles"
+        admin.ADMIN_TOKEN = ADMIN_TOKEN
+        with TestClient(app) as client:
+            yield client
+    finally:
+        profiling.PROFILE_SECRET = ""
+        admin.ADMIN_TOKEN = ""
+        os.chdir(cwd)
+
+
+def _prepare_slow_topic() -> str:
+    """Make a topic whose next request queries many FAQs and synthesizes audio."""
+    from app.db import get_all_topics, get_faqs_collection, update_topic_audio
+
+    topic_id = get_all_topics()[0]["id"]
+    update_topic_audio(topic_id, "")
+    get_faqs_collection().insert_many(
+        [{"topic_id": "other-topic", "question": f"Q{i}?", "answer": "A."} for i in range(3000)]
+    )
+    return topic_id
+
+
+def test_profile_contains_db_and_tts_frames():
+    """A signed request is profiled and its samples cover app/db.py and app/tts_stub.py."""
+    from app.profiling import sign
+
+    with _profiled_app() as client:
+        topic_id = _prepare_slow_topic()
+        path = f"/api/topics/{topic_id}"
+        response = client.get(path, headers={"X-Profile-Signature": sign(path, SECRET)})
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+
+        profile_path = f"/api/admin/profiles/{profile_id}"
+        response = client.get(profile_path, headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        profile = response.json()
+
+        sampled = profile["profiles"][0]
+        assert sampled["samples"] and len(sampled["samples"]) == len(sampled["weights"])
+
+        files = {Path(frame["file"]).as_posix() for frame in profile["shared"]["frames"]}
+        assert any(name.endswith("app/db.py") for name in files)
+        assert any(name.endswith("app/tts_stub.py") for name in files)
+        print(f"  {len(sampled['samples'])} samples, {sampled['endValue']:.0f} ms profiled")
+
+        response = client.get(profile_path, params={"format": "folded"}, headers=ADMIN_HEADERS)
+        assert "generate_tts_audio" in response.text
+
+
+def test_unsigned_requests_not_profiled():
+    """Requests without a valid signature are served normally and not profiled."""
+    with _profiled_app() as client:
+        response = client.get("/api/topics", headers={"X-Profile-Signature": "forged"})
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+
+
+
+def test_admin_endpoints_require_the_admin_token():
+    """Every /api/admin/ route needs X-Admin-Token; a profile signature is not enough."""
+    from app import admin
+    from app.profiling import sign
+
+    with _profiled_app() as client:
+        for path in ("/api/admin/profiles", "/api/admin/duplicates", "/api/admin/metrics"):
+            assert client.get(path).status_code == 403
+            assert client.get(path, headers={"X-Profile-Signature": sign(path, SECRET)}).status_code == 403
+            assert client.get(path, headers={"X-Admin-Token": "forged"}).status_code == 403
+            response = client.get(
+                path, headers={**ADMIN_HEADERS, "X-Profile-Signature": sign(path, SECRET)}
+            )
+            assert response.status_code == 200
+            # Admin endpoints are never profiled
+            assert "X-Profile-Id" not in response.headers
+
+        # Without a configured token the admin endpoints are closed
+        admin.ADMIN_TOKEN = ""
+        assert client.get("/api/admin/metrics", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_signatures_expire():
+    """Expired signatures, and ones claiming to outlive the TTL, are rejected."""
+    from app import profiling
+    from app.profiling import sign, verify_signature
+
+    profiling.PROFILE_SECRET = SECRET
+    try:
+        path = "/api/topics/t1"
+        now = int(time.time())
+        assert verify_signature(path, sign(path, SECRET))
+        assert not verify_signature("/api/topics", sign(path, SECRET))
+        assert not verify_signature(path, sign(path, SECRET, expires_at=now - 1))
+        assert not verify_signature(
+            path, sign(path, SECRET, expires_at=now + profiling.PROFILE_SIGNATURE_TTL_S + 60)
+        )
+        # The expiry is part of the signed payload
+        expires, digest = sign(path, SECRET).split(".")
+        assert not verify_signature(path, f"{int(expires) + 1}.{digest}")
+        assert not verify_signature(path, digest)
+    finally:
+        profiling.PROFILE_SECRET = ""
+
+
+def test_sampling_is_bounded(tmp_path):
+    """The sampler stops at its caps and when an event stream starts."""
+    from app import profiling
+    from app.profiling import ProfilingMiddleware, SamplingProfiler, sign
+
+    switch_interval = sys.getswitchinterval()
+    profiler = SamplingProfiler(threading.get_ident(), interval_ms=1, max_samples=5)
+    profiler.start()
+    deadline = time.monotonic() + 10
+    while profiler._thread.is_alive():
+        assert time.monotonic() < deadline, "sampler did not stop"
+        time.sleep(0.01)
+    assert len(profiler.samples) == 5
+    assert sys.getswitchinterval() == switch_interval
+    profiler.stop()
+
+    async def stream(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream")],
+            }
+        )
+        await asyncio.sleep(0.5)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    messages = []
+    path = "/api/topics/t1/events"
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "headers": [(b"x-profile-signature", sign(path, SECRET).encode())],
+    }
+    profiling.PROFILE_SECRET = SECRET
+    profiling.PROFILE_DIR = tmp_path
+    try:
+        asyncio.run(ProfilingMiddleware(stream)(scope, receive, send))
+    finally:
+        profiling.PROFILE_SECRET = ""
+        profiling.PROFILE_DIR = Path("profiles")
+
+    profile_id = dict(messages[0]["headers"])[b"x-profile-id"].decode()
+    profile = json.loads((tmp_path / f"{profile_id}{profiling.SPEEDSCOPE_SUFFIX}").read_text())
+    # Only the time before the stream opened was sampled, not its 500 ms
+    assert profile["profiles"][0]["endValue"] < 250
+    assert sys.getswitchinterval() == switch_interval
+
+
+if __name__ == "__main__":
+    print("Testing request profiling...")
+    print("-" * 50)
+    test_profile_contains_db_and_tts_frames()
+    test_unsigned_requests_not_profiled()
+    test_admin_endpoints_require_the_admin_token()
+    test_signatures_expire()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_sampling_is_bounded(Path(tmp_dir))
+    print("\n✓ All profiling tests passed")
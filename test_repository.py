@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the catalogue repositories.
+Runs the same checks against mongomock and a temporary SQLite file.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _use_backend(backend: str, tmp_dir: str):
+    from benchmarks.fakes import install_mongomock
+    from app import db
+    from app.repository import SQLiteRepository, set_repository
+
+    if backend == "sqlite":
+        set_repository(SQLiteRepository(str(Path(tmp_dir) / "catalogue.sqlite3")))
+    else:
+        install_mongomock("edtech_repository_test")
+    db.clear_catalogue()
+    return db
+
+
+def check_documents_round_trip(db):
+    topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+    assert topic["version"] == 1
+    other = db.insert_topic("Gezeiten", "Der Mond zieht die Ozeane.", "de")
+    faq = db.insert_faq(topic["id"], "How often?", "Twice a day.", "en")
+    db.insert_faq(topic["id"], "Why?", "Gravity.", "en")
+
+    assert db.count_topics() == 2
+    assert db.get_topic_by_id(topic["id"]) == topic
+    assert db.get_faq_by_id(faq["id"]) == faq
+    assert db.get_topic_by_id("0" * 24) is None
+    assert db.get_faq_by_id("not-an-id") is None
+
+    assert db.get_all_topics() == [
+        {"id": topic["id"], "title": "Tides", "language": "en"},
+        {"id": other["id"], "title": "Gezeiten", "language": "de"},
+    ]
+    assert [item["question"] for item in db.get_faqs_by_topic_id(topic["id"])] == ["How often?", "Why?"]
+    assert db.get_faqs_by_topic_id(other["id"]) == []
+    assert [item["id"] for item in db.iter_faqs()] == [
+        item["id"] for item in db.get_faqs_by_topic_id(topic["id"])
+    ]
+
+    # Audio and timing updates (flushed, in case they were batched)
+    db.update_faq_audio(faq["id"], "/static/media/audio/faq_1.mp3")
+    db.update_faq_timing(faq["id"], {"version": 1, "words": [{"word": "Twice", "start_ms": 0}]})
+    db.close_db()
+    stored = db.get_faq_by_id(faq["id"])
+    assert stored["answer_audio_url"] == "/static/media/audio/faq_1.mp3"
+    assert stored["timing_track"]["words"][0]["word"] == "Twice"
+    assert db.get_faqs_by_topic_id(topic["id"])[0]["answer_audio_url"].endswith("faq_1.mp3")
+
+
+def check_versioned_updates(db):
+    topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en", audio_url="/a.mp3")
+    db.update_topic_timing(topic["id"], {"version": 1, "words": []})
+    db.close_db()
+
+    renamed = db.update_topic(topic["id"], {"title": "Ocean tides"}, expected_version=1)
+    assert renamed["version"] == 2
+    assert renamed["audio_url"] == "/a.mp3"
+    assert db.update_topic(topic["id"], {"title": "Ocean tides"})["version"] == 2
+
+    with pytest.raises(db.VersionConflictError) as conflict:
+        db.update_topic(topic["id"], {"content_text": "Lost update."}, expected_version=1)
+    assert conflict.value.current_version == 2
+
+    edited = db.update_topic(topic["id"], {"content_text": "The sun helps too."})
+    assert edited["version"] == 3
+    assert edited["audio_url"] is None
+    assert "timing_track" not in edited
+    assert db.get_topic_by_id(topic["id"]) == edited
+    assert db.update_topic("0" * 24, {"title": "Missing"}) is None
+
+
+@pytest.mark.parametrize("backend", ["mongo", "sqlite"])
+def test_backends_store_the_same_documents(backend):
+    from app.repository import set_repository
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            check_documents_round_trip(_use_backend(backend, tmp_dir))
+            check_versioned_updates(_use_backend(backend, tmp_dir))
+        finally:
+            set_repository(None)
+
+
+def test_sqlite_rejects_unknown_fields():
+    from app.repository import set_repository
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = _use_backend("sqlite", tmp_dir)
+        try:
+            topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+            with pytest.raises(ValueError):
+                db.update_topic(topic["id"], {"colour": "blue"})
+        finally:
+            db.close_db()
+            set_repository(None)
+
+
+if __name__ == "__main__":
+    print("Testing catalogue repositories...")
+    print("-" * 50)
+    for backend in ("mongo", "sqlite"):
+        test_backends_store_the_same_documents(backend)
+        print(f"✓ {backend}")
+    test_sqlite_rejects_unknown_fields()
+    print("\n✓ All repository tests passed")
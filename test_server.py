@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script for the production server (app.server): worker sizing, audio
+jobs drained at shutdown, and a two-worker gunicorn master that seeds
+once, reloads on HUP without failed requests and stops cleanly on TERM.
+
+Requires the development dependencies (pip install -r requirements-dev.txt)
+and gunicorn for the multi-process test.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_worker_count_follows_cpu_quota(tmp_path, monkeypatch):
+    from app import server
+
+    assert server.cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert server.cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert server.cgroup_cpu_limit(tmp_path) == 1.5
+
+    # cgroup v1
+    (tmp_path / "cpu.max").unlink()
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert server.cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    assert server.cgroup_cpu_limit(tmp_path) == 2.0
+
+    # A 2-CPU quota on an 8-CPU host gives 2 workers, not 8
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    assert server.available_cpus(tmp_path) == 2
+    monkeypatch.setattr(server, "CGROUP_ROOT", tmp_path)
+    monkeypatch.setattr(server, "available_cpus", lambda root=tmp_path: 1)
+    assert server.worker_count() == 2
+    monkeypatch.setattr(server, "WEB_CONCURRENCY", 5)
+    assert server.worker_count() == 5
+
+
+def test_shutdown_waits_for_abandoned_audio_jobs():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    sandbox = setup_environment(tts_latency=1.0, database="edtech_server_test")
+    try:
+        import httpx
+        from app import db
+        from app.main import app, lifespan
+        from app.tts_stub import pending_audio_jobs
+
+        async def run():
+            async with lifespan(app):
+                topic = db.insert_topic("Volcanoes", "Molten rock rises through the crust.", "en")
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    # The client gives up while the narration is being synthesised
+                    request = asyncio.create_task(client.get(f"/api/topics/{topic['id']}"))
+                    deadline = time.monotonic() + 10
+                    while not pending_audio_jobs():
+                        assert time.monotonic() < deadline, "synthesis did not start"
+                        await asyncio.sleep(0.01)
+                    request.cancel()
+                    with pytest.raises(asyncio.CancelledError):
+                        await request
+                    assert pending_audio_jobs() == 1
+                database = db.get_repository().db
+            return topic["id"], database
+
+        topic_id, database = asyncio.run(run())
+        # Shutdown waited for the job, and its result was written before the client closed
+        assert pending_audio_jobs() == 0
+        stored = database["topics"].find_one({"title": "Volcanoes"})
+        assert stored["audio_url"] and (sandbox / stored["audio_url"].lstrip("/")).exists()
+        assert str(stored["_id"]) == topic_id
+    finally:
+        os.chdir(cwd)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(port: int, path: str):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}", headers={"X-Admin-Token": "test-admin-token"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_workers_reload_and_stop_gracefully():
+    pytest.importorskip("gunicorn")
+    from benchmarks.fakes import make_sandbox
+
+    cwd = os.getcwd()
+    sandbox = make_sandbox()
+    os.chdir(cwd)
+    port = _free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(Path(__file__).resolve().parent),
+        DB_BACKEND="sqlite",
+        SQLITE_PATH=str(sandbox / "catalogue.sqlite3"),
+        PORT=str(port),
+        HOST="127.0.0.1",
+        WEB_CONCURRENCY="2",
+        LOG_LEVEL="WARNING",
+        ADMIN_TOKEN="test-admin-token",
+        # Counters stay in memory until each worker's shutdown writes them
+        ANALYTICS_FLUSH_INTERVAL_S="3600",
+    )
+    master = subprocess.Popen(
+        [sys.executable, "-m", "app.server"], cwd=sandbox, env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                _get(port, "/health")
+                break
+            except OSError:
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.2)
+
+        # Seeded once by the master, not once per worker
+        status, topics = _get(port, "/api/topics")
+        assert status == 200 and len(topics) == 2
+        topic_path = f"/api/topics/{topics[0]['id']}"
+
+        def worker_pids():
+            return {_get(port, "/api/admin/metrics")[1]["worker_pid"] for _ in range(20)}
+
+        old_pids = worker_pids()
+        views = 0
+        master.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            assert _get(port, topic_path)[0] == 200
+            views += 1
+            if not worker_pids() & old_pids:
+                break
+        else:
+            pytest.fail("old workers still serving after reload")
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=60) == 0
+
+        # Every worker, old and new, wrote its view counts on the way out
+        with sqlite3.connect(sandbox / "catalogue.sqlite3") as connection:
+            (counted,) = connection.execute(
+                "SELECT SUM(views) FROM counters WHERE kind = 'topic' AND doc_id = ?", (topics[0]["id"],)
+            ).fetchone()
+        assert counted == views
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("Testing production server...")
+    print("-" * 50)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        monkeypatch = pytest.MonkeyPatch()
+        try:
+            test_worker_count_follows_cpu_quota(Path(tmp_dir), monkeypatch)
+        finally:
+            monkeypatch.undo()
+    test_shutdown_waits_for_abandoned_audio_jobs()
+    test_workers_reload_and_stop_gracefully()
+    print("\n✓ All production server tests passed")
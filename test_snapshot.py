@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for read-only catalogue snapshots.
+Runs against an in-memory mongomock database.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _seeded_db():
+    from benchmarks.fakes import install_mongomock
+    from app import db
+    from app.seed_data import seed_database
+
+    database = install_mongomock("edtech_snapshot_test")
+    database.topics.delete_many({})
+    database.faqs.delete_many({})
+    seed_database()
+    topic_id = db.get_all_topics()[0]["id"]
+    db.update_topic_timing(topic_id, {"version": 1, "duration_ms": 10, "words": [], "visemes": []})
+    db.close_db()
+    return db
+
+
+def _reads(db):
+    topics = db.get_all_topics()
+    return {
+        "topics": topics,
+        "details": [db.get_topic_by_id(topic["id"]) for topic in topics],
+        "faqs": [db.get_faqs_by_topic_id(topic["id"]) for topic in topics],
+        "faq_details": [
+            db.get_faq_by_id(faq["id"]) for topic in topics for faq in db.get_faqs_by_topic_id(topic["id"])
+        ],
+    }
+
+
+def test_snapshot_reads_match_database():
+    from app import snapshot
+
+    db = _seeded_db()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "catalogue.snap"
+        snapshot.export_snapshot(str(path))
+
+        expected = _reads(db)
+        snapshot.set_snapshot_path(str(path))
+        try:
+            assert _reads(db) == expected
+            assert db.get_topic_by_id("0" * 24) is None
+            assert db.get_faq_by_id("not-an-id") is None
+            assert db.get_faqs_by_topic_id("0" * 24) == []
+        finally:
+            snapshot.set_snapshot_path(None)
+
+
+def test_new_snapshot_is_swapped_in_and_writes_are_refused():
+    from app import snapshot
+
+    db = _seeded_db()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "catalogue.snap"
+        snapshot.export_snapshot(str(path))
+        snapshot.set_snapshot_path(str(path))
+        check_seconds = snapshot.SNAPSHOT_CHECK_SECONDS
+        try:
+            old = snapshot.get_snapshot()
+            count = len(db.get_all_topics())
+
+            # A newer catalogue is exported from the database behind the edge node
+            db.get_topics_collection().insert_one(
+                {"title": "Fresh topic", "content_text": "Just published.", "language": "en"}
+            )
+            snapshot.export_snapshot(str(path))
+
+            snapshot.SNAPSHOT_CHECK_SECONDS = 0
+            assert len(db.get_all_topics()) == count + 1
+            assert snapshot.get_snapshot() is not old
+            # Readers still holding the previous mapping are unaffected
+            assert len(old.list_topics()) == count
+
+            try:
+                db.insert_topic("Edge write", "Not allowed.", "en")
+                raise AssertionError("insert_topic should fail in snapshot mode")
+            except RuntimeError:
+                pass
+            assert db.update_topic_audio(db.get_all_topics()[0]["id"], "/x.mp3") is False
+        finally:
+            snapshot.SNAPSHOT_CHECK_SECONDS = check_seconds
+            snapshot.set_snapshot_path(None)
+
+
+if __name__ == "__main__":
+    print("Testing catalogue snapshots...")
+    print("-" * 50)
+    test_snapshot_reads_match_database()
+    test_new_snapshot_is_swapped_in_and_writes_are_refused()
+    print("\n✓ All snapshot tests passed")
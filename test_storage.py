@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for the audio storage backends.
+The S3 backend runs against moto's in-process S3 stand-in; the same code
+works against MinIO by setting S3_ENDPOINT_URL.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+BUCKET = "avatar-audio-test"
+
+
+@contextmanager
+def _bucket():
+    """An empty mocked S3 bucket and a client for it."""
+    import boto3
+    from botocore.config import Config
+    from moto import mock_aws
+
+    with mock_aws():
+        client = boto3.client(
+            "s3", region_name="us-east-1", config=Config(signature_version="s3v4")
+        )
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _node(client, local_dir: Path, **kwargs):
+    """S3 storage as one app node would see it."""
+    from app.storage import S3Storage
+
+    return S3Storage(bucket=BUCKET, local_dir=str(local_dir), client=client, **kwargs)
+
+
+def test_nodes_share_synthesis_cache():
+    """Audio synthesised on one node is reused, not re-synthesised, on another."""
+    from benchmarks.fakes import install_fake_tts, FakeTTS
+    from app import storage, tts_stub
+
+    calls = []
+
+    class CountingTTS(FakeTTS):
+        def save(self, path):
+            calls.append(self.text)
+            super().save(path)
+
+    install_fake_tts()
+    tts_stub.set_tts_engine(CountingTTS)
+
+    with _bucket() as client, tempfile.TemporaryDirectory() as tmp_dir:
+        node_a = _node(client, Path(tmp_dir) / "a")
+        node_b = _node(client, Path(tmp_dir) / "b")
+        text = "Shared storage means every node reuses this narration."
+        try:
+            storage.set_storage(node_a)
+            url = tts_stub.generate_tts_audio(text, "en", "tts_shared.mp3")
+
+            storage.set_storage(node_b)
+            assert tts_stub.generate_tts_audio(text, "en", "tts_shared.mp3") == url
+            assert len(calls) == 1
+
+            # Node B reads through to the bucket the first time it needs the file
+            assert not node_b.cache_path("tts_shared.mp3").exists()
+            local = node_b.local_path("tts_shared.mp3")
+            assert local.read_bytes() == node_a.cache_path("tts_shared.mp3").read_bytes()
+        finally:
+            storage.set_storage(None)
+            tts_stub.set_tts_engine(None)
+
+
+def test_concurrent_first_reads_of_a_key():
+    """Threads that all miss the local cache for one key each get the complete file."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _bucket() as client, tempfile.TemporaryDirectory() as tmp_dir:
+        payload = os.urandom(256 * 1024)
+        client.put_object(Bucket=BUCKET, Key="audio/topic_busy.mp3", Body=payload)
+        node = _node(client, Path(tmp_dir) / "node")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(lambda _: node.local_path("topic_busy.mp3"), range(8)))
+
+        assert {path.read_bytes() for path in paths} == {payload}
+        assert [path.name for path in node.local_dir.iterdir()] == ["topic_busy.mp3"]
+
+
+def test_large_files_use_multipart():
+    """Files above the threshold are uploaded in parts."""
+    with _bucket() as client, tempfile.TemporaryDirectory() as tmp_dir:
+        node = _node(client, Path(tmp_dir) / "cache", multipart_threshold_mb=5)
+        large = Path(tmp_dir) / "large.mp3"
+        large.write_bytes(os.urandom(11 * 1024 * 1024))
+
+        node.put_file("large.mp3", large)
+        head = client.head_object(Bucket=BUCKET, Key="audio/large.mp3")
+        assert head["ContentLength"] == large.stat().st_size
+        assert head["ETag"].strip('"').endswith("-3")  # three 5 MB parts
+        assert head["ContentType"] == "audio/mpeg"
+
+
+def test_audio_requests_redirect_to_signed_url():
+    """The app answers audio requests with a redirect instead of proxying bytes."""
+    from benchmarks.fakes import setup_environment
+    from app import storage
+
+    cwd = os.getcwd()
+    sandbox = setup_environment()
+    try:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        with _bucket() as client, TestClient(app) as test_client:
+            node = _node(client, sandbox / "static" / "media" / "audio")
+            node.put_file("topic_1.mp3", node.cache_path("topic_1.mp3"))
+            storage.set_storage(node)
+
+            response = test_client.get("/static/media/audio/topic_1.mp3", follow_redirects=False)
+            assert response.status_code == 307
+            assert "X-Amz-Signature" in response.headers["location"]
+
+            # Not in the bucket yet: served from local disk
+            response = test_client.get("/static/media/audio/faq_1.mp3", follow_redirects=False)
+            assert response.status_code == 200
+
+            storage.set_storage(storage.FilesystemStorage())
+            response = test_client.get("/static/media/audio/topic_1.mp3", follow_redirects=False)
+            assert response.status_code == 200
+    finally:
+        storage.set_storage(None)
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing audio storage...")
+    print("-" * 50)
+    test_nodes_share_synthesis_cache()
+    test_concurrent_first_reads_of_a_key()
+    test_large_files_use_multipart()
+    test_audio_requests_redirect_to_signed_url()
+    print("\n✓ All storage tests passed")
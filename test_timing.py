@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the avatar word/viseme timing tracks (app.timing) and the
+/timing endpoints. Runs in-process on mongomock and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _check_track(track, words: int):
+    """Words and viseme cues are in order and inside the audio."""
+    duration_ms = track["duration_ms"]
+    assert len(track["words"]) == words
+    previous_end = 0
+    for start, end, _ in track["words"]:
+        assert previous_end <= start < end <= duration_ms
+        previous_end = end
+
+    times = [time_ms for time_ms, _ in track["visemes"]]
+    assert times == sorted(times)
+    assert 0 == times[0] and times[-1] <= duration_ms
+    assert {code for _, code in track["visemes"]} <= set("XAEOMFLS")
+    assert track["visemes"][-1][1] == "X"
+
+
+def test_track_is_ordered_within_the_duration():
+    from app.timing import build_timing_track
+
+    track = build_timing_track("Hello, world. The moon pulls the oceans! नमस्ते दुनिया।", 4.2)
+    assert track["duration_ms"] == 4200
+    _check_track(track, words=9)
+
+    # Punctuation adds a pause between words
+    words = track["words"]
+    comma_gap = words[1][0] - words[0][1]
+    word_gap = words[3][0] - words[2][1]
+    assert comma_gap > word_gap
+
+    # Nothing to say: the mouth stays at rest
+    assert build_timing_track("...", 1.0)["visemes"] == [[0, "X"]]
+
+
+def test_timing_endpoints():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_timing_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app import db
+        from app.main import app
+        from app.mp3 import get_duration
+        from app.transcode import url_to_path
+
+        with TestClient(app) as client:
+            text = "The moon pulls the oceans, twice a day."
+            topic = client.post(
+                "/api/topics", json={"title": "Tides", "content_text": text, "language": "en"}
+            ).json()
+            response = client.get(f"/api/topics/{topic['id']}/timing")
+            assert response.status_code == 200
+            track = response.json()
+            _check_track(track, words=8)
+            duration = get_duration(url_to_path(topic["audio_url"]))
+            assert track["duration_ms"] == round(duration * 1000)
+
+            faq = client.post(
+                "/api/faqs",
+                json={"topic_id": topic["id"], "question": "Why?", "answer": "Gravity.", "language": "en"},
+            ).json()
+            _check_track(client.get(f"/api/faqs/{faq['id']}/timing").json(), words=1)
+
+            # Built on first request for documents stored without one
+            older = db.insert_topic("Rain", "Clouds release water.", "en")
+            db.update_topic_audio(older["id"], topic["audio_url"])
+            assert client.get(f"/api/topics/{older['id']}/timing").status_code == 200
+            assert db.get_topic_by_id(older["id"])["timing_track"]
+
+            # No audio yet, no track
+            silent = db.insert_topic("Snow", "Frozen rain.", "en")
+            assert client.get(f"/api/topics/{silent['id']}/timing").status_code == 404
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing avatar timing tracks...")
+    print("-" * 50)
+    test_track_is_ordered_within_the_duration()
+    test_timing_endpoints()
+    print("\n✓ All timing track tests passed")
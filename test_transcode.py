@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the low-bitrate audio variants (app.transcode): variants
+keep the narration's pauses (needs ffmpeg and ffprobe on PATH, skipped
+without them), and synthesis returns before they are built.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _duration(path: Path, ffprobe: str) -> float:
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-of", "json", "-show_entries", "format=duration", str(path)],
+        check=True,
+        capture_output=True,
+    )
+    return float(json.loads(result.stdout)["format"]["duration"])
+
+
+def test_variants_keep_pauses_inside_the_narration(tmp_path):
+    from app import transcode
+
+    ffmpeg, ffprobe = transcode.find_ffmpeg(), shutil.which("ffprobe")
+    if ffmpeg is None or ffprobe is None:
+        pytest.skip("ffmpeg not installed")
+
+    # Speech, a 1.5 s pause, speech: the pause must survive, or the timing track drifts
+    original = tmp_path / "topic_pause.mp3"
+    subprocess.run(
+        [
+            ffmpeg, "-loglevel", "error",
+            "-f", "lavfi", "-i", "sine=f=220:d=1",
+            "-f", "lavfi", "-i", "anullsrc=r=44100:cl=mono:d=1.5",
+            "-f", "lavfi", "-i", "sine=f=330:d=1",
+            "-filter_complex", "[0][1][2]concat=n=3:v=0:a=1",
+            "-c:a", "libmp3lame", "-b:a", "64k",
+            str(original),
+        ],
+        check=True,
+    )
+
+    variants = transcode.transcode_audio(original)
+    assert [path.name for path in variants] == [
+        "topic_pause.opus16.ogg",
+        "topic_pause.opus24.ogg",
+        "topic_pause.mp3_32.mp3",
+    ]
+    expected = _duration(original, ffprobe)
+    for variant in variants:
+        assert _duration(variant, ffprobe) == pytest.approx(expected, abs=0.15), variant.name
+
+
+def test_synthesis_does_not_wait_for_variants():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_transcode_test")
+    patch = pytest.MonkeyPatch()
+    started, release = threading.Event(), threading.Event()
+    try:
+        from app import transcode
+        from app.storage import get_storage, key_from_url
+        from app.tts_stub import generate_tts_audio
+
+        def slow_transcode(original):
+            # Stands in for ffmpeg: one variant, once the test lets it finish
+            started.set()
+            assert release.wait(10)
+            variant = transcode.variant_path(original, transcode.AUDIO_VARIANTS[0])
+            variant.write_bytes(original.read_bytes()[:100])
+            return [variant]
+
+        patch.setattr(transcode, "find_ffmpeg", lambda: "ffmpeg")
+        patch.setattr(transcode, "transcode_audio", slow_transcode)
+
+        audio_url = generate_tts_audio("The moon pulls the oceans.", "en", "topic_background.mp3")
+        assert started.wait(10)
+        # The MP3 is served while its variants are still being built
+        assert [variant["name"] for variant in transcode.get_audio_variants(audio_url)] == ["original"]
+        assert get_storage().exists(key_from_url(audio_url))
+
+        release.set()
+        transcode.stop_transcoding()
+        assert [variant["name"] for variant in transcode.get_audio_variants(audio_url)] == [
+            "opus16",
+            "original",
+        ]
+    finally:
+        release.set()
+        patch.undo()
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing audio transcoding...")
+    print("-" * 50)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            test_variants_keep_pauses_inside_the_narration(Path(tmp_dir))
+        except pytest.skip.Exception as e:
+            print(f"Skipped: {e}")
+    test_synthesis_does_not_wait_for_variants()
+    print("\n✓ All transcoding tests passed")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script for the PATCH endpoints and returned write documents, and
+audio synthesised from text a PATCH replaced meanwhile not being stored.
+Runs in-process on mongomock (or SQLite) and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_patch_topic_and_faq():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_updates_test")
+    try:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        with TestClient(app) as client:
+            topic = client.post(
+                "/api/topics",
+                json={"title": "Tides", "content_text": "The moon pulls the oceans.", "language": "en"},
+            ).json()
+            assert topic["version"] == 1
+            assert topic["audio_url"]
+            topic_url = f"/api/topics/{topic['id']}"
+
+            # A title change keeps the narration
+            renamed = client.patch(topic_url, json={"title": "Ocean tides", "version": 1}).json()
+            assert renamed["version"] == 2
+            assert renamed["title"] == "Ocean tides"
+            assert renamed["audio_url"] == topic["audio_url"]
+
+            # Writing the same values again changes nothing
+            assert client.patch(topic_url, json={"title": "Ocean tides"}).json()["version"] == 2
+
+            # Editing with a stale version is refused
+            stale = client.patch(topic_url, json={"content_text": "Lost update.", "version": 1})
+            assert stale.status_code == 409
+
+            # A new narration text clears the audio; the next view synthesises it again
+            edited = client.patch(
+                topic_url, json={"content_text": "The moon and the sun pull the oceans."}
+            ).json()
+            assert edited["version"] == 3
+            assert edited["audio_url"] is None
+            regenerated = client.get(topic_url).json()
+            assert regenerated["audio_url"] and regenerated["audio_url"] != topic["audio_url"]
+
+            faq = client.post(
+                "/api/faqs",
+                json={
+                    "topic_id": topic["id"],
+                    "question": "How often?",
+                    "answer": "Twice a day.",
+                    "language": "en",
+                },
+            ).json()
+            faq_url = f"/api/faqs/{faq['id']}"
+            reworded = client.patch(faq_url, json={"question": "How often do tides happen?"}).json()
+            assert reworded["answer_audio_url"] == faq["answer_audio_url"]
+            answered = client.patch(faq_url, json={"answer": "About twice a day."}).json()
+            assert answered["answer_audio_url"] is None
+            assert answered["version"] == 3
+
+            assert client.patch(f"/api/faqs/{'0' * 24}", json={"answer": "x"}).status_code == 404
+
+            # Required fields can be omitted but not nulled; the stored documents stay readable
+            for field in ("title", "content_text", "language", "avatar_video_url"):
+                assert client.patch(topic_url, json={field: None}).status_code == 422
+            for field in ("question", "answer", "language"):
+                assert client.patch(faq_url, json={field: None}).status_code == 422
+            assert client.get(topic_url).json()["title"] == "Ocean tides"
+            assert client.get("/api/topics").status_code == 200
+            assert client.get(faq_url).json()["answer"] == "About twice a day."
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.mark.parametrize("backend", ["mongo", "sqlite"])
+def test_patch_during_synthesis_drops_stale_audio(backend):
+    from benchmarks.fakes import FakeTTS, setup_environment
+
+    cwd = os.getcwd()
+    previous = os.environ.get("DB_BACKEND")
+    os.environ["DB_BACKEND"] = backend
+    setup_environment(database="edtech_updates_test")
+    patch = pytest.MonkeyPatch()
+    try:
+        import httpx
+        from app import db
+        from app.main import app, lifespan
+        from app.pregen import set_pregenerator
+        from app.repository import set_repository
+
+        started, release = threading.Event(), threading.Event()
+        save = FakeTTS.save
+
+        def blocking_save(self, path):
+            # Hold synthesis until the test has edited the text
+            started.set()
+            assert release.wait(10)
+            save(self, path)
+
+        patch.setattr(FakeTTS, "save", blocking_save)
+
+        async def interleave(client, url, field, text):
+            started.clear()
+            release.clear()
+            opening = asyncio.ensure_future(client.get(url))
+            assert await asyncio.to_thread(started.wait, 10)
+            edited = await client.patch(url, json={field: text})
+            assert edited.status_code == 200
+            release.set()
+            # The request that started synthesis still answers with what it read
+            assert (await opening).json()["version"] == 1
+            db.close_db()
+
+        async def run():
+            async with lifespan(app):
+                # Only requests synthesise audio here
+                set_pregenerator(None)
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    topic = db.insert_topic("Tides", "The moon pulls the oceans.", "en")
+                    await interleave(client, f"/api/topics/{topic['id']}", "content_text", "The sun helps.")
+                    stored = db.get_topic_by_id(topic["id"])
+                    assert stored["version"] == 2
+                    assert stored["audio_url"] is None
+                    assert "timing_track" not in stored
+
+                    faq = db.insert_faq(topic["id"], "How often?", "Twice a day.", "en")
+                    await interleave(client, f"/api/faqs/{faq['id']}", "answer", "About twice a day.")
+                    stored = db.get_faq_by_id(faq["id"])
+                    assert stored["version"] == 2
+                    assert stored["answer_audio_url"] is None
+                    assert "timing_track" not in stored
+
+                    # The next view synthesises the new text and keeps it
+                    release.set()
+                    regenerated = (await client.get(f"/api/faqs/{faq['id']}")).json()
+                    db.close_db()
+                    assert db.get_faq_by_id(faq["id"])["answer_audio_url"] == regenerated["answer_audio_url"]
+
+        asyncio.run(run())
+    finally:
+        patch.undo()
+        if previous is None:
+            os.environ.pop("DB_BACKEND", None)
+        else:
+            os.environ["DB_BACKEND"] = previous
+        set_repository(None)
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing update endpoints...")
+    print("-" * 50)
+    test_patch_topic_and_faq()
+    for backend in ("mongo", "sqlite"):
+        test_patch_during_synthesis_drops_stale_audio(backend)
+    print("\n✓ All update tests passed")
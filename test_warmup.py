@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for startup warm-up (app.warmup): /health answers while a
+background warm-up is still seeding, /ready reports 503 until it is done,
+and importing the app doesn't load the heavy libraries.
+Runs in-process on mongomock and the fake TTS engine.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_heavy_imports_are_deferred():
+    """Importing the app doesn't import gTTS, pymongo or python-dotenv."""
+    script = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('gtts', 'pymongo', 'dotenv') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).parent,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_background_warmup_reports_ready_when_done():
+    from benchmarks.fakes import setup_environment
+
+    cwd = os.getcwd()
+    setup_environment(database="edtech_warmup_test")
+    try:
+        import httpx
+        from app import seed_data, warmup
+        from app.main import app, lifespan
+
+        seeding, release = threading.Event(), threading.Event()
+        seed_database = seed_data.seed_database
+
+        def slow_seed_database():
+            seeding.set()
+            release.wait(10)
+            return seed_database()
+
+        async def run():
+            async with lifespan(app):
+                async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                    assert await asyncio.to_thread(seeding.wait, 10)
+                    # Serving already: alive, but not ready until seeding finishes
+                    assert (await client.get("/health")).status_code == 200
+                    response = await client.get("/ready")
+                    assert response.status_code == 503
+                    assert response.json()["status"] == "warming_up"
+
+                    release.set()
+                    deadline = time.monotonic() + 10
+                    while (response := await client.get("/ready")).status_code != 200:
+                        assert time.monotonic() < deadline, "warm-up did not finish"
+                        await asyncio.sleep(0.01)
+                    assert response.json()["warmup_seconds"] is not None
+                    assert (await client.get("/api/topics")).json()
+
+        seed_data.seed_database = slow_seed_database
+        warmup.STARTUP_MODE = "background"
+        warmup._state["ready"] = False
+        try:
+            asyncio.run(run())
+        finally:
+            seed_data.seed_database = seed_database
+            warmup.STARTUP_MODE = "blocking"
+            release.set()
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print("Testing startup warm-up...")
+    print("-" * 50)
+    test_heavy_imports_are_deferred()
+    test_background_warmup_reports_ready_when_done()
+    print("\n✓ All warm-up tests passed")
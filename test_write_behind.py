@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test script for write-behind batching of audio URL updates.
+Runs against an in-memory mongomock database.
+
+Requires the development dependencies (pip install -r requirements-dev.txt).
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _fresh_db(interval_ms: float = 60_000):
+    """mongomock database and a batcher that only flushes when told to (or on size)."""
+    from benchmarks.fakes import install_mongomock
+    from app import db
+    from app.repository import get_repository
+    from app.write_behind import WriteBehindBatcher
+
+    database = install_mongomock("edtech_write_behind_test")
+    database.faqs.delete_many({})
+    get_repository().batcher = WriteBehindBatcher(lambda name: database[name], 100, interval_ms)
+    return db, database
+
+
+def _insert_faqs(db, count: int):
+    return [
+        db.insert_faq("topic-1", f"Question {i}?", f"Answer {i}.", "en")["id"] for i in range(count)
+    ]
+
+
+def test_updates_coalesce_into_one_write():
+    """Repeated updates to one document are written once, with the latest value."""
+    db, database = _fresh_db()
+    faq_id = _insert_faqs(db, 1)[0]
+
+    for i in range(5):
+        assert db.update_faq_audio(faq_id, f"/static/media/audio/faq_{i}.mp3")
+
+    # Reads see the queued value before it is written
+    assert database.faqs.find_one()["answer_audio_url"] is None
+    assert db.get_faq_by_id(faq_id)["answer_audio_url"] == "/static/media/audio/faq_4.mp3"
+    assert db.get_faqs_by_topic_id("topic-1")[0]["answer_audio_url"].endswith("faq_4.mp3")
+
+    assert db.get_write_batcher().flush() == 1
+    assert database.faqs.find_one()["answer_audio_url"] == "/static/media/audio/faq_4.mp3"
+
+    stats = db.get_write_batch_stats()
+    assert stats["queued_updates"] == 5
+    assert stats["coalesced_updates"] == 4
+    assert stats["batches"] == 1
+    db.get_write_batcher().stop()
+
+
+def test_full_batch_flushes_without_waiting():
+    """Reaching the batch size wakes the writer before the interval elapses."""
+    import time
+
+    db, database = _fresh_db()
+    faq_ids = _insert_faqs(db, 100)
+    for faq_id in faq_ids:
+        db.update_faq_audio(faq_id, "/static/media/audio/faq_1.mp3")
+
+    deadline = time.time() + 5
+    while database.faqs.count_documents({"answer_audio_url": None}) and time.time() < deadline:
+        time.sleep(0.01)
+    assert database.faqs.count_documents({"answer_audio_url": None}) == 0
+    assert db.get_write_batch_stats()["max_batch_size"] == 100
+    db.get_write_batcher().stop()
+
+
+def test_close_db_writes_pending_updates():
+    """Nothing queued is lost on shutdown."""
+    db, database = _fresh_db()
+    faq_ids = _insert_faqs(db, 10)
+    for faq_id in faq_ids:
+        db.update_faq_timing(faq_id, {"words": []})
+
+    db.close_db()
+    assert database.faqs.count_documents({"timing_track": {"words": []}}) == 10
+    assert db.get_write_batch_stats()["pending_documents"] == 0
+
+
+class _FlakyCollection:
+    """A collection whose first `failures` bulk writes raise."""
+
+    def __init__(self, collection, failures: int):
+        self.collection = collection
+        self.failures = failures
+
+    def bulk_write(self, operations, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("primary stepped down")
+        return self.collection.bulk_write(operations, ordered=ordered)
+
+
+def test_versioned_updates_only_apply_to_their_version():
+    """An update for an edited document is neither shown nor written."""
+    db, database = _fresh_db()
+    faq_id = _insert_faqs(db, 1)[0]
+
+    db.update_faq_audio(faq_id, "/old.mp3", 1)
+    assert db.get_faq_by_id(faq_id)["answer_audio_url"] == "/old.mp3"
+    # The edit writes the queued update first, then clears it with the version bump
+    db.update_faq(faq_id, {"answer": "New answer."})
+    db.update_faq_audio(faq_id, "/stale.mp3", 1)
+    db.update_faq_timing(faq_id, {"version": 1, "words": []}, 1)
+    assert db.get_faq_by_id(faq_id)["answer_audio_url"] is None
+    assert db.get_faq_by_id(faq_id, ("answer_audio_url",)) == {"id": faq_id, "answer_audio_url": None}
+    db.get_write_batcher().flush()
+    assert database.faqs.find_one({})["answer_audio_url"] is None
+
+    # An update for the current version replaces a stale one instead of merging
+    db.update_faq_timing(faq_id, {"version": 1, "words": []}, 1)
+    db.update_faq_audio(faq_id, "/new.mp3", 2)
+    db.close_db()
+    stored = database.faqs.find_one({})
+    assert stored["answer_audio_url"] == "/new.mp3"
+    assert "timing_track" not in stored
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_stop_retries_then_reports_lost_updates():
+    """A failing final flush is retried; what still can't be written is logged."""
+    from app import write_behind
+    from app.write_behind import WriteBehindBatcher
+
+    db, database = _fresh_db()
+    faq_ids = _insert_faqs(db, 2)
+    write_behind.STOP_RETRY_DELAY_S = 0.01
+    try:
+        flaky = _FlakyCollection(database.faqs, failures=1)
+        batcher = WriteBehindBatcher(lambda name: flaky, 100, 60_000)
+        batcher.queue_set("faqs", faq_ids[0], {"answer_audio_url": "/a.mp3"})
+        assert batcher.stop() == 0
+        assert database.faqs.find_one({"answer_audio_url": "/a.mp3"}) is not None
+
+        down = _FlakyCollection(database.faqs, failures=100)
+        batcher = WriteBehindBatcher(lambda name: down, 100, 60_000)
+        batcher.queue_set("faqs", faq_ids[1], {"answer_audio_url": "/b.mp3"})
+        handler = _Records()
+        logging.getLogger("app.write_behind").addHandler(handler)
+        try:
+            assert batcher.stop() == 1
+        finally:
+            logging.getLogger("app.write_behind").removeHandler(handler)
+        lost = [record for record in handler.records if record.msg.endswith("at shutdown")]
+        assert lost and lost[0].ids == [f"faqs/{faq_ids[1]}"]
+        assert database.faqs.find_one({"answer_audio_url": "/b.mp3"}) is None
+    finally:
+        write_behind.STOP_RETRY_DELAY_S = 0.2
+
+
+if __name__ == "__main__":
+    print("Testing write-behind batching...")
+    print("-" * 50)
+    test_updates_coalesce_into_one_write()
+    test_full_batch_flushes_without_waiting()
+    test_close_db_writes_pending_updates()
+    test_versioned_updates_only_apply_to_their_version()
+    test_stop_retries_then_reports_lost_updates()
+    print("\n✓ All write-behind tests passed")